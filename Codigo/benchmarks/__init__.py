@@ -0,0 +1,27 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Performance benchmarks for HookCI.
+
+The suite runs the real application code against a simulated Docker backend
+so results reflect HookCI's own overhead rather than the daemon's. Run it with
+`scripts/bench`; see `python -m benchmarks --help` for the available options.
+
+Results are written as JSON with `--output`. Passing a previous results file
+with `--baseline` prints the relative change of every metric and exits with a
+non-zero status when one regressed beyond `--threshold`.
+"""
@@ -0,0 +1,119 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Command-line entry point: `python -m benchmarks [--output FILE] [--baseline FILE]`.
+"""
+import argparse
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+from rich.console import Console
+from rich.table import Table
+
+from benchmarks.results import BenchmarkResults, Comparison, compare
+from benchmarks.suite import BENCHMARKS, LIVE_BENCHMARKS, run_benchmarks
+
+console = Console()
+
+
+def _parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description="Run the HookCI benchmark suite."
+    )
+    parser.add_argument(
+        "benchmarks",
+        nargs="*",
+        metavar="BENCHMARK",
+        help=(
+            f"Benchmarks to run: {', '.join(BENCHMARKS)} (default: all), or "
+            f"{', '.join(LIVE_BENCHMARKS)}, which need a Docker daemon."
+        ),
+    )
+    parser.add_argument("-o", "--output", type=Path, help="Write results as JSON to this file.")
+    parser.add_argument(
+        "-b", "--baseline", type=Path, help="Compare against a previous results file."
+    )
+    parser.add_argument(
+        "-t",
+        "--threshold",
+        type=float,
+        default=0.15,
+        help="Relative slowdown that counts as a regression (default: 0.15).",
+    )
+    parser.add_argument("--quick", action="store_true", help="Use smaller workloads.")
+    args = parser.parse_args(argv)
+    unknown = [
+        name for name in args.benchmarks if name not in BENCHMARKS and name not in LIVE_BENCHMARKS
+    ]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+    return args
+
+
+def _print_results(results: BenchmarkResults) -> None:
+    table = Table(title="HookCI benchmarks")
+    table.add_column("Metric")
+    table.add_column("Value", justify="right")
+    table.add_column("Unit")
+    for name, metric in results.metrics.items():
+        table.add_row(name, f"{metric.value:.3f}", metric.unit)
+    console.print(table)
+
+
+def _print_comparison(comparisons: List[Comparison]) -> None:
+    table = Table(title="Comparison with baseline")
+    table.add_column("Metric")
+    table.add_column("Baseline", justify="right")
+    table.add_column("Current", justify="right")
+    table.add_column("Change", justify="right")
+    for c in comparisons:
+        style = "red" if c.regressed else ("green" if c.change < 0 else "")
+        table.add_row(
+            c.name,
+            f"{c.baseline:.3f} {c.unit}",
+            f"{c.current:.3f} {c.unit}",
+            f"[{style}]{c.change:+.1%}[/]" if style else f"{c.change:+.1%}",
+        )
+    console.print(table)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(argv)
+    selected = args.benchmarks or list(BENCHMARKS)
+
+    results = BenchmarkResults()
+    for metrics in run_benchmarks(selected, quick=args.quick):
+        results.metrics.update(metrics)
+    _print_results(results)
+
+    if args.output:
+        results.write(args.output)
+        console.print(f"Results written to [cyan]{args.output}[/cyan]")
+
+    if args.baseline:
+        comparisons = compare(BenchmarkResults.read(args.baseline), results, args.threshold)
+        _print_comparison(comparisons)
+        regressions = [c.name for c in comparisons if c.regressed]
+        if regressions:
+            console.print(f"[bold red]Regressed beyond {args.threshold:.0%}:[/] {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
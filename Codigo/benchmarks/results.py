@@ -0,0 +1,101 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Benchmark result records, their JSON format and baseline comparison.
+"""
+import json
+import platform
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+from pydantic import BaseModel, Field
+
+# Bumped whenever the layout of the results file changes incompatibly.
+RESULTS_SCHEMA_VERSION: int = 1
+
+
+class Metric(BaseModel):
+    """A single measured value."""
+
+    value: float
+    unit: str
+    lower_is_better: bool = True
+
+
+class BenchmarkResults(BaseModel):
+    """The content of a results file written by `python -m benchmarks -o`."""
+
+    schema_version: int = RESULTS_SCHEMA_VERSION
+    created_at: str = Field(
+        default_factory=lambda: datetime.now(timezone.utc).isoformat(timespec="seconds")
+    )
+    python: str = Field(default_factory=platform.python_version)
+    platform: str = Field(default_factory=platform.platform)
+    metrics: Dict[str, Metric] = Field(default_factory=dict)
+
+    def write(self, path: Path) -> None:
+        path.write_text(self.model_dump_json(indent=2) + "\n", encoding="utf-8")
+
+    @classmethod
+    def read(cls, path: Path) -> "BenchmarkResults":
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if data.get("schema_version") != RESULTS_SCHEMA_VERSION:
+            raise ValueError(
+                f"{path} uses results schema {data.get('schema_version')}, "
+                f"expected {RESULTS_SCHEMA_VERSION}."
+            )
+        return cls.model_validate(data)
+
+
+class Comparison(BaseModel):
+    """How one metric moved relative to the baseline."""
+
+    name: str
+    baseline: float
+    current: float
+    unit: str
+    change: float  # Relative change, positive means worse.
+    regressed: bool
+
+
+def compare(
+    baseline: BenchmarkResults, current: BenchmarkResults, threshold: float
+) -> List[Comparison]:
+    """
+    Compares the metrics present in both result sets. A metric regresses when
+    it got worse by more than `threshold` (a fraction, e.g. 0.15 for 15%).
+    """
+    comparisons = []
+    for name, metric in current.metrics.items():
+        old = baseline.metrics.get(name)
+        if old is None or old.value == 0:
+            continue
+        change = (metric.value - old.value) / old.value
+        if not metric.lower_is_better:
+            change = -change
+        comparisons.append(
+            Comparison(
+                name=name,
+                baseline=old.value,
+                current=metric.value,
+                unit=metric.unit,
+                change=change,
+                regressed=change > threshold,
+            )
+        )
+    return comparisons
@@ -0,0 +1,226 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Simulated Docker backend and in-memory collaborators for benchmarks.
+"""
+import hashlib
+import itertools
+import time
+from pathlib import Path
+from typing import Any, Dict, Generator, Iterable, Iterator, List, Optional, Tuple
+
+from hookci.application.constants import MAX_PARALLEL_STEPS
+from hookci.application.events import LogStream
+from hookci.application.results import ImageInfo
+from hookci.infrastructure.docker import IDockerService, VolumeMount
+
+
+class SimulatedDockerService(IDockerService):
+    """
+    An IDockerService that never touches a daemon.
+
+    Each container start sleeps for `start_latency` seconds, then emits
+    `lines_per_step` lines of `line_bytes` bytes and exits with the code
+    mapped to its command in `exit_codes` (or `default_exit_code`). The
+    scheduler runs up to `capacity` steps at once.
+    """
+
+    def __init__(
+        self,
+        start_latency: float = 0.0,
+        lines_per_step: int = 10,
+        line_bytes: int = 80,
+        exit_codes: Optional[Dict[str, int]] = None,
+        default_exit_code: int = 0,
+        capacity: int = MAX_PARALLEL_STEPS,
+    ) -> None:
+        self.parallelism = capacity
+        self.start_latency = start_latency
+        self.lines_per_step = lines_per_step
+        self.line = "x" * max(0, line_bytes - 1) + "\n"
+        self.exit_codes = exit_codes or {}
+        self.default_exit_code = default_exit_code
+        self.images: set[str] = set()
+        self.volumes: set[str] = set()
+        self._containers: Dict[str, str] = {}
+        self._container_ids = itertools.count()
+
+    @property
+    def capacity(self) -> int:
+        return self.parallelism
+
+    def _emit(self, command: str) -> Generator[Tuple[LogStream, str], None, int]:
+        for _ in range(self.lines_per_step):
+            yield "stdout", self.line
+        return self.exit_codes.get(command, self.default_exit_code)
+
+    def image_exists(self, tag: str) -> bool:
+        return tag in self.images
+
+    def image_id(self, tag: str) -> str:
+        return "sha256:" + hashlib.sha256(tag.encode()).hexdigest()
+
+    def pull_image(self, image_name: str) -> Generator[None, None, None]:
+        self.images.add(image_name)
+        yield
+
+    def list_images(self, repository: str) -> List[ImageInfo]:
+        return [
+            ImageInfo(tag=tag, size=0) for tag in self.images if tag.startswith(f"{repository}:")
+        ]
+
+    def remove_image(self, tag: str) -> None:
+        self.images.discard(tag)
+
+    def create_volume(self, name: str) -> None:
+        self.volumes.add(name)
+
+    def remove_volume(self, name: str) -> None:
+        self.volumes.discard(name)
+
+    def refresh_workspace(self, workdir: Path) -> None:
+        pass
+
+    def run_command_in_container(
+        self,
+        image: str,
+        command: str,
+        workdir: Path,
+        env: Optional[Dict[str, str]] = None,
+        volumes: Optional[List[VolumeMount]] = None,
+    ) -> Generator[Tuple[LogStream, str], None, int]:
+        if self.start_latency:
+            time.sleep(self.start_latency)
+        return (yield from self._emit(command))
+
+    def build_image(
+        self, dockerfile_path: Path, tag: str
+    ) -> Generator[Tuple[int, str], None, None]:
+        self.images.add(tag)
+        yield 1, "Step 1/1 : FROM scratch"
+
+    def count_dockerfile_steps(self, dockerfile_path: Path) -> int:
+        return 1
+
+    def calculate_dockerfile_hash(self, dockerfile_path: Path) -> str:
+        return hashlib.sha256(str(dockerfile_path).encode()).hexdigest()[:12]
+
+    def start_persistent_container(
+        self,
+        image: str,
+        workdir: Path,
+        volumes: Optional[List[VolumeMount]] = None,
+    ) -> str:
+        if self.start_latency:
+            time.sleep(self.start_latency)
+        container_id = f"sim-{next(self._container_ids)}"
+        self._containers[container_id] = image
+        return container_id
+
+    def exec_in_container(
+        self,
+        container_id: str,
+        command: str,
+        env: Optional[Dict[str, str]] = None,
+    ) -> Generator[Tuple[LogStream, str], None, int]:
+        return (yield from self._emit(command))
+
+    def stop_and_remove_container(self, container_id: str) -> None:
+        self._containers.pop(container_id, None)
+
+    def commit_container(self, container_id: str, tag: str) -> None:
+        self.images.add(tag)
+
+    def save_image(self, tag: str) -> Iterator[bytes]:
+        return iter([tag.encode()])
+
+    def load_image(self, archive: Iterable[bytes]) -> None:
+        self.images.add(b"".join(archive).decode())
+
+
+class StaticGitService:
+    """An IScmService rooted at a fixed directory with no Git process calls."""
+
+    def __init__(self, root: Path) -> None:
+        self._root = root
+
+    @property
+    def git_root(self) -> Path:
+        return self._root
+
+    @property
+    def git_dir(self) -> Path:
+        return self._root / ".git"
+
+    def set_hooks_path(self, hooks_path: Path) -> None:
+        pass
+
+    def get_current_branch(self) -> str:
+        return "main"
+
+    def get_staged_commit_message(self) -> str:
+        return ""
+
+    def get_changed_files(self, hook_type: str) -> List[str]:
+        return []
+
+    def list_files(self) -> List[str]:
+        return []
+
+    def get_file_fingerprints(self, paths: Iterable[str]) -> Dict[str, str]:
+        return {}
+
+    def write_index_tree(self) -> str:
+        return hashlib.sha1(b"tree 0\0").hexdigest()
+
+    def export_tree(self, tree: str, destination: Path) -> None:
+        pass
+
+
+class StaticConfigHandler:
+    """An IConfigHandler that serves a pre-built configuration dictionary."""
+
+    def __init__(self, config_data: Dict[str, Any]) -> None:
+        self._config_data = config_data
+
+    def load_config_data(self, path: Path) -> Dict[str, Any]:
+        return self._config_data
+
+    def write_config_data(self, path: Path, config_data: Dict[str, Any]) -> None:
+        self._config_data = config_data
+
+
+class EmptyFileSystem:
+    """An IFileSystem in which no file exists."""
+
+    def file_exists(self, path: Path) -> bool:
+        return False
+
+    def create_dir(self, path: Path) -> None:
+        pass
+
+    def write_file(self, path: Path, content: str) -> None:
+        pass
+
+    def read_file(self, path: Path) -> str:
+        return ""
+
+    def make_executable(self, path: Path) -> None:
+        pass
+
+    def glob(self, root: Path, pattern: str) -> List[Path]:
+        return []
@@ -0,0 +1,380 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+The benchmark cases. Each case returns the metrics it measured.
+"""
+import os
+import statistics
+import struct
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Generator, List
+
+import yaml
+from rich.console import Console, RenderableType
+
+from benchmarks.results import Metric
+from benchmarks.simulator import (
+    EmptyFileSystem,
+    SimulatedDockerService,
+    StaticConfigHandler,
+    StaticGitService,
+)
+from hookci.application.events import LogLine, PipelineEnd, PipelineStart, StepStart
+from hookci.application.services import CiExecutionService
+from hookci.domain.config import Configuration, LogLevel, Step
+from hookci.infrastructure.docker import DockerService
+from hookci.infrastructure.fs import GitService, LocalFileSystem
+from hookci.infrastructure.stat_cache import StatCache
+from hookci.infrastructure.yaml_handler import YamlConfigHandler
+from hookci.presentation.cli import JsonlUI, PipelineUI, PlainUI
+from hookci.tracing import latency
+
+Benchmark = Callable[[bool], Dict[str, Metric]]
+
+CONTAINER_BENCH_IMAGE = "alpine:3"
+
+
+def _timed(fn: Callable[[], Any], repeat: int) -> float:
+    """Returns the median wall time of `fn` in seconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def make_config_data(step_count: int, fan_in: int = 10) -> Dict[str, Any]:
+    """
+    Builds a configuration with `step_count` steps laid out in layers of
+    `fan_in`; every step depends on the step one layer above it.
+    """
+    steps = []
+    for i in range(step_count):
+        step: Dict[str, Any] = {"name": f"step-{i}", "command": f"echo {i}"}
+        if i >= fan_in:
+            step["depends_on"] = [f"step-{i - fan_in}"]
+        steps.append(step)
+    return {
+        "version": "1.0",
+        "log_level": "ERROR",
+        "docker": {"image": "simulated:latest"},
+        "steps": steps,
+    }
+
+
+def bench_scheduler(quick: bool) -> Dict[str, Metric]:
+    """Per-step overhead of the DAG scheduler with instant containers."""
+    step_count = 50 if quick else 200
+    metrics = {}
+    layouts = {"independent": step_count, "chain": 1}
+    for layout, fan_in in layouts.items():
+        config_data = make_config_data(step_count, fan_in=fan_in)
+        docker = SimulatedDockerService(lines_per_step=1)
+        docker.images.add("simulated:latest")
+        service = CiExecutionService(
+            git_service=StaticGitService(Path(tempfile.gettempdir())),
+            config_handler=StaticConfigHandler(config_data),
+            docker_service=docker,
+            fs=EmptyFileSystem(),
+        )
+
+        def run_pipeline() -> None:
+            events = list(service.run(hook_type=None))
+            final = events[-1]
+            if not isinstance(final, PipelineEnd) or final.status != "SUCCESS":
+                raise RuntimeError(f"Simulated pipeline did not succeed: {final}")
+
+        elapsed = _timed(run_pipeline, repeat=3)
+        metrics[f"scheduler.overhead_per_step.{layout}"] = Metric(
+            value=elapsed / step_count * 1000, unit="ms"
+        )
+    return metrics
+
+
+def _docker_frames(total_bytes: int, line_bytes: int, chunk_bytes: int) -> List[bytes]:
+    """Builds a multiplexed Docker log stream split into transport-sized chunks."""
+    payload = b"y" * (line_bytes - 1) + b"\n"
+    frame = struct.pack(">BxxxL", 1, len(payload)) + payload
+    stream = frame * (total_bytes // len(frame))
+    return [stream[i : i + chunk_bytes] for i in range(0, len(stream), chunk_bytes)]
+
+
+def bench_demux(quick: bool) -> Dict[str, Metric]:
+    """Throughput of the Docker log stream demultiplexer."""
+    total_bytes = (2 if quick else 8) * 1024 * 1024
+    chunks = _docker_frames(total_bytes, line_bytes=100, chunk_bytes=32 * 1024)
+    # The demultiplexer does not need a daemon connection.
+    service = DockerService.__new__(DockerService)
+
+    def stream() -> Generator[bytes, None, None]:
+        yield from chunks
+
+    def consume() -> None:
+        for _ in service._demultiplex_docker_stream(stream()):
+            pass
+
+    elapsed = _timed(consume, repeat=3)
+    return {
+        "demux.throughput": Metric(
+            value=total_bytes / elapsed / (1024 * 1024), unit="MB/s", lower_is_better=False
+        )
+    }
+
+
+class _LiveStub:
+    """Stands in for Rich's Live; renders every update to a throwaway console."""
+
+    def __init__(self, console: Console) -> None:
+        self.console = console
+
+    def update(self, renderable: RenderableType) -> None:
+        self.console.print(renderable)
+
+
+def bench_render(quick: bool) -> Dict[str, Metric]:
+    """Latency from a log event reaching PipelineUI to its frame being rendered."""
+    line_count = 200 if quick else 1000
+    metrics = {}
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        for level in (LogLevel.INFO, LogLevel.DEBUG):
+            console = Console(file=devnull, width=120, force_terminal=True)
+            ui = PipelineUI(console)
+            live: Any = _LiveStub(console)
+            step = Step(name="Render", command="make")
+            ui.handle_event(PipelineStart(total_steps=1, log_level=level), live)
+            ui.handle_event(StepStart(step=step), live)
+
+            samples = []
+            for i in range(line_count):
+                event = LogLine(line=f"line {i} of output\n", stream="stdout", step_name="Render")
+                start = time.perf_counter()
+                ui.handle_event(event, live)
+                samples.append(time.perf_counter() - start)
+
+            name = level.value.lower()
+            samples.sort()
+            metrics[f"render.event_latency.{name}.mean"] = Metric(
+                value=statistics.fmean(samples) * 1000, unit="ms"
+            )
+            metrics[f"render.event_latency.{name}.p95"] = Metric(
+                value=samples[int(len(samples) * 0.95)] * 1000, unit="ms"
+            )
+
+        plain = PlainUI(devnull)
+        plain.handle_event(PipelineStart(total_steps=1, log_level=LogLevel.DEBUG))
+        plain.handle_event(StepStart(step=Step(name="Render", command="make")))
+        events = [
+            LogLine(line=f"line {i} of output\n", stream="stdout", step_name="Render")
+            for i in range(line_count)
+        ]
+        start = time.perf_counter()
+        for event in events:
+            plain.handle_event(event)
+        plain.flush()
+        metrics["render.event_latency.plain.mean"] = Metric(
+            value=(time.perf_counter() - start) / line_count * 1000, unit="ms"
+        )
+    return metrics
+
+
+def bench_jsonl(quick: bool) -> Dict[str, Metric]:
+    """Cost of streaming log events as JSON Lines."""
+    line_count = 10_000 if quick else 100_000
+    step = Step(name="Render", command="make")
+    events = [
+        LogLine(line=f"line {i} of output\n", stream="stdout", step_name="Render")
+        for i in range(line_count)
+    ]
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+
+        def stream() -> None:
+            ui = JsonlUI(devnull)
+            ui.handle_event(StepStart(step=step))
+            for event in events:
+                ui.handle_event(event)
+            ui.handle_event(PipelineEnd(status="SUCCESS"))
+
+        elapsed = _timed(stream, repeat=3)
+    return {
+        "jsonl.event_cost": Metric(value=elapsed / line_count * 1e6, unit="us"),
+    }
+
+
+def bench_config_load(quick: bool) -> Dict[str, Metric]:
+    """Time to read, parse and validate configurations of growing size."""
+    metrics = {}
+    handler = YamlConfigHandler(fs=LocalFileSystem())
+    with tempfile.TemporaryDirectory() as tmp:
+        for step_count in (10, 100, 1000):
+            path = Path(tmp) / f"hookci-{step_count}.yaml"
+            path.write_text(yaml.safe_dump(make_config_data(step_count)), encoding="utf-8")
+
+            def load() -> None:
+                Configuration.model_validate(handler.load_config_data(path))
+
+            elapsed = _timed(load, repeat=3 if quick else 7)
+            metrics[f"config.load.{step_count}_steps"] = Metric(value=elapsed * 1000, unit="ms")
+    return metrics
+
+
+def bench_dag(quick: bool) -> Dict[str, Metric]:
+    """Time to validate and sort the step graph of very large configurations."""
+    step_count = 2_000 if quick else 10_000
+    metrics = {}
+    layouts = {"chain": 1, "layered": 100, "independent": step_count}
+    for layout, fan_in in layouts.items():
+        steps = [Step.model_validate(s) for s in make_config_data(step_count, fan_in)["steps"]]
+
+        def validate() -> None:
+            Configuration(version="1.0", steps=steps)
+
+        elapsed = _timed(validate, repeat=3 if quick else 7)
+        metrics[f"dag.validate.{layout}"] = Metric(value=elapsed * 1000, unit="ms")
+    return metrics
+
+
+def make_large_repo(root: Path, file_count: int, per_dir: int = 100) -> List[str]:
+    """
+    Creates a committed Git repository of small files, spread over
+    directories of `per_dir` files, and returns their relative paths.
+    """
+    paths = []
+    old = time.time() - 3600  # Outside the stat cache's racy window
+    for i in range(file_count):
+        rel = f"src/d{i // per_dir}/f{i}.txt"
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"file {i}\n" * 8)
+        os.utime(path, (old, old))
+        paths.append(rel)
+    git = ["git", "-c", "user.name=bench", "-c", "user.email=bench@localhost"]
+    subprocess.run([*git, "init", "-q"], cwd=root, check=True)
+    subprocess.run([*git, "add", "."], cwd=root, check=True)
+    subprocess.run([*git, "commit", "-q", "-m", "init"], cwd=root, check=True)
+    return paths
+
+
+def bench_fingerprint(quick: bool) -> Dict[str, Metric]:
+    """
+    Time to fingerprint every file of a large synthetic repository, through
+    the stat cache (cold and warm) and through the index route taken when Git
+    has a filesystem monitor. No monitor daemon runs here, so `git status`
+    still stats every file; its cost is reported for reference.
+    """
+    file_count = 5_000 if quick else 100_000
+    metrics = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        paths = make_large_repo(root, file_count)
+        git = GitService(fs=LocalFileSystem())
+        git.git_root = root
+
+        start = time.perf_counter()
+        git.stat_cache.fingerprints(root, paths)
+        metrics["fingerprint.stat_cache.cold"] = Metric(
+            value=(time.perf_counter() - start) * 1000, unit="ms"
+        )
+        git.stat_cache.close()
+
+        def warm() -> None:
+            # A fresh cache object, as in a new HookCI process
+            StatCache(git.stat_cache.path).fingerprints(root, paths)
+
+        metrics["fingerprint.stat_cache.warm"] = Metric(
+            value=_timed(warm, repeat=3) * 1000, unit="ms"
+        )
+
+        def status() -> None:
+            git.get_worktree_changes()
+
+        metrics["fingerprint.git_status"] = Metric(
+            value=_timed(status, repeat=3) * 1000, unit="ms"
+        )
+
+        git.fsmonitor_enabled = True
+
+        def via_index() -> None:
+            git.get_file_fingerprints(paths)
+
+        metrics["fingerprint.git_index"] = Metric(
+            value=_timed(via_index, repeat=3) * 1000, unit="ms"
+        )
+    return metrics
+
+
+def bench_container(quick: bool) -> Dict[str, Metric]:
+    """
+    Per-phase latency of running a trivial step on the real Docker daemon.
+    Needs a reachable daemon, so it only runs when named explicitly.
+    """
+    service = DockerService()
+    if not service.image_exists(CONTAINER_BENCH_IMAGE):
+        for _ in service.pull_image(CONTAINER_BENCH_IMAGE):
+            pass
+
+    with tempfile.TemporaryDirectory() as tmp:
+
+        def run_step() -> None:
+            for _ in service.run_command_in_container(CONTAINER_BENCH_IMAGE, "echo ok", Path(tmp)):
+                pass
+
+        run_step()  # Warm up the daemon's caches
+        latency.reset()
+        elapsed = _timed(run_step, repeat=5 if quick else 20)
+
+    metrics = {"container.step": Metric(value=elapsed * 1000, unit="ms")}
+    for name, phase in latency.summary().items():
+        metrics[f"{name}.mean"] = Metric(value=phase.mean * 1000, unit="ms")
+    return metrics
+
+
+def peak_rss() -> Dict[str, Metric]:
+    """Peak resident set size of the benchmark process so far."""
+    import resource
+
+    # ru_maxrss is reported in kilobytes on Linux.
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {"process.peak_rss": Metric(value=rss_kb / 1024, unit="MB")}
+
+
+BENCHMARKS: Dict[str, Benchmark] = {
+    "scheduler": bench_scheduler,
+    "demux": bench_demux,
+    "render": bench_render,
+    "jsonl": bench_jsonl,
+    "config": bench_config_load,
+    "dag": bench_dag,
+    "fingerprint": bench_fingerprint,
+}
+
+# Benchmarks that need a real Docker daemon; they never run by default.
+LIVE_BENCHMARKS: Dict[str, Benchmark] = {
+    "container": bench_container,
+}
+
+
+def run_benchmarks(
+    selected: List[str], quick: bool
+) -> Generator[Dict[str, Metric], None, None]:
+    """Runs the selected benchmarks in order, yielding each one's metrics."""
+    for name in selected:
+        yield {**BENCHMARKS, **LIVE_BENCHMARKS}[name](quick)
+    yield peak_rss()
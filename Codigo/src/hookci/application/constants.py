@@ -21,6 +21,7 @@ This module centralizes constants that are used across different services
 within the application layer, such as file paths and directory names, to
 ensure consistency and ease of maintenance.
 """
+import os
 
 # The latest version of the configuration file schema.
 LATEST_CONFIG_VERSION: str = "1.0"
@@ -30,3 +31,38 @@ BASE_DIR_NAME: str = ".hookci"
 
 # Default name for the main configuration file.
 CONFIG_FILENAME: str = "hookci.yaml"
+
+# Repository prefix of the images built from a project's Dockerfile,
+# tagged as `<prefix>/<repository name>:<dockerfile hash>`.
+IMAGE_REPOSITORY_PREFIX: str = "hookci"
+
+# Suffix of the repository of the images committed from `snapshot` steps,
+# tagged as `<prefix>/<repository name><suffix>:<key hash>`.
+SETUP_REPOSITORY_SUFFIX: str = "-setup"
+
+# Prefix of the per-run volume that carries step outputs between steps,
+# and where that volume is mounted inside step containers.
+ARTIFACTS_VOLUME_PREFIX: str = "hookci-artifacts-"
+ARTIFACTS_DIR: str = "/artifacts"
+
+# Environment variable pointing steps at the artifacts directory.
+ARTIFACTS_ENV: str = "HOOKCI_ARTIFACTS"
+
+# Steps a single Docker daemon runs at once by default. It is the Docker
+# service's capacity, from which both its connection pools and the
+# scheduler's thread pool are sized.
+MAX_PARALLEL_STEPS: int = min(32, (os.cpu_count() or 1) + 4)
+
+# Log lines waiting for the UI before the steps producing more have to
+# wait, and how long a step waits for room before its lines are left out
+# of the UI, in seconds. Left-out lines are still stored in full.
+EVENT_QUEUE_SIZE: int = 4096
+EVENT_QUEUE_TIMEOUT: float = 0.5
+
+# How long the working tree must stay quiet before `hookci watch` reacts to
+# a burst of file changes, in seconds.
+WATCH_DEBOUNCE: float = 0.2
+
+# The file in the Git directory whose replacement `hookci speculate` watches
+# for, after a `git add` or any other change to the staged tree.
+INDEX_FILENAME: str = "index"
@@ -35,3 +35,9 @@ class ConfigurationUpToDateError(ApplicationError):
     """Raised when a migration is attempted on an up-to-date configuration."""
 
     pass
+
+
+class StepSelectionError(ApplicationError):
+    """Raised when a step selection names unknown steps or matches none."""
+
+    pass
@@ -17,7 +17,8 @@
 """
 Event models for streaming pipeline status from the application to the presentation layer.
 """
-from typing import Literal, Union
+import json
+from typing import Dict, List, Literal, Optional, Type, Union, cast, get_args
 
 from pydantic import BaseModel
 
@@ -69,6 +70,18 @@ class LogLine(BaseModel):
     step_name: str
 
 
+class LogLinesSuppressed(BaseModel):
+    """
+    Event standing for log lines of a step that were kept out of the stream
+    because output arrived faster than it was displayed. `log_file` holds
+    the step's full output, when it is stored.
+    """
+
+    step_name: str
+    count: int
+    log_file: Optional[str] = None
+
+
 class ImageBuildEnd(BaseModel):
     """Event indicating that the Docker image build has finished."""
 
@@ -94,6 +107,7 @@ class StepEnd(BaseModel):
     step: Step
     status: EventStatus
     exit_code: int
+    reused: bool = False
 
 
 class PipelineEnd(BaseModel):
@@ -102,6 +116,25 @@ class PipelineEnd(BaseModel):
     status: EventStatus
 
 
+class ChangesDetected(BaseModel):
+    """Event indicating `hookci watch` saw files change and which steps will run again."""
+
+    paths: List[str]
+    steps: List[str]
+
+
+class PipelineCancelled(BaseModel):
+    """Event indicating a run was stopped before its end, superseded by newer changes."""
+
+    pass
+
+
+class SpeculationStart(BaseModel):
+    """Event indicating `hookci speculate` started verifying a staged tree."""
+
+    tree: str
+
+
 # A type hint for any possible event that can be yielded by the service.
 PipelineEvent = Union[
     PipelineStart,
@@ -110,9 +143,26 @@ PipelineEvent = Union[
     ImageBuildStart,
     ImageBuildProgress,
     LogLine,
+    LogLinesSuppressed,
     ImageBuildEnd,
     StepStart,
     DebugShellStarting,
     StepEnd,
     PipelineEnd,
+    ChangesDetected,
+    PipelineCancelled,
+    SpeculationStart,
 ]
+
+_EVENT_TYPES: Dict[str, Type[BaseModel]] = {t.__name__: t for t in get_args(PipelineEvent)}
+
+
+def dump_event(event: PipelineEvent) -> str:
+    """Serializes an event as one line of JSON, tagged with its type."""
+    return f'{{"event":"{type(event).__name__}","data":{event.model_dump_json()}}}'
+
+
+def load_event(line: str) -> PipelineEvent:
+    """Reads back an event serialized by `dump_event`."""
+    record = json.loads(line)
+    return cast(PipelineEvent, _EVENT_TYPES[record["event"]].model_validate(record["data"]))
@@ -17,7 +17,7 @@
 """
 Data models for representing the results of application service operations.
 """
-from typing import List, Literal
+from typing import List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -35,6 +35,25 @@ class StepResult(BaseModel):
     stderr: str = ""
 
 
+class ImageInfo(BaseModel):
+    """A locally stored image and its size in bytes."""
+
+    tag: str
+    size: int
+    last_used: Optional[float] = None
+
+
+class GcResult(BaseModel):
+    """Represents the outcome of an image garbage collection."""
+
+    kept: List[ImageInfo] = Field(default_factory=list)
+    removed: List[ImageInfo] = Field(default_factory=list)
+
+    @property
+    def freed_bytes(self) -> int:
+        return sum(image.size for image in self.removed)
+
+
 class PipelineResult(BaseModel):
     """Represents the overall result of a CI pipeline execution."""
 
@@ -17,42 +17,98 @@
 """
 Application services that orchestrate use cases.
 """
+import fnmatch
+import hashlib
+import itertools
+import json
+import os
+import posixpath
 import queue
 import re
+import shlex
+import threading
+import uuid
 from collections import deque
 from concurrent.futures import Future, ThreadPoolExecutor, wait
 from pathlib import Path
 from textwrap import dedent
-from typing import Any, Dict, Generator, List, Literal, Optional, Set, Tuple
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    List,
+    Literal,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
 
-from pydantic import ValidationError
+from pydantic import ByteSize, ValidationError
 
 from hookci.application import constants
 from hookci.application.errors import (
     ConfigurationUpToDateError,
     ProjectAlreadyInitializedError,
+    StepSelectionError,
 )
 from hookci.application.events import (
+    ChangesDetected,
     DebugShellStarting,
+    EventStatus,
     ImageBuildEnd,
     ImageBuildProgress,
     ImageBuildStart,
     ImagePullEnd,
     ImagePullStart,
     LogLine,
+    LogLinesSuppressed,
     LogStream,
+    PipelineCancelled,
     PipelineEnd,
     PipelineEvent,
     PipelineStart,
+    SpeculationStart,
     StepEnd,
     StepStart,
+    dump_event,
+    load_event,
+)
+from hookci.application.results import GcResult
+from hookci.domain.config import (
+    ROOT_PACKAGE,
+    Configuration,
+    Docker,
+    ImageArchive,
+    ImageGc,
+    Monorepo,
+    Step,
+    create_default_config,
 )
-from hookci.domain.config import Configuration, Docker, Step, create_default_config
-from hookci.infrastructure.docker import IDockerService
-from hookci.infrastructure.errors import ConfigurationParseError, DockerError
+from hookci.infrastructure.checkpoint import Checkpoint, ICheckpointStore, StepRecord
+from hookci.infrastructure.docker import IDockerService, VolumeMount
+from hookci.infrastructure.errors import (
+    ConfigurationParseError,
+    DockerError,
+    ExecutorError,
+    FileSystemError,
+    GitCommandError,
+    InfrastructureError,
+)
+from hookci.infrastructure.executor import DockerExecutor, IStepExecutor
 from hookci.infrastructure.fs import IFileSystem, IScmService
+from hookci.infrastructure.image_archive import IImageArchive
+from hookci.infrastructure.image_index import IImageIndex
+from hookci.infrastructure.outputs import IOutputStore
+from hookci.infrastructure.result_cache import IResultCache
+from hookci.infrastructure.speculation import ISpeculationStore, SpeculativeRun
+from hookci.infrastructure.step_logs import IStepLogStore, StepLogs
+from hookci.infrastructure.watcher import IFileWatcher
 from hookci.infrastructure.yaml_handler import IConfigHandler
 from hookci.log import get_logger, setup_logging
+from hookci.tracing import tracer
 
 logger = get_logger(__name__)
 
@@ -132,6 +188,567 @@ class ProjectInitService:
         self._fs.make_executable(hook_path)
 
 
+def image_repository(git_root: Path) -> str:
+    """Returns the repository of the images built from a project's Dockerfile."""
+    return f"{constants.IMAGE_REPOSITORY_PREFIX}/{git_root.name}"
+
+
+def setup_image_repository(git_root: Path) -> str:
+    """Returns the repository of the images committed from a project's snapshot steps."""
+    return f"{image_repository(git_root)}{constants.SETUP_REPOSITORY_SUFFIX}"
+
+
+class ImageGcService:
+    """
+    Service to remove old images built from the project's Dockerfile, and
+    old setup images committed from its snapshot steps.
+
+    In each of the two repositories, the most recently used `keep` images
+    are kept, then the oldest of those are dropped until the rest fit in
+    `max_size`; the newest image is never removed. Last-use times come from
+    the local image index, so a collection costs one image listing plus one
+    removal per collected image.
+    """
+
+    def __init__(
+        self,
+        git_service: IScmService,
+        config_handler: IConfigHandler,
+        docker_service: IDockerService,
+        image_index: IImageIndex,
+    ):
+        self._git_service = git_service
+        self._config_handler = config_handler
+        self._docker_service = docker_service
+        self._image_index = image_index
+
+    @property
+    def repository(self) -> str:
+        return image_repository(self._git_service.git_root)
+
+    @property
+    def repositories(self) -> List[str]:
+        return [self.repository, setup_image_repository(self._git_service.git_root)]
+
+    def load_policy(self) -> ImageGc:
+        """Reads the policy from the configuration file, falling back to the defaults."""
+        config_path = (
+            self._git_service.git_root
+            / constants.BASE_DIR_NAME
+            / constants.CONFIG_FILENAME
+        )
+        try:
+            config_data = self._config_handler.load_config_data(config_path)
+            config = Configuration.model_validate(config_data)
+        except (InfrastructureError, ValidationError) as e:
+            logger.warning(f"Using the default image retention policy: {e}")
+            return ImageGc()
+        return config.docker.gc or ImageGc()
+
+    def mark_used(self, tag: str) -> None:
+        """Records that an image was just used; failures are only logged."""
+        try:
+            self._image_index.touch(tag)
+        except FileSystemError as e:
+            logger.warning(f"Could not record image use: {e}")
+
+    def needs_collection(self, policy: ImageGc) -> bool:
+        """Tells from the index alone whether the policy may be exceeded."""
+        index = self._image_index.load()
+        for repository in self.repositories:
+            prefix = f"{repository}:"
+            usage = [u for tag, u in index.items() if tag.startswith(prefix)]
+            if len(usage) > policy.keep:
+                return True
+            if policy.max_size is None:
+                continue
+            sizes = [u.size for u in usage]
+            if any(size is None for size in sizes):
+                return True  # A new image; its size is learned by collecting.
+            if sum(size or 0 for size in sizes) > policy.max_size:
+                return True
+        return False
+
+    def collect(self, policy: ImageGc, dry_run: bool = False) -> GcResult:
+        """Removes the images the policy does not keep."""
+        usage = self._image_index.load()
+        result = GcResult(kept=[], removed=[])
+        for repository in self.repositories:
+            images = self._docker_service.list_images(repository)
+            for image in images:
+                if image.tag in usage:
+                    image.last_used = usage[image.tag].last_used
+            # Images never recorded in the index count as the oldest.
+            images.sort(key=lambda i: i.last_used or 0.0, reverse=True)
+
+            kept, removed = images[: policy.keep], images[policy.keep :]
+            if policy.max_size is not None:
+                total = sum(image.size for image in kept)
+                while len(kept) > 1 and total > policy.max_size:
+                    oldest = kept.pop()
+                    removed.insert(0, oldest)
+                    total -= oldest.size
+            result.kept.extend(kept)
+            result.removed.extend(removed)
+        if dry_run:
+            return result
+
+        removed, result.removed = result.removed, []
+        for image in removed:
+            try:
+                self._docker_service.remove_image(image.tag)
+                result.removed.append(image)
+            except DockerError as e:
+                logger.warning(str(e))
+                result.kept.append(image)
+        self._image_index.forget(image.tag for image in result.removed)
+        self._image_index.record_sizes({image.tag: image.size for image in result.kept})
+        return result
+
+
+def _package_step(package: str, step: Step) -> Step:
+    """
+    Prefixes a package step, its dependencies and its artifacts with the
+    package name, so packages may reuse each other's names.
+    """
+    if package == ROOT_PACKAGE:
+        return step
+    return step.model_copy(
+        update={
+            "name": f"{package}: {step.name}",
+            "depends_on": [f"{package}: {dep}" for dep in step.depends_on],
+            "outputs": [f"{package}/{name}" for name in step.outputs],
+            "needs_artifacts": [f"{package}/{name}" for name in step.needs_artifacts],
+            "inputs": [f"{package}/{pattern}" for pattern in step.inputs],
+            "output_files": [f"{package}/{pattern}" for pattern in step.output_files],
+            "key_files": [f"{package}/{pattern}" for pattern in step.key_files],
+        }
+    )
+
+
+class Speculation(NamedTuple):
+    """
+    A run of `hookci speculate`: the snapshot of the staged tree its steps
+    see instead of the working tree, and the event that cancels it.
+    """
+
+    workdir: Path
+    cancel: threading.Event
+
+
+class RunOptions(NamedTuple):
+    """
+    How a pipeline run was requested. `only`, `from_steps` and `until` select
+    a part of the step graph; see `_select_steps`.
+    """
+
+    debug: bool = False
+    resume: bool = False
+    only: Tuple[str, ...] = ()
+    from_steps: Tuple[str, ...] = ()
+    until: Tuple[str, ...] = ()
+    speculation: Optional[Speculation] = None
+
+    @property
+    def selects(self) -> bool:
+        return bool(self.only or self.from_steps or self.until)
+
+
+class StepPlacement(NamedTuple):
+    """
+    Where a scheduled step runs: its image, its directory in the repository,
+    the artifacts volume it mounts, if any, the tree mounted as the
+    repository when it is not the working tree, and for a snapshot step
+    to run, the tag to commit its container to.
+    """
+
+    image: str
+    directory: str = ROOT_PACKAGE
+    volume: Optional[str] = None
+    workdir: Optional[Path] = None
+    snapshot: Optional[str] = None
+
+
+class WatchPlan(NamedTuple):
+    """
+    What `hookci watch` runs: the whole pipeline, with each step's placement
+    and images already prepared, and the files whose change calls for a new
+    plan.
+    """
+
+    config: Configuration
+    placements: Dict[str, StepPlacement]
+    sources: Set[str]
+    monorepo: Optional[Monorepo] = None
+    packages: Tuple[str, ...] = ()
+
+    def replanned_by(self, paths: Set[str]) -> bool:
+        """Tells whether a change touches a configuration file, a Dockerfile or `.env`."""
+        return any(
+            path in self.sources or posixpath.basename(path) == constants.CONFIG_FILENAME
+            for path in paths
+        )
+
+    def affected_steps(self, paths: Set[str]) -> Set[str]:
+        """
+        Finds the steps a change concerns: those with an input among the paths
+        and, when a step has no inputs, any change in its package, or anywhere
+        outside monorepos.
+        """
+        packages = (
+            self.monorepo.affected(self.packages, paths) if self.monorepo else {ROOT_PACKAGE}
+        )
+        affected = set()
+        for step in self.config.steps:
+            if step.inputs:
+                matches = _input_matcher(step.inputs)
+                if any(matches(path) for path in paths):
+                    affected.add(step.name)
+            elif self.placements[step.name].directory in packages:
+                affected.add(step.name)
+        return affected
+
+
+class ContainerSession:
+    """
+    Persistent containers that steps run in through `exec`, instead of a
+    transient container each. Subclasses decide what becomes of a container
+    once its step ends.
+    """
+
+    # A volume every container of the session mounts for artifacts, if any.
+    artifacts_volume: Optional[str] = None
+
+    def __init__(self, docker_service: IDockerService) -> None:
+        self._docker_service = docker_service
+        self._lock = threading.Lock()
+        self._busy: Dict[str, str] = {}  # Container ID -> image
+
+    def acquire(
+        self, image: str, workdir: Path, volumes: Optional[List[VolumeMount]] = None
+    ) -> str:
+        """Starts a container for a step."""
+        extra: Dict[str, Any] = {"volumes": volumes} if volumes else {}
+        container_id = self._docker_service.start_persistent_container(
+            image=image, workdir=workdir, **extra
+        )
+        logger.debug(f"Started persistent container: {container_id}")
+        with self._lock:
+            self._busy[container_id] = image
+        return container_id
+
+    def release(
+        self, step: Step, container_id: str, status: Optional[EventStatus]
+    ) -> None:
+        """
+        Hands back a step's container. The status is None when the container
+        itself failed, so it cannot be trusted any more.
+        """
+        with self._lock:
+            self._busy.pop(container_id, None)
+        self._remove(container_id)
+
+    def cancel(self) -> None:
+        """Removes the containers of the running steps, ending their commands."""
+        with self._lock:
+            busy = list(self._busy)
+            self._busy.clear()
+        for container_id in busy:
+            self._remove(container_id)
+
+    def close(self) -> None:
+        """Removes every container the session still holds."""
+        self.cancel()
+
+    def _remove(self, container_id: str) -> None:
+        logger.debug(f"Stopping and removing container: {container_id}")
+        try:
+            self._docker_service.stop_and_remove_container(container_id)
+        except DockerError as e:
+            logger.warning(f"Could not remove container {container_id}: {e}")
+
+
+class DebugSession(ContainerSession):
+    """
+    Gives every step a container of its own, kept alive for the debug shell
+    if the step is the first critical one to fail; all others are removed.
+    """
+
+    def __init__(self, docker_service: IDockerService) -> None:
+        super().__init__(docker_service)
+        self.step: Optional[Step] = None
+        self.container_id: Optional[str] = None
+
+    def release(
+        self, step: Step, container_id: str, status: Optional[EventStatus]
+    ) -> None:
+        with self._lock:
+            self._busy.pop(container_id, None)
+            keep = status == "FAILURE" and self.container_id is None
+            if keep:
+                self.step, self.container_id = step, container_id
+        if not keep:
+            self._remove(container_id)
+
+    def close(self) -> None:
+        super().close()
+        if self.container_id:
+            self._remove(self.container_id)
+
+
+class WarmContainerPool(ContainerSession):
+    """
+    Containers kept running between the runs of `hookci watch`. A step takes
+    an idle container of its image, or starts one, and hands it back when it
+    ends, so later runs skip container startup. Every container mounts the
+    session's artifacts volume, if there is one, writable by all steps.
+    """
+
+    def __init__(
+        self, docker_service: IDockerService, artifacts_volume: Optional[str] = None
+    ) -> None:
+        super().__init__(docker_service)
+        self.artifacts_volume = artifacts_volume
+        self._idle: Dict[str, List[str]] = {}
+
+    def acquire(
+        self, image: str, workdir: Path, volumes: Optional[List[VolumeMount]] = None
+    ) -> str:
+        with self._lock:
+            idle = self._idle.get(image)
+            if idle:
+                container_id = idle.pop()
+                self._busy[container_id] = image
+                return container_id
+        mounts = None
+        if self.artifacts_volume:
+            mounts = [VolumeMount(name=self.artifacts_volume, target=constants.ARTIFACTS_DIR)]
+        return super().acquire(image, workdir, mounts)
+
+    def release(
+        self, step: Step, container_id: str, status: Optional[EventStatus]
+    ) -> None:
+        with self._lock:
+            image = self._busy.pop(container_id, None)
+            if image is None:
+                return  # Removed by a cancellation
+            if status is not None:
+                self._idle.setdefault(image, []).append(container_id)
+                return
+        self._remove(container_id)
+
+    def close(self) -> None:
+        super().close()
+        with self._lock:
+            idle = [c for containers in self._idle.values() for c in containers]
+            self._idle.clear()
+        for container_id in idle:
+            self._remove(container_id)
+
+
+class EventChannel:
+    """
+    Carries events from the step threads to the scheduler.
+
+    Log lines are bounded: at most `size` wait to be taken, and a step with
+    a line to add waits up to `timeout` seconds for room. A step still
+    finding no room is overloaded; from then on its lines are only
+    forwarded while there is room, without waiting, and the ones left out
+    are counted. The count is reported as a `LogLinesSuppressed` event
+    before the step's next forwarded line or its end. Every line still
+    reaches the step's log, and status events are never bounded, delayed
+    or dropped.
+    """
+
+    def __init__(
+        self,
+        logs: Optional[StepLogs] = None,
+        size: int = constants.EVENT_QUEUE_SIZE,
+        timeout: float = constants.EVENT_QUEUE_TIMEOUT,
+    ) -> None:
+        self._logs = logs
+        self._timeout = timeout
+        self._events: "queue.Queue[PipelineEvent]" = queue.Queue()
+        self._room = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._suppressed: Dict[str, int] = {}
+
+    def put(self, event: PipelineEvent) -> None:
+        """Queues an event, waiting for room if it is a log line."""
+        if not isinstance(event, LogLine):
+            if isinstance(event, StepEnd):
+                self._report_suppressed(event.step.name)
+            self._events.put(event)
+            return
+        name = event.step_name
+        if self._logs is not None:
+            self._logs.append(name, event.line)
+        with self._lock:
+            overloaded = name in self._suppressed
+        if overloaded:
+            forwarded = self._room.acquire(blocking=False)
+        else:
+            forwarded = self._room.acquire(timeout=self._timeout)
+        if not forwarded:
+            with self._lock:
+                self._suppressed[name] = self._suppressed.get(name, 0) + 1
+            return
+        self._report_suppressed(name)
+        self._events.put(event)
+
+    def get(self, timeout: Optional[float] = None) -> PipelineEvent:
+        """Takes the next event; raises `queue.Empty` if none arrives in time."""
+        event = self._events.get(timeout=timeout)
+        if isinstance(event, LogLine):
+            self._room.release()
+        return event
+
+    def empty(self) -> bool:
+        return self._events.empty()
+
+    def _report_suppressed(self, name: str) -> None:
+        with self._lock:
+            count = self._suppressed.pop(name, 0)
+        if count:
+            log_file = str(self._logs.path(name)) if self._logs is not None else None
+            self._events.put(LogLinesSuppressed(step_name=name, count=count, log_file=log_file))
+
+
+def _digest(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8", errors="surrogateescape"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _input_matcher(patterns: List[str]) -> Callable[[str], bool]:
+    """
+    Matches repository paths against a step's input patterns. A pattern is a
+    shell-style glob in which `*` also crosses directories; a directory
+    matches every file below it.
+    """
+    regexes = []
+    for pattern in patterns:
+        pattern = pattern.strip("/")
+        regexes.append(fnmatch.translate(pattern))
+        regexes.append(re.escape(pattern) + "/.*")
+    regex = re.compile("|".join(f"(?:{r})" for r in regexes), re.DOTALL)
+    return lambda path: regex.fullmatch(path) is not None
+
+
+def _output_paths(root: Path, patterns: List[str]) -> List[str]:
+    """
+    Lists the files and symbolic links under `root` matching a step's
+    `output_files`, which use the same patterns as its inputs. Only the
+    directories before each pattern's first wildcard are walked.
+    """
+    matches = _input_matcher(patterns)
+    paths: Set[str] = set()
+    for pattern in patterns:
+        parts = pattern.strip("/").split("/")
+        literal = list(itertools.takewhile(lambda part: not _has_wildcard(part), parts))
+        start = root.joinpath(*literal)
+        if start.is_symlink() or start.is_file():
+            paths.add("/".join(literal))
+            continue
+        for current, dirs, files in os.walk(start):
+            base = Path(current).relative_to(root).as_posix()
+            # Links to directories are outputs themselves; they are not followed.
+            names = files + [d for d in dirs if os.path.islink(os.path.join(current, d))]
+            paths.update(
+                rel for rel in (posixpath.join(base, name) for name in names) if matches(rel)
+            )
+    return sorted(paths)
+
+
+def _descendants(config: Configuration, name: str) -> List[str]:
+    """Lists the steps depending on a step, directly or not, in graph order."""
+    found: Set[str] = set()
+    pending = [name]
+    while pending:
+        for user in config.graph.dependents[pending.pop()]:
+            if user not in found:
+                found.add(user)
+                pending.append(user)
+    return [n for n in config.graph.order if n in found]
+
+
+def _has_wildcard(part: str) -> bool:
+    return any(c in part for c in "*?[")
+
+
+def _select_steps(config: Configuration, options: RunOptions) -> Configuration:
+    """
+    Narrows the pipeline to the selected part of its step graph:
+    `only` keeps the named steps and their transitive dependencies, `from_steps`
+    the named steps and their transitive dependents, and `until` drops the steps
+    coming after the named ones. Combined options intersect. Dependencies on
+    steps left out count as met.
+    """
+    if not options.selects:
+        return config
+    graph = config.graph
+    named = [*options.only, *options.from_steps, *options.until]
+    unknown = [name for name in named if name not in graph.dependencies]
+    if unknown:
+        raise StepSelectionError(
+            f"Unknown step '{unknown[0]}'. Known steps: {', '.join(graph.order)}."
+        )
+
+    selected = set(graph.order)
+    if options.only:
+        selected &= graph.ancestors(options.only)
+    if options.from_steps:
+        selected &= graph.descendants(options.from_steps)
+    if options.until:
+        selected -= graph.descendants(options.until) - set(options.until)
+    if not selected:
+        raise StepSelectionError("The step selection matches no steps.")
+    return _subset_steps(config, selected)
+
+
+def _subset_steps(
+    config: Configuration, selected: Set[str], artifacts_kept: bool = False
+) -> Configuration:
+    """
+    Keeps the selected steps. Dependencies on steps left out count as met,
+    and so do needs for their artifacts, which steps only find when
+    `artifacts_kept` says the volume holds them from an earlier run.
+    """
+    produced = {a for s in config.steps if s.name in selected for a in s.outputs}
+    steps = []
+    for step in config.steps:
+        if step.name not in selected:
+            continue
+        missing = [a for a in step.needs_artifacts if a not in produced]
+        for artifact in missing if not artifacts_kept else []:
+            logger.warning(
+                f"Step '{step.name}' needs artifact '{artifact}', "
+                "but the step producing it is not selected."
+            )
+        steps.append(
+            step.model_copy(
+                update={
+                    "depends_on": [d for d in step.depends_on if d in selected],
+                    "needs_artifacts": [a for a in step.needs_artifacts if a in produced],
+                }
+            )
+        )
+    logger.info(f"Running {len(steps)} of {len(config.steps)} selected steps.")
+    return Configuration.model_validate({**dict(config), "steps": steps})
+
+
+def _with_artifacts(step: Step, command: str) -> str:
+    """Prefixes a producing step's command with the creation of its output directories."""
+    if not step.outputs:
+        return command
+    dirs = " ".join(
+        shlex.quote(f"{constants.ARTIFACTS_DIR}/{name}") for name in step.outputs
+    )
+    return f"mkdir -p {dirs} || exit 1\n{command}"
+
+
 class CiExecutionService:
     """Service to handle the CI execution use case."""
 
@@ -141,19 +758,55 @@ class CiExecutionService:
         config_handler: IConfigHandler,
         docker_service: IDockerService,
         fs: IFileSystem,
+        image_gc: Optional[ImageGcService] = None,
+        checkpoints: Optional[ICheckpointStore] = None,
+        watcher: Optional[IFileWatcher] = None,
+        speculations: Optional[ISpeculationStore] = None,
+        results: Optional[IResultCache] = None,
+        outputs: Optional[IOutputStore] = None,
+        step_logs: Optional[IStepLogStore] = None,
+        executors: Optional[Dict[str, IStepExecutor]] = None,
+        image_archive: Optional[IImageArchive] = None,
     ):
         self._git_service = git_service
         self._config_handler = config_handler
         self._docker_service = docker_service
         self._fs = fs
+        self._image_gc = image_gc
+        self._checkpoints = checkpoints
+        self._watcher = watcher
+        self._speculations = speculations
+        self._results = results
+        self._outputs = outputs
+        self._step_logs = step_logs
+        self._executors: Dict[str, IStepExecutor] = {
+            "docker": DockerExecutor(docker_service),
+            **(executors or {}),
+        }
+        self._image_archive = image_archive
+        self._archiving: List[threading.Thread] = []
 
     def run(
-        self, hook_type: Optional[str], debug: bool = False
+        self,
+        hook_type: Optional[str],
+        debug: bool = False,
+        resume: bool = False,
+        only: Sequence[str] = (),
+        from_steps: Sequence[str] = (),
+        until: Sequence[str] = (),
     ) -> Generator[PipelineEvent, None, None]:
         """
         Executes the main CI pipeline, yielding events for real-time feedback.
+        With `resume`, steps that succeeded in the last checkpointed run
+        with the same inputs are not run again. `only`, `from_steps` and `until` restrict
+        the run to part of the pipeline.
+
+        A pre-commit run takes over the speculative run of the same staged
+        tree, if `hookci speculate` made one: a finished run is replayed,
+        one in progress is followed to its end.
         """
-        config = self._load_and_validate_configuration()
+        with tracer.span("config.load"):
+            config = self._load_and_validate_configuration()
         setup_logging(config.log_level.value)
 
         if not self._should_run(hook_type, config):
@@ -167,13 +820,544 @@ class CiExecutionService:
             debug = False
 
         base_env = self._load_dotenv()
+        options = RunOptions(
+            debug=debug,
+            resume=resume,
+            only=tuple(only),
+            from_steps=tuple(from_steps),
+            until=tuple(until),
+        )
+
+        if hook_type == "pre-commit":
+            joined = yield from self._join_speculation(config, base_env)
+            if joined:
+                return
+
+        yield from self._run_configured(config, hook_type, base_env, options)
+
+    def _run_configured(
+        self,
+        config: Configuration,
+        hook_type: Optional[str],
+        base_env: Dict[str, str],
+        options: RunOptions = RunOptions(),
+    ) -> Generator[PipelineEvent, None, None]:
+        """Runs the loaded pipeline, then collects old images."""
+        try:
+            if config.monorepo is not None:
+                yield from self._run_monorepo(
+                    config, config.monorepo, hook_type, base_env, options
+                )
+                return
 
-        if debug:
-            # Debug mode remains sequential for simplicity in attaching shells
-            yield from self._run_pipeline_debug(config, base_env)
+            yield from self._run_pipeline_standard(config, base_env, options)
+
+            if config.docker.dockerfile:
+                self._collect_old_images(config.docker.gc or ImageGc())
+        finally:
+            self._finish_archiving()
+
+    def _run_monorepo(
+        self,
+        config: Configuration,
+        monorepo: Monorepo,
+        hook_type: Optional[str],
+        base_env: Dict[str, str],
+        options: RunOptions = RunOptions(),
+    ) -> Generator[PipelineEvent, None, None]:
+        """
+        Runs the pipelines of the affected packages under one scheduler. Only
+        those packages' configurations are loaded. The root configuration's own
+        steps form the root package, which owns every path outside the others.
+        """
+        with tracer.span("monorepo.discover"):
+            packages = self._discover_packages(monorepo)
+        changed = self._changed_files(hook_type)
+        if changed is None:
+            affected = set(packages) | {ROOT_PACKAGE}
         else:
-            # Standard mode now supports parallel execution
-            yield from self._run_pipeline_standard(config, base_env)
+            affected = monorepo.affected(packages, changed)
+        logger.debug(f"Affected packages: {', '.join(sorted(affected)) or 'none'}")
+
+        configs: Dict[str, Configuration] = {}
+        if ROOT_PACKAGE in affected and config.steps:
+            configs[ROOT_PACKAGE] = config
+        for name in sorted(affected - {ROOT_PACKAGE}):
+            with tracer.span("config.load", package=name):
+                package_config = self._load_package_configuration(name)
+            if hook_type and not self._should_run(hook_type, package_config):
+                continue
+            configs[name] = package_config
+        if not configs:
+            logger.info("Skipping: no package is affected by the changes.")
+            return
+
+        merged, owners = self._merge_packages(config, configs)
+        merged = _select_steps(merged, options)
+        owners = {step.name: owners[step.name] for step in merged.steps}
+        configs = {name: c for name, c in configs.items() if name in owners.values()}
+
+        yield PipelineStart(total_steps=len(merged.steps), log_level=config.log_level)
+
+        with tracer.span("image.prepare"):
+            images = yield from self._prepare_package_images(configs)
+        if images is None:
+            yield PipelineEnd(status="FAILURE")
+            return
+
+        placements = {
+            step: StepPlacement(image=images[name], directory=name)
+            for step, name in owners.items()
+        }
+        yield from self._schedule_steps(merged, placements, base_env, options)
+
+        if any(c.docker.dockerfile for c in configs.values()):
+            self._collect_old_images(config.docker.gc or ImageGc())
+
+    def _merge_packages(
+        self, config: Configuration, configs: Dict[str, Configuration]
+    ) -> Tuple[Configuration, Dict[str, str]]:
+        """Merges the packages' steps into one pipeline, returning it with each step's package."""
+        steps: List[Step] = []
+        owners: Dict[str, str] = {}
+        for name, package_config in configs.items():
+            for step in package_config.steps:
+                step = _package_step(name, step)
+                steps.append(step)
+                owners[step.name] = name
+        try:
+            merged = Configuration(
+                version=config.version,
+                log_level=config.log_level,
+                artifacts=config.artifacts,
+                cache=config.cache,
+                steps=steps,
+            )
+        except ValidationError as e:
+            raise ConfigurationParseError(f"Invalid monorepo pipeline:\n{e}") from e
+        return merged, owners
+
+    def _prepare_package_images(
+        self, configs: Dict[str, Configuration]
+    ) -> Generator[PipelineEvent, None, Optional[Dict[str, str]]]:
+        """
+        Prepares the image of every package, returning it by package name, or
+        None when one cannot be prepared. Packages sharing a Docker setup
+        share its image.
+        """
+        images: Dict[str, str] = {}
+        for name, package_config in configs.items():
+            key = package_config.docker.model_dump_json()
+            if key not in images:
+                image = yield from self._prepare_docker_image(package_config)
+                if not image:
+                    return None
+                images[key] = image
+        return {name: images[c.docker.model_dump_json()] for name, c in configs.items()}
+
+    def watch(self, debounce: float) -> Generator[PipelineEvent, None, None]:
+        """
+        Runs the pipeline, then watches the working tree. After each burst of
+        changes, settled for `debounce` seconds, the steps the changed files
+        concern run again, along with the steps depending on them. A change
+        arriving mid-run cancels the run, whose steps are carried over to the
+        next one.
+
+        Images are prepared once, and again only when a configuration file
+        or Dockerfile changes. Steps run in containers kept warm between
+        runs, sharing one artifacts volume for the whole session, so steps
+        run again still find the outputs of those that were not.
+        """
+        assert self._watcher is not None
+        watcher = self._watcher
+        files = set(self._git_service.list_files())
+        watcher.watch(
+            self._git_service.git_root, {posixpath.dirname(path) for path in files}
+        )
+        batches: "queue.Queue[Set[str]]" = queue.Queue()
+        cancel = threading.Event()
+
+        def listen() -> None:
+            for batch in watcher.changes(debounce):
+                batches.put(batch)
+                cancel.set()
+
+        threading.Thread(target=listen, name="hookci-watch", daemon=True).start()
+
+        plan: Optional[WatchPlan] = None
+        pool: Optional[WarmContainerPool] = None
+        base_env: Dict[str, str] = {}
+        pending: Optional[Set[str]] = None  # None stands for every file
+        replan = True
+        try:
+            while True:
+                if replan:
+                    if plan is not None and pool is not None:
+                        self._close_watch_pool(plan, pool)
+                    plan, pool = yield from self._watch_plan()
+                    base_env = self._load_dotenv()
+                    pending = None
+                if plan is not None and pool is not None:
+                    cancelled = yield from self._watch_run(
+                        plan, pool, base_env, pending, cancel
+                    )
+                    if not cancelled:
+                        pending = set()
+
+                changed, files = self._next_changes(batches, cancel, files)
+                # Lost events may hide a configuration change, too.
+                replan = plan is None or changed is None or plan.replanned_by(changed)
+                if not replan and changed is not None and pending is not None:
+                    pending |= changed
+        finally:
+            watcher.close()
+            if plan is not None and pool is not None:
+                self._close_watch_pool(plan, pool)
+
+    def _close_watch_pool(self, plan: WatchPlan, pool: WarmContainerPool) -> None:
+        pool.close()
+        if pool.artifacts_volume:
+            self._drop_artifacts_volume(plan.config, pool.artifacts_volume)
+
+    def _next_changes(
+        self,
+        batches: "queue.Queue[Set[str]]",
+        cancel: threading.Event,
+        files: Set[str],
+    ) -> Tuple[Optional[Set[str]], Set[str]]:
+        """
+        Waits for changes to files steps can see, or to the files a watch plan
+        comes from, returning them with the new file list. None means events
+        were lost and any file may have changed.
+        """
+        while True:
+            batch = batches.get()
+            cancel.clear()
+            while batch and not batches.empty():
+                more = batches.get_nowait()
+                batch = batch | more if more else set()
+            if not batch:
+                return None, files
+            try:
+                current = set(self._git_service.list_files())
+            except GitCommandError as e:
+                logger.warning(f"Could not list the working tree files: {e}")
+                return batch, files
+            # Deleted files are only in the old list, created ones in the new.
+            visible = {
+                path
+                for path in batch
+                if path in files
+                or path in current
+                or posixpath.basename(path) in (constants.CONFIG_FILENAME, ".env")
+            }
+            files = current
+            if visible:
+                return visible, files
+
+    def _watch_plan(
+        self,
+    ) -> Generator[PipelineEvent, None, Tuple[Optional[WatchPlan], Optional[WarmContainerPool]]]:
+        """
+        Loads the whole pipeline, every monorepo package included, prepares
+        its images and starts a container pool for it. Returns no plan when
+        the configuration is invalid or an image cannot be prepared.
+        """
+        try:
+            config = self._load_and_validate_configuration()
+            setup_logging(config.log_level.value)
+            configs = {ROOT_PACKAGE: config}
+            merged, owners = config, {step.name: ROOT_PACKAGE for step in config.steps}
+            packages: List[str] = []
+            if config.monorepo is not None:
+                packages = self._discover_packages(config.monorepo)
+                configs = {ROOT_PACKAGE: config} if config.steps else {}
+                for name in packages:
+                    configs[name] = self._load_package_configuration(name)
+                merged, owners = self._merge_packages(config, configs)
+        except ConfigurationParseError as e:
+            logger.error(f"{e}")
+            logger.info("Waiting for the configuration to be fixed.")
+            return None, None
+
+        with tracer.span("image.prepare"):
+            images = yield from self._prepare_package_images(configs)
+        if images is None:
+            logger.info("Waiting for the Docker setup to be fixed.")
+            return None, None
+
+        volume: Optional[str] = None
+        if any(step.uses_artifacts for step in merged.steps):
+            volume = f"{constants.ARTIFACTS_VOLUME_PREFIX}{uuid.uuid4().hex[:12]}"
+            self._docker_service.create_volume(volume)
+
+        sources = {".env"} | {c.docker.dockerfile for c in configs.values() if c.docker.dockerfile}
+        plan = WatchPlan(
+            config=merged,
+            placements={
+                step: StepPlacement(image=images[name], directory=name)
+                for step, name in owners.items()
+            },
+            sources=sources,
+            monorepo=config.monorepo,
+            packages=tuple(packages),
+        )
+        return plan, WarmContainerPool(self._docker_service, volume)
+
+    def _watch_run(
+        self,
+        plan: WatchPlan,
+        pool: WarmContainerPool,
+        base_env: Dict[str, str],
+        changed: Optional[Set[str]],
+        cancel: threading.Event,
+    ) -> Generator[PipelineEvent, None, bool]:
+        """
+        Runs the steps the changes concern, or every step when `changed` is
+        None. Returns True if the run was cancelled.
+        """
+        affected = set(plan.config.graph.order)
+        if changed is not None:
+            affected = plan.affected_steps(changed)
+        selected = plan.config.graph.descendants(affected) if affected else set()
+        if changed is not None:
+            yield ChangesDetected(
+                paths=sorted(changed),
+                steps=[name for name in plan.config.graph.order if name in selected],
+            )
+        if not selected:
+            return False
+
+        config = _subset_steps(plan.config, selected, artifacts_kept=True)
+        placements = {name: plan.placements[name] for name in selected}
+        options = RunOptions(from_steps=tuple(sorted(affected)))
+        yield PipelineStart(total_steps=len(config.steps), log_level=config.log_level)
+        for event in self._schedule_steps(
+            config, placements, base_env, options, session=pool, cancel=cancel
+        ):
+            yield event
+            if isinstance(event, PipelineCancelled):
+                return True
+        return False
+
+    def speculate(self, debounce: float) -> Generator[PipelineEvent, None, None]:
+        """
+        Verifies the staged tree ahead of the commit. Each time the index
+        settles on a new tree, for `debounce` seconds, the pipeline the
+        pre-commit hook would run is run on a snapshot of that tree, and the
+        run of an earlier tree is cancelled. The events of the run are
+        logged, so the hook can replay or follow the run of its tree.
+        """
+        assert self._watcher is not None and self._speculations is not None
+        watcher = self._watcher
+        watcher.watch(self._git_service.git_dir, [])
+        trees: "queue.Queue[str]" = queue.Queue()
+        cancel = threading.Event()
+        running: List[Optional[str]] = [None]
+
+        def listen() -> None:
+            for batch in watcher.changes(debounce):
+                # An empty batch means events were lost, maybe the index's too.
+                if batch and constants.INDEX_FILENAME not in batch:
+                    continue
+                tree = self._staged_tree()
+                if tree is None:
+                    continue
+                trees.put(tree)
+                if tree != running[0]:
+                    cancel.set()
+
+        threading.Thread(target=listen, name="hookci-speculate", daemon=True).start()
+
+        tree = self._staged_tree()
+        try:
+            while True:
+                # Writing the tree may rewrite the index, reporting the same tree again.
+                if tree is not None and tree != running[0]:
+                    running[0] = tree
+                    cancel.clear()
+                    yield from self._speculate_tree(tree, cancel)
+                tree = trees.get()
+                while not trees.empty():
+                    tree = trees.get_nowait()
+        finally:
+            watcher.close()
+
+    def _staged_tree(self) -> Optional[str]:
+        """Returns the ID of the staged tree, or None while the index has conflicts."""
+        try:
+            return self._git_service.write_index_tree()
+        except GitCommandError as e:
+            logger.debug(f"Could not write the staged tree: {e}")
+            return None
+
+    def _speculation_key(
+        self, tree: str, config: Configuration, base_env: Dict[str, str]
+    ) -> str:
+        """Covers what a pre-commit run's result depends on besides the working tree."""
+        return _digest(tree, config.model_dump_json(), json.dumps(base_env, sort_keys=True))
+
+    def _speculate_tree(
+        self, tree: str, cancel: threading.Event
+    ) -> Generator[PipelineEvent, None, None]:
+        """
+        Runs the pre-commit pipeline on a snapshot of a staged tree, logging
+        its events. The branch and commit message filters are left to the
+        hook, since the message is not written yet.
+        """
+        assert self._speculations is not None
+        repo = self._git_service.git_root
+        try:
+            config = self._load_and_validate_configuration()
+        except ConfigurationParseError as e:
+            logger.error(f"{e}")
+            return
+        setup_logging(config.log_level.value)
+        if not self._is_hook_enabled("pre-commit", config):
+            return
+
+        base_env = self._load_dotenv()
+        key = self._speculation_key(tree, config, base_env)
+        previous = self._speculations.load(repo)
+        if previous is not None and previous.key == key and previous.status:
+            logger.debug(f"Staged tree {tree[:12]} was already verified.")
+            return
+
+        yield SpeculationStart(tree=tree)
+        try:
+            workdir = self._speculations.snapshot(repo, tree)
+            self._git_service.export_tree(tree, workdir)
+            log = self._speculations.open_log(repo, key)
+        except (FileSystemError, GitCommandError) as e:
+            logger.error(f"Could not prepare the speculative run: {e}")
+            return
+
+        run = SpeculativeRun(key=key, tree=tree, pid=os.getpid())
+        options = RunOptions(speculation=Speculation(workdir=workdir, cancel=cancel))
+        try:
+            with log:
+                self._save_speculation(run)
+                for event in self._run_configured(config, "pre-commit", base_env, options):
+                    log.write(dump_event(event) + "\n")
+                    log.flush()
+                    if isinstance(event, PipelineEnd):
+                        run.status = event.status
+                    yield event
+        finally:
+            # Marked done last, so a hook following the log has seen every event.
+            run.done = True
+            self._save_speculation(run)
+
+    def _save_speculation(self, run: SpeculativeRun) -> None:
+        assert self._speculations is not None
+        try:
+            self._speculations.save(self._git_service.git_root, run)
+        except FileSystemError as e:
+            logger.warning(f"{e}")
+
+    def _join_speculation(
+        self, config: Configuration, base_env: Dict[str, str]
+    ) -> Generator[PipelineEvent, None, bool]:
+        """
+        Replays or follows the speculative run of the staged tree, when there
+        is one for the same configuration and environment. Returns False when
+        the pipeline must run here after all, such as when the followed run is
+        cancelled; its events so far have then been yielded already.
+        """
+        if self._speculations is None:
+            return False
+        repo = self._git_service.git_root
+        run = self._speculations.load(repo)
+        if run is None or (run.done and not run.status):
+            return False
+        tree = self._staged_tree()
+        if tree is None or run.key != self._speculation_key(tree, config, base_env):
+            return False
+
+        if run.done:
+            logger.info(f"Reusing the speculative run of staged tree {tree[:12]}.")
+        else:
+            logger.info(f"Following the speculative run of staged tree {tree[:12]}.")
+        for line in self._speculations.follow(repo, run):
+            try:
+                event = load_event(line)
+            except (ValueError, KeyError) as e:
+                logger.warning(f"Unreadable speculative run event: {e}")
+                break
+            if isinstance(event, PipelineCancelled):
+                break
+            if isinstance(event, StepEnd):
+                event = event.model_copy(update={"reused": True})
+            yield event
+            if isinstance(event, PipelineEnd):
+                return True
+        logger.warning("The speculative run ended early; running the pipeline here.")
+        return False
+
+    def _discover_packages(self, monorepo: Monorepo) -> List[str]:
+        """
+        Finds the package directories holding a configuration file. The files
+        are only located here, not read.
+        """
+        git_root = self._git_service.git_root
+        packages: List[str] = []
+        for pattern in monorepo.packages:
+            for path in self._fs.glob(git_root, f"{pattern}/{constants.CONFIG_FILENAME}"):
+                name = path.parent.relative_to(git_root).as_posix()
+                if name not in packages:
+                    packages.append(name)
+
+        known = set(packages) | {ROOT_PACKAGE}
+        for package, deps in monorepo.dependencies.items():
+            unknown = [p for p in [package, *deps] if p not in known]
+            if unknown:
+                raise ConfigurationParseError(
+                    f"Monorepo dependencies name unknown package '{unknown[0]}'."
+                )
+        return packages
+
+    def _changed_files(self, hook_type: Optional[str]) -> Optional[List[str]]:
+        """Returns the paths a hook validates, or None when every package should run."""
+        if not hook_type:
+            return None
+        try:
+            return self._git_service.get_changed_files(hook_type)
+        except GitCommandError as e:
+            logger.warning(f"Could not list changed files, running every package: {e}")
+            return None
+
+    def _load_package_configuration(self, name: str) -> Configuration:
+        """Loads a package's configuration, resolving its Dockerfile from the repository root."""
+        path = self._git_service.git_root / name / constants.CONFIG_FILENAME
+        try:
+            config = Configuration.model_validate(self._config_handler.load_config_data(path))
+        except ValidationError as e:
+            raise ConfigurationParseError(
+                f"Invalid configuration structure in package '{name}':\n{e}"
+            ) from e
+        if config.docker.dockerfile:
+            config.docker = config.docker.model_copy(
+                update={"dockerfile": (Path(name) / config.docker.dockerfile).as_posix()}
+            )
+        return config
+
+    def _collect_old_images(self, policy: ImageGc) -> None:
+        """Runs the automatic image collection once the policy is exceeded."""
+        if self._image_gc is None or not policy.auto:
+            return
+        try:
+            if not self._image_gc.needs_collection(policy):
+                return
+            with tracer.span("image.gc"):
+                result = self._image_gc.collect(policy)
+        except InfrastructureError as e:
+            logger.warning(f"Automatic image cleanup failed: {e}")
+            return
+        if result.removed:
+            logger.info(
+                f"Removed {len(result.removed)} old image(s), freeing "
+                f"{ByteSize(result.freed_bytes).human_readable()}."
+            )
 
     def _load_dotenv(self) -> Dict[str, str]:
         """Loads environment variables from a .env file in the git root."""
@@ -206,31 +1390,482 @@ class CiExecutionService:
         return env_vars
 
     def _run_pipeline_standard(
-        self, config: Configuration, base_env: Dict[str, str]
+        self,
+        config: Configuration,
+        base_env: Dict[str, str],
+        options: RunOptions = RunOptions(),
     ) -> Generator[PipelineEvent, None, None]:
         """
         Runs the pipeline using a DAG scheduler to allow concurrent execution of independent steps.
         """
+        config = _select_steps(config, options)
         yield PipelineStart(total_steps=len(config.steps), log_level=config.log_level)
 
-        docker_image = yield from self._prepare_docker_image(config)
+        with tracer.span("image.prepare"):
+            docker_image = yield from self._prepare_docker_image(config)
         if not docker_image:
             yield PipelineEnd(status="FAILURE")
             return
 
+        placements = {s.name: StepPlacement(image=docker_image) for s in config.steps}
+        yield from self._schedule_steps(config, placements, base_env, options)
+
+    def _schedule_steps(
+        self,
+        config: Configuration,
+        placements: Dict[str, StepPlacement],
+        base_env: Dict[str, str],
+        options: RunOptions = RunOptions(),
+        session: Optional[ContainerSession] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> Generator[PipelineEvent, None, None]:
+        """
+        Runs the steps as their dependencies complete, ending the pipeline.
+        Steps exchanging artifacts share a volume created for this run only,
+        unless the given container session brings its own.
+
+        In debug mode every step gets its own persistent container. The
+        container of the first critical step to fail is kept for the debug
+        shell, which opens once the running steps are done.
+
+        Setting `cancel` stops the run: the containers of the session's
+        running steps are removed and the run ends without a result.
+        Speculative runs get a session of their own for that, and mount
+        their snapshot instead of the working tree.
+
+        The results are recorded in a checkpoint. When resuming, steps whose
+        key matches a success in the last checkpoint, along with all the
+        steps before them, are reported as reused instead of run. With the
+        shared result cache on, successes are also recorded there, and steps
+        whose key any clone saw succeed are reused the same way. Snapshot
+        steps whose setup image exists are reused too, and the steps after
+        them start from that image.
+        """
+        speculation = options.speculation
+        shared = self._shared_results(config)
+        # Checkpoints describe the working tree, which speculative runs do not see.
+        keys = (
+            None
+            if speculation
+            else self._step_keys(config, placements, base_env, shared, options.resume)
+        )
+        reused = (
+            self._reusable_steps(
+                config,
+                keys,
+                options.resume,
+                shared,
+                # Outputs only outlive their run in a session's own volume.
+                session is not None and bool(session.artifacts_volume),
+            )
+            if keys
+            else set()
+        )
+        if speculation is None:
+            placements, snapshotted = self._snapshot_placements(
+                config, placements, base_env, commit=session is None and not options.debug
+            )
+            reused |= snapshotted
+        else:
+            placements = {
+                name: placement._replace(workdir=speculation.workdir)
+                for name, placement in placements.items()
+            }
+            cancel = speculation.cancel
+
+        volume: Optional[str] = None
+        if session is not None and session.artifacts_volume:
+            placements = {
+                name: placement._replace(volume=session.artifacts_volume)
+                for name, placement in placements.items()
+            }
+        elif any(s.uses_artifacts for s in config.steps):
+            volume = f"{constants.ARTIFACTS_VOLUME_PREFIX}{uuid.uuid4().hex[:12]}"
+            try:
+                self._docker_service.create_volume(volume)
+            except DockerError as e:
+                logger.error(f"Failed to create the artifacts volume: {e}")
+                yield PipelineEnd(status="FAILURE")
+                return
+            placements = {
+                s.name: placements[s.name]._replace(volume=volume)
+                if s.uses_artifacts
+                else placements[s.name]
+                for s in config.steps
+            }
+
+        owned = session is None and (options.debug or speculation is not None)
+        if owned:
+            session = (
+                DebugSession(self._docker_service)
+                if options.debug
+                else ContainerSession(self._docker_service)
+            )
+        results: Dict[str, str] = {}
+        try:
+            for event in self._run_scheduler(
+                config, placements, base_env, session, reused, cancel
+            ):
+                if isinstance(event, StepEnd):
+                    results[event.step.name] = event.status
+                    if keys and event.status == "SUCCESS" and not event.reused:
+                        key = keys[1][event.step.name]
+                        if shared:
+                            shared.add([key])
+                        if event.step.output_files:
+                            self._archive_outputs(event.step, key)
+                elif isinstance(event, PipelineEnd) and keys:
+                    if self._checkpoints is not None:
+                        self._save_checkpoint(config, keys, results, options.selects)
+                    if shared and config.cache:
+                        shared.evict(config.cache.max_size)
+                yield event
+        finally:
+            if owned and session is not None:
+                session.close()
+            if volume:
+                self._drop_artifacts_volume(config, volume)
+
+    def _shared_results(self, config: Configuration) -> Optional[IResultCache]:
+        """Returns the shared result cache if the configuration turns it on."""
+        if config.cache and config.cache.shared:
+            return self._results
+        return None
+
+    def _step_keys(
+        self,
+        config: Configuration,
+        placements: Dict[str, StepPlacement],
+        base_env: Dict[str, str],
+        shared: Optional[IResultCache] = None,
+        resume: bool = False,
+    ) -> Optional[Tuple[str, Dict[str, str]]]:
+        """
+        Returns the tree hash and, for every step, a key covering what its
+        result depends on: its definition, image, environment, input files
+        and the keys of its dependencies. Steps without `inputs` depend on
+        the whole tree. Returns None when the tree cannot be read, or when
+        nothing needs the keys: the run does not resume, the shared result
+        cache is off and no step has `output_files` to store.
+
+        Keys for the shared cache name images by ID, since other clones may
+        hold a different image under the same tag. Files matching a step's
+        `output_files` are products, not inputs, so they are left out.
+        """
+        needed = (
+            (resume and self._checkpoints is not None)
+            or shared is not None
+            or (self._outputs is not None and any(s.output_files for s in config.steps))
+        )
+        if not needed:
+            return None
+        try:
+            with tracer.span("checkpoint.fingerprint"):
+                paths = self._git_service.list_files()
+                products = [p for s in config.steps for p in s.output_files]
+                if products:
+                    produced = _input_matcher(products)
+                    paths = [path for path in paths if not produced(path)]
+                files = sorted(self._git_service.get_file_fingerprints(paths).items())
+        except GitCommandError as e:
+            logger.warning(f"Could not fingerprint the working tree; no checkpoint kept: {e}")
+            return None
+
+        images = {p.image: p.image for p in placements.values()}
+        if shared is not None:
+            try:
+                images = {tag: self._docker_service.image_id(tag) for tag in images}
+            except DockerError as e:
+                logger.warning(f"Could not identify the step images; not sharing results: {e}")
+                return None
+
+        tree_hash = _digest(*(f"{path} {oid}" for path, oid in files))
+        env = json.dumps(base_env, sort_keys=True)
+        steps_by_name = {s.name: s for s in config.steps}
+        keys: Dict[str, str] = {}
+        for name in config.graph.order:
+            step = steps_by_name[name]
+            inputs = tree_hash
+            if step.inputs:
+                matches = _input_matcher(step.inputs)
+                inputs = _digest(*(f"{path} {oid}" for path, oid in files if matches(path)))
+            placement = placements[name]
+            keys[name] = _digest(
+                step.model_dump_json(),
+                images[placement.image],
+                placement.directory,
+                env,
+                inputs,
+                *(keys[dep] for dep in config.graph.dependencies[name]),
+            )
+        return tree_hash, keys
+
+    def _reusable_steps(
+        self,
+        config: Configuration,
+        keys: Tuple[str, Dict[str, str]],
+        resume: bool,
+        shared: Optional[IResultCache],
+        outputs_kept: bool,
+    ) -> Set[str]:
+        """
+        Finds the steps whose earlier results still hold, dependencies
+        included: successes in the last checkpoint when resuming, successes
+        any clone recorded in the shared result cache, and runs whose
+        `output_files` are stored. A step with `output_files` is only
+        reused once they are restored into the working tree.
+
+        Unless `outputs_kept`, the outputs of a reused step are gone, so a
+        step whose artifacts are needed by a step that runs is run again.
+        """
+        step_keys = keys[1]
+        held: Set[str] = set()
+        if resume:
+            held |= self._checkpoint_successes(config, step_keys)
+        if shared is not None:
+            hits = shared.hits(step_keys.values())
+            held |= {name for name, key in step_keys.items() if key in hits}
+
+        steps_by_name = {s.name: s for s in config.steps}
+        if self._outputs is not None:
+            repo = self._git_service.git_root
+            held |= {
+                name
+                for name, key in step_keys.items()
+                if steps_by_name[name].output_files and self._outputs.has(repo, key)
+            }
+
+        reused: Set[str] = set()
+        for name in config.graph.order:
+            if (
+                name in held
+                and all(dep in reused for dep in config.graph.dependencies[name])
+                and self._restore_outputs(steps_by_name[name], step_keys[name])
+            ):
+                reused.add(name)
+        if not outputs_kept:
+            for name in reversed(config.graph.order):
+                step = steps_by_name[name]
+                if name in reused and any(
+                    set(step.outputs) & set(steps_by_name[user].needs_artifacts)
+                    for user in config.graph.dependents[name]
+                    if user not in reused
+                ):
+                    reused.discard(name)
+
+        if resume:
+            logger.info(f"Resuming: reusing {len(reused)} of {len(config.steps)} steps.")
+        elif reused:
+            logger.info(
+                f"Reusing {len(reused)} of {len(config.steps)} steps from the result cache."
+            )
+        return reused
+
+    def _restore_outputs(self, step: Step, key: str) -> bool:
+        """Restores a reused step's `output_files`, telling whether it may be reused."""
+        if not step.output_files:
+            return True
+        if self._outputs is None:
+            return False
+        with tracer.span("outputs.restore", step=step.name):
+            restored = self._outputs.restore(self._git_service.git_root, key)
+        if restored:
+            logger.debug(f"Restored the outputs of step '{step.name}'.")
+        return restored
+
+    def _archive_outputs(self, step: Step, key: str) -> None:
+        """Stores the `output_files` a successful step wrote into the working tree."""
+        if self._outputs is None:
+            return
+        root = self._git_service.git_root
+        try:
+            with tracer.span("outputs.archive", step=step.name):
+                self._outputs.archive(root, key, step.name, _output_paths(root, step.output_files))
+        except FileSystemError as e:
+            logger.warning(f"Could not store the outputs of step '{step.name}': {e}")
+
+    def _snapshot_placements(
+        self,
+        config: Configuration,
+        placements: Dict[str, StepPlacement],
+        base_env: Dict[str, str],
+        commit: bool,
+    ) -> Tuple[Dict[str, StepPlacement], Set[str]]:
+        """
+        Finds the setup image of each `snapshot` step, tagged with a hash of
+        its definition, image, environment and `key_files`, and points the
+        steps after it that share its image at the setup image instead.
+        Returns the new placements and the snapshot steps whose image exists,
+        which need not run.
+
+        A missing image is committed from the step's container once it
+        succeeds, which only transient containers allow. Without `commit`,
+        the step runs as usual and the steps after it keep their image.
+        """
+        snapshots = {s.name: s for s in config.steps if s.snapshot}
+        if not snapshots:
+            return placements, set()
+        repository = setup_image_repository(self._git_service.git_root)
+        planned = dict(placements)
+        existing: Set[str] = set()
+        try:
+            key_files = _input_matcher([p for s in snapshots.values() for p in s.key_files])
+            fingerprints = self._git_service.get_file_fingerprints(
+                [path for path in self._git_service.list_files() if key_files(path)]
+            )
+            files = sorted(fingerprints.items())
+            env = json.dumps(base_env, sort_keys=True)
+            for name in config.graph.order:
+                step = snapshots.get(name)
+                if step is None:
+                    continue
+                placement = planned[name]
+                # A setup image from an earlier snapshot step is named by its key already.
+                base = placement.image
+                if not base.startswith(f"{repository}:"):
+                    base = self._docker_service.image_id(base)
+                matches = _input_matcher(step.key_files)
+                key = _digest(
+                    step.model_dump_json(),
+                    base,
+                    placement.directory,
+                    env,
+                    *(f"{path} {oid}" for path, oid in files if matches(path)),
+                )
+                tag = f"{repository}:{key[:12]}"
+                if self._docker_service.image_exists(tag):
+                    existing.add(name)
+                    self._mark_image_used(tag)
+                elif commit:
+                    planned[name] = placement._replace(snapshot=tag)
+                else:
+                    continue
+                for later in _descendants(config, name):
+                    if planned[later].image == placement.image:
+                        planned[later] = planned[later]._replace(image=tag)
+        except (GitCommandError, DockerError) as e:
+            logger.warning(f"Could not look up setup snapshots; setup steps run as usual: {e}")
+            return placements, set()
+        return planned, existing
+
+    def _checkpoint_successes(self, config: Configuration, step_keys: Dict[str, str]) -> Set[str]:
+        """Finds the steps that succeeded in the last checkpoint with the same key."""
+        if self._checkpoints is None:
+            return set()
+        checkpoint = self._checkpoints.load(self._git_service.git_root)
+        if checkpoint is None:
+            logger.info("No checkpoint to resume from; running every step.")
+            return set()
+        if checkpoint.config_hash != _digest(config.model_dump_json()):
+            logger.info("The configuration changed; steps it affects will run again.")
+        return {
+            name
+            for name, record in checkpoint.steps.items()
+            if record.status == "SUCCESS" and record.key == step_keys.get(name)
+        }
+
+    def _save_checkpoint(
+        self,
+        config: Configuration,
+        keys: Tuple[str, Dict[str, str]],
+        results: Dict[str, str],
+        partial: bool = False,
+    ) -> None:
+        """
+        Records the run's results. After a partial run, the records of the
+        steps left out are carried over, since their keys still tell whether
+        they hold.
+        """
+        assert self._checkpoints is not None
+        tree_hash, step_keys = keys
+        steps = {
+            name: StepRecord(status=status, key=step_keys[name])
+            for name, status in results.items()
+        }
+        previous = self._checkpoints.load(self._git_service.git_root) if partial else None
+        if previous is not None:
+            steps = {**previous.steps, **steps}
+        checkpoint = Checkpoint(
+            tree_hash=tree_hash,
+            config_hash=_digest(config.model_dump_json()),
+            steps=steps,
+        )
+        try:
+            self._checkpoints.save(self._git_service.git_root, checkpoint)
+        except FileSystemError as e:
+            logger.warning(f"Could not save the run checkpoint: {e}")
+
+    def _drop_artifacts_volume(self, config: Configuration, volume: str) -> None:
+        if config.artifacts and config.artifacts.retain:
+            logger.info(f"Artifacts kept in Docker volume '{volume}'.")
+            return
+        try:
+            self._docker_service.remove_volume(volume)
+        except DockerError as e:
+            logger.warning(f"Could not remove the artifacts volume '{volume}': {e}")
+
+    def _run_scheduler(
+        self,
+        config: Configuration,
+        placements: Dict[str, StepPlacement],
+        base_env: Dict[str, str],
+        session: Optional[ContainerSession] = None,
+        reused: Optional[Set[str]] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> Generator[PipelineEvent, None, None]:
+        # Remote daemons get one copy of each workspace per run.
+        for workdir in {p.workdir or self._git_service.git_root for p in placements.values()}:
+            self._docker_service.refresh_workspace(workdir)
+        logs: Optional[StepLogs] = None
+        if self._step_logs is not None:
+            try:
+                logs = self._step_logs.open(self._git_service.git_root)
+            except FileSystemError as e:
+                logger.warning(f"Step output will not be stored: {e}")
+        try:
+            yield from self._schedule(
+                config, placements, base_env, EventChannel(logs), session, reused, cancel
+            )
+        finally:
+            if logs is not None:
+                logs.close()
+
+    def _schedule(
+        self,
+        config: Configuration,
+        placements: Dict[str, StepPlacement],
+        base_env: Dict[str, str],
+        event_queue: EventChannel,
+        session: Optional[ContainerSession] = None,
+        reused: Optional[Set[str]] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> Generator[PipelineEvent, None, None]:
         steps_by_name, incoming_edges, outgoing_edges = self._initialize_dag_structures(
             config
         )
 
-        event_queue: "queue.Queue[PipelineEvent]" = queue.Queue()
+        # Reused steps are reported as if run, so their dependents are released in order.
+        for name in [n for n in config.graph.order if n in reused] if reused else []:
+            incoming_edges[name] = -1  # Mark as submitted
+            step = steps_by_name[name]
+            event_queue.put(StepStart(step=step))
+            event_queue.put(StepEnd(step=step, status="SUCCESS", exit_code=0, reused=True))
         completed_steps: Set[str] = set()
         failed_critical = False
         pipeline_status: Literal["SUCCESS", "FAILURE", "WARNING"] = "SUCCESS"
+        cancelled = False
 
-        with ThreadPoolExecutor() as executor:
+        with ThreadPoolExecutor(max_workers=self._docker_service.capacity) as executor:
             active_futures: List[Future[None]] = []
 
             while len(completed_steps) < len(config.steps):
+                if cancel is not None and cancel.is_set():
+                    cancelled = True
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    if session is not None:
+                        session.cancel()
+                    break
+
                 if not failed_critical:
                     self._submit_ready_steps(
                         incoming_edges=incoming_edges,
@@ -238,12 +1873,16 @@ class CiExecutionService:
                         completed_steps=completed_steps,
                         executor=executor,
                         active_futures=active_futures,
-                        docker_image=docker_image,
+                        placements=placements,
                         base_env=base_env,
                         event_queue=event_queue,
+                        session=session,
+                        cancel=cancel,
                     )
 
-                if not active_futures:
+                # Finished threads may still have events waiting in the queue,
+                # so only an empty queue with nothing running means a stall.
+                if not active_futures and event_queue.empty():
                     if not failed_critical:
                         logger.error(
                             "Deadlock detected or no reachable steps remaining."
@@ -267,26 +1906,29 @@ class CiExecutionService:
                     failed_critical = True
 
             wait(active_futures)
-            while not event_queue.empty():
+            while not cancelled and not event_queue.empty():
                 yield event_queue.get()
 
+        if cancelled:
+            yield PipelineCancelled()
+            return
+        if isinstance(session, DebugSession) and session.step and session.container_id:
+            yield DebugShellStarting(step=session.step, container_id=session.container_id)
         yield PipelineEnd(status=pipeline_status)
 
     def _initialize_dag_structures(
         self, config: Configuration
     ) -> Tuple[Dict[str, Step], Dict[str, int], Dict[str, List[str]]]:
-        """Initializes the necessary structures for the DAG scheduler."""
+        """
+        Initializes the scheduler state from the graph built during validation.
+        Steps are listed longest critical path first, so when several are ready
+        the ones that hold up the most work start first.
+        """
+        graph = config.graph
         steps_by_name = {s.name: s for s in config.steps}
-        incoming_edges = {
-            s.name: len([d for d in s.depends_on if d in steps_by_name])
-            for s in config.steps
-        }
-        outgoing_edges: Dict[str, List[str]] = {s.name: [] for s in config.steps}
-        for s in config.steps:
-            for dep in s.depends_on:
-                if dep in outgoing_edges:
-                    outgoing_edges[dep].append(s.name)
-        return steps_by_name, incoming_edges, outgoing_edges
+        priority = sorted(graph.order, key=lambda name: -graph.critical_path[name])
+        incoming_edges = {name: len(graph.dependencies[name]) for name in priority}
+        return steps_by_name, incoming_edges, graph.dependents
 
     def _submit_ready_steps(
         self,
@@ -295,9 +1937,11 @@ class CiExecutionService:
         completed_steps: Set[str],
         executor: ThreadPoolExecutor,
         active_futures: List[Future[None]],
-        docker_image: str,
+        placements: Dict[str, StepPlacement],
         base_env: Dict[str, str],
-        event_queue: "queue.Queue[PipelineEvent]",
+        event_queue: EventChannel,
+        session: Optional[ContainerSession] = None,
+        cancel: Optional[threading.Event] = None,
     ) -> None:
         """Identifies steps with satisfied dependencies and submits them to the executor."""
         ready_steps = [
@@ -309,19 +1953,25 @@ class CiExecutionService:
         for name in ready_steps:
             incoming_edges[name] = -1  # Mark as submitted
             step = steps_by_name[name]
+            placement = placements[name]
             future = executor.submit(
                 self._threaded_step_wrapper,
                 step,
-                docker_image,
-                self._git_service.git_root,
+                placement.image,
+                placement.workdir or self._git_service.git_root,
                 base_env,
                 event_queue,
+                placement.directory,
+                placement.volume,
+                session,
+                placement.snapshot,
+                cancel,
             )
             active_futures.append(future)
 
     def _process_next_event(
         self,
-        event_queue: "queue.Queue[PipelineEvent]",
+        event_queue: EventChannel,
         active_futures: List[Future[None]],
         completed_steps: Set[str],
         outgoing_edges: Dict[str, List[str]],
@@ -398,19 +2048,101 @@ class CiExecutionService:
         image: str,
         workdir: Path,
         base_env: Dict[str, str],
-        event_queue: "queue.Queue[PipelineEvent]",
+        event_queue: EventChannel,
+        directory: str = ROOT_PACKAGE,
+        volume: Optional[str] = None,
+        session: Optional[ContainerSession] = None,
+        snapshot: Optional[str] = None,
+        cancel: Optional[threading.Event] = None,
     ) -> None:
         """
         Wrapper to run a step in a separate thread and push events to a queue.
         """
+        with tracer.track(f"step: {step.name}"), tracer.span("step", step=step.name):
+            if step.executor != "docker":
+                # Sessions and snapshots hold containers; other executors have
+                # none, so their steps are cancelled through the executor.
+                self._run_step(
+                    step, image, workdir, base_env, event_queue, directory, volume, cancel
+                )
+            elif snapshot is not None:
+                self._run_snapshot_step(
+                    step, image, workdir, base_env, event_queue, snapshot, directory, volume
+                )
+            elif session is None:
+                self._run_step(
+                    step, image, workdir, base_env, event_queue, directory, volume
+                )
+            else:
+                self._run_persistent_step(
+                    step, image, workdir, base_env, event_queue, session, directory, volume
+                )
+
+    def _step_invocation(
+        self,
+        step: Step,
+        base_env: Dict[str, str],
+        directory: str,
+        volume: Optional[str],
+    ) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+        """
+        Builds a step's command and environment, plus the extra container
+        arguments. The whole repository is mounted; steps of a package start
+        in its directory, and find their package's artifacts under
+        `HOOKCI_ARTIFACTS`. The artifacts volume is only writable by steps
+        producing outputs.
+        """
+        env = {**base_env, **step.env}
+        command = step.command
+        if directory != ROOT_PACKAGE:
+            command = f"cd {shlex.quote(directory)} || exit 1\n{command}"
+        extra: Dict[str, Any] = {}
+        if volume:
+            env[constants.ARTIFACTS_ENV] = (
+                constants.ARTIFACTS_DIR
+                if directory == ROOT_PACKAGE
+                else f"{constants.ARTIFACTS_DIR}/{directory}"
+            )
+            command = _with_artifacts(step, command)
+            extra["volumes"] = [
+                VolumeMount(
+                    name=volume,
+                    target=constants.ARTIFACTS_DIR,
+                    read_only=not step.outputs,
+                )
+            ]
+        return command, env, extra
+
+    def _run_step(
+        self,
+        step: Step,
+        image: str,
+        workdir: Path,
+        base_env: Dict[str, str],
+        event_queue: EventChannel,
+        directory: str = ROOT_PACKAGE,
+        volume: Optional[str] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> None:
+        """
+        Runs a single step on its executor, in a transient container for
+        Docker steps, reporting through the queue.
+        """
         event_queue.put(StepStart(step=step))
         try:
-            combined_env = {**base_env, **step.env}
-            command_gen = self._docker_service.run_command_in_container(
+            command, combined_env, extra = self._step_invocation(
+                step, base_env, directory, volume
+            )
+            executor = self._executors.get(step.executor)
+            if executor is None:
+                raise ExecutorError(f"No '{step.executor}' executor is available.")
+            command_gen = executor.run_command(
                 image=image,
-                command=step.command,
+                command=command,
                 workdir=workdir,
                 env=combined_env,
+                cancel=cancel,
+                **extra,
             )
 
             exit_code = 1
@@ -436,67 +2168,114 @@ class CiExecutionService:
             logger.error(f"Thread wrapper failed for step '{step.name}': {e}")
             event_queue.put(StepEnd(step=step, status="FAILURE", exit_code=1))
 
-    def _run_pipeline_debug(
-        self, config: Configuration, base_env: Dict[str, str]
-    ) -> Generator[PipelineEvent, None, None]:
-        yield PipelineStart(total_steps=len(config.steps), log_level=config.log_level)
-
-        docker_image = yield from self._prepare_docker_image(config)
-        if not docker_image:
-            yield PipelineEnd(status="FAILURE")
+    def _run_persistent_step(
+        self,
+        step: Step,
+        image: str,
+        workdir: Path,
+        base_env: Dict[str, str],
+        event_queue: EventChannel,
+        session: ContainerSession,
+        directory: str = ROOT_PACKAGE,
+        volume: Optional[str] = None,
+    ) -> None:
+        """
+        Runs a step through `exec` in a container of the session, which
+        decides what becomes of the container once the step ends.
+        """
+        event_queue.put(StepStart(step=step))
+        command, combined_env, extra = self._step_invocation(
+            step, base_env, directory, volume
+        )
+        try:
+            container_id = session.acquire(image, workdir, extra.get("volumes"))
+        except DockerError as e:
+            logger.error(f"Failed to start a container for step '{step.name}': {e}")
+            event_queue.put(StepEnd(step=step, status="FAILURE", exit_code=1))
             return
 
+        status: Optional[EventStatus] = None
+        exit_code = 1
+        try:
+            logs = self._stream_logs_and_get_exit_code(
+                self._docker_service.exec_in_container(
+                    container_id, command=command, env=combined_env
+                ),
+                step.name,
+            )
+            while True:
+                event_queue.put(next(logs))
+        except StopIteration as e:
+            exit_code = int(e.value)
+            status = "SUCCESS"
+            if exit_code != 0:
+                status = "FAILURE" if step.critical else "WARNING"
+        except Exception as e:
+            logger.error(f"Infrastructure error during step '{step.name}': {e}")
+        # Released before the step is reported, so its dependents can reuse it.
+        session.release(step, container_id, status)
+        event_queue.put(StepEnd(step=step, status=status or "FAILURE", exit_code=exit_code))
+
+    def _run_snapshot_step(
+        self,
+        step: Step,
+        image: str,
+        workdir: Path,
+        base_env: Dict[str, str],
+        event_queue: EventChannel,
+        tag: str,
+        directory: str = ROOT_PACKAGE,
+        volume: Optional[str] = None,
+    ) -> None:
+        """
+        Runs a snapshot step through `exec` in a container of its own, then
+        commits the container to its setup image before reporting success,
+        so the steps after it find the image when they start.
+        """
+        event_queue.put(StepStart(step=step))
+        command, combined_env, extra = self._step_invocation(
+            step, base_env, directory, volume
+        )
         try:
             container_id = self._docker_service.start_persistent_container(
-                image=docker_image, workdir=self._git_service.git_root
+                image, workdir, extra.get("volumes")
             )
         except DockerError as e:
-            logger.error(f"Failed to start debug container: {e}")
-            yield PipelineEnd(status="FAILURE")
+            logger.error(f"Failed to start a container for step '{step.name}': {e}")
+            event_queue.put(StepEnd(step=step, status="FAILURE", exit_code=1))
             return
 
-        logger.debug(f"Started persistent container: {container_id}")
-
-        final_status: Literal["SUCCESS", "FAILURE", "WARNING"] = "SUCCESS"
+        exit_code = 1
         try:
-            # Debug mode runs sequentially ignoring dependencies for simplicity in user interaction
-            for step in config.steps:
-                yield StepStart(step=step)
-
-                combined_env = {**base_env, **step.env}
-
-                try:
-                    exit_code = yield from self._stream_logs_and_get_exit_code(
-                        self._docker_service.exec_in_container(
-                            container_id, command=step.command, env=combined_env
-                        ),
-                        step.name,
-                    )
-                except DockerError as e:
-                    logger.error(
-                        f"Infrastructure error during debug step '{step.name}': {e}"
-                    )
-                    yield StepEnd(step=step, status="FAILURE", exit_code=1)
-                    final_status = "FAILURE"
-                    break
-
-                if exit_code == 0:
-                    yield StepEnd(step=step, status="SUCCESS", exit_code=exit_code)
-                    continue
-                if step.critical:
-                    yield StepEnd(step=step, status="FAILURE", exit_code=exit_code)
-                    yield DebugShellStarting(step=step, container_id=container_id)
-                    final_status = "FAILURE"
-                    break
-                if final_status != "FAILURE":
-                    final_status = "WARNING"
-                yield StepEnd(step=step, status="WARNING", exit_code=exit_code)
+            logs = self._stream_logs_and_get_exit_code(
+                self._docker_service.exec_in_container(
+                    container_id, command=command, env=combined_env
+                ),
+                step.name,
+            )
+            while True:
+                event_queue.put(next(logs))
+        except StopIteration as e:
+            exit_code = int(e.value)
+        except Exception as e:
+            logger.error(f"Infrastructure error during step '{step.name}': {e}")
 
+        status: EventStatus = "SUCCESS" if exit_code == 0 else "FAILURE"
+        try:
+            if status == "SUCCESS":
+                with tracer.span("docker.snapshot", step=step.name):
+                    self._docker_service.commit_container(container_id, tag)
+                self._mark_image_used(tag)
+                logger.info(f"Saved the result of step '{step.name}' as image '{tag}'.")
+        except DockerError as e:
+            logger.error(f"Failed to snapshot step '{step.name}': {e}")
+            status = "FAILURE"
         finally:
-            logger.debug(f"Stopping and removing container: {container_id}")
-            self._docker_service.stop_and_remove_container(container_id)
-
-        yield PipelineEnd(status=final_status)
+            try:
+                self._docker_service.stop_and_remove_container(container_id)
+            except DockerError as e:
+                logger.warning(f"Could not remove the container of step '{step.name}': {e}")
+        event_queue.put(StepEnd(step=step, status=status, exit_code=exit_code))
 
     def _stream_logs_and_get_exit_code(
         self,
@@ -572,17 +2351,18 @@ class CiExecutionService:
         Ensures the required Docker image is available, either by pulling,
         building it, or using a cached version.
         """
+        archive = config.docker.archive
         if config.docker.dockerfile:
-            return (yield from self._prepare_from_dockerfile(config.docker.dockerfile))
+            return (yield from self._prepare_from_dockerfile(config.docker.dockerfile, archive))
 
         if config.docker.image:
-            return (yield from self._prepare_from_registry(config.docker.image))
+            return (yield from self._prepare_from_registry(config.docker.image, archive))
 
         # This case should be prevented by pydantic model validation, but as a safeguard:
         raise ConfigurationParseError("No docker image or dockerfile was specified.")
 
     def _prepare_from_dockerfile(
-        self, dockerfile_rel_path: str
+        self, dockerfile_rel_path: str, archive: Optional[ImageArchive] = None
     ) -> Generator[PipelineEvent, None, str | None]:
         """Handles building a Docker image from a Dockerfile."""
         git_root = self._git_service.git_root
@@ -592,10 +2372,13 @@ class CiExecutionService:
             dockerfile_hash = self._docker_service.calculate_dockerfile_hash(
                 dockerfile_path
             )
-            tag = f"hookci/{git_root.name}:{dockerfile_hash}"
+            tag = f"{image_repository(git_root)}:{dockerfile_hash}"
 
-            if self._docker_service.image_exists(tag):
+            if self._docker_service.image_exists(tag) or self._load_archived_image(
+                tag, archive
+            ):
                 logger.debug(f"Using cached Docker image: {tag}")
+                self._mark_image_used(tag)
                 return tag
 
             total_steps = self._docker_service.count_dockerfile_steps(dockerfile_path)
@@ -611,34 +2394,109 @@ class CiExecutionService:
             for step, line in build_generator:
                 yield ImageBuildProgress(step=step, line=line)
             yield ImageBuildEnd(status="SUCCESS")
+            self._mark_image_used(tag)
+            self._archive_image(tag, archive)
             return tag
         except DockerError as e:
             logger.error(f"Docker build failed: {e}")
             yield ImageBuildEnd(status="FAILURE")
             return None
 
+    def _mark_image_used(self, tag: str) -> None:
+        if self._image_gc is not None:
+            self._image_gc.mark_used(tag)
+
     def _prepare_from_registry(
-        self, image_name: str
+        self, image_name: str, archive: Optional[ImageArchive] = None
     ) -> Generator[PipelineEvent, None, str | None]:
-        """Handles pulling a Docker image from a registry."""
+        """
+        Handles pulling a Docker image from a registry, unless the image
+        archive holds it.
+        """
         try:
             if self._docker_service.image_exists(image_name):
                 logger.debug(f"Using cached Docker image: {image_name}")
                 return image_name
         except DockerError as e:
             logger.warning(f"Could not check if image exists locally: {e}")
+        if self._load_archived_image(image_name, archive):
+            return image_name
 
         yield ImagePullStart(image_name=image_name)
         try:
             # Consume the generator
             deque(self._docker_service.pull_image(image_name), maxlen=0)
             yield ImagePullEnd(status="SUCCESS")
+            self._archive_image(image_name, archive)
             return image_name
         except DockerError as e:
             logger.error(f"Docker pull failed: {e}")
             yield ImagePullEnd(status="FAILURE")
             return None
 
+    def _load_archived_image(self, image: str, settings: Optional[ImageArchive]) -> bool:
+        """
+        Loads a missing image from the image archive, if the configuration
+        turns it on. An archive the daemon cannot load is discarded.
+        """
+        if settings is None or self._image_archive is None:
+            return False
+        archive = self._image_archive.open(image)
+        if archive is None:
+            return False
+        try:
+            with tracer.span("image_archive.load", image=image):
+                self._docker_service.load_image(archive)
+            if self._docker_service.image_exists(image):
+                logger.debug(f"Loaded Docker image {image} from its archive.")
+                return True
+            logger.warning(f"The archive of image '{image}' did not hold it.")
+        except (DockerError, OSError) as e:
+            logger.warning(f"Could not load image '{image}' from its archive: {e}")
+        self._image_archive.discard(image)
+        return False
+
+    def _archive_image(self, image: str, settings: Optional[ImageArchive]) -> None:
+        """
+        Stores a pulled or built image in the image archive, if the
+        configuration turns it on. An image whose ID is already archived is
+        only linked to its name; otherwise the export runs in the background
+        while the steps do, and the run waits for it before it ends.
+        """
+        if settings is None or self._image_archive is None:
+            return
+        try:
+            image_id = self._docker_service.image_id(image)
+            if self._image_archive.has(image_id):
+                self._image_archive.link(image, image_id)
+                return
+        except (DockerError, FileSystemError) as e:
+            logger.warning(f"Could not archive image '{image}': {e}")
+            return
+        thread = threading.Thread(
+            target=self._store_archive,
+            args=(self._image_archive, image, image_id, settings.max_size),
+            name="hookci-image-archive",
+        )
+        thread.start()
+        self._archiving.append(thread)
+
+    def _store_archive(
+        self, archive: IImageArchive, image: str, image_id: str, max_size: int
+    ) -> None:
+        """Exports an image to the archive, then keeps the archive within its cap."""
+        try:
+            with tracer.span("image_archive.store", image=image):
+                archive.store(image, image_id, self._docker_service.save_image(image))
+        except (DockerError, FileSystemError) as e:
+            logger.warning(f"Could not archive image '{image}': {e}")
+        archive.evict(max_size)
+
+    def _finish_archiving(self) -> None:
+        """Waits for the image exports started during the run."""
+        while self._archiving:
+            self._archiving.pop().join()
+
     def _load_and_validate_configuration(self) -> Configuration:
         """
         Locates, loads, and validates the HookCI configuration file.
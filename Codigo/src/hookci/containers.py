@@ -22,20 +22,33 @@ such as services and infrastructure handlers. It follows the Dependency
 Inversion Principle, allowing high-level modules (like the CLI) to depend on
 abstractions rather than concrete implementations.
 """
+import os
 from functools import cached_property
 
 from hookci.application.services import (
     CiExecutionService,
+    ImageGcService,
     MigrationService,
     ProjectInitService,
 )
+from hookci.infrastructure import constants as infra_constants
+from hookci.infrastructure.checkpoint import ICheckpointStore, JsonCheckpointStore
+from hookci.infrastructure.cluster import DockerClusterService, parse_docker_hosts
 from hookci.infrastructure.docker import DockerService, IDockerService
+from hookci.infrastructure.executor import HostExecutor, SandboxExecutor
 from hookci.infrastructure.fs import (
     GitService,
     IFileSystem,
     IScmService,
     LocalFileSystem,
 )
+from hookci.infrastructure.image_archive import IImageArchive, LocalImageArchive
+from hookci.infrastructure.image_index import IImageIndex, JsonImageIndex
+from hookci.infrastructure.outputs import IOutputStore, LocalOutputStore
+from hookci.infrastructure.result_cache import IResultCache, SqliteResultCache
+from hookci.infrastructure.speculation import ISpeculationStore, JsonSpeculationStore
+from hookci.infrastructure.step_logs import IStepLogStore, LocalStepLogStore
+from hookci.infrastructure.watcher import IFileWatcher, InotifyWatcher
 from hookci.infrastructure.yaml_handler import (
     IConfigHandler,
     YamlConfigHandler,
@@ -58,12 +71,47 @@ class Container:
 
     @cached_property
     def docker_service(self) -> IDockerService:
+        docker_hosts = os.environ.get(infra_constants.DOCKER_HOSTS_ENV)
+        if docker_hosts:
+            return DockerClusterService(parse_docker_hosts(docker_hosts))
         return DockerService()
 
     @cached_property
     def config_handler(self) -> IConfigHandler:
         return YamlConfigHandler(fs=self.file_system)
 
+    @cached_property
+    def image_index(self) -> IImageIndex:
+        return JsonImageIndex()
+
+    @cached_property
+    def checkpoint_store(self) -> ICheckpointStore:
+        return JsonCheckpointStore()
+
+    @cached_property
+    def result_cache(self) -> IResultCache:
+        return SqliteResultCache()
+
+    @cached_property
+    def image_archive(self) -> IImageArchive:
+        return LocalImageArchive()
+
+    @cached_property
+    def output_store(self) -> IOutputStore:
+        return LocalOutputStore()
+
+    @cached_property
+    def step_log_store(self) -> IStepLogStore:
+        return LocalStepLogStore()
+
+    @cached_property
+    def speculation_store(self) -> ISpeculationStore:
+        return JsonSpeculationStore()
+
+    @cached_property
+    def file_watcher(self) -> IFileWatcher:
+        return InotifyWatcher()
+
     @cached_property
     def project_init_service(self) -> ProjectInitService:
         return ProjectInitService(
@@ -79,6 +127,24 @@ class Container:
             config_handler=self.config_handler,
             docker_service=self.docker_service,
             fs=self.file_system,
+            image_gc=self.image_gc_service,
+            checkpoints=self.checkpoint_store,
+            watcher=self.file_watcher,
+            speculations=self.speculation_store,
+            results=self.result_cache,
+            outputs=self.output_store,
+            step_logs=self.step_log_store,
+            image_archive=self.image_archive,
+            executors={"host": HostExecutor(), "sandbox": SandboxExecutor()},
+        )
+
+    @cached_property
+    def image_gc_service(self) -> ImageGcService:
+        return ImageGcService(
+            git_service=self.git_service,
+            config_handler=self.config_handler,
+            docker_service=self.docker_service,
+            image_index=self.image_index,
         )
 
     @cached_property
@@ -20,9 +20,9 @@ Domain models for HookCI configuration.
 from __future__ import annotations
 
 from enum import Enum
-from typing import Dict, List, Optional, Set
+from typing import Dict, Iterable, List, Literal, Optional, Set
 
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel, ByteSize, Field, PrivateAttr, model_validator
 
 from hookci.application.constants import LATEST_CONFIG_VERSION
 
@@ -43,6 +43,192 @@ class Step(BaseModel):
     critical: bool = True
     env: Dict[str, str] = Field(default_factory=dict)
     depends_on: List[str] = Field(default_factory=list)
+    outputs: List[str] = Field(default_factory=list)
+    needs_artifacts: List[str] = Field(default_factory=list)
+    inputs: List[str] = Field(default_factory=list)
+    output_files: List[str] = Field(default_factory=list)
+    snapshot: bool = False
+    key_files: List[str] = Field(default_factory=list)
+    executor: Literal["docker", "host", "sandbox"] = "docker"
+
+    @property
+    def uses_artifacts(self) -> bool:
+        return bool(self.outputs or self.needs_artifacts)
+
+    @model_validator(mode="after")
+    def check_snapshot(self) -> Step:
+        """
+        Ensures snapshot steps say what their image depends on and are
+        critical, and that only Docker steps use images and artifacts.
+        """
+        if self.snapshot and not self.key_files:
+            raise ValueError(f'Snapshot step "{self.name}" needs "key_files".')
+        if self.key_files and not self.snapshot:
+            raise ValueError(f'Step "{self.name}" has "key_files" but is not a snapshot step.')
+        if self.snapshot and not self.critical:
+            raise ValueError(
+                f'Snapshot step "{self.name}" must be critical; later steps start from its image.'
+            )
+        if self.executor != "docker" and (self.snapshot or self.uses_artifacts):
+            raise ValueError(
+                f'Step "{self.name}" runs on the {self.executor} executor, which has no '
+                'image to snapshot nor artifacts volume; only "docker" steps can use them.'
+            )
+        return self
+
+
+class Artifacts(BaseModel):
+    """Settings of the volume that carries step outputs to the steps needing them."""
+
+    retain: bool = False
+
+
+class Cache(BaseModel):
+    """Settings of the step result cache shared by every clone on the machine."""
+
+    shared: bool = False
+    max_size: ByteSize = ByteSize(64 * 1024 * 1024)
+
+
+class StepGraph(BaseModel):
+    """
+    The step dependency graph in the shapes the scheduler needs, computed once
+    per configuration.
+
+    `order` is a topological order, `levels` groups steps by their distance
+    from the roots, and `critical_path` maps each step to the number of steps
+    on the longest chain that starts with it.
+    """
+
+    order: List[str] = Field(default_factory=list)
+    levels: List[List[str]] = Field(default_factory=list)
+    dependencies: Dict[str, List[str]] = Field(default_factory=dict)
+    dependents: Dict[str, List[str]] = Field(default_factory=dict)
+    critical_path: Dict[str, int] = Field(default_factory=dict)
+
+    @classmethod
+    def build(cls, steps: List[Step]) -> StepGraph:
+        """
+        Validates the dependencies and sorts the steps with Kahn's algorithm.
+        Runs in linear time without recursion, so long chains are fine.
+        A step needing an artifact depends on the step producing it.
+        """
+        dependencies: Dict[str, List[str]] = {s.name: [] for s in steps}
+        dependents: Dict[str, List[str]] = {name: [] for name in dependencies}
+        producers: Dict[str, str] = {}
+        for step in steps:
+            for artifact in step.outputs:
+                if artifact in producers:
+                    raise ValueError(
+                        f"Artifact '{artifact}' is produced by both "
+                        f"'{producers[artifact]}' and '{step.name}'."
+                    )
+                producers[artifact] = step.name
+        for step in steps:
+            for artifact in step.needs_artifacts:
+                if artifact not in producers:
+                    raise ValueError(
+                        f"Step '{step.name}' needs unknown artifact '{artifact}'."
+                    )
+            implicit = [producers[a] for a in step.needs_artifacts]
+            for dep in dict.fromkeys([*step.depends_on, *implicit]):
+                if dep not in dependencies:
+                    raise ValueError(f"Step '{step.name}' depends on unknown step '{dep}'.")
+                if dep == step.name:
+                    raise ValueError(f"Step '{step.name}' cannot depend on itself.")
+                dependencies[step.name].append(dep)
+                dependents[dep].append(step.name)
+
+        pending = {name: len(deps) for name, deps in dependencies.items()}
+        level = dict.fromkeys(dependencies, 0)
+        order = [name for name, count in pending.items() if count == 0]
+        for name in order:  # Grows while iterating
+            child_level = level[name] + 1
+            for child in dependents[name]:
+                if level[child] < child_level:
+                    level[child] = child_level
+                pending[child] -= 1
+                if pending[child] == 0:
+                    order.append(child)
+
+        if len(order) < len(dependencies):
+            cycle = cls._find_cycle(dependencies, pending)
+            raise ValueError(
+                f"Circular dependency detected in steps: {' -> '.join(cycle)}."
+            )
+
+        levels: List[List[str]] = []
+        for name in order:
+            if level[name] == len(levels):
+                levels.append([])
+            levels[level[name]].append(name)
+
+        critical_path = dict.fromkeys(dependencies, 1)
+        for name in reversed(order):
+            length = critical_path[name] + 1
+            for dep in dependencies[name]:
+                if critical_path[dep] < length:
+                    critical_path[dep] = length
+
+        # Everything above is already well-typed; skip re-validating 10k-entry maps.
+        return cls.model_construct(
+            order=order,
+            levels=levels,
+            dependencies=dependencies,
+            dependents=dependents,
+            critical_path=critical_path,
+        )
+
+    def ancestors(self, names: Iterable[str]) -> Set[str]:
+        """The given steps and every step they transitively depend on."""
+        return self._closure(names, self.dependencies)
+
+    def descendants(self, names: Iterable[str]) -> Set[str]:
+        """The given steps and every step transitively depending on them."""
+        return self._closure(names, self.dependents)
+
+    @staticmethod
+    def _closure(names: Iterable[str], edges: Dict[str, List[str]]) -> Set[str]:
+        seen = set(names)
+        stack = list(seen)
+        while stack:
+            for neighbour in edges[stack.pop()]:
+                if neighbour not in seen:
+                    seen.add(neighbour)
+                    stack.append(neighbour)
+        return seen
+
+    @staticmethod
+    def _find_cycle(
+        dependencies: Dict[str, List[str]], pending: Dict[str, int]
+    ) -> List[str]:
+        """
+        Walks unsorted steps through their unsorted dependencies until one
+        repeats. Every unsorted step has such a dependency, so the walk must
+        close a cycle.
+        """
+        node = next(name for name, count in pending.items() if count > 0)
+        seen: Dict[str, int] = {}
+        path: List[str] = []
+        while node not in seen:
+            seen[node] = len(path)
+            path.append(node)
+            node = next(d for d in dependencies[node] if pending[d] > 0)
+        return path[seen[node] :] + [node]
+
+
+class ImageGc(BaseModel):
+    """Garbage collection policy for the images HookCI builds from a Dockerfile."""
+
+    keep: int = Field(default=3, ge=1)
+    max_size: Optional[ByteSize] = None
+    auto: bool = True
+
+
+class ImageArchive(BaseModel):
+    """Settings of the machine-wide cache of image archives."""
+
+    max_size: ByteSize = ByteSize(4 * 1024 * 1024 * 1024)
 
 
 class Docker(BaseModel):
@@ -50,6 +236,8 @@ class Docker(BaseModel):
 
     image: Optional[str] = None
     dockerfile: Optional[str] = None
+    gc: Optional[ImageGc] = None
+    archive: Optional[ImageArchive] = None
 
     @model_validator(mode="after")
     def check_image_or_dockerfile(self) -> Docker:
@@ -79,6 +267,52 @@ class Filters(BaseModel):
     commits: Optional[str] = None
 
 
+# Name of the package made of the repository root and every path outside other packages.
+ROOT_PACKAGE = "."
+
+
+class Monorepo(BaseModel):
+    """
+    Splits the repository into packages that each have their own `hookci.yaml`.
+
+    `packages` holds glob patterns of package directories, relative to the
+    repository root. `dependencies` maps a package to the packages it uses.
+    """
+
+    packages: List[str] = Field(min_length=1)
+    dependencies: Dict[str, List[str]] = Field(default_factory=dict)
+
+    def affected(self, packages: Iterable[str], changed_paths: Iterable[str]) -> Set[str]:
+        """
+        Returns the packages holding a changed path, plus every package that
+        depends on one of them, directly or not. A path belongs to the deepest
+        package containing it, or to the root package when there is none.
+        """
+        known = set(packages)
+        affected = set()
+        for path in changed_paths:
+            parts = path.split("/")[:-1]
+            owner = ROOT_PACKAGE
+            for depth in range(len(parts), 0, -1):
+                candidate = "/".join(parts[:depth])
+                if candidate in known:
+                    owner = candidate
+                    break
+            affected.add(owner)
+
+        users: Dict[str, List[str]] = {}
+        for package, deps in self.dependencies.items():
+            for dep in deps:
+                users.setdefault(dep, []).append(package)
+        pending = list(affected)
+        while pending:
+            for user in users.get(pending.pop(), []):
+                if user not in affected:
+                    affected.add(user)
+                    pending.append(user)
+        return affected & (known | {ROOT_PACKAGE})
+
+
 def default_docker_config() -> Docker:
     """Provides a default Docker configuration."""
     return Docker(image="python:3.13-slim-trixie")
@@ -92,8 +326,18 @@ class Configuration(BaseModel):
     docker: Docker = Field(default_factory=default_docker_config)
     hooks: Hooks = Field(default_factory=Hooks)
     filters: Optional[Filters] = None
+    monorepo: Optional[Monorepo] = None
+    artifacts: Optional[Artifacts] = None
+    cache: Optional[Cache] = None
     steps: List[Step] = Field(default_factory=list)
 
+    _graph: StepGraph = PrivateAttr(default_factory=StepGraph)
+
+    @property
+    def graph(self) -> StepGraph:
+        """The dependency graph computed when the configuration was validated."""
+        return self._graph
+
     @model_validator(mode="after")
     def validate_dag(self) -> Configuration:
         """
@@ -103,48 +347,9 @@ class Configuration(BaseModel):
         2. Self-dependencies.
         3. Circular dependencies.
         """
-        step_names = {s.name for s in self.steps}
-        self._validate_dependencies_exist(step_names)
-        self._detect_circular_dependencies(step_names)
+        self._graph = StepGraph.build(self.steps)
         return self
 
-    def _validate_dependencies_exist(self, step_names: Set[str]) -> None:
-        """Ensures all dependencies point to existing steps and are not self-referential."""
-        for step in self.steps:
-            for dep in step.depends_on:
-                if dep not in step_names:
-                    raise ValueError(
-                        f"Step '{step.name}' depends on unknown step '{dep}'."
-                    )
-                if dep == step.name:
-                    raise ValueError(f"Step '{step.name}' cannot depend on itself.")
-
-    def _detect_circular_dependencies(self, step_names: Set[str]) -> None:
-        """Runs DFS to detect cycles in the dependency graph."""
-        adjacency_list: Dict[str, List[str]] = {
-            s.name: s.depends_on for s in self.steps
-        }
-        visited: Set[str] = set()
-        recursion_stack: Set[str] = set()
-
-        def is_cyclic(node: str) -> bool:
-            visited.add(node)
-            recursion_stack.add(node)
-
-            for neighbor in adjacency_list[node]:
-                if neighbor not in visited:
-                    if is_cyclic(neighbor):
-                        return True
-                elif neighbor in recursion_stack:
-                    return True
-
-            recursion_stack.remove(node)
-            return False
-
-        for name in step_names:
-            if name not in visited and is_cyclic(name):
-                raise ValueError("Circular dependency detected in steps.")
-
 
 def create_default_config() -> Configuration:
     """
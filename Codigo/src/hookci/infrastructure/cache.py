@@ -0,0 +1,65 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Helpers shared by the on-disk caches and stores.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Generator
+
+from hookci.application import constants as app_constants
+from hookci.infrastructure import constants
+
+
+def cache_dir(repo: Path, create: bool = False) -> Path:
+    """
+    Returns the repository's `.hookci/cache/` directory. With `create`, the
+    directory is made if missing, along with the `.gitignore` that keeps its
+    machine-specific contents out of commits.
+    """
+    directory = repo / app_constants.BASE_DIR_NAME / constants.CACHE_DIR_NAME
+    if create:
+        ensure_cache_dir(directory)
+    return directory
+
+
+def ensure_cache_dir(directory: Path) -> None:
+    """Creates a cache directory and its `.gitignore`, for stores given a path rather than a repository."""
+    gitignore = directory / ".gitignore"
+    if not gitignore.exists():
+        directory.mkdir(parents=True, exist_ok=True)
+        gitignore.write_text("*\n", encoding="utf-8")
+
+
+@contextmanager
+def atomic_write(path: Path) -> Generator[Path, None, None]:
+    """
+    Yields a temporary file next to `path` and, once the block succeeds,
+    renames it over `path`, so readers only ever see a complete file. The
+    temporary file is removed if the block fails. Its name starts with a
+    dot, which keeps it out of the stores' listings.
+    """
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}-")
+    os.close(fd)
+    try:
+        yield Path(tmp_name)
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
@@ -0,0 +1,85 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Per-repository record of the last pipeline run, for resuming it.
+"""
+import json
+from pathlib import Path
+from typing import Dict, Optional, Protocol, runtime_checkable
+
+from pydantic import BaseModel, ValidationError
+
+from hookci.infrastructure import constants
+from hookci.infrastructure.cache import atomic_write, cache_dir
+from hookci.infrastructure.errors import FileSystemError
+from hookci.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class StepRecord(BaseModel):
+    """How a step ended, and the key of the inputs it ran with."""
+
+    status: str
+    key: str
+
+
+class Checkpoint(BaseModel):
+    """The state of the working tree and configuration a run saw, and its results."""
+
+    tree_hash: str
+    config_hash: str
+    steps: Dict[str, StepRecord]
+
+
+@runtime_checkable
+class ICheckpointStore(Protocol):
+    """Interface for storing the last run's checkpoint of a repository."""
+
+    def load(self, repo: Path) -> Optional[Checkpoint]: ...
+
+    def save(self, repo: Path, checkpoint: Checkpoint) -> None: ...
+
+
+class JsonCheckpointStore(ICheckpointStore):
+    """
+    Keeps the checkpoint in `.hookci/cache/`, next to the other
+    machine-specific caches. Each run replaces the file atomically.
+    """
+
+    def path(self, repo: Path) -> Path:
+        return cache_dir(repo) / constants.CHECKPOINT_FILENAME
+
+    def load(self, repo: Path) -> Optional[Checkpoint]:
+        """Returns the last checkpoint, or None if there is no usable one."""
+        path = self.path(repo)
+        try:
+            return Checkpoint.model_validate_json(path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValidationError) as e:
+            logger.warning(f"Ignoring unreadable checkpoint {path}: {e}")
+            return None
+
+    def save(self, repo: Path, checkpoint: Checkpoint) -> None:
+        path = self.path(repo)
+        try:
+            cache_dir(repo, create=True)
+            with atomic_write(path) as tmp, open(tmp, "w", encoding="utf-8") as f:
+                json.dump(checkpoint.model_dump(), f, indent=2, sort_keys=True)
+        except OSError as e:
+            raise FileSystemError(f"Failed to write checkpoint {path}: {e}") from e
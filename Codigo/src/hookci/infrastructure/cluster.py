@@ -0,0 +1,309 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Docker execution spread over several daemons.
+"""
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Generator, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from hookci.application.events import LogStream
+from hookci.application.results import ImageInfo
+from hookci.infrastructure.docker import DockerService, IDockerService, VolumeMount
+from hookci.infrastructure.errors import DockerError
+from hookci.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class DockerEndpoint(BaseModel):
+    """A Docker daemon and the number of steps it may run at once."""
+
+    url: str
+    capacity: int = Field(default=1, ge=1)
+
+
+def parse_docker_hosts(value: str) -> List[DockerEndpoint]:
+    """
+    Parses an endpoint list such as "unix:///var/run/docker.sock=4,tcp://box:2375=16".
+    Entries without a `=<capacity>` suffix get a capacity of 1.
+    """
+    endpoints = []
+    for entry in value.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        url, sep, capacity = entry.rpartition("=")
+        if sep and capacity.isdigit():
+            endpoints.append(DockerEndpoint(url=url, capacity=int(capacity)))
+        else:
+            endpoints.append(DockerEndpoint(url=entry))
+    if not endpoints:
+        raise DockerError(f"No Docker endpoints found in '{value}'.")
+    return endpoints
+
+
+class DockerClusterService(IDockerService):
+    """
+    Runs steps on a set of Docker daemons, placing each container on the
+    least-loaded endpoint that still has a free slot.
+
+    Images are prepared on every endpoint, so any of them can take any step.
+    Persistent containers are pinned to the endpoint that created them, and
+    so are volumes, along with every step that mounts one.
+    """
+
+    def __init__(
+        self,
+        endpoints: List[DockerEndpoint],
+        services: Optional[List[DockerService]] = None,
+    ) -> None:
+        if not endpoints:
+            raise DockerError("At least one Docker endpoint is required.")
+        self.endpoints = endpoints
+        self.services = services or [
+            DockerService(base_url=e.url, parallelism=e.capacity) for e in endpoints
+        ]
+        self._active = [0] * len(endpoints)
+        self._slots = threading.Condition()
+        self._owners: Dict[str, int] = {}
+        self._volume_owners: Dict[str, int] = {}
+
+    @property
+    def capacity(self) -> int:
+        """Total number of steps the cluster can run concurrently."""
+        return sum(e.capacity for e in self.endpoints)
+
+    def _acquire(self, only: Optional[int] = None) -> int:
+        """Blocks until an endpoint (or the given one) has a free slot and reserves it."""
+        candidates = range(len(self.endpoints)) if only is None else [only]
+        with self._slots:
+            while True:
+                free = [i for i in candidates if self._active[i] < self.endpoints[i].capacity]
+                if free:
+                    # Lowest load ratio wins; ties go to the endpoint with more free slots.
+                    index = min(
+                        free,
+                        key=lambda i: (
+                            self._active[i] / self.endpoints[i].capacity,
+                            self._active[i] - self.endpoints[i].capacity,
+                        ),
+                    )
+                    self._active[index] += 1
+                    return index
+                self._slots.wait()
+
+    def _release(self, index: int) -> None:
+        with self._slots:
+            self._active[index] -= 1
+            self._slots.notify_all()
+
+    def _for_each_endpoint(
+        self, action: str, fn: Callable[[DockerService], None]
+    ) -> None:
+        """Runs an action on every endpoint in parallel, raising the first failure."""
+        with ThreadPoolExecutor(max_workers=len(self.services)) as pool:
+            futures = [pool.submit(fn, service) for service in self.services]
+        errors = [e for e in (f.exception() for f in futures) if e is not None]
+        if errors:
+            raise DockerError(f"Failed to {action} on every endpoint: {errors[0]}")
+
+    def image_exists(self, tag: str) -> bool:
+        """An image only counts as present when every endpoint has it."""
+        return all(service.image_exists(tag) for service in self.services)
+
+    def image_id(self, tag: str) -> str:
+        """
+        The image's ID when every endpoint holds the same one, as they do for
+        a pulled image. An image built on each endpoint gets a different ID
+        on each, so a digest of the sorted IDs stands for it instead: it
+        changes whenever any endpoint's copy does, whatever their order.
+        """
+        ids = sorted({service.image_id(tag) for service in self.services})
+        if len(ids) == 1:
+            return ids[0]
+        return "sha256:" + hashlib.sha256("\n".join(ids).encode("utf-8")).hexdigest()
+
+    def pull_image(self, image_name: str) -> Generator[None, None, None]:
+        """Pulls the image on every endpoint that does not have it yet."""
+
+        def pull(service: DockerService) -> None:
+            if not service.image_exists(image_name):
+                for _ in service.pull_image(image_name):
+                    pass
+
+        self._for_each_endpoint(f"pull '{image_name}'", pull)
+        yield
+
+    def list_images(self, repository: str) -> List[ImageInfo]:
+        """Lists the repository's images on every endpoint, reporting each tag once."""
+        images: Dict[str, ImageInfo] = {}
+        for service in self.services:
+            for image in service.list_images(repository):
+                known = images.get(image.tag)
+                if known is None or image.size > known.size:
+                    images[image.tag] = image
+        return list(images.values())
+
+    def remove_image(self, tag: str) -> None:
+        """Removes the image from every endpoint."""
+        self._for_each_endpoint(f"remove image '{tag}'", lambda s: s.remove_image(tag))
+
+    def create_volume(self, name: str) -> None:
+        """Creates the volume on the endpoint with the most capacity."""
+        index = max(range(len(self.endpoints)), key=lambda i: self.endpoints[i].capacity)
+        self.services[index].create_volume(name)
+        self._volume_owners[name] = index
+
+    def remove_volume(self, name: str) -> None:
+        index = self._volume_owners.pop(name, None)
+        if index is not None:
+            self.services[index].remove_volume(name)
+
+    def refresh_workspace(self, workdir: Path) -> None:
+        """Has every endpoint sync the workspace again on its first use."""
+        for service in self.services:
+            service.refresh_workspace(workdir)
+
+    def build_image(
+        self, dockerfile_path: Path, tag: str
+    ) -> Generator[Tuple[int, str], None, None]:
+        """
+        Builds the image on every endpoint lacking it. Progress is reported for
+        the first such endpoint while the others build in the background.
+        """
+        missing = [s for s in self.services if not s.image_exists(tag)]
+        if not missing:
+            return
+
+        def build(service: DockerService) -> None:
+            for _ in service.build_image(dockerfile_path, tag):
+                pass
+
+        with ThreadPoolExecutor(max_workers=max(1, len(missing) - 1)) as pool:
+            background = [pool.submit(build, s) for s in missing[1:]]
+            yield from missing[0].build_image(dockerfile_path, tag)
+        for future in background:
+            error = future.exception()
+            if error is not None:
+                raise DockerError(f"Failed to build image on a secondary endpoint: {error}")
+
+    def count_dockerfile_steps(self, dockerfile_path: Path) -> int:
+        return self.services[0].count_dockerfile_steps(dockerfile_path)
+
+    def calculate_dockerfile_hash(self, dockerfile_path: Path) -> str:
+        return self.services[0].calculate_dockerfile_hash(dockerfile_path)
+
+    def run_command_in_container(
+        self,
+        image: str,
+        command: str,
+        workdir: Path,
+        env: Optional[Dict[str, str]] = None,
+        volumes: Optional[List[VolumeMount]] = None,
+    ) -> Generator[Tuple[LogStream, str], None, int]:
+        """
+        Runs the command on the least-loaded endpoint, or on the endpoint
+        holding its volumes.
+        """
+        index = self._acquire(self._volume_endpoint(volumes))
+        logger.debug(f"Placing step on Docker endpoint {self.endpoints[index].url}")
+        try:
+            return (
+                yield from self.services[index].run_command_in_container(
+                    image=image, command=command, workdir=workdir, env=env, volumes=volumes
+                )
+            )
+        finally:
+            self._release(index)
+
+    def _volume_endpoint(self, volumes: Optional[List[VolumeMount]]) -> Optional[int]:
+        """Returns the endpoint holding the given volumes, if they live on one."""
+        pinned = {self._volume_owners[v.name] for v in volumes or [] if v.name in self._volume_owners}
+        if len(pinned) > 1:
+            raise DockerError("A step cannot mount volumes from different endpoints.")
+        return next(iter(pinned), None)
+
+    def start_persistent_container(
+        self,
+        image: str,
+        workdir: Path,
+        volumes: Optional[List[VolumeMount]] = None,
+    ) -> str:
+        """Starts a container on the least-loaded endpoint; it keeps its slot until removed."""
+        index = self._acquire(self._volume_endpoint(volumes))
+        try:
+            container_id = self.services[index].start_persistent_container(
+                image, workdir, volumes
+            )
+        except BaseException:
+            self._release(index)
+            raise
+        self._owners[container_id] = index
+        return container_id
+
+    def exec_in_container(
+        self,
+        container_id: str,
+        command: str,
+        env: Optional[Dict[str, str]] = None,
+    ) -> Generator[Tuple[LogStream, str], None, int]:
+        service = self.services[self._owner_of(container_id)]
+        return (yield from service.exec_in_container(container_id, command, env))
+
+    def stop_and_remove_container(self, container_id: str) -> None:
+        index = self._owner_of(container_id)
+        try:
+            self.services[index].stop_and_remove_container(container_id)
+        finally:
+            del self._owners[container_id]
+            self._release(index)
+
+    def commit_container(self, container_id: str, tag: str) -> None:
+        """
+        Commits the container on its endpoint, then copies the image to the
+        other endpoints, since later steps may be placed on any of them.
+        """
+        owner = self.services[self._owner_of(container_id)]
+        owner.commit_container(container_id, tag)
+
+        def copy(service: DockerService) -> None:
+            if service is not owner and not service.image_exists(tag):
+                service.load_image(owner.save_image(tag))
+
+        self._for_each_endpoint(f"copy image '{tag}'", copy)
+
+    def save_image(self, tag: str) -> Iterator[bytes]:
+        """Exports the image from the first endpoint; every endpoint holds the same one."""
+        return self.services[0].save_image(tag)
+
+    def load_image(self, archive: Iterable[bytes]) -> None:
+        """
+        Loads the image on every endpoint at once. Each endpoint reads the
+        archive from the start, so it must be iterable more than once.
+        """
+        self._for_each_endpoint("load an image", lambda s: s.load_image(archive))
+
+    def _owner_of(self, container_id: str) -> int:
+        try:
+            return self._owners[container_id]
+        except KeyError:
+            raise DockerError(f"Container {container_id} is not managed by this cluster.")
@@ -18,3 +18,122 @@
 
 # The working directory inside the Docker container where the repository is mounted.
 CONTAINER_WORKDIR: str = "/app"
+
+# Environment variable listing the Docker endpoints of a local execution cluster.
+# Comma-separated daemon URLs, each optionally suffixed with `=<capacity>`,
+# e.g. "unix:///var/run/docker.sock=4,tcp://buildbox:2375=16".
+DOCKER_HOSTS_ENV: str = "HOOKCI_DOCKER_HOSTS"
+
+# Name prefix of the volumes holding workspaces synced to remote daemons.
+WORKSPACE_VOLUME_PREFIX: str = "hookci-ws-"
+
+# Size of the chunks read from the workspace tar stream and from image archives.
+TAR_CHUNK_SIZE: int = 64 * 1024
+
+# Maximum number of bytes read at once from an attached container or a
+# host process.
+ATTACH_CHUNK_SIZE: int = 64 * 1024
+
+# The shell that runs the commands of steps on the host.
+HOST_SHELL: str = "/bin/sh"
+
+# How often a host process's output reader checks whether its step was
+# cancelled, in seconds.
+HOST_CANCEL_POLL_INTERVAL: float = 0.1
+
+# The util-linux tool that starts the commands of sandboxed steps in
+# namespaces of their own.
+SANDBOX_UNSHARE: str = "unshare"
+
+# Connections a running step holds for as long as it runs: its attach stream
+# and its pending wait, or its exec stream.
+STREAM_CONNECTIONS_PER_STEP: int = 2
+
+# Control connections kept beyond one per running step, for the container
+# reaper and the calls made outside steps.
+CONTROL_CONNECTION_HEADROOM: int = 2
+
+# Labels put on every container HookCI creates, so leftovers can be traced
+# back to the run that created them and swept once that run is gone.
+LABEL_RUN_ID: str = "hookci.run-id"
+LABEL_REPO: str = "hookci.repo"
+LABEL_HOST: str = "hookci.host"
+LABEL_PID: str = "hookci.pid"
+
+# How long the container reaper waits to gather removals into one batch, in seconds.
+REAPER_BATCH_INTERVAL: float = 0.05
+
+# How long to wait for pending container removals when HookCI exits, in seconds.
+REAPER_EXIT_TIMEOUT: float = 10.0
+
+# Directory under the XDG state directory holding machine-wide HookCI state.
+STATE_DIR_NAME: str = "hookci"
+
+# File recording when each HookCI-built image was last used.
+IMAGE_INDEX_FILENAME: str = "images.json"
+
+# SQLite database under the XDG cache directory recording the keys of the
+# step runs that succeeded, shared by every clone on the machine.
+RESULT_CACHE_FILENAME: str = "results.sqlite"
+
+# Directory under the XDG cache directory holding image archives, one file
+# per image ID plus a reference per image name, shared by every clone on the
+# machine.
+IMAGE_ARCHIVE_DIR_NAME: str = "images"
+IMAGE_ARCHIVE_SUFFIX: str = ".tar"
+IMAGE_ARCHIVE_REF_SUFFIX: str = ".ref"
+
+# Once the result cache outgrows its size cap, the least recently used
+# entries are evicted until it fits in this fraction of the cap.
+RESULT_CACHE_LOW_WATERMARK: float = 0.9
+
+# Directory under `.hookci/` holding machine-specific caches.
+CACHE_DIR_NAME: str = "cache"
+
+# SQLite database mapping file stat signatures to Git blob IDs.
+STAT_CACHE_FILENAME: str = "stat.sqlite"
+
+# Size of the chunks read when hashing a file.
+HASH_CHUNK_SIZE: int = 1024 * 1024
+
+# Files modified this recently are hashed on every lookup instead of cached,
+# in nanoseconds, since a second write within the same timestamp tick would
+# leave their stat signature unchanged.
+RACY_WINDOW_NS: int = 2_000_000_000
+
+# Record of the last run's step results, used by `hookci run --resume`.
+CHECKPOINT_FILENAME: str = "checkpoint.json"
+
+# Directory under `.hookci/cache/` holding the files steps declared in
+# `output_files`: a manifest per step key and the file contents they name.
+OUTPUTS_DIR_NAME: str = "outputs"
+OUTPUT_OBJECTS_DIR_NAME: str = "objects"
+OUTPUT_MANIFEST_SUFFIX: str = ".json"
+
+# How many archived runs of each step the output store keeps.
+OUTPUT_MANIFESTS_PER_STEP: int = 3
+
+# The Linux FICLONE ioctl, which makes a copy-on-write clone of a file.
+FICLONE: int = 0x40049409
+
+# Maximum number of bytes read at once from the inotify descriptor.
+INOTIFY_BUFFER_SIZE: int = 64 * 1024
+
+# Directory under `.hookci/cache/` shared by `hookci speculate` and the
+# pre-commit hook: the record of the latest speculative run, its event log
+# and the snapshot of the staged tree it verifies.
+SPECULATION_DIR_NAME: str = "speculation"
+SPECULATION_RECORD_FILENAME: str = "run.json"
+SPECULATION_LOG_SUFFIX: str = ".jsonl"
+SPECULATION_SNAPSHOT_PREFIX: str = "tree-"
+
+# How often a hook attached to a speculative run looks for new events, in seconds.
+SPECULATION_POLL_INTERVAL: float = 0.05
+
+# Directory under `.hookci/cache/` holding the full output of each step of
+# the latest runs, a directory per run and a file per step.
+STEP_LOGS_DIR_NAME: str = "logs"
+STEP_LOG_SUFFIX: str = ".log"
+
+# Number of runs whose step logs are kept, the one starting included.
+STEP_LOG_RUNS_KEPT: int = 10
@@ -18,37 +18,85 @@
 Docker interaction services.
 """
 import hashlib
+import os
 import re
 import struct
+import tarfile
+import threading
+import uuid
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, Generator, Optional, Protocol, Tuple, runtime_checkable
+from typing import (
+    Any,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Protocol,
+    Tuple,
+    runtime_checkable,
+)
 
 import docker
-from docker.errors import APIError, BuildError, DockerException, ImageNotFound
+from docker.errors import APIError, BuildError, DockerException, ImageNotFound, NotFound
 from docker.models.containers import Container
+from docker.utils.socket import read as read_socket
+from pydantic import BaseModel
 
+from hookci.application import constants as app_constants
 from hookci.application.events import LogStream
+from hookci.application.results import ImageInfo
 from hookci.infrastructure import constants
 from hookci.infrastructure.errors import DockerError
+from hookci.infrastructure.reaper import HOSTNAME, ContainerReaper, container_labels
 from hookci.log import get_logger
+from hookci.tracing import latency, tracer
 
 logger = get_logger(__name__)
 
 
+class VolumeMount(BaseModel):
+    """A named volume mounted into a step container."""
+
+    name: str
+    target: str
+    read_only: bool = False
+
+
 @runtime_checkable
 class IDockerService(Protocol):
     """Interface for Docker operations."""
 
+    @property
+    def capacity(self) -> int:
+        """Number of steps the service runs at once."""
+        ...
+
     def image_exists(self, tag: str) -> bool: ...
 
+    def image_id(self, tag: str) -> str: ...
+
     def pull_image(self, image_name: str) -> Generator[None, None, None]: ...
 
+    def list_images(self, repository: str) -> List[ImageInfo]: ...
+
+    def remove_image(self, tag: str) -> None: ...
+
+    def create_volume(self, name: str) -> None: ...
+
+    def remove_volume(self, name: str) -> None: ...
+
+    def refresh_workspace(self, workdir: Path) -> None: ...
+
     def run_command_in_container(
         self,
         image: str,
         command: str,
         workdir: Path,
         env: Optional[Dict[str, str]] = None,
+        volumes: Optional[List[VolumeMount]] = None,
     ) -> Generator[Tuple[LogStream, str], None, int]: ...
 
     def build_image(
@@ -59,7 +107,12 @@ class IDockerService(Protocol):
 
     def calculate_dockerfile_hash(self, dockerfile_path: Path) -> str: ...
 
-    def start_persistent_container(self, image: str, workdir: Path) -> str: ...
+    def start_persistent_container(
+        self,
+        image: str,
+        workdir: Path,
+        volumes: Optional[List[VolumeMount]] = None,
+    ) -> str: ...
 
     def exec_in_container(
         self,
@@ -70,18 +123,70 @@ class IDockerService(Protocol):
 
     def stop_and_remove_container(self, container_id: str) -> None: ...
 
+    def commit_container(self, container_id: str, tag: str) -> None: ...
 
-class DockerService(IDockerService):
-    """Concrete implementation for Docker operations using docker-py."""
+    def save_image(self, tag: str) -> Iterator[bytes]: ...
+
+    def load_image(self, archive: Iterable[bytes]) -> None: ...
 
-    def __init__(self) -> None:
+
+class DockerService(IDockerService):
+    """
+    Concrete implementation for Docker operations using docker-py.
+
+    By default the client is configured from the environment (`DOCKER_HOST`
+    and friends). A `base_url` may be given to talk to a specific daemon;
+    daemons reached over the network cannot see the host filesystem, so the
+    workspace is synced into a named volume instead of being bind-mounted.
+
+    Every container is labeled with the run that created it. Removals are
+    left to a background reaper, which also sweeps containers left behind by
+    runs that died.
+
+    Connection pools are sized for `parallelism` steps at once, the
+    service's capacity, so the scheduler never runs more. The streams
+    a step holds while it runs (attach, wait, exec output) go through a
+    client of their own, without a read timeout, so they neither outlast a
+    quiet step nor take the connections short control calls reuse.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        parallelism: int = app_constants.MAX_PARALLEL_STEPS,
+    ) -> None:
+        self.base_url = base_url
+        self.parallelism = parallelism
+        self.is_remote = base_url is not None and not base_url.startswith("unix://")
+        self._workspace_volumes: Dict[Path, str] = {}
+        self._sync_lock = threading.Lock()
         try:
-            self.client = docker.from_env()  # type: ignore[attr-defined, no-untyped-call]
-            self.client.ping()
+            with tracer.span("docker.connect", url=base_url or "env"):
+                self.client = self._connect(
+                    max_pool_size=parallelism + constants.CONTROL_CONNECTION_HEADROOM
+                )
+                self.client.ping()
+                self._streams = self._connect(
+                    max_pool_size=parallelism * constants.STREAM_CONNECTIONS_PER_STEP,
+                    version=self.client.api.api_version,
+                    timeout=None,
+                ).api
         except DockerException as e:
+            location = f" at {base_url}" if base_url else ""
             raise DockerError(
-                "Could not connect to the Docker daemon. Is it running?"
+                f"Could not connect to the Docker daemon{location}. Is it running?"
             ) from e
+        self.reaper = ContainerReaper(self.client.api)
+
+    @property
+    def capacity(self) -> int:
+        return self.parallelism
+
+    def _connect(self, **kwargs: Any) -> Any:
+        """Creates a client for the daemon, configured from the environment by default."""
+        if self.base_url is None:
+            return docker.from_env(**kwargs)  # type: ignore[attr-defined, no-untyped-call]
+        return docker.DockerClient(base_url=self.base_url, **kwargs)  # type: ignore[attr-defined, no-untyped-call]
 
     def _format_error_msg(self, e: DockerException) -> str:
         """Extracts a meaningful message from a DockerException."""
@@ -92,7 +197,8 @@ class DockerService(IDockerService):
     def image_exists(self, tag: str) -> bool:
         """Checks if a Docker image with the given tag exists locally."""
         try:
-            self.client.images.get(tag)
+            with tracer.span("docker.image_exists", tag=tag):
+                self.client.images.get(tag)
             return True
         except ImageNotFound:
             return False
@@ -101,11 +207,22 @@ class DockerService(IDockerService):
                 f"Docker error when checking for image: {self._format_error_msg(e)}"
             ) from e
 
+    def image_id(self, tag: str) -> str:
+        """Returns the ID of a local image, which changes with its content."""
+        try:
+            with tracer.span("docker.image_id", tag=tag):
+                return str(self.client.images.get(tag).id)
+        except DockerException as e:
+            raise DockerError(
+                f"Docker error when inspecting image '{tag}': {self._format_error_msg(e)}"
+            ) from e
+
     def pull_image(self, image_name: str) -> Generator[None, None, None]:
         """Pulls a Docker image, handling potential errors."""
         logger.debug(f"Pulling Docker image: {image_name}")
         try:
-            self.client.images.pull(image_name)
+            with tracer.span("docker.pull", image=image_name):
+                self.client.images.pull(image_name)
             yield
         except ImageNotFound:
             raise DockerError(f"Docker image '{image_name}' not found in any registry.")
@@ -114,6 +231,32 @@ class DockerService(IDockerService):
                 f"Docker error while pulling image: {self._format_error_msg(e)}"
             ) from e
 
+    def list_images(self, repository: str) -> List[ImageInfo]:
+        """Lists the tagged images of a repository with a single API call."""
+        try:
+            images = self.client.api.images(name=repository)
+        except DockerException as e:
+            raise DockerError(
+                f"Docker error while listing images: {self._format_error_msg(e)}"
+            ) from e
+        return [
+            ImageInfo(tag=tag, size=int(image.get("Size") or 0))
+            for image in images
+            for tag in image.get("RepoTags") or []
+            if tag.startswith(f"{repository}:")
+        ]
+
+    def remove_image(self, tag: str) -> None:
+        """Removes an image tag, failing if a container still uses it."""
+        try:
+            self.client.api.remove_image(tag)
+        except ImageNotFound:
+            pass
+        except DockerException as e:
+            raise DockerError(
+                f"Could not remove image '{tag}': {self._format_error_msg(e)}"
+            ) from e
+
     def _parse_one_frame(
         self, buffer: bytes
     ) -> tuple[tuple[LogStream, str] | None, bytes]:
@@ -156,7 +299,11 @@ class DockerService(IDockerService):
         Parses a raw Docker log stream by repeatedly processing frames from a buffer.
         """
         buffer = b""
+        received_output = False
         for chunk in stream_generator:
+            if not received_output:
+                received_output = True
+                tracer.instant("first_output_byte")
             buffer += chunk
             while True:
                 frame, new_buffer = self._parse_one_frame(buffer)
@@ -172,42 +319,81 @@ class DockerService(IDockerService):
         if buffer:
             yield "stdout", buffer.decode("utf-8", errors="ignore")
 
+    def create_volume(self, name: str) -> None:
+        """Creates a named volume, labeled like the containers of this run."""
+        try:
+            self.client.api.create_volume(name=name, labels=container_labels())
+        except DockerException as e:
+            raise DockerError(
+                f"Could not create volume '{name}': {self._format_error_msg(e)}"
+            ) from e
+
+    def remove_volume(self, name: str) -> None:
+        """
+        Removes a named volume; containers still using it must be gone first.
+        Containers handed to the reaper may still mount it, so their removal
+        is awaited.
+        """
+        self.reaper.flush()
+        try:
+            self.client.api.remove_volume(name, force=True)
+        except NotFound:
+            pass
+        except DockerException as e:
+            raise DockerError(
+                f"Could not remove volume '{name}': {self._format_error_msg(e)}"
+            ) from e
+
     def run_command_in_container(
         self,
         image: str,
         command: str,
         workdir: Path,
         env: Optional[Dict[str, str]] = None,
+        volumes: Optional[List[VolumeMount]] = None,
     ) -> Generator[Tuple[LogStream, str], None, int]:
         """
         Runs a command in a new Docker container, yielding demultiplexed logs.
-        Returns the final exit code.
+        Returns the final exit code. Named `volumes` are mounted next to the
+        workspace.
+
+        The container is created, attached to and only then started, so its
+        output arrives on the attach socket from the first byte and no log
+        replay is needed. Once the output ends, the exit code is read from
+        the stopped container, and its removal is left to the reaper so it
+        stays off the step's critical path.
         """
-        container: Optional[Container] = None
+        api = self.client.api
+        streams = self._streams
+        container_id: Optional[str] = None
+        attached: Any = None
         try:
             logger.debug(f"Running command in container using image {image}...")
-            container = self.client.containers.run(
-                image=image,
-                command=["/bin/sh", "-c", command],
-                volumes={
-                    str(workdir): {
-                        "bind": constants.CONTAINER_WORKDIR,
-                        "mode": "rw",
-                    }
-                },
-                working_dir=constants.CONTAINER_WORKDIR,
-                environment=env or {},
-                detach=True,
-            )
+            with self._phase("container.create", image=image):
+                container_id = api.create_container(
+                    image,
+                    command=["/bin/sh", "-c", command],
+                    working_dir=constants.CONTAINER_WORKDIR,
+                    environment=env or {},
+                    labels=container_labels(str(workdir)),
+                    host_config=api.create_host_config(
+                        binds=self._mounts(workdir, image, volumes)
+                    ),
+                )["Id"]
+
+            with self._phase("container.attach"):
+                attached = streams.attach_socket(
+                    container_id, params={"stdout": 1, "stderr": 1, "stream": 1}
+                )
+            with self._phase("container.start"):
+                api.start(container_id)
 
-            # Get the raw, multiplexed stream by removing the incorrect 'demux' argument.
-            # The default behavior for a non-TTY stream is the format we handle.
-            log_stream_generator = container.logs(
-                stream=True, follow=True, stdout=True, stderr=True
-            )
-            yield from self._demultiplex_docker_stream(log_stream_generator)
+            with tracer.span("container.logs"):
+                yield from self._demultiplex_docker_stream(self._read_attached(attached))
 
-            result = container.wait()
+            with self._phase("container.wait"):
+                # The attach stream ends as the container stops, so this returns at once.
+                result = streams.wait(container_id)
             return int(result.get("StatusCode", 1))
 
         except ImageNotFound:
@@ -217,11 +403,160 @@ class DockerService(IDockerService):
                 f"Docker error: {self._format_error_msg(e)}"
             ) from e
         finally:
-            if container:
+            if attached is not None:
+                attached.close()
+            if container_id:
+                self.reaper.submit(container_id)
+
+    @contextmanager
+    def _phase(self, name: str, **args: Any) -> Generator[None, None, None]:
+        """Times a container lifecycle phase for the latency counters and the trace."""
+        with tracer.span(name, **args), latency.measure(name):
+            yield
+
+    def _read_attached(self, sock: Any) -> Generator[bytes, None, None]:
+        """Reads the raw multiplexed output of an attached container until it exits."""
+        while True:
+            chunk = read_socket(sock, constants.ATTACH_CHUNK_SIZE)  # type: ignore[no-untyped-call]
+            if chunk is None:
+                continue  # Interrupted read; try again.
+            if not chunk:
+                return
+            yield chunk
+
+    def _workspace_mount(
+        self, workdir: Path, image: str
+    ) -> Dict[str, Dict[str, str]]:
+        """
+        Returns the volume specification that exposes the workspace at the
+        container working directory.
+        """
+        source = str(workdir)
+        if self.is_remote:
+            source = self._sync_workspace(workdir, image)
+        return {source: {"bind": constants.CONTAINER_WORKDIR, "mode": "rw"}}
+
+    def _mounts(
+        self, workdir: Path, image: str, volumes: Optional[List[VolumeMount]]
+    ) -> Dict[str, Dict[str, str]]:
+        """Returns the workspace mount followed by the step's named volumes."""
+        mounts = self._workspace_mount(workdir, image)
+        for v in volumes or []:
+            mounts[v.name] = {"bind": v.target, "mode": "ro" if v.read_only else "rw"}
+        return mounts
+
+    def refresh_workspace(self, workdir: Path) -> None:
+        """
+        Makes the next container mounting `workdir` see its current content.
+        On a remote daemon the workspace is synced again on first use; a
+        local daemon mounts the host path, which is always current.
+        """
+        with self._sync_lock:
+            self._workspace_volumes.pop(workdir, None)
+
+    def _sync_workspace(self, workdir: Path, image: str) -> str:
+        """
+        Copies the workspace into a named volume on the daemon, once until
+        `refresh_workspace` is called for it, so the steps of a run share one
+        copy and see what earlier steps wrote to it.
+
+        Each sync gets a volume of its own, labeled with this host and the
+        workdir, so clients sharing a daemon never write to each other's;
+        older volumes of the checkout are dropped. A throwaway container
+        (never started) mounts the volume and receives the workspace as a tar
+        stream through the archive API. Changes made by steps are not synced
+        back to the host.
+        """
+        with self._sync_lock:
+            volume_name = self._workspace_volumes.get(workdir)
+            if volume_name:
+                return volume_name
+
+            volume_name = f"{constants.WORKSPACE_VOLUME_PREFIX}{uuid.uuid4().hex[:12]}"
+            logger.debug(f"Syncing workspace to volume '{volume_name}' on {self.base_url}...")
+            try:
+                self.client.volumes.create(name=volume_name, labels=container_labels(str(workdir)))
+                helper = self.client.api.create_container(
+                    image,
+                    command=["true"],
+                    labels=container_labels(str(workdir)),
+                    host_config=self.client.api.create_host_config(
+                        binds={volume_name: {"bind": constants.CONTAINER_WORKDIR, "mode": "rw"}}
+                    ),
+                )
+                archive = self._tar_stream(workdir)
                 try:
-                    container.remove(force=True)  # type: ignore[no-untyped-call]
-                except DockerException as e:
-                    logger.warning(f"Failed to remove transient container: {e}")
+                    self.client.api.put_archive(helper["Id"], constants.CONTAINER_WORKDIR, archive)
+                finally:
+                    archive.close()
+                    self.reaper.submit(helper["Id"])
+            except DockerException as e:
+                raise DockerError(
+                    f"Failed to sync workspace to {self.base_url}: {self._format_error_msg(e)}"
+                ) from e
+
+            self._workspace_volumes[workdir] = volume_name
+            self._drop_stale_workspaces(workdir, keep=volume_name)
+            return volume_name
+
+    def _drop_stale_workspaces(self, workdir: Path, keep: str) -> None:
+        """
+        Removes the older workspace volumes of this checkout, left by earlier
+        syncs or runs. Volumes steps still mount are kept for a later sync.
+        """
+        self.reaper.flush()
+        try:
+            volumes = self.client.volumes.list(
+                filters={
+                    "label": [
+                        f"{constants.LABEL_HOST}={HOSTNAME}",
+                        f"{constants.LABEL_REPO}={workdir}",
+                    ]
+                }
+            )
+        except DockerException as e:
+            logger.debug(f"Could not list workspace volumes: {self._format_error_msg(e)}")
+            return
+        for volume in volumes:
+            if volume.name == keep:
+                continue
+            try:
+                volume.remove(force=True)
+            except DockerException as e:
+                logger.debug(
+                    f"Keeping workspace volume '{volume.name}': {self._format_error_msg(e)}"
+                )
+
+    def _tar_stream(self, workdir: Path) -> Generator[bytes, None, None]:
+        """
+        Streams a tar archive of the workspace without materializing it.
+        The archive is produced by a writer thread into a pipe. Closing the
+        stream early closes the read end, which fails the writer's next
+        write, and waits for the thread, so none is left blocked on a pipe
+        nobody drains.
+        """
+        read_fd, write_fd = os.pipe()
+        errors: List[BaseException] = []
+
+        def produce() -> None:
+            try:
+                with os.fdopen(write_fd, "wb") as sink, tarfile.open(
+                    fileobj=sink, mode="w|"
+                ) as tar:
+                    tar.add(str(workdir), arcname=".")
+            except BaseException as e:
+                errors.append(e)
+
+        writer = threading.Thread(target=produce, name="hookci-workspace-tar", daemon=True)
+        writer.start()
+        try:
+            with os.fdopen(read_fd, "rb") as source:
+                while chunk := source.read(constants.TAR_CHUNK_SIZE):
+                    yield chunk
+        finally:
+            writer.join()
+        if errors:
+            raise DockerError(f"Could not archive workspace {workdir}: {errors[0]}")
 
     def build_image(
         self, dockerfile_path: Path, tag: str
@@ -281,7 +616,12 @@ class DockerService(IDockerService):
         except (IOError, OSError) as e:
             raise DockerError(f"Could not read Dockerfile at {dockerfile_path}: {e}")
 
-    def start_persistent_container(self, image: str, workdir: Path) -> str:
+    def start_persistent_container(
+        self,
+        image: str,
+        workdir: Path,
+        volumes: Optional[List[VolumeMount]] = None,
+    ) -> str:
         """
         Starts a container that remains running in the background.
         Returns the container ID.
@@ -290,13 +630,9 @@ class DockerService(IDockerService):
             container: Container = self.client.containers.run(
                 image=image,
                 command=["tail", "-f", "/dev/null"],  # Keep-alive command
-                volumes={
-                    str(workdir): {
-                        "bind": constants.CONTAINER_WORKDIR,
-                        "mode": "rw",
-                    }
-                },
+                volumes=self._mounts(workdir, image, volumes),
                 working_dir=constants.CONTAINER_WORKDIR,
+                labels=container_labels(str(workdir)),
                 detach=True,
             )
             return str(container.id)
@@ -327,7 +663,7 @@ class DockerService(IDockerService):
             exec_id = exec_instance["Id"]
 
             # Step 2: Start the exec instance and get the streaming output
-            output_stream = self.client.api.exec_start(exec_id, stream=True)
+            output_stream = self._streams.exec_start(exec_id, stream=True)
 
             # Step 3: Yield logs from the demultiplexed stream
             yield from self._demultiplex_docker_stream(output_stream)
@@ -348,12 +684,35 @@ class DockerService(IDockerService):
             ) from e
 
     def stop_and_remove_container(self, container_id: str) -> None:
-        """Stops and removes a container."""
+        """Schedules a container to be killed and removed in the background."""
+        self.reaper.submit(container_id)
+
+    def commit_container(self, container_id: str, tag: str) -> None:
+        """Saves a container's filesystem, outside its mounts, as an image."""
+        repository, _, version = tag.rpartition(":")
         try:
-            container = self.client.containers.get(container_id)
-            container.stop(timeout=1)
-            container.remove()
+            with tracer.span("docker.commit", tag=tag):
+                self.client.containers.get(container_id).commit(
+                    repository=repository, tag=version
+                )
         except DockerException as e:
-            logger.warning(
-                f"Could not stop or remove container {container_id}: {self._format_error_msg(e)}"
-            )
+            raise DockerError(
+                f"Could not commit container to '{tag}': {self._format_error_msg(e)}"
+            ) from e
+
+    def save_image(self, tag: str) -> Iterator[bytes]:
+        """Streams an image as a tar archive, for `load_image` on another daemon."""
+        try:
+            return iter(self.client.api.get_image(tag))
+        except DockerException as e:
+            raise DockerError(
+                f"Could not export image '{tag}': {self._format_error_msg(e)}"
+            ) from e
+
+    def load_image(self, archive: Iterable[bytes]) -> None:
+        """Loads an image from a tar archive made by `save_image`."""
+        try:
+            for _ in self.client.api.load_image(archive):
+                pass
+        except DockerException as e:
+            raise DockerError(f"Could not load image: {self._format_error_msg(e)}") from e
@@ -59,3 +59,9 @@ class FileSystemError(InfrastructureError):
     """Raised when a filesystem operation fails."""
 
     pass
+
+
+class ExecutorError(InfrastructureError):
+    """Raised when a step's command cannot be run by its executor."""
+
+    pass
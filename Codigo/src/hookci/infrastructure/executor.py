@@ -0,0 +1,238 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Executors: the places a step's command can run in.
+"""
+import codecs
+import os
+import selectors
+import signal
+import subprocess
+import threading
+from pathlib import Path
+from typing import IO, Dict, Generator, List, Optional, Protocol, Tuple, runtime_checkable
+
+from hookci.application.events import LogStream
+from hookci.infrastructure import constants
+from hookci.infrastructure.docker import IDockerService, VolumeMount
+from hookci.infrastructure.errors import ExecutorError
+from hookci.log import get_logger
+from hookci.tracing import tracer
+
+logger = get_logger(__name__)
+
+
+@runtime_checkable
+class IStepExecutor(Protocol):
+    """
+    Interface for running a step's command, yielding its output as
+    `(stream, text)` pairs and returning its exit code. Setting `cancel`
+    ends the command early, where the executor supports it.
+    """
+
+    def run_command(
+        self,
+        image: str,
+        command: str,
+        workdir: Path,
+        env: Optional[Dict[str, str]] = None,
+        volumes: Optional[List[VolumeMount]] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> Generator[Tuple[LogStream, str], None, int]: ...
+
+
+class DockerExecutor(IStepExecutor):
+    """
+    Runs each command in a transient container of the step's image. Steps
+    that can be cancelled run in a session's containers instead, which are
+    removed to cancel them, so `cancel` is ignored.
+    """
+
+    def __init__(self, docker_service: IDockerService) -> None:
+        self._docker_service = docker_service
+
+    def run_command(
+        self,
+        image: str,
+        command: str,
+        workdir: Path,
+        env: Optional[Dict[str, str]] = None,
+        volumes: Optional[List[VolumeMount]] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> Generator[Tuple[LogStream, str], None, int]:
+        extra = {"volumes": volumes} if volumes else {}
+        return self._docker_service.run_command_in_container(
+            image=image, command=command, workdir=workdir, env=env, **extra
+        )
+
+
+class HostExecutor(IStepExecutor):
+    """
+    Runs each command on the host, through `/bin/sh -c` in the working
+    tree, with HookCI's own environment under the step's. Nothing is
+    isolated, so this is meant for trusted steps such as linters and
+    formatters, whose work costs less than a container round trip.
+
+    The image and volumes are ignored. The command runs in a session of its
+    own; if its step is cut short or cancelled, the whole process group is
+    killed.
+    """
+
+    # Where the command runs, for error messages.
+    place = "on the host"
+
+    def argv(self, command: str, workdir: Path) -> List[str]:
+        """Returns the program line that runs `command` in `workdir`."""
+        return [constants.HOST_SHELL, "-c", command]
+
+    def run_command(
+        self,
+        image: str,
+        command: str,
+        workdir: Path,
+        env: Optional[Dict[str, str]] = None,
+        volumes: Optional[List[VolumeMount]] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> Generator[Tuple[LogStream, str], None, int]:
+        try:
+            with tracer.span("host.spawn"):
+                process = subprocess.Popen(
+                    self.argv(command, workdir),
+                    cwd=workdir,
+                    env={**os.environ, **(env or {})},
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    start_new_session=True,
+                )
+        except OSError as e:
+            raise ExecutorError(f"Could not start the command {self.place}: {e}") from e
+        assert process.stdout is not None and process.stderr is not None
+        try:
+            with tracer.span("host.logs"):
+                yield from _read_lines(
+                    {"stdout": process.stdout, "stderr": process.stderr}, cancel
+                )
+            if cancel is not None and cancel.is_set():
+                _kill(process)
+            code = process.wait()
+        finally:
+            if process.poll() is None:
+                # The step was cut short; leave nothing running behind it.
+                _kill(process)
+            process.stdout.close()
+            process.stderr.close()
+        # Like a shell, report death by signal N as 128 + N.
+        return 128 - code if code < 0 else code
+
+
+# Runs as root of the new user namespace, with $1 the working tree and $2
+# the command. Every mount is made read-only; then /tmp is replaced by a
+# private tmpfs, and the working tree, still reachable as the current
+# directory even under /tmp, is bound back read-write.
+_SANDBOX_SETUP = r"""set -e
+cd "$1"
+while read -r _ _ _ _ mnt _; do
+  case $mnt in *\\*) mnt=$(printf '%b' "$mnt") ;; esac
+  # Mounts hidden under others cannot be remounted, nor reached.
+  mount -o remount,bind,ro "$mnt" 2>/dev/null || :
+done < /proc/self/mountinfo
+mount -t tmpfs hookci /tmp
+mkdir -p "$1"
+mount --no-canonicalize --bind . "$1"
+mount -o remount,bind,rw "$1"
+cd "$1"
+exec "$0" -c "$2"
+"""
+
+
+class SandboxExecutor(HostExecutor):
+    """
+    Runs each command on the host like `HostExecutor`, but in user, mount
+    and PID namespaces of its own, started by `unshare` without privileges
+    nor a daemon. The working tree is writable, `/tmp` is private and
+    empty, and the rest of the host is read-only; the network is shared.
+    The command runs as PID 1 of its namespace, so whatever it leaves
+    behind dies with it.
+
+    Needs util-linux and unprivileged user namespaces.
+    """
+
+    place = "in a sandbox"
+
+    def argv(self, command: str, workdir: Path) -> List[str]:
+        return [
+            constants.SANDBOX_UNSHARE,
+            "--user",
+            "--map-root-user",
+            "--mount",
+            "--pid",
+            "--fork",
+            "--mount-proc",
+            "--kill-child",
+            constants.HOST_SHELL,
+            "-c",
+            _SANDBOX_SETUP,
+            constants.HOST_SHELL,
+            str(workdir),
+            command,
+        ]
+
+
+def _kill(process: "subprocess.Popen[bytes]") -> None:
+    """Kills a process started in a session of its own, with everything it started."""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    process.wait()
+
+
+def _read_lines(
+    pipes: Dict[LogStream, IO[bytes]],
+    cancel: Optional[threading.Event] = None,
+) -> Generator[Tuple[LogStream, str], None, None]:
+    """
+    Yields the lines of several pipes as they arrive, each with its stream,
+    until every pipe is closed or `cancel` is set. A last line without a
+    newline is yielded as is.
+    """
+    selector = selectors.DefaultSelector()
+    decoders = {}
+    pending: Dict[LogStream, str] = {}
+    for stream, pipe in pipes.items():
+        selector.register(pipe, selectors.EVENT_READ, stream)
+        decoders[stream] = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        pending[stream] = ""
+    with selector:
+        while selector.get_map():
+            if cancel is not None and cancel.is_set():
+                return
+            timeout = None if cancel is None else constants.HOST_CANCEL_POLL_INTERVAL
+            for key, _ in selector.select(timeout):
+                stream = key.data
+                chunk = os.read(key.fd, constants.ATTACH_CHUNK_SIZE)
+                text = pending[stream] + decoders[stream].decode(chunk, final=not chunk)
+                if not chunk:
+                    selector.unregister(key.fileobj)
+                    pending[stream] = ""
+                    if text:
+                        yield stream, text
+                    continue
+                *lines, pending[stream] = text.split("\n")
+                for line in lines:
+                    yield stream, line + "\n"
@@ -17,17 +17,25 @@
 """
 Filesystem and Git interaction services.
 """
+import os
 import stat
 import subprocess
+import tempfile
 from functools import cached_property
 from pathlib import Path
-from typing import Protocol, runtime_checkable
+from typing import Any, Dict, Iterable, List, Optional, Protocol, runtime_checkable
 
+from hookci.infrastructure import constants
+from hookci.infrastructure.cache import cache_dir
 from hookci.infrastructure.errors import (
     FileSystemError,
     GitCommandError,
     NotInGitRepositoryError,
 )
+from hookci.infrastructure.stat_cache import StatCache
+from hookci.log import get_logger
+
+logger = get_logger(__name__)
 
 
 @runtime_checkable
@@ -39,6 +47,7 @@ class IFileSystem(Protocol):
     def write_file(self, path: Path, content: str) -> None: ...
     def read_file(self, path: Path) -> str: ...
     def make_executable(self, path: Path) -> None: ...
+    def glob(self, root: Path, pattern: str) -> List[Path]: ...
 
 
 @runtime_checkable
@@ -50,6 +59,13 @@ class IScmService(Protocol):
     def set_hooks_path(self, hooks_path: Path) -> None: ...
     def get_current_branch(self) -> str: ...
     def get_staged_commit_message(self) -> str: ...
+    def get_changed_files(self, hook_type: str) -> List[str]: ...
+    def list_files(self) -> List[str]: ...
+    def get_file_fingerprints(self, paths: Iterable[str]) -> Dict[str, str]: ...
+    @property
+    def git_dir(self) -> Path: ...
+    def write_index_tree(self) -> str: ...
+    def export_tree(self, tree: str, destination: Path) -> None: ...
 
 
 class LocalFileSystem(IFileSystem):
@@ -89,6 +105,13 @@ class LocalFileSystem(IFileSystem):
                 f"Failed to change permissions for file: {path}"
             ) from e
 
+    def glob(self, root: Path, pattern: str) -> List[Path]:
+        """Returns the paths under `root` matching the pattern, sorted."""
+        try:
+            return sorted(root.glob(pattern))
+        except (OSError, ValueError) as e:
+            raise FileSystemError(f"Failed to search for '{pattern}' in {root}: {e}") from e
+
 
 class GitService(IScmService):
     """Service for interacting with Git repositories."""
@@ -114,18 +137,36 @@ class GitService(IScmService):
         except subprocess.CalledProcessError as e:
             raise NotInGitRepositoryError("Not inside a Git repository.") from e
 
-    def _run_git_command(self, *args: str) -> str:
-        """Helper to run a git command from the git root and return its stdout."""
+    @cached_property
+    def git_dir(self) -> Path:
+        """The repository's Git directory, which is not always `.git` under the root."""
+        return Path(self._run_git_command("rev-parse", "--absolute-git-dir"))
+
+    def _run_git_command(
+        self,
+        *args: str,
+        strip: bool = True,
+        env: Optional[Dict[str, str]] = None,
+        input: Optional[str] = None,
+    ) -> str:
+        """
+        Helper to run a git command from the git root and return its stdout.
+        NUL-separated output should not be stripped: paths may start with spaces.
+        """
+        extra: Dict[str, Any] = {"env": {**os.environ, **env}} if env else {}
+        if input is not None:
+            extra["input"] = input
         try:
-            process = subprocess.run(
+            process: subprocess.CompletedProcess[str] = subprocess.run(
                 ["git", *args],
                 check=True,
                 capture_output=True,
                 text=True,
                 encoding="utf-8",
                 cwd=self.git_root,  # Now uses the cached property, preventing recursion.
+                **extra,
             )
-            return process.stdout.strip()
+            return process.stdout.strip() if strip else process.stdout
         except subprocess.CalledProcessError as e:
             raise GitCommandError(
                 f"Git command '{' '.join(args)}' failed: {e.stderr.strip()}"
@@ -166,3 +207,150 @@ class GitService(IScmService):
             raise GitCommandError(
                 f"Could not read or parse commit message file: {e}"
             ) from e
+
+    def get_changed_files(self, hook_type: str) -> List[str]:
+        """
+        Lists the paths, relative to the repository root, that the hook is about
+        to validate: the staged changes for `pre-commit`, and the commits not yet
+        on the upstream branch for `pre-push`. Renames count as a deletion plus
+        an addition, so both paths are listed.
+        """
+        if hook_type == "pre-push":
+            args = ["diff", "--name-only", "--no-renames", "-z", "@{upstream}...HEAD"]
+        else:
+            args = ["diff", "--cached", "--name-only", "--no-renames", "-z"]
+        return [
+            path for path in self._run_git_command(*args, strip=False).split("\0") if path
+        ]
+
+    def list_files(self) -> List[str]:
+        """
+        Lists the files steps can see, relative to the repository root: the
+        tracked ones and the untracked ones that are not ignored.
+        """
+        output = self._run_git_command(
+            "ls-files", "-z", "--cached", "--others", "--exclude-standard", strip=False
+        )
+        # Unmerged entries are listed once per stage.
+        return list(dict.fromkeys(path for path in output.split("\0") if path))
+
+    def write_index_tree(self) -> str:
+        """
+        Returns the ID of the tree the index holds, the one a commit would
+        record. Git hooks see the index of the commit in progress through
+        `GIT_INDEX_FILE`, which the command inherits.
+        """
+        return self._run_git_command("write-tree")
+
+    def export_tree(self, tree: str, destination: Path) -> None:
+        """
+        Writes the files of a tree into a directory, through a temporary
+        index so the repository's own index is left alone.
+        """
+        with tempfile.TemporaryDirectory(prefix="hookci-index-") as tmp:
+            env = {"GIT_INDEX_FILE": str(Path(tmp) / "index")}
+            self._run_git_command("read-tree", tree, env=env)
+            self._run_git_command(
+                "checkout-index", "--all", "--force", f"--prefix={destination}/", env=env
+            )
+
+    @cached_property
+    def fsmonitor_enabled(self) -> bool:
+        """Whether Git asks a filesystem monitor what changed instead of stat'ing every file."""
+        try:
+            value = self._run_git_command("config", "--get", "core.fsmonitor").lower()
+        except GitCommandError:
+            return False  # Not set
+        return value not in ("false", "no", "off", "0", "")
+
+    @cached_property
+    def stat_cache(self) -> StatCache:
+        return StatCache(
+            cache_dir(self.git_root) / constants.STAT_CACHE_FILENAME,
+            hash_files=self._hash_files,
+        )
+
+    def _hash_files(self, paths: List[str]) -> Dict[str, str]:
+        """
+        Computes the blob ID of each listed file as `git add` would store it,
+        with clean filters and line-ending conversion applied, so the IDs match
+        those the index holds. Files that cannot be read are left out.
+        """
+        # --stdin-paths reads one path per line and unquotes leading quotes.
+        batch = [path for path in paths if "\n" not in path and not path.startswith('"')]
+        result: Dict[str, str] = {}
+        if batch:
+            try:
+                output = self._run_git_command(
+                    "hash-object", "--stdin-paths", input="\n".join(batch) + "\n"
+                )
+                result = dict(zip(batch, output.split()))
+            except GitCommandError:
+                pass  # A file vanished; hash them one at a time below.
+        for path in paths:
+            if path in result:
+                continue
+            try:
+                result[path] = self._run_git_command("hash-object", "--", path)
+            except GitCommandError:
+                continue
+        return result
+
+    def get_worktree_changes(self) -> List[str]:
+        """
+        Lists the files whose working-tree content differs from the index,
+        untracked files included. Git answers from its filesystem monitor and
+        untracked cache when they are configured.
+        """
+        output = self._run_git_command(
+            "status",
+            "--porcelain=v1",
+            "-z",
+            "--no-renames",
+            "--untracked-files=all",
+            strip=False,
+        )
+        return [
+            entry[3:]
+            for entry in output.split("\0")
+            if len(entry) > 3 and entry[1] != " "
+        ]
+
+    def get_file_fingerprints(self, paths: Iterable[str]) -> Dict[str, str]:
+        """
+        Returns the blob ID of each listed file's working-tree content, keyed by
+        its path relative to the repository root. Missing files are left out.
+
+        With a filesystem monitor, Git already knows which files changed, so the
+        IDs of the others come straight from the index. Otherwise every listed
+        file is stat'ed and only those whose stat signature changed since the
+        last lookup are read.
+        """
+        if not self.fsmonitor_enabled:
+            return self.stat_cache.fingerprints(self.git_root, paths)
+
+        changed = set(self.get_worktree_changes())
+        indexed = self._index_blob_ids()
+        result: Dict[str, str] = {}
+        misses: List[str] = []
+        for path in paths:
+            oid = indexed.get(path)
+            if oid is not None and path not in changed:
+                result[path] = oid
+            else:
+                misses.append(path)
+        result.update(self.stat_cache.fingerprints(self.git_root, misses))
+        return result
+
+    def _index_blob_ids(self) -> Dict[str, str]:
+        """Reads the blob ID of every stage-0 entry in the index."""
+        result = {}
+        output = self._run_git_command("ls-files", "--stage", "-z", strip=False)
+        for entry in output.split("\0"):
+            info, _, path = entry.partition("\t")
+            if not path:
+                continue
+            mode, oid, stage = info.split(" ")
+            if stage == "0" and mode != "160000":  # Skip conflicts and submodules
+                result[path] = oid
+        return result
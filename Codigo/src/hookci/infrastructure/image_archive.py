@@ -0,0 +1,191 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Machine-wide cache of image archives, so a daemon missing an image can load
+it from disk instead of a registry.
+"""
+import hashlib
+import os
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Protocol, Tuple, runtime_checkable
+
+from hookci.infrastructure import constants
+from hookci.infrastructure.cache import atomic_write
+from hookci.infrastructure.errors import FileSystemError
+from hookci.log import get_logger
+
+logger = get_logger(__name__)
+
+
+@runtime_checkable
+class IImageArchive(Protocol):
+    """Interface for storing images as tar archives and reading them back."""
+
+    def open(self, image: str) -> Optional[Iterable[bytes]]: ...
+
+    def has(self, image_id: str) -> bool: ...
+
+    def link(self, image: str, image_id: str) -> None: ...
+
+    def store(self, image: str, image_id: str, archive: Iterable[bytes]) -> None: ...
+
+    def discard(self, image: str) -> None: ...
+
+    def evict(self, max_size: int) -> int: ...
+
+
+def default_archive_dir() -> Path:
+    """Returns the archive location under the XDG cache directory."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(cache_home) / constants.STATE_DIR_NAME / constants.IMAGE_ARCHIVE_DIR_NAME
+
+
+class ArchiveFile:
+    """
+    An archive read in chunks. Each iteration reads the file from the
+    start, so several daemons can load it at once.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def __iter__(self) -> Iterator[bytes]:
+        with open(self.path, "rb") as f:
+            while chunk := f.read(constants.TAR_CHUNK_SIZE):
+                yield chunk
+
+
+class LocalImageArchive(IImageArchive):
+    """
+    Keeps the archives `docker save` writes, one file per image ID, shared
+    by every clone on the machine. A small reference file per image name
+    records the ID the name last pointed at, so a tag that moves gets a new
+    archive and tags of the same image share one. Files are written to a
+    temporary file and renamed into place, so a reader, here or in another
+    process, only ever sees a complete one; a file being read stays
+    readable even if it is replaced or evicted meanwhile.
+
+    Opening an archive marks it as just used, and `evict` drops the least
+    recently used ones once they outgrow their cap.
+    """
+
+    def __init__(self, directory: Optional[Path] = None) -> None:
+        self.directory = directory or default_archive_dir()
+
+    def path(self, image_id: str) -> Path:
+        digest = hashlib.sha256(image_id.encode("utf-8")).hexdigest()
+        return self.directory / f"{digest}{constants.IMAGE_ARCHIVE_SUFFIX}"
+
+    def ref_path(self, image: str) -> Path:
+        digest = hashlib.sha256(image.encode("utf-8")).hexdigest()
+        return self.directory / f"{digest}{constants.IMAGE_ARCHIVE_REF_SUFFIX}"
+
+    def _resolve(self, image: str) -> Optional[str]:
+        """Returns the ID the image name was last archived under."""
+        try:
+            return self.ref_path(image).read_text(encoding="utf-8").strip() or None
+        except FileNotFoundError:
+            return None
+
+    def open(self, image: str) -> Optional[ArchiveFile]:
+        """Returns the archive of the image the name last pointed at, if stored."""
+        try:
+            image_id = self._resolve(image)
+            if image_id is None:
+                return None
+            path = self.path(image_id)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Could not read the archive of image '{image}': {e}")
+            return None
+        return ArchiveFile(path)
+
+    def has(self, image_id: str) -> bool:
+        """Tells whether an image with this ID is archived."""
+        return self.path(image_id).is_file()
+
+    def link(self, image: str, image_id: str) -> None:
+        """Points an image name at the archive of an image already stored."""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with atomic_write(self.ref_path(image)) as tmp:
+                tmp.write_text(image_id, encoding="utf-8")
+        except OSError as e:
+            raise FileSystemError(f"Failed to store the archive of image '{image}': {e}") from e
+
+    def store(self, image: str, image_id: str, archive: Iterable[bytes]) -> None:
+        """Stores an image's archive under its ID and points the name at it."""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with atomic_write(self.path(image_id)) as tmp, open(tmp, "wb") as f:
+                for chunk in archive:
+                    f.write(chunk)
+        except OSError as e:
+            raise FileSystemError(f"Failed to store the archive of image '{image}': {e}") from e
+        self.link(image, image_id)
+
+    def discard(self, image: str) -> None:
+        """Removes an image's archive, such as one the daemon could not load."""
+        try:
+            image_id = self._resolve(image)
+            if image_id is not None:
+                self.path(image_id).unlink(missing_ok=True)
+            self.ref_path(image).unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Could not remove the archive of image '{image}': {e}")
+
+    def evict(self, max_size: int) -> int:
+        """
+        Removes the least recently used archives until the rest fit in
+        `max_size` bytes. Returns the number of archives removed.
+        """
+        archives: List[Tuple[int, int, Path]] = []
+        removed = 0
+        total = 0
+        try:
+            for path in self.directory.glob(f"*{constants.IMAGE_ARCHIVE_SUFFIX}"):
+                try:
+                    st = path.stat()
+                except FileNotFoundError:
+                    continue  # Evicted by another run.
+                archives.append((st.st_mtime_ns, st.st_size, path))
+            for _, size, path in sorted(archives, reverse=True):
+                total += size
+                if total > max_size:
+                    path.unlink(missing_ok=True)
+                    removed += 1
+            if removed:
+                self._drop_dangling_refs()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not evict image archives: {e}")
+        if removed:
+            logger.debug(f"Evicted {removed} image archive(s).")
+        return removed
+
+    def _drop_dangling_refs(self) -> None:
+        """Removes the references to archives that are gone."""
+        for ref in self.directory.glob(f"*{constants.IMAGE_ARCHIVE_REF_SUFFIX}"):
+            try:
+                image_id = ref.read_text(encoding="utf-8").strip()
+            except FileNotFoundError:
+                continue
+            if not self.has(image_id):
+                ref.unlink(missing_ok=True)
@@ -0,0 +1,122 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Local record of when each HookCI-built image was last used.
+"""
+import fcntl
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Generator, Iterable, Optional, Protocol, runtime_checkable
+
+from pydantic import BaseModel, ValidationError
+
+from hookci.infrastructure import constants
+from hookci.infrastructure.cache import atomic_write
+from hookci.infrastructure.errors import FileSystemError
+from hookci.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class ImageUsage(BaseModel):
+    """When an image was last used and, once known, its size in bytes."""
+
+    last_used: float
+    size: Optional[int] = None
+
+
+@runtime_checkable
+class IImageIndex(Protocol):
+    """Interface for the image last-use index."""
+
+    def load(self) -> Dict[str, ImageUsage]: ...
+
+    def touch(self, tag: str) -> None: ...
+
+    def record_sizes(self, sizes: Dict[str, int]) -> None: ...
+
+    def forget(self, tags: Iterable[str]) -> None: ...
+
+
+def default_index_path() -> Path:
+    """Returns the index location under the XDG state directory."""
+    state_home = os.environ.get("XDG_STATE_HOME") or str(Path.home() / ".local" / "state")
+    return Path(state_home) / constants.STATE_DIR_NAME / constants.IMAGE_INDEX_FILENAME
+
+
+class JsonImageIndex(IImageIndex):
+    """
+    Keeps the index in a small JSON file shared by every repository on the
+    machine. Updates take an exclusive lock and replace the file atomically,
+    so concurrent runs never see a partial write.
+    """
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = path or default_index_path()
+
+    def load(self) -> Dict[str, ImageUsage]:
+        """Returns the usage of every indexed image, keyed by tag."""
+        try:
+            raw = json.loads(self.path.read_text(encoding="utf-8"))
+            return {tag: ImageUsage.model_validate(entry) for tag, entry in raw.items()}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, AttributeError, ValidationError) as e:
+            logger.warning(f"Ignoring unreadable image index {self.path}: {e}")
+            return {}
+
+    def touch(self, tag: str) -> None:
+        """Marks an image as used now."""
+        with self._update() as entries:
+            previous = entries.get(tag)
+            entries[tag] = ImageUsage(
+                last_used=time.time(), size=previous.size if previous else None
+            )
+
+    def record_sizes(self, sizes: Dict[str, int]) -> None:
+        """Stores the sizes of images already in the index."""
+        with self._update() as entries:
+            for tag, size in sizes.items():
+                if tag in entries:
+                    entries[tag].size = size
+
+    def forget(self, tags: Iterable[str]) -> None:
+        """Drops removed images from the index."""
+        with self._update() as entries:
+            for tag in tags:
+                entries.pop(tag, None)
+
+    @contextmanager
+    def _update(self) -> Generator[Dict[str, ImageUsage], None, None]:
+        """Loads the index under an exclusive lock and writes it back on success."""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path.with_suffix(".lock"), "w") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                entries = self.load()
+                yield entries
+                self._write(entries)
+        except OSError as e:
+            raise FileSystemError(f"Failed to update image index {self.path}: {e}") from e
+
+    def _write(self, entries: Dict[str, ImageUsage]) -> None:
+        data = {tag: usage.model_dump(exclude_none=True) for tag, usage in entries.items()}
+        with atomic_write(self.path) as tmp, open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
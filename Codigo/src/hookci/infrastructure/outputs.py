@@ -0,0 +1,249 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Per-repository store of the files steps write into the working tree, so a
+step whose key is unchanged gets its files back instead of running.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import stat
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Protocol, Set, runtime_checkable
+
+from pydantic import BaseModel, ValidationError
+
+from hookci.infrastructure import constants
+from hookci.infrastructure.cache import atomic_write, cache_dir
+from hookci.infrastructure.errors import FileSystemError
+from hookci.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class OutputFile(BaseModel):
+    """
+    A file a step produced: the stored object holding its content, with the
+    object's size and modification time when archived, or the target of a
+    symbolic link.
+    """
+
+    object: Optional[str] = None
+    size: int = 0
+    mtime_ns: int = 0
+    link: Optional[str] = None
+
+
+class OutputManifest(BaseModel):
+    """The files one run of a step produced, keyed by path relative to the repository."""
+
+    step: str
+    files: Dict[str, OutputFile]
+
+
+@runtime_checkable
+class IOutputStore(Protocol):
+    """Interface for archiving and restoring the files steps produce."""
+
+    def has(self, repo: Path, key: str) -> bool: ...
+
+    def archive(self, repo: Path, key: str, step: str, paths: Iterable[str]) -> None: ...
+
+    def restore(self, repo: Path, key: str) -> bool: ...
+
+
+class LocalOutputStore(IOutputStore):
+    """
+    Keeps outputs in `.hookci/cache/outputs/`: a manifest per step key, and
+    a read-only object per distinct content, shared by the manifests naming
+    it. Living on the repository's file system, objects are restored as
+    copy-on-write clones where the file system supports them, else as
+    hardlinks, and only copied as a last resort.
+
+    A hardlinked file is its object, so a step writing into it in place
+    alters the store. Restoring checks each object still has the size and
+    modification time its manifest recorded, and archiving hashes a linked
+    object again before trusting it.
+    """
+
+    def directory(self, repo: Path) -> Path:
+        return cache_dir(repo) / constants.OUTPUTS_DIR_NAME
+
+    def _manifest_path(self, repo: Path, key: str) -> Path:
+        return self.directory(repo) / f"{key}{constants.OUTPUT_MANIFEST_SUFFIX}"
+
+    def has(self, repo: Path, key: str) -> bool:
+        """Tells whether the outputs of a step run with this key are stored."""
+        return self._manifest_path(repo, key).is_file()
+
+    def archive(self, repo: Path, key: str, step: str, paths: Iterable[str]) -> None:
+        """
+        Stores the listed files, relative to `repo`, as the outputs of the
+        step run with this key. Paths that are not files or symbolic links
+        are skipped. Only the latest `OUTPUT_MANIFESTS_PER_STEP` runs of each
+        step are kept, along with the objects they name.
+        """
+        try:
+            directory = cache_dir(repo, create=True) / constants.OUTPUTS_DIR_NAME
+            objects = directory / constants.OUTPUT_OBJECTS_DIR_NAME
+            objects.mkdir(parents=True, exist_ok=True)
+            files: Dict[str, OutputFile] = {}
+            for rel in sorted(paths):
+                source = repo / rel
+                st = os.lstat(source)
+                if stat.S_ISLNK(st.st_mode):
+                    files[rel] = OutputFile(link=os.readlink(source))
+                elif stat.S_ISREG(st.st_mode):
+                    files[rel] = _store_object(objects, source, st)
+
+            manifest = OutputManifest(step=step, files=files)
+            path = self._manifest_path(repo, key)
+            with atomic_write(path) as tmp, open(tmp, "w", encoding="utf-8") as f:
+                json.dump(manifest.model_dump(), f, sort_keys=True)
+            self._prune(directory, step)
+        except OSError as e:
+            raise FileSystemError(f"Failed to archive the outputs of step '{step}': {e}") from e
+
+    def restore(self, repo: Path, key: str) -> bool:
+        """
+        Puts the outputs stored for this key back into `repo`, replacing the
+        files there. Returns False, with nothing or only part restored, when
+        they are not stored or cannot be restored.
+        """
+        path = self._manifest_path(repo, key)
+        manifest = self._load(path)
+        if manifest is None:
+            return False
+        objects = self.directory(repo) / constants.OUTPUT_OBJECTS_DIR_NAME
+        try:
+            for rel, entry in manifest.files.items():
+                if entry.object is None:
+                    continue
+                st = os.stat(objects / entry.object)
+                if (st.st_size, st.st_mtime_ns) != (entry.size, entry.mtime_ns):
+                    logger.warning(
+                        f"The stored copy of '{rel}' was modified; "
+                        f"step '{manifest.step}' runs again."
+                    )
+                    return False
+            for rel, entry in manifest.files.items():
+                target = repo / rel
+                target.parent.mkdir(parents=True, exist_ok=True)
+                target.unlink(missing_ok=True)
+                if entry.link is not None:
+                    os.symlink(entry.link, target)
+                elif entry.object is not None:
+                    _link_or_copy(objects / entry.object, target)
+            os.utime(path)  # Restored runs are kept longest.
+        except OSError as e:
+            logger.warning(f"Could not restore the outputs of step '{manifest.step}': {e}")
+            return False
+        return True
+
+    def _load(self, path: Path) -> Optional[OutputManifest]:
+        try:
+            return OutputManifest.model_validate_json(path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValidationError) as e:
+            logger.warning(f"Ignoring unreadable output manifest {path}: {e}")
+            return None
+
+    def _prune(self, directory: Path, step: str) -> None:
+        """Drops the step's older manifests, then the objects no manifest names."""
+        manifests: List[Path] = []
+        referenced: Set[str] = set()
+        for path in sorted(
+            directory.glob(f"*{constants.OUTPUT_MANIFEST_SUFFIX}"),
+            key=lambda p: p.stat().st_mtime_ns,
+            reverse=True,
+        ):
+            manifest = self._load(path)
+            if manifest is None:
+                continue
+            if manifest.step == step:
+                manifests.append(path)
+                if len(manifests) > constants.OUTPUT_MANIFESTS_PER_STEP:
+                    path.unlink(missing_ok=True)
+                    continue
+            referenced.update(e.object for e in manifest.files.values() if e.object)
+        for obj in (directory / constants.OUTPUT_OBJECTS_DIR_NAME).iterdir():
+            # Dot files are objects another run is still writing.
+            if not obj.name.startswith(".") and obj.name not in referenced:
+                obj.unlink(missing_ok=True)
+
+
+def _file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(constants.HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _store_object(objects: Path, source: Path, st: os.stat_result) -> OutputFile:
+    """
+    Stores a file's content as a read-only object, named by its hash and
+    whether it is executable, since hardlinks share their mode.
+    """
+    executable = bool(st.st_mode & stat.S_IXUSR)
+    name = _file_digest(source) + ("x" if executable else "")
+    target = objects / name
+    try:
+        existing = os.stat(target)
+        if existing.st_size == st.st_size and (
+            existing.st_nlink == 1 or _file_digest(target) == name.rstrip("x")
+        ):
+            return OutputFile(object=name, size=existing.st_size, mtime_ns=existing.st_mtime_ns)
+    except FileNotFoundError:
+        pass
+    with atomic_write(target) as tmp:
+        if not _clone_file(source, str(tmp)):
+            shutil.copyfile(source, tmp)
+        os.chmod(tmp, 0o555 if executable else 0o444)
+        os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+    stored = os.stat(target)
+    return OutputFile(object=name, size=stored.st_size, mtime_ns=stored.st_mtime_ns)
+
+
+def _clone_file(source: Path, target: str) -> bool:
+    """Makes `target` a copy-on-write clone of `source`; False if the file system cannot."""
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), constants.FICLONE, src.fileno())
+        except OSError:
+            return False
+    return True
+
+
+def _link_or_copy(source: Path, target: Path) -> None:
+    """
+    Restores an object as a clone, else as a hardlink, else as a copy.
+    Clones and copies are the step's own files again, so they are writable.
+    """
+    if not _clone_file(source, str(target)):
+        target.unlink(missing_ok=True)
+        try:
+            os.link(source, target)
+            return
+        except OSError:
+            shutil.copyfile(source, target)
+    st = os.stat(source)
+    os.chmod(target, stat.S_IMODE(st.st_mode) | stat.S_IWUSR)
+    os.utime(target, ns=(st.st_atime_ns, st.st_mtime_ns))
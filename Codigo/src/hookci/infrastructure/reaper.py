@@ -0,0 +1,168 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Background removal of the containers HookCI no longer needs.
+"""
+import atexit
+import os
+import queue
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from docker.errors import DockerException, NotFound
+
+from hookci.infrastructure import constants
+from hookci.log import get_logger
+from hookci.tracing import latency
+
+logger = get_logger(__name__)
+
+# Identifies this HookCI process on every container it creates.
+RUN_ID = uuid.uuid4().hex[:12]
+HOSTNAME = socket.gethostname()
+
+
+def container_labels(repo: Optional[str] = None) -> Dict[str, str]:
+    """Returns the labels marking a container as created by this run."""
+    labels = {
+        constants.LABEL_RUN_ID: RUN_ID,
+        constants.LABEL_HOST: HOSTNAME,
+        constants.LABEL_PID: str(os.getpid()),
+    }
+    if repo is not None:
+        labels[constants.LABEL_REPO] = repo
+    return labels
+
+
+def process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Alive, but owned by someone else
+    return True
+
+
+def is_orphan(labels: Dict[str, str]) -> bool:
+    """
+    Tells whether a labeled container belongs to a run that is gone. Only runs
+    on this host can be checked; containers from other hosts are never orphans.
+    """
+    if labels.get(constants.LABEL_RUN_ID) == RUN_ID:
+        return False
+    if labels.get(constants.LABEL_HOST) != HOSTNAME:
+        return False
+    try:
+        pid = int(labels.get(constants.LABEL_PID, ""))
+    except ValueError:
+        return False
+    return not process_alive(pid)
+
+
+class ContainerReaper:
+    """
+    Force-removes containers on a background thread so removals stay off the
+    critical path of a step. Requests arriving close together are handled as
+    one batch. Removals still pending when HookCI exits are given a short
+    grace period; anything left behind is swept by the next run.
+    """
+
+    def __init__(
+        self,
+        api: Any,
+        sweep: bool = True,
+        batch_interval: float = constants.REAPER_BATCH_INTERVAL,
+    ) -> None:
+        self._api = api
+        self._batch_interval = batch_interval
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, args=(sweep,), name="hookci-reaper", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, container_id: str) -> None:
+        """Schedules a container for removal."""
+        if self._closed:
+            self._remove(container_id)
+        else:
+            self._queue.put(container_id)
+
+    def flush(self) -> None:
+        """Blocks until every scheduled removal has been attempted."""
+        self._queue.join()
+
+    def close(self, timeout: float = constants.REAPER_EXIT_TIMEOUT) -> None:
+        """Finishes pending removals and stops the reaper thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+        atexit.unregister(self.close)
+
+    def sweep_orphans(self) -> List[str]:
+        """
+        Removes containers left behind by runs that died, using a single
+        filtered list call. Returns the IDs of the removed containers.
+        """
+        try:
+            containers = self._api.containers(
+                all=True, filters={"label": constants.LABEL_RUN_ID}
+            )
+        except DockerException as e:
+            logger.warning(f"Could not list leftover containers: {e}")
+            return []
+        orphans = [c["Id"] for c in containers if is_orphan(c.get("Labels") or {})]
+        if orphans:
+            logger.debug(f"Removing {len(orphans)} container(s) left by earlier runs...")
+        for container_id in orphans:
+            self._remove(container_id)
+        return orphans
+
+    def _run(self, sweep: bool) -> None:
+        if sweep:
+            self.sweep_orphans()
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self._batch_interval
+            while batch[-1] is not None and (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            for container_id in batch:
+                if container_id is not None:
+                    self._remove(container_id)
+                self._queue.task_done()
+            if batch[-1] is None:
+                return
+
+    def _remove(self, container_id: str) -> None:
+        try:
+            with latency.measure("container.remove"):
+                self._api.remove_container(container_id, force=True)
+        except NotFound:
+            pass
+        except Exception as e:  # The reaper must outlive any single failure
+            logger.warning(f"Could not remove container {container_id}: {e}")
@@ -0,0 +1,205 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Machine-wide cache of step results, shared by every clone of a repository.
+"""
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Generator, Iterable, List, Optional, Protocol, Set, runtime_checkable
+
+from hookci.infrastructure import constants
+from hookci.log import get_logger
+
+logger = get_logger(__name__)
+
+
+@runtime_checkable
+class IResultCache(Protocol):
+    """Interface for the cache of the step keys known to succeed."""
+
+    def hits(self, keys: Iterable[str]) -> Set[str]: ...
+
+    def add(self, keys: Iterable[str]) -> None: ...
+
+    def evict(self, max_size: int) -> int: ...
+
+
+def default_cache_path() -> Path:
+    """Returns the cache location under the XDG cache directory."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(cache_home) / constants.STATE_DIR_NAME / constants.RESULT_CACHE_FILENAME
+
+
+class SqliteResultCache(IResultCache):
+    """
+    Records the keys of successful step runs in a SQLite database. A key
+    covers everything a step's result depends on, so a hit from any clone
+    holds in every other. SQLite's locking makes each write atomic and safe
+    with several processes at once; its write-ahead log lets runs read while
+    another writes.
+
+    Each hit refreshes the entry's last use, and `evict` drops the least
+    recently used entries once the database outgrows its cap. Like the stat
+    cache, this is an optimization: if the database cannot be used, steps
+    simply run.
+    """
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = path or default_cache_path()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._disabled = False
+
+    def hits(self, keys: Iterable[str]) -> Set[str]:
+        """Returns the given keys that are cached, marking them as just used."""
+        wanted = list(keys)
+        with self._lock:
+            db = self._connect()
+            if db is None or not wanted:
+                return set()
+            try:
+                found: Set[str] = set()
+                with self._transaction(db):
+                    for batch in _batches(wanted):
+                        marks = ", ".join("?" * len(batch))
+                        found.update(
+                            key
+                            for (key,) in db.execute(
+                                f"SELECT key FROM results WHERE key IN ({marks})", batch
+                            )
+                        )
+                    db.executemany(
+                        "UPDATE results SET last_used = ? WHERE key = ?",
+                        [(time.time(), key) for key in found],
+                    )
+                return found
+            except sqlite3.Error as e:
+                self._disable(e)
+                return set()
+
+    def add(self, keys: Iterable[str]) -> None:
+        """Records keys of steps that succeeded."""
+        now = time.time()
+        rows = [(key, now) for key in keys]
+        with self._lock:
+            db = self._connect()
+            if db is None or not rows:
+                return
+            try:
+                with self._transaction(db):
+                    db.executemany(
+                        "INSERT OR REPLACE INTO results (key, last_used) VALUES (?, ?)", rows
+                    )
+            except sqlite3.Error as e:
+                self._disable(e)
+
+    def evict(self, max_size: int) -> int:
+        """
+        Drops the least recently used entries while the pages in use exceed
+        `max_size` bytes, down to `RESULT_CACHE_LOW_WATERMARK` of it so the
+        next runs do not evict again. Freed pages are reused by later writes,
+        so the file stays near the cap. Returns the number of entries dropped.
+        """
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return 0
+            try:
+                dropped = 0
+                with self._transaction(db):
+                    # Pages are not all full, so one pass may not free enough.
+                    while (used := _used_bytes(db)) > max_size:
+                        (count,) = db.execute("SELECT COUNT(*) FROM results").fetchone()
+                        if not count:
+                            break
+                        keep = int(count * max_size * constants.RESULT_CACHE_LOW_WATERMARK / used)
+                        dropped += db.execute(
+                            "DELETE FROM results WHERE key IN "
+                            "(SELECT key FROM results ORDER BY last_used LIMIT ?)",
+                            (count - keep,),
+                        ).rowcount
+                if not dropped:
+                    return 0
+                logger.debug(f"Evicted {dropped} entries from the result cache {self.path}.")
+                return dropped
+            except sqlite3.Error as e:
+                self._disable(e)
+                return 0
+
+    @contextmanager
+    def _transaction(self, db: sqlite3.Connection) -> Generator[None, None, None]:
+        # Take the write lock upfront, so a read-then-write cannot deadlock
+        # with another process doing the same.
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._db is not None or self._disabled:
+            return self._db
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(
+                self.path, timeout=10, isolation_level=None, check_same_thread=False
+            )
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, last_used REAL) WITHOUT ROWID"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Could not open the result cache {self.path}: {e}")
+            self._disabled = True
+            return None
+        self._db = db
+        return db
+
+    def _disable(self, error: sqlite3.Error) -> None:
+        logger.warning(f"Disabling the result cache {self.path}: {error}")
+        if self._db is not None:
+            self._db.close()
+        self._db = None
+        self._disabled = True
+
+    def close(self) -> None:
+        """Closes the database; the next lookup reopens it."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def _used_bytes(db: sqlite3.Connection) -> int:
+    """Returns the size of the database's pages that hold data."""
+    (page_size,) = db.execute("PRAGMA page_size").fetchone()
+    (pages,) = db.execute("PRAGMA page_count").fetchone()
+    (free,) = db.execute("PRAGMA freelist_count").fetchone()
+    return int((pages - free) * page_size)
+
+
+def _batches(keys: List[str], size: int = 500) -> Iterable[List[str]]:
+    """Splits keys into lists short enough for one statement's parameters."""
+    return (keys[i : i + size] for i in range(0, len(keys), size))
@@ -0,0 +1,163 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Per-repository record of the speculative run of the staged tree, shared
+between `hookci speculate` and the pre-commit hook.
+"""
+import json
+import shutil
+import time
+from pathlib import Path
+from typing import Iterator, Optional, Protocol, TextIO, runtime_checkable
+
+from pydantic import BaseModel, ValidationError
+
+from hookci.infrastructure import constants
+from hookci.infrastructure.cache import atomic_write, cache_dir
+from hookci.infrastructure.errors import FileSystemError
+from hookci.infrastructure.reaper import process_alive
+from hookci.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class SpeculativeRun(BaseModel):
+    """
+    A run of the pipeline on a staged tree. `key` covers the tree, the
+    configuration and the environment. `status` is the pipeline's final
+    status, or None while it runs or when it ended without one.
+    """
+
+    key: str
+    tree: str
+    pid: int
+    done: bool = False
+    status: Optional[str] = None
+
+
+@runtime_checkable
+class ISpeculationStore(Protocol):
+    """Interface for sharing the speculative run and its events between processes."""
+
+    def load(self, repo: Path) -> Optional[SpeculativeRun]: ...
+
+    def save(self, repo: Path, run: SpeculativeRun) -> None: ...
+
+    def snapshot(self, repo: Path, tree: str) -> Path: ...
+
+    def open_log(self, repo: Path, key: str) -> TextIO: ...
+
+    def follow(self, repo: Path, run: SpeculativeRun) -> Iterator[str]: ...
+
+
+class JsonSpeculationStore(ISpeculationStore):
+    """
+    Keeps the record, the event log of each run and the snapshot of the
+    tree it verifies in `.hookci/cache/speculation/`. Only the latest run
+    is kept; starting a snapshot removes those of earlier trees.
+    """
+
+    def __init__(self, poll_interval: float = constants.SPECULATION_POLL_INTERVAL) -> None:
+        self._poll_interval = poll_interval
+
+    def directory(self, repo: Path) -> Path:
+        return cache_dir(repo) / constants.SPECULATION_DIR_NAME
+
+    def _ensure_directory(self, repo: Path) -> Path:
+        directory = cache_dir(repo, create=True) / constants.SPECULATION_DIR_NAME
+        directory.mkdir(exist_ok=True)
+        return directory
+
+    def load(self, repo: Path) -> Optional[SpeculativeRun]:
+        """Returns the latest speculative run, or None if there is no usable one."""
+        path = self.directory(repo) / constants.SPECULATION_RECORD_FILENAME
+        try:
+            return SpeculativeRun.model_validate_json(path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValidationError) as e:
+            logger.warning(f"Ignoring unreadable speculative run record {path}: {e}")
+            return None
+
+    def save(self, repo: Path, run: SpeculativeRun) -> None:
+        """Replaces the record atomically, so readers never see half of it."""
+        try:
+            directory = self._ensure_directory(repo)
+            path = directory / constants.SPECULATION_RECORD_FILENAME
+            with atomic_write(path) as tmp, open(tmp, "w", encoding="utf-8") as f:
+                json.dump(run.model_dump(), f, sort_keys=True)
+        except OSError as e:
+            raise FileSystemError(f"Failed to write the speculative run record: {e}") from e
+
+    def snapshot(self, repo: Path, tree: str) -> Path:
+        """
+        Returns an empty directory to export the tree into. Snapshots of
+        other trees are removed; files steps created as another user may
+        survive until the next time.
+        """
+        try:
+            directory = self._ensure_directory(repo)
+            for old in directory.glob(f"{constants.SPECULATION_SNAPSHOT_PREFIX}*"):
+                shutil.rmtree(old, ignore_errors=True)
+            path = directory / f"{constants.SPECULATION_SNAPSHOT_PREFIX}{tree}"
+            path.mkdir(exist_ok=True)
+            return path
+        except OSError as e:
+            raise FileSystemError(f"Failed to create the snapshot of tree {tree}: {e}") from e
+
+    def _log_path(self, repo: Path, key: str) -> Path:
+        return self.directory(repo) / f"{key}{constants.SPECULATION_LOG_SUFFIX}"
+
+    def open_log(self, repo: Path, key: str) -> TextIO:
+        """Opens a new event log for a run, removing the logs of earlier runs."""
+        try:
+            directory = self._ensure_directory(repo)
+            for old in directory.glob(f"*{constants.SPECULATION_LOG_SUFFIX}"):
+                old.unlink(missing_ok=True)
+            return open(self._log_path(repo, key), "w", encoding="utf-8")
+        except OSError as e:
+            raise FileSystemError(f"Failed to open the speculative run log: {e}") from e
+
+    def follow(self, repo: Path, run: SpeculativeRun) -> Iterator[str]:
+        """
+        Yields the lines of a run's event log, waiting for new ones until the
+        run is done, replaced by another, or its process is gone.
+        """
+        try:
+            log = open(self._log_path(repo, run.key), encoding="utf-8")
+        except OSError:
+            return
+        with log:
+            pending = ""
+            while True:
+                chunk = log.read()
+                if not chunk:
+                    current = self.load(repo)
+                    if (
+                        current is not None
+                        and current.key == run.key
+                        and not current.done
+                        and process_alive(current.pid)
+                    ):
+                        time.sleep(self._poll_interval)
+                        continue
+                    # The run ended; lines written before its record are all there.
+                    chunk = log.read()
+                    if not chunk:
+                        return
+                *lines, pending = (pending + chunk).split("\n")
+                yield from lines
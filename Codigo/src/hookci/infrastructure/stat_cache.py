@@ -0,0 +1,191 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Stat-based cache of file fingerprints.
+"""
+import hashlib
+import os
+import sqlite3
+import stat
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from hookci.infrastructure import constants
+from hookci.infrastructure.cache import ensure_cache_dir
+from hookci.log import get_logger
+
+logger = get_logger(__name__)
+
+# (mtime in ns, size, inode) of a file when its blob ID was computed.
+StatSignature = Tuple[int, int, int]
+
+
+def blob_id(path: str, st: os.stat_result) -> str:
+    """
+    Computes the Git blob ID of a file's current content, as `git hash-object`
+    does without filters. Symbolic links hash their target, like Git stores them.
+    """
+    digest = hashlib.sha1(usedforsecurity=False)
+    if stat.S_ISLNK(st.st_mode):
+        target = os.fsencode(os.readlink(path))
+        digest.update(b"blob %d\0" % len(target))
+        digest.update(target)
+        return digest.hexdigest()
+    digest.update(b"blob %d\0" % st.st_size)
+    with open(path, "rb") as f:
+        while chunk := f.read(constants.HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class StatCache:
+    """
+    Maps each file's stat signature to its blob ID, so unchanged files are
+    only stat'ed, never read. Entries live in a SQLite database and are
+    loaded once per process; only new or changed entries are written back.
+
+    Regular files whose signature changed are hashed by `hash_files`, given
+    their paths relative to the root, when set; otherwise their raw content
+    is hashed with `blob_id`. Symbolic links are always hashed by `blob_id`.
+
+    Like Git's index, a file modified within `RACY_WINDOW_NS` of the lookup
+    is not cached, since a later write in the same timestamp tick would go
+    unnoticed. The cache is an optimization: if the database cannot be used,
+    fingerprints are still computed, just not remembered.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        hash_files: Optional[Callable[[List[str]], Dict[str, str]]] = None,
+    ) -> None:
+        self.path = path
+        self._hash_files = hash_files
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Tuple[StatSignature, str]]] = None
+        self._db: Optional[sqlite3.Connection] = None
+        self._disabled = False
+
+    def fingerprints(self, root: Path, paths: Iterable[str]) -> Dict[str, str]:
+        """
+        Returns the blob ID of every listed file under `root` that exists,
+        keyed by its path relative to `root`.
+        """
+        racy_after = time.time_ns() - constants.RACY_WINDOW_NS
+        result: Dict[str, str] = {}
+        updates: List[Tuple[str, int, int, int, str]] = []
+        base = os.path.join(root, "")  # Plain strings: pathlib dominates on big trees
+        with self._lock:
+            entries = self._load()
+            misses: List[Tuple[str, os.stat_result]] = []
+            for rel in paths:
+                try:
+                    st = os.lstat(base + rel)
+                except OSError:
+                    continue  # Deleted or unreadable; it has no fingerprint.
+                if not (stat.S_ISREG(st.st_mode) or stat.S_ISLNK(st.st_mode)):
+                    continue
+                cached = entries.get(rel)
+                if cached is not None and cached[0] == (st.st_mtime_ns, st.st_size, st.st_ino):
+                    result[rel] = cached[1]
+                else:
+                    misses.append((rel, st))
+            hashed: Dict[str, str] = {}
+            if self._hash_files is not None:
+                regular = [rel for rel, st in misses if stat.S_ISREG(st.st_mode)]
+                if regular:
+                    hashed = self._hash_files(regular)
+            for rel, st in misses:
+                if self._hash_files is not None and stat.S_ISREG(st.st_mode):
+                    if rel not in hashed:
+                        continue
+                    oid = hashed[rel]
+                else:
+                    try:
+                        oid = blob_id(base + rel, st)
+                    except OSError:
+                        continue
+                result[rel] = oid
+                if st.st_mtime_ns < racy_after:
+                    signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+                    entries[rel] = (signature, oid)
+                    updates.append((rel, *signature, oid))
+            if updates:
+                self._store(updates)
+        return result
+
+    def _load(self) -> Dict[str, Tuple[StatSignature, str]]:
+        if self._entries is not None:
+            return self._entries
+        self._entries = {}
+        db = self._connect()
+        if db is not None:
+            try:
+                for rel, mtime_ns, size, ino, oid in db.execute(
+                    "SELECT path, mtime_ns, size, ino, oid FROM files"
+                ):
+                    self._entries[rel] = ((mtime_ns, size, ino), oid)
+            except sqlite3.Error as e:
+                self._disable(e)
+        return self._entries
+
+    def _store(self, updates: List[Tuple[str, int, int, int, str]]) -> None:
+        db = self._connect()
+        if db is None:
+            return
+        try:
+            with db:
+                db.executemany(
+                    "INSERT OR REPLACE INTO files (path, mtime_ns, size, ino, oid) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    updates,
+                )
+        except sqlite3.Error as e:
+            self._disable(e)
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._db is not None or self._disabled:
+            return self._db
+        try:
+            ensure_cache_dir(self.path.parent)
+            db = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, "
+                "mtime_ns INTEGER, size INTEGER, ino INTEGER, oid TEXT) WITHOUT ROWID"
+            )
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Could not open the file cache {self.path}: {e}")
+            self._disabled = True
+            return None
+        self._db = db
+        return db
+
+    def _disable(self, error: sqlite3.Error) -> None:
+        logger.warning(f"Disabling the file cache {self.path}: {error}")
+        if self._db is not None:
+            self._db.close()
+        self._db = None
+        self._disabled = True
+
+    def close(self) -> None:
+        """Closes the database; the next lookup reopens it."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
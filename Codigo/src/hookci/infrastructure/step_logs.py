@@ -0,0 +1,135 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Per-repository store of the full output of each step of the latest runs.
+"""
+import hashlib
+import re
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Protocol, Set, TextIO, runtime_checkable
+
+from hookci.infrastructure import constants
+from hookci.infrastructure.cache import cache_dir
+from hookci.infrastructure.errors import FileSystemError
+from hookci.infrastructure.reaper import RUN_ID
+from hookci.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class StepLogs:
+    """
+    The logs of one run, a file per step. Each step appends from its own
+    thread, so writes to different steps never wait on each other. A step
+    whose file cannot be written loses its log, not its run.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self._files: Dict[str, TextIO] = {}
+        self._failed: Set[str] = set()
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def path(self, step: str) -> Path:
+        """Returns the file holding a step's output."""
+        # Step names may hold any character; the digest keeps similar names apart.
+        slug = re.sub(r"[^\w.-]+", "_", step).strip("_")
+        digest = hashlib.sha256(step.encode("utf-8")).hexdigest()[:8]
+        return self.directory / f"{slug}-{digest}{constants.STEP_LOG_SUFFIX}"
+
+    def append(self, step: str, line: str) -> None:
+        """Appends a line of a step's output."""
+        f = self._files.get(step)
+        try:
+            if f is None:
+                with self._lock:
+                    if self._closed or step in self._failed:
+                        return
+                    f = self._files[step] = open(self.path(step), "w", encoding="utf-8")
+            f.write(line)
+        except (OSError, ValueError) as e:
+            # ValueError: the run ended, closing the file, while a cancelled step still wrote.
+            with self._lock:
+                if not self._closed and step not in self._failed:
+                    self._failed.add(step)
+                    logger.warning(f"Could not store the output of step '{step}': {e}")
+                self._files.pop(step, None)
+
+    def close(self) -> None:
+        """Flushes and closes every step's file."""
+        with self._lock:
+            self._closed = True
+            for step, f in self._files.items():
+                try:
+                    f.close()
+                except OSError as e:
+                    logger.warning(f"Could not store the output of step '{step}': {e}")
+            self._files.clear()
+
+
+@runtime_checkable
+class IStepLogStore(Protocol):
+    """Interface for keeping the output of each step."""
+
+    def open(self, repo: Path) -> StepLogs: ...
+
+
+class LocalStepLogStore(IStepLogStore):
+    """
+    Keeps the output of each run in its own directory under
+    `.hookci/cache/logs/`, so runs of the same repository, in parallel or
+    one after another, never remove each other's logs. Opening a run prunes
+    all but the latest `STEP_LOG_RUNS_KEPT` runs.
+    """
+
+    def __init__(self, keep: int = constants.STEP_LOG_RUNS_KEPT) -> None:
+        self._keep = keep
+
+    def directory(self, repo: Path) -> Path:
+        return cache_dir(repo) / constants.STEP_LOGS_DIR_NAME
+
+    def runs(self, repo: Path) -> List[Path]:
+        """Returns the directory of each stored run, oldest first."""
+        directory = self.directory(repo)
+        try:
+            return sorted(p for p in directory.iterdir() if p.is_dir())
+        except FileNotFoundError:
+            return []
+
+    def open(self, repo: Path) -> StepLogs:
+        """Starts the logs of a new run."""
+        directory = self.directory(repo)
+        try:
+            cache_dir(repo, create=True)
+            directory.mkdir(exist_ok=True)
+            # Named after the start time, so sorting by name sorts by age.
+            stamp = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+            run = Path(tempfile.mkdtemp(dir=directory, prefix=f"{stamp}-{RUN_ID}-"))
+        except OSError as e:
+            raise FileSystemError(f"Failed to prepare the step log directory: {e}") from e
+        self._prune(repo, run)
+        return StepLogs(run)
+
+    def _prune(self, repo: Path, current: Path) -> None:
+        old = [p for p in self.runs(repo) if p != current]
+        for path in old[: max(len(old) - self._keep + 1, 0)]:
+            shutil.rmtree(path, ignore_errors=True)
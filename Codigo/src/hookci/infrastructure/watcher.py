@@ -0,0 +1,213 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Change notifications for the files of a working tree.
+"""
+import ctypes
+import errno
+import os
+import select
+import struct
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Protocol, Set, runtime_checkable
+
+from hookci.infrastructure import constants
+from hookci.infrastructure.errors import FileSystemError
+from hookci.log import get_logger
+
+logger = get_logger(__name__)
+
+# inotify(7) event bits.
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (
+    IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DONT_FOLLOW
+    | IN_EXCL_UNLINK
+)
+
+# struct inotify_event { int wd; uint32_t mask, cookie, len; char name[]; }
+_EVENT_HEADER = struct.Struct("iIII")
+
+# Directories never worth watching: Git's own state and HookCI's caches.
+IGNORED_DIRS = (".git", ".hookci/cache")
+
+
+@runtime_checkable
+class IFileWatcher(Protocol):
+    """Interface for watching a working tree for file changes."""
+
+    def watch(self, root: Path, directories: Iterable[str]) -> None: ...
+    def changes(self, debounce: float) -> Iterator[Set[str]]: ...
+    def close(self) -> None: ...
+
+
+def _ignored(directory: str) -> bool:
+    return any(directory == d or directory.startswith(f"{d}/") for d in IGNORED_DIRS)
+
+
+class InotifyWatcher(IFileWatcher):
+    """
+    Watches a working tree with Linux inotify. inotify is not recursive, so
+    every directory gets its own watch; directories created later are
+    watched as they appear, and the files already in them are reported.
+    """
+
+    def __init__(self) -> None:
+        self._libc: Any = None
+        self._fd = -1
+        self._wake_r = self._wake_w = -1
+        self._root = Path()
+        self._directories: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._iterating = False
+        self._closed = False
+
+    def watch(self, root: Path, directories: Iterable[str]) -> None:
+        """Starts watching the root and the given directories, relative to it."""
+        libc = ctypes.CDLL(None, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise FileSystemError("Watching files needs inotify, which this system does not provide.")
+        fd = libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if fd < 0:
+            raise FileSystemError(
+                f"Could not start watching files: {os.strerror(ctypes.get_errno())}"
+            )
+        self._libc, self._fd, self._root = libc, fd, root
+        self._wake_r, self._wake_w = os.pipe()
+        for directory in sorted({"", *directories}):
+            if not _ignored(directory):
+                self._add_watch(directory)
+        logger.debug(f"Watching {len(self._directories)} directories under {root}")
+
+    def _add_watch(self, directory: str) -> bool:
+        """Watches a directory, returning False when it is gone."""
+        path = self._root / directory if directory else self._root
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error in (errno.ENOENT, errno.ENOTDIR):
+                return False
+            if error == errno.ENOSPC:
+                raise FileSystemError(
+                    "Ran out of inotify watches; raise the fs.inotify.max_user_watches sysctl."
+                )
+            raise FileSystemError(f"Could not watch '{path}': {os.strerror(error)}")
+        self._directories[wd] = directory
+        return True
+
+    def _add_tree(self, directory: str, paths: Set[str]) -> None:
+        """Watches a new directory and everything below it, reporting its files."""
+        for current, dirs, files in os.walk(self._root / directory):
+            relative = Path(current).relative_to(self._root).as_posix()
+            if _ignored(relative) or not self._add_watch(relative):
+                dirs.clear()
+                continue
+            paths.update(f"{relative}/{name}" for name in files)
+
+    def _read_events(self, paths: Set[str]) -> bool:
+        """Adds the paths of the pending events to the set; returns True on queue overflow."""
+        try:
+            data = os.read(self._fd, constants.INOTIFY_BUFFER_SIZE)
+        except BlockingIOError:
+            return False
+        overflow = False
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            if mask & IN_IGNORED:
+                self._directories.pop(wd, None)
+                continue
+            parent = self._directories.get(wd)
+            if parent is None or not name:
+                continue
+            path = f"{parent}/{name}" if parent else name
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._add_tree(path, paths)
+            elif not _ignored(parent):
+                paths.add(path)
+        return overflow
+
+    def changes(self, debounce: float) -> Iterator[Set[str]]:
+        """
+        Yields the paths changed in each burst of activity, once the tree has
+        been quiet for `debounce` seconds. An empty set means events were lost
+        and any file may have changed. Ends when the watcher is closed.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._iterating = True
+        try:
+            paths: Set[str] = set()
+            overflow = False
+            timeout: Optional[float] = None
+            while True:
+                ready, _, _ = select.select([self._fd, self._wake_r], [], [], timeout)
+                if self._wake_r in ready:
+                    return
+                if ready:
+                    overflow |= self._read_events(paths)
+                    if paths or overflow:
+                        timeout = debounce
+                    continue
+                yield set() if overflow else paths
+                paths, overflow, timeout = set(), False, None
+        finally:
+            with self._lock:
+                self._iterating = False
+                self._release()
+
+    def close(self) -> None:
+        """Stops watching, ending any iteration over `changes`."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self._wake_w >= 0:
+                os.write(self._wake_w, b"\0")
+            if not self._iterating:
+                self._release()
+
+    def _release(self) -> None:
+        if not self._closed:
+            return
+        for fd in (self._fd, self._wake_r, self._wake_w):
+            if fd >= 0:
+                os.close(fd)
+        self._fd = self._wake_r = self._wake_w = -1
@@ -17,6 +17,7 @@
 """Centralized logging configuration for the application."""
 
 import logging
+from rich.console import Console
 from rich.logging import RichHandler
 
 
@@ -39,6 +40,16 @@ def setup_logging(level: str = "INFO") -> None:
     )
 
 
+def log_to_stderr() -> None:
+    """
+    Sends log records to standard error, leaving standard output free for
+    machine-readable data.
+    """
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, RichHandler):
+            handler.console = Console(stderr=True)
+
+
 def get_logger(name: str) -> logging.Logger:
     """
     Returns a logger instance for the given name.
@@ -21,8 +21,13 @@ handling all command-line interface interactions.
 from __future__ import annotations
 
 import subprocess
+import sys
+import time
 from collections import defaultdict, deque
+from contextlib import nullcontext
+from enum import Enum
 from itertools import chain
+from pathlib import Path
 from typing import (
     Any,
     Callable,
@@ -31,10 +36,14 @@ from typing import (
     Iterable,
     List,
     Optional,
+    Sequence,
+    Set,
+    TextIO,
     Tuple,
 )
 
 import typer
+from pydantic import ByteSize, ValidationError
 from rich.console import Console, Group
 from rich.live import Live
 from rich.panel import Panel
@@ -49,8 +58,10 @@ from rich.progress import (
 from rich.syntax import Syntax
 from rich.text import Text
 
+from hookci.application.constants import WATCH_DEBOUNCE
 from hookci.application.errors import ApplicationError, ConfigurationUpToDateError
 from hookci.application.events import (
+    ChangesDetected,
     DebugShellStarting,
     ImageBuildEnd,
     ImageBuildProgress,
@@ -58,16 +69,20 @@ from hookci.application.events import (
     ImagePullEnd,
     ImagePullStart,
     LogLine,
+    LogLinesSuppressed,
+    PipelineCancelled,
     PipelineEnd,
     PipelineEvent,
     PipelineStart,
+    SpeculationStart,
     StepEnd,
     StepStart,
 )
 from hookci.containers import container
-from hookci.domain.config import LogLevel, Step  # Strictly for type hinting
+from hookci.domain.config import ImageGc, LogLevel, Step
 from hookci.infrastructure.errors import InfrastructureError  # Strictly for exceptions
-from hookci.log import get_logger, setup_logging
+from hookci.log import get_logger, log_to_stderr, setup_logging
+from hookci.tracing import tracer
 
 try:
     from hookci._version import __version__  # type: ignore[import-not-found]
@@ -96,6 +111,15 @@ app = typer.Typer(
 console = Console()
 
 
+class OutputFormat(str, Enum):
+    """How `run` renders pipeline events."""
+
+    AUTO = "auto"
+    RICH = "rich"
+    PLAIN = "plain"
+    JSONL = "jsonl"
+
+
 @app.callback()
 def main_options(
     version: Optional[bool] = typer.Option(
@@ -112,6 +136,14 @@ def main_options(
     """
 
 
+def _suppressed_note(event: LogLinesSuppressed) -> str:
+    """Describes output left out of the display, and where to find it."""
+    note = f"... {event.count} lines suppressed"
+    if event.log_file:
+        note += f"; full output in {event.log_file}"
+    return note + " ..."
+
+
 class PipelineUI:
     """Manages the Rich components for displaying pipeline progress and logs."""
 
@@ -157,6 +189,7 @@ class PipelineUI:
             ImageBuildEnd: self._on_image_build_end,
             StepStart: self._on_step_start,
             LogLine: self._on_log_line,
+            LogLinesSuppressed: self._on_lines_suppressed,
             StepEnd: self._on_step_end,
             PipelineEnd: self._on_pipeline_end,
         }
@@ -241,6 +274,10 @@ class PipelineUI:
         self.all_logs[event.step_name].append(event)
         self._update_panel_with_log(event)
 
+    def _on_lines_suppressed(self, event: LogLinesSuppressed) -> None:
+        note = f"{_suppressed_note(event)}\n"
+        self._on_log_line(LogLine(line=note, stream="stderr", step_name=event.step_name))
+
     def _on_step_end(self, event: StepEnd) -> None:
         self._finalize_step(event)
 
@@ -290,6 +327,8 @@ class PipelineUI:
             description = f"  - {step.name}"
             if event.status == "SUCCESS":
                 description = f"[green]✔[/] {description}"
+                if event.reused:
+                    description += " [dim](reused)[/]"
                 self.overall_progress.update(self.overall_task, advance=1)
             elif event.status == "FAILURE":
                 description = f"[red]✖[/] {description}"
@@ -385,6 +424,9 @@ class DebugUI:
     def __init__(self) -> None:
         self.final_status = "FAILURE"
         self.current_step: Optional[Step] = None
+        # Steps run in parallel, so log lines are grouped under their step's name.
+        self.running: Set[str] = set()
+        self.last_log_step: Optional[str] = None
         # A mapping of event types to their corresponding handler methods.
         self.event_handlers: Dict[
             type[PipelineEvent], Callable[[PipelineEvent], None]
@@ -397,6 +439,7 @@ class DebugUI:
             ImageBuildEnd: self._handle_image_build_end,
             StepStart: self._handle_step_start,
             LogLine: self._handle_log_line,
+            LogLinesSuppressed: self._handle_lines_suppressed,
             StepEnd: self._handle_step_end,
             DebugShellStarting: self._handle_debug_shell,
             PipelineEnd: self._handle_pipeline_end,
@@ -443,17 +486,32 @@ class DebugUI:
     def _handle_step_start(self, event: PipelineEvent) -> None:
         assert isinstance(event, StepStart)
         self.current_step = event.step
+        self.running.add(event.step.name)
+        self.last_log_step = event.step.name
         console.print(f"\n[bold]▶️ Running Step: {event.step.name}[/]")
         console.print(f"  [cyan]Command:[/] {event.step.command}")
 
     def _handle_log_line(self, event: PipelineEvent) -> None:
         assert isinstance(event, LogLine)
+        if len(self.running) > 1 and event.step_name != self.last_log_step:
+            console.print(f"[bold]│ {event.step_name}[/]")
+        self.last_log_step = event.step_name
         stream_color = "red" if event.stream == "stderr" else "dim"
         console.print(f"  [{stream_color}]{event.line.strip()}[/]")
 
+    def _handle_lines_suppressed(self, event: PipelineEvent) -> None:
+        assert isinstance(event, LogLinesSuppressed)
+        if len(self.running) > 1 and event.step_name != self.last_log_step:
+            console.print(f"[bold]│ {event.step_name}[/]")
+        self.last_log_step = event.step_name
+        console.print(f"  [yellow]{_suppressed_note(event)}[/]")
+
     def _handle_step_end(self, event: PipelineEvent) -> None:
         assert isinstance(event, StepEnd)
-        if event.status == "SUCCESS":
+        self.running.discard(event.step.name)
+        if event.reused:
+            console.print(f"[bold green]✔ Step '{event.step.name}' Reused from the last run[/]")
+        elif event.status == "SUCCESS":
             console.print(f"[bold green]✔ Step '{event.step.name}' Succeeded[/]")
         else:
             style = "red" if event.status == "FAILURE" else "yellow"
@@ -480,6 +538,259 @@ def _run_debug_mode(
     return ui_handler.final_status
 
 
+class _BatchedWriter:
+    """
+    Collects output lines and writes them to a stream in batches, so a chatty
+    step costs one write call per batch rather than one per line.
+    """
+
+    def __init__(self, stream: TextIO, batch_size: int, flush_interval: float) -> None:
+        self.stream = stream
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+        self._buffer: List[str] = []
+
+    def write(self, line: str, now: float, urgent: bool = False) -> None:
+        """Queues a line; urgent lines flush the batch immediately."""
+        self._buffer.append(line)
+        if (
+            urgent
+            or len(self._buffer) >= self.batch_size
+            or now - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes out any queued lines."""
+        if self._buffer:
+            self.stream.write("\n".join(self._buffer) + "\n")
+            self.stream.flush()
+            self._buffer.clear()
+        self._last_flush = time.monotonic()
+
+
+class JsonlUI:
+    """
+    Serializes pipeline events as JSON Lines for editors and other tools.
+
+    Each record carries a sequence number, the seconds elapsed since the run
+    started (monotonic clock), the event type and its fields. Log lines are
+    written in batches; every other event flushes immediately so consumers
+    see status changes without delay.
+    """
+
+    def __init__(
+        self, stream: TextIO, batch_size: int = 512, flush_interval: float = 0.05
+    ) -> None:
+        self.final_status = "FAILURE"
+        self._writer = _BatchedWriter(stream, batch_size, flush_interval)
+        self._seq = 0
+        self._start = time.monotonic()
+
+    def handle_event(self, event: PipelineEvent) -> None:
+        """Queues an event for output, flushing the batch when it is due."""
+        now = time.monotonic()
+        self._seq += 1
+        if isinstance(event, PipelineEnd):
+            self.final_status = event.status
+        # Pydantic serializes the payload natively; only the envelope is formatted here.
+        self._writer.write(
+            f'{{"seq":{self._seq},"ts":{now - self._start:.6f},'
+            f'"event":"{type(event).__name__}","data":{event.model_dump_json()}}}',
+            now,
+            urgent=not isinstance(event, LogLine),
+        )
+
+    def flush(self) -> None:
+        """Writes out any queued records."""
+        self._writer.flush()
+
+
+class PlainUI:
+    """
+    Prints pipeline progress as plain text for terminals that are not
+    interactive, such as commits made from an editor or a Git GUI.
+
+    There are no progress bars or panels: step transitions are printed as
+    they happen and log lines are streamed with a step prefix. At the ERROR
+    log level lines are held back instead, and only the output of failed
+    steps is printed, once, at the end of the run.
+    """
+
+    def __init__(
+        self, stream: TextIO, batch_size: int = 256, flush_interval: float = 0.1
+    ) -> None:
+        self.final_status = "FAILURE"
+        self.log_level = LogLevel.INFO
+        self._writer = _BatchedWriter(stream, batch_size, flush_interval)
+        self._logs: DefaultDict[str, List[str]] = defaultdict(list)
+        self._failed_steps: List[Step] = []
+        self._handlers: Dict[Any, Callable[[Any], None]] = {
+            PipelineStart: self._on_pipeline_start,
+            ImagePullStart: self._on_image_pull_start,
+            ImagePullEnd: self._on_image_pull_end,
+            ImageBuildStart: self._on_image_build_start,
+            ImageBuildProgress: self._on_image_build_progress,
+            ImageBuildEnd: self._on_image_build_end,
+            StepStart: self._on_step_start,
+            LogLine: self._on_log_line,
+            LogLinesSuppressed: self._on_lines_suppressed,
+            StepEnd: self._on_step_end,
+            PipelineEnd: self._on_pipeline_end,
+        }
+
+    def handle_event(self, event: PipelineEvent) -> None:
+        """Prints the text for a pipeline event."""
+        handler = self._handlers.get(type(event))
+        if handler:
+            handler(event)
+
+    def flush(self) -> None:
+        """Writes out any queued lines."""
+        self._writer.flush()
+
+    def _print(self, line: str, urgent: bool = True) -> None:
+        self._writer.write(line, time.monotonic(), urgent)
+
+    def _on_pipeline_start(self, event: PipelineStart) -> None:
+        self.log_level = event.log_level
+        self._print(f"==> Pipeline started ({event.total_steps} steps)")
+
+    def _on_image_pull_start(self, event: ImagePullStart) -> None:
+        self._print(f"==> Pulling image {event.image_name}")
+
+    def _on_image_pull_end(self, event: ImagePullEnd) -> None:
+        self._print(f"==> Image pull: {event.status}")
+
+    def _on_image_build_start(self, event: ImageBuildStart) -> None:
+        self._print(f"==> Building image {event.tag} ({event.total_steps} steps)")
+
+    def _on_image_build_progress(self, event: ImageBuildProgress) -> None:
+        if self.log_level == LogLevel.DEBUG:
+            self._print(f"    {event.line}", urgent=False)
+
+    def _on_image_build_end(self, event: ImageBuildEnd) -> None:
+        self._print(f"==> Image build: {event.status}")
+
+    def _on_step_start(self, event: StepStart) -> None:
+        self._print(f"--> {event.step.name}: {event.step.command}")
+
+    def _on_log_line(self, event: LogLine) -> None:
+        line = event.line.rstrip("\n")
+        if self.log_level == LogLevel.ERROR:
+            self._logs[event.step_name].append(line)
+        else:
+            self._print(f"[{event.step_name}] {line}", urgent=False)
+
+    def _on_lines_suppressed(self, event: LogLinesSuppressed) -> None:
+        note = _suppressed_note(event)
+        if self.log_level == LogLevel.ERROR:
+            self._logs[event.step_name].append(note)
+        else:
+            self._print(f"[{event.step_name}] {note}", urgent=False)
+
+    def _on_step_end(self, event: StepEnd) -> None:
+        if event.reused:
+            self._print(f"<-- {event.step.name}: {event.status} (reused)")
+        else:
+            self._print(f"<-- {event.step.name}: {event.status} (exit code {event.exit_code})")
+        if event.status == "FAILURE":
+            self._failed_steps.append(event.step)
+        else:
+            self._logs.pop(event.step.name, None)
+
+    def _on_pipeline_end(self, event: PipelineEnd) -> None:
+        self.final_status = event.status
+        # Below the ERROR level the output has already been streamed.
+        if self.log_level == LogLevel.ERROR:
+            for step in self._failed_steps:
+                self._print(f"\n==> Output of failed step '{step.name}'", urgent=False)
+                self._print(f"$ {step.command}", urgent=False)
+                for line in self._logs.pop(step.name, []):
+                    self._print(line, urgent=False)
+        self._print(f"==> Pipeline finished: {event.status}")
+
+
+class WatchUI(PlainUI):
+    """
+    Prints the runs of `hookci watch` as plain text. Each run reads like a
+    plain `hookci run`, introduced by the changes that started it.
+    """
+
+    _waiting: str = "==> Watching for changes (Ctrl+C to stop)"
+
+    def __init__(self, stream: TextIO) -> None:
+        super().__init__(stream)
+        self._handlers.update(
+            {
+                ChangesDetected: self._on_changes_detected,
+                PipelineCancelled: self._on_pipeline_cancelled,
+            }
+        )
+
+    def _on_changes_detected(self, event: ChangesDetected) -> None:
+        paths = ", ".join(event.paths[:3])
+        if len(event.paths) > 3:
+            paths += f" and {len(event.paths) - 3} more"
+        if event.steps:
+            self._print(f"\n==> Changed: {paths}; running {', '.join(event.steps)}")
+        else:
+            self._print(f"\n==> Changed: {paths}; no step affected")
+
+    def _on_pipeline_start(self, event: PipelineStart) -> None:
+        self._logs.clear()
+        self._failed_steps.clear()
+        super()._on_pipeline_start(event)
+
+    def _on_pipeline_cancelled(self, event: PipelineCancelled) -> None:
+        self._print("==> Run cancelled by newer changes")
+
+    def _on_pipeline_end(self, event: PipelineEnd) -> None:
+        super()._on_pipeline_end(event)
+        self._print(self._waiting)
+
+
+class SpeculateUI(WatchUI):
+    """Prints the runs of `hookci speculate`, each introduced by the staged tree it verifies."""
+
+    _waiting = "==> Waiting for the index to change (Ctrl+C to stop)"
+
+    def __init__(self, stream: TextIO) -> None:
+        super().__init__(stream)
+        self._handlers[SpeculationStart] = self._on_speculation_start
+
+    def _on_speculation_start(self, event: SpeculationStart) -> None:
+        self._print(f"\n==> Verifying staged tree {event.tree[:12]}")
+
+
+def _run_plain_mode(event_iterable: Iterable[PipelineEvent]) -> str:
+    """Prints pipeline events as plain text to standard output."""
+    ui_handler = PlainUI(sys.stdout)
+    try:
+        for event in event_iterable:
+            ui_handler.handle_event(event)
+    finally:
+        ui_handler.flush()
+    return ui_handler.final_status
+
+
+def _run_jsonl_mode(
+    event_iterable: Iterable[PipelineEvent], output_file: Optional[Path]
+) -> str:
+    """Writes pipeline events as JSON Lines to a file or standard output."""
+    with (
+        open(output_file, "w", encoding="utf-8") if output_file else nullcontext(sys.stdout)
+    ) as stream:
+        ui_handler = JsonlUI(stream)
+        try:
+            for event in event_iterable:
+                ui_handler.handle_event(event)
+        finally:
+            ui_handler.flush()
+    return ui_handler.final_status
+
+
 @app.command()
 def init() -> None:
     """
@@ -518,25 +829,147 @@ def run(
         "--debug",
         help="On failure of a manual run, keep the container alive and open a debug shell.",
     ),
+    resume: bool = typer.Option(
+        False,
+        "--resume",
+        help="Reuse the results of steps that succeeded in the last run with the same inputs.",
+    ),
+    only: Optional[List[str]] = typer.Option(
+        None,
+        "--only",
+        help="Run only this step and the steps it depends on. Repeatable.",
+    ),
+    from_steps: Optional[List[str]] = typer.Option(
+        None,
+        "--from",
+        help="Run this step and every step depending on it. Repeatable.",
+    ),
+    until: Optional[List[str]] = typer.Option(
+        None,
+        "--until",
+        help="Skip the steps depending on this step. Repeatable.",
+    ),
+    trace: Optional[Path] = typer.Option(
+        None,
+        "--trace",
+        help="Write a Chrome trace-event timeline of the run to this file (open it in Perfetto).",
+        dir_okay=False,
+    ),
+    output: OutputFormat = typer.Option(
+        OutputFormat.AUTO,
+        "--output",
+        help=(
+            "How to render the run: 'rich' for the interactive display, 'plain' for simple text, "
+            "'jsonl' for one JSON event per line. 'auto' picks 'rich' on a terminal and 'plain' otherwise."
+        ),
+    ),
+    output_file: Optional[Path] = typer.Option(
+        None,
+        "--output-file",
+        help="Write the 'jsonl' event stream to this file instead of standard output. Implies '--output jsonl'.",
+        dir_okay=False,
+    ),
 ) -> None:
     """
     Manually runs the CI pipeline based on the configuration file.
     """
+    if output_file is not None:
+        if output not in (OutputFormat.AUTO, OutputFormat.JSONL):
+            raise typer.BadParameter(
+                f"The event stream is only written with '--output jsonl', not '{output.value}'.",
+                param_hint="'--output-file'",
+            )
+        output = OutputFormat.JSONL
+    if output == OutputFormat.AUTO:
+        output = OutputFormat.RICH if console.is_terminal else OutputFormat.PLAIN
+    if output == OutputFormat.JSONL:
+        if debug:
+            raise typer.BadParameter(
+                "The debug shell cannot be used with '--output jsonl'.",
+                param_hint="'--debug'",
+            )
+        if output_file is None:
+            # Keep standard output free for the event stream.
+            log_to_stderr()
+    if trace:
+        tracer.enable()
+    try:
+        final_status = _run_pipeline(
+            hook_type,
+            debug,
+            output,
+            output_file,
+            resume=resume,
+            only=only or [],
+            from_steps=from_steps or [],
+            until=until or [],
+        )
+    finally:
+        if trace:
+            try:
+                tracer.write(trace)
+                logger.info(f"Trace written to {trace}")
+            except OSError as e:
+                logger.warning(f"Could not write the trace to {trace}: {e}")
+
+    if final_status is None:
+        return
+    if output == OutputFormat.JSONL:
+        # The event stream already carries the outcome; only the exit code is added.
+        if final_status == "FAILURE":
+            raise typer.Exit(code=1)
+        return
+    if final_status == "SUCCESS":
+        console.print("\n[bold green]✅ Pipeline finished successfully![/bold green]")
+    elif final_status == "WARNING":
+        console.print(
+            "\n[bold yellow]🔶 Pipeline finished with non-critical failures.[/bold yellow]"
+        )
+    else:  # FAILURE
+        console.print("\n[bold red]❌ Pipeline failed.[/bold red]")
+        raise typer.Exit(code=1)
+
+
+def _run_pipeline(
+    hook_type: Optional[str],
+    debug: bool,
+    output: OutputFormat = OutputFormat.RICH,
+    output_file: Optional[Path] = None,
+    resume: bool = False,
+    only: Sequence[str] = (),
+    from_steps: Sequence[str] = (),
+    until: Sequence[str] = (),
+) -> Optional[str]:
+    """
+    Runs the pipeline, rendering its events, and returns the final status,
+    or None when the run was skipped.
+    """
     final_status = "FAILURE"  # Default status
     try:
         service = container.ci_execution_service
-        event_generator = service.run(hook_type=hook_type, debug=debug)
+        event_generator = service.run(
+            hook_type=hook_type,
+            debug=debug,
+            resume=resume,
+            only=only,
+            from_steps=from_steps,
+            until=until,
+        )
 
         try:
             first_event = next(event_generator)
         except StopIteration:
             logger.info("Pipeline run was skipped based on configuration filters.")
-            return
+            return None
 
         all_events = chain([first_event], event_generator)
 
         if debug:
             final_status = _run_debug_mode(all_events)
+        elif output == OutputFormat.JSONL:
+            final_status = _run_jsonl_mode(all_events, output_file)
+        elif output == OutputFormat.PLAIN:
+            final_status = _run_plain_mode(all_events)
         else:
             pipeline_ui = PipelineUI(console)
             with Live(
@@ -554,15 +987,55 @@ def run(
     except Exception as e:
         _handle_error(e)
 
-    if final_status == "SUCCESS":
-        console.print("\n[bold green]✅ Pipeline finished successfully![/bold green]")
-    elif final_status == "WARNING":
-        console.print(
-            "\n[bold yellow]🔶 Pipeline finished with non-critical failures.[/bold yellow]"
-        )
-    else:  # FAILURE
-        console.print("\n[bold red]❌ Pipeline failed.[/bold red]")
-        raise typer.Exit(code=1)
+    return final_status
+
+
+@app.command()
+def watch(
+    debounce: float = typer.Option(
+        WATCH_DEBOUNCE,
+        "--debounce",
+        min=0.0,
+        help="Seconds the working tree must stay quiet before the changed steps run again.",
+    ),
+) -> None:
+    """
+    Runs the pipeline, then runs again the steps concerned by each change to the working tree.
+    """
+    ui_handler = WatchUI(sys.stdout)
+    try:
+        for event in container.ci_execution_service.watch(debounce):
+            ui_handler.handle_event(event)
+    except KeyboardInterrupt:
+        logger.info("Stopped watching.")
+    except Exception as e:
+        _handle_error(e)
+    finally:
+        ui_handler.flush()
+
+
+@app.command()
+def speculate(
+    debounce: float = typer.Option(
+        WATCH_DEBOUNCE,
+        "--debounce",
+        min=0.0,
+        help="Seconds the index must stay unchanged before the staged tree is verified.",
+    ),
+) -> None:
+    """
+    Verifies the staged tree in the background, so the pre-commit hook can reuse the result.
+    """
+    ui_handler = SpeculateUI(sys.stdout)
+    try:
+        for event in container.ci_execution_service.speculate(debounce):
+            ui_handler.handle_event(event)
+    except KeyboardInterrupt:
+        logger.info("Stopped verifying the staged tree.")
+    except Exception as e:
+        _handle_error(e)
+    finally:
+        ui_handler.flush()
 
 
 @app.command()
@@ -580,6 +1053,66 @@ def migrate() -> None:
         _handle_error(e)
 
 
+@app.command()
+def gc(
+    keep: Optional[int] = typer.Option(
+        None,
+        "--keep",
+        min=1,
+        help="How many of the most recently used images to keep. Defaults to `docker.gc.keep`.",
+    ),
+    max_size: Optional[str] = typer.Option(
+        None,
+        "--max-size",
+        help="Total size the kept images may use, e.g. '10GB'. Defaults to `docker.gc.max_size`.",
+    ),
+    dry_run: bool = typer.Option(
+        False, "--dry-run", help="Show what would be removed without removing anything."
+    ),
+) -> None:
+    """
+    Removes old images built from the project's Dockerfile or its snapshot steps.
+    """
+    try:
+        service = container.image_gc_service
+        policy = service.load_policy()
+        overrides = {"keep": keep, "max_size": max_size}
+        try:
+            policy = ImageGc.model_validate(
+                {
+                    **policy.model_dump(),
+                    **{k: v for k, v in overrides.items() if v is not None},
+                }
+            )
+        except ValidationError as e:
+            raise typer.BadParameter(str(e), param_hint="'--max-size'")
+
+        result = service.collect(policy, dry_run=dry_run)
+
+        for image in result.removed:
+            console.print(
+                f"   - {image.tag} [dim]({ByteSize(image.size).human_readable()})[/dim]"
+            )
+        freed = ByteSize(result.freed_bytes).human_readable()
+        if not result.removed:
+            console.print(
+                f"[bold green]✅ Nothing to remove; {len(result.kept)} image(s) kept.[/bold green]"
+            )
+        elif dry_run:
+            console.print(
+                f"[bold yellow]Would remove {len(result.removed)} image(s), freeing {freed}.[/bold yellow]"
+            )
+        else:
+            console.print(
+                f"[bold green]✅ Removed {len(result.removed)} image(s), freeing {freed}.[/bold green]"
+            )
+
+    except typer.BadParameter:
+        raise
+    except Exception as e:
+        _handle_error(e)
+
+
 def main() -> None:
     """
     The main entry point for the Typer application.
@@ -0,0 +1,211 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Lightweight span tracing exported in the Chrome trace-event format, plus
+always-on latency counters for hot infrastructure phases.
+
+Traces open in `chrome://tracing` or https://ui.perfetto.dev. Tracing is off
+by default; while disabled, `span()` hands back a shared no-op context manager
+and `instant()` returns immediately, so instrumented code pays only for a
+method call.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from itertools import count
+from pathlib import Path
+from typing import Any, Dict, Generator, List, Optional
+
+from pydantic import BaseModel
+
+_NULL_SPAN: AbstractContextManager[None] = nullcontext()
+
+
+class _Span(AbstractContextManager[None]):
+    """Records a complete ("X") event when the span closes."""
+
+    __slots__ = ("_tracer", "_name", "_args", "_start")
+
+    def __init__(self, tracer: "Tracer", name: str, args: Dict[str, Any]) -> None:
+        self._tracer = tracer
+        self._name = name
+        self._args = args
+        self._start = 0
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter_ns()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        end = time.perf_counter_ns()
+        event = self._tracer._event(self._name, "X", self._start, self._args)
+        event["dur"] = (end - self._start) / 1000
+        self._tracer._record(event)
+
+
+class Tracer:
+    """Collects spans from any thread and writes them as a trace file."""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+        self._pid = os.getpid()
+        self._track_ids = count(1)
+        self._local = threading.local()
+
+    def enable(self) -> None:
+        """Starts recording, discarding anything recorded before."""
+        with self._lock:
+            self._events = []
+            self._origin = time.perf_counter_ns()
+            self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def span(self, name: str, **args: Any) -> AbstractContextManager[None]:
+        """Times the enclosed block as a span on the current track."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, args)
+
+    def instant(self, name: str, **args: Any) -> None:
+        """Marks a point in time on the current track."""
+        if not self.enabled:
+            return
+        event = self._event(name, "i", time.perf_counter_ns(), args)
+        event["s"] = "t"
+        self._record(event)
+
+    @contextmanager
+    def track(self, name: str) -> Generator[None, None, None]:
+        """
+        Puts everything recorded by this thread inside the block on a new,
+        named track. Pool threads are reused across steps, so tracks are keyed
+        by the block rather than by the operating-system thread.
+        """
+        if not self.enabled:
+            yield
+            return
+        previous: Optional[int] = getattr(self._local, "track", None)
+        track_id = next(self._track_ids)
+        self._local.track = track_id
+        self._record(
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": self._pid,
+                "tid": track_id,
+                "args": {"name": name},
+            }
+        )
+        try:
+            yield
+        finally:
+            self._local.track = previous
+
+    def _event(self, name: str, phase: str, start_ns: int, args: Dict[str, Any]) -> Dict[str, Any]:
+        event: Dict[str, Any] = {
+            "name": name,
+            "ph": phase,
+            "ts": (start_ns - self._origin) / 1000,
+            "pid": self._pid,
+            "tid": getattr(self._local, "track", None) or 0,
+        }
+        if args:
+            event["args"] = args
+        return event
+
+    def _record(self, event: Dict[str, Any]) -> None:
+        with self._lock:
+            self._events.append(event)
+
+    def write(self, path: Path) -> None:
+        """Writes the recorded events as a Chrome trace-event JSON file."""
+        with self._lock:
+            events = list(self._events)
+        main_track = {
+            "name": "thread_name",
+            "ph": "M",
+            "pid": self._pid,
+            "tid": 0,
+            "args": {"name": "pipeline"},
+        }
+        path.write_text(
+            json.dumps({"traceEvents": [main_track, *events], "displayTimeUnit": "ms"}),
+            encoding="utf-8",
+        )
+
+
+class PhaseLatency(BaseModel):
+    """Aggregated timings of one phase, in seconds."""
+
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class LatencyCounters:
+    """
+    Counts how often each phase ran and how long it took. Unlike tracing this
+    is always on; a measurement costs two clock reads and a lock.
+    """
+
+    def __init__(self) -> None:
+        self._phases: Dict[str, PhaseLatency] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            phase = self._phases.get(name)
+            if phase is None:
+                phase = self._phases[name] = PhaseLatency()
+            phase.count += 1
+            phase.total += seconds
+            phase.max = max(phase.max, seconds)
+
+    @contextmanager
+    def measure(self, name: str) -> Generator[None, None, None]:
+        """Times the enclosed block, including when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def summary(self) -> Dict[str, PhaseLatency]:
+        """Returns a copy of the counters, keyed by phase name."""
+        with self._lock:
+            return {name: phase.model_copy() for name, phase in self._phases.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._phases.clear()
+
+
+# The process-wide tracer, enabled by `hookci run --trace`.
+tracer = Tracer()
+
+# Process-wide latency counters for container lifecycle phases.
+latency = LatencyCounters()
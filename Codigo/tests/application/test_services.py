@@ -17,9 +17,13 @@
 """
 Tests for application services.
 """
+import itertools
 import queue
+import threading
+import time
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, Generator, Tuple, cast
+from typing import Any, Dict, Generator, Iterator, List, Optional, Set, Tuple, Type, cast
 from unittest.mock import MagicMock, PropertyMock, call, create_autospec, patch
 
 import pytest
@@ -30,27 +34,57 @@ from hookci.application.constants import LATEST_CONFIG_VERSION
 from hookci.application.errors import (
     ConfigurationUpToDateError,
     ProjectAlreadyInitializedError,
+    StepSelectionError,
 )
 from hookci.application.events import (
+    ChangesDetected,
     DebugShellStarting,
     ImageBuildEnd,
     ImageBuildStart,
     ImagePullEnd,
     ImagePullStart,
+    LogLine,
+    LogLinesSuppressed,
     LogStream,
+    PipelineCancelled,
     PipelineEnd,
+    PipelineEvent,
     PipelineStart,
+    SpeculationStart,
     StepEnd,
+    StepStart,
 )
+from hookci.application.results import ImageInfo
 from hookci.application.services import (
     CiExecutionService,
+    ContainerSession,
+    DebugSession,
+    EventChannel,
+    ImageGcService,
     MigrationService,
     ProjectInitService,
+    RunOptions,
+    StepPlacement,
+    WarmContainerPool,
+    _select_steps,
 )
-from hookci.domain.config import Configuration, LogLevel, Step
-from hookci.infrastructure.docker import IDockerService
-from hookci.infrastructure.errors import ConfigurationParseError, DockerError
+from hookci.domain.config import Artifacts, Cache, Configuration, ImageGc, LogLevel, Step
+from hookci.infrastructure.checkpoint import Checkpoint, ICheckpointStore
+from hookci.infrastructure.docker import IDockerService, VolumeMount
+from hookci.infrastructure.errors import (
+    ConfigurationParseError,
+    DockerError,
+    GitCommandError,
+)
+from hookci.infrastructure.executor import HostExecutor
 from hookci.infrastructure.fs import IFileSystem, IScmService
+from hookci.infrastructure.image_archive import LocalImageArchive
+from hookci.infrastructure.image_index import IImageIndex, ImageUsage
+from hookci.infrastructure.outputs import LocalOutputStore
+from hookci.infrastructure.result_cache import SqliteResultCache
+from hookci.infrastructure.speculation import JsonSpeculationStore
+from hookci.infrastructure.step_logs import LocalStepLogStore, StepLogs
+from hookci.infrastructure.watcher import IFileWatcher
 from hookci.infrastructure.yaml_handler import IConfigHandler
 
 
@@ -81,6 +115,7 @@ def mock_config_handler() -> MagicMock:
 def mock_docker_service() -> MagicMock:
     """Fixture for a mocked IDockerService."""
     mock = cast(MagicMock, create_autospec(IDockerService, instance=True))
+    mock.capacity = 4
 
     def mock_run_command_success(
         *args: Any, **kwargs: Any
@@ -785,13 +820,13 @@ def test_ci_debug_run_warns_on_non_critical_failure(
     ]
     mock_config_handler.load_config_data.return_value = valid_config_dict
     mock_fs.file_exists.return_value = False  # No .env
-    exit_codes = [1, 0]
+    exit_codes = {"lint": 1, "test": 0}
 
     def mock_exec_commands(
-        *args: Any, **kwargs: Any
+        container_id: str, command: str, env: Dict[str, str]
     ) -> Generator[Tuple[LogStream, str], None, int]:
         yield "stdout", "output"
-        return exit_codes.pop(0)
+        return exit_codes[command]
 
     mock_docker_service.exec_in_container.side_effect = mock_exec_commands
     service = CiExecutionService(
@@ -799,23 +834,72 @@ def test_ci_debug_run_warns_on_non_critical_failure(
     )
     events = list(service.run(hook_type=None, debug=True))
 
-    step_ends = [e for e in events if isinstance(e, StepEnd)]
+    step_ends = {e.step.name: e for e in events if isinstance(e, StepEnd)}
     assert len(step_ends) == 2
-    assert step_ends[0].status == "WARNING"
-    assert step_ends[1].status == "SUCCESS"
+    assert step_ends["NonCritical"].status == "WARNING"
+    assert step_ends["Critical"].status == "SUCCESS"
 
     pipeline_end = next(e for e in events if isinstance(e, PipelineEnd))
     assert pipeline_end.status == "WARNING"
 
-    # Verify debug mode behavior
-    mock_docker_service.start_persistent_container.assert_called_once()
+    # Each step gets its own container, removed as soon as it ends.
+    assert mock_docker_service.start_persistent_container.call_count == 2
     assert mock_docker_service.exec_in_container.call_count == 2
-    mock_docker_service.stop_and_remove_container.assert_called_once_with(
-        "container-123"
-    )
+    assert mock_docker_service.stop_and_remove_container.call_count == 2
     assert not any(isinstance(e, DebugShellStarting) for e in events)
 
 
+def test_ci_debug_run_follows_dependencies_and_keeps_failed_container(
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+    valid_config_dict: Dict[str, Any],
+) -> None:
+    """
+    Verify debug runs use the DAG scheduler: independent steps run, steps
+    after a critical failure do not, and only the failed container survives
+    until the debug shell is done.
+    """
+    valid_config_dict["steps"] = [
+        {"name": "Build", "command": "build"},
+        {"name": "Lint", "command": "lint"},
+        {"name": "Test", "command": "test", "depends_on": ["Build"]},
+    ]
+    mock_config_handler.load_config_data.return_value = valid_config_dict
+    mock_fs.file_exists.return_value = False
+    containers = iter(["c-1", "c-2", "c-3"])
+    started: Dict[str, str] = {}
+
+    def start(image: str, workdir: Path) -> str:
+        return next(containers)
+
+    def run(
+        container_id: str, command: str, env: Dict[str, str]
+    ) -> Generator[Tuple[LogStream, str], None, int]:
+        started[command] = container_id
+        yield "stdout", command
+        return 2 if command == "build" else 0
+
+    mock_docker_service.start_persistent_container.side_effect = start
+    mock_docker_service.exec_in_container.side_effect = run
+    service = CiExecutionService(
+        mock_git_service, mock_config_handler, mock_docker_service, mock_fs
+    )
+
+    events = service.run(hook_type=None, debug=True)
+    removed = mock_docker_service.stop_and_remove_container
+    shell = next(e for e in events if isinstance(e, DebugShellStarting))
+    assert shell.step.name == "Build"
+    assert shell.container_id == started["build"]
+    assert [c.args[0] for c in removed.call_args_list] == [started["lint"]]
+
+    rest = list(events)
+    assert isinstance(rest[-1], PipelineEnd) and rest[-1].status == "FAILURE"
+    assert "test" not in started
+    assert removed.call_args_list[-1].args == (started["build"],)
+
+
 def test_migration_service_success_from_unversioned(
     mock_git_service: MagicMock, mock_config_handler: MagicMock
 ) -> None:
@@ -974,6 +1058,179 @@ def test_ci_run_image_pull_failure(
     assert events[-1].status == "FAILURE"
 
 
+def test_ci_run_loads_a_missing_image_from_the_archive(
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+    valid_config_dict: Dict[str, Any],
+    tmp_path: Path,
+) -> None:
+    """Verify a pulled image is archived, and later runs load it instead of pulling."""
+    valid_config_dict["docker"]["archive"] = {"max_size": "1MB"}
+    mock_config_handler.load_config_data.return_value = valid_config_dict
+    mock_fs.file_exists.return_value = False  # No .env
+    mock_docker_service.save_image.return_value = iter([b"image tar"])
+    mock_docker_service.image_id.return_value = "sha256:one"
+    archive = LocalImageArchive(tmp_path / "images")
+    service = CiExecutionService(
+        mock_git_service,
+        mock_config_handler,
+        mock_docker_service,
+        mock_fs,
+        image_archive=archive,
+    )
+
+    events = list(service.run(hook_type=None))
+    assert isinstance(events[-1], PipelineEnd) and events[-1].status == "SUCCESS"
+    mock_docker_service.pull_image.assert_called_once_with("test:latest")
+    mock_docker_service.save_image.assert_called_once_with("test:latest")
+
+    mock_docker_service.pull_image.reset_mock()
+    loaded: List[bytes] = []
+    mock_docker_service.load_image.side_effect = lambda tar: loaded.append(b"".join(tar))
+    mock_docker_service.image_exists.side_effect = [False, True]
+    events = list(service.run(hook_type=None))
+    assert not any(isinstance(e, ImagePullStart) for e in events)
+    assert isinstance(events[-1], PipelineEnd) and events[-1].status == "SUCCESS"
+    assert loaded == [b"image tar"]
+    mock_docker_service.pull_image.assert_not_called()
+
+
+def test_ci_run_pulls_when_the_archive_cannot_be_loaded(
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+    valid_config_dict: Dict[str, Any],
+    tmp_path: Path,
+) -> None:
+    """Verify a broken archive is dropped and the image pulled instead."""
+    valid_config_dict["docker"]["archive"] = {}
+    mock_config_handler.load_config_data.return_value = valid_config_dict
+    mock_fs.file_exists.return_value = False  # No .env
+    mock_docker_service.load_image.side_effect = DockerError("unexpected EOF")
+    mock_docker_service.save_image.side_effect = DockerError("no such image")
+    mock_docker_service.image_id.return_value = "sha256:one"
+    archive = LocalImageArchive(tmp_path / "images")
+    archive.store("test:latest", "sha256:one", iter([b"truncated"]))
+    service = CiExecutionService(
+        mock_git_service,
+        mock_config_handler,
+        mock_docker_service,
+        mock_fs,
+        image_archive=archive,
+    )
+
+    events = list(service.run(hook_type=None))
+    assert any(isinstance(e, ImagePullStart) for e in events)
+    assert isinstance(events[-1], PipelineEnd) and events[-1].status == "SUCCESS"
+    assert archive.open("test:latest") is None
+
+
+def test_ci_run_archives_images_while_the_steps_run(
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+    valid_config_dict: Dict[str, Any],
+    tmp_path: Path,
+) -> None:
+    """Verify the export runs off the critical path, and the run waits for it."""
+    valid_config_dict["docker"]["archive"] = {}
+    mock_config_handler.load_config_data.return_value = valid_config_dict
+    mock_fs.file_exists.return_value = False  # No .env
+    mock_docker_service.image_id.return_value = "sha256:one"
+    step_ran = threading.Event()
+
+    def run_step(*args: Any, **kwargs: Any) -> Generator[Tuple[LogStream, str], None, int]:
+        step_ran.set()
+        yield "stdout", "ok\n"
+        return 0
+
+    def save(image: str) -> Iterator[bytes]:
+        assert step_ran.wait(5)  # A synchronous export would hold the steps back.
+        yield b"image tar"
+
+    mock_docker_service.run_command_in_container.side_effect = run_step
+    mock_docker_service.save_image.side_effect = save
+    archive = LocalImageArchive(tmp_path / "images")
+    service = CiExecutionService(
+        mock_git_service,
+        mock_config_handler,
+        mock_docker_service,
+        mock_fs,
+        image_archive=archive,
+    )
+
+    events = list(service.run(hook_type=None))
+    assert isinstance(events[-1], PipelineEnd) and events[-1].status == "SUCCESS"
+    stored = archive.open("test:latest")
+    assert stored is not None and b"".join(stored) == b"image tar"
+    assert not [t for t in threading.enumerate() if t.name == "hookci-image-archive"]
+
+
+def test_ci_run_exports_an_image_once_per_id(
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+    valid_config_dict: Dict[str, Any],
+    tmp_path: Path,
+) -> None:
+    """Verify pulling an image already archived skips the export, and a moved tag gets a new one."""
+    valid_config_dict["docker"]["archive"] = {}
+    mock_config_handler.load_config_data.return_value = valid_config_dict
+    mock_fs.file_exists.return_value = False  # No .env
+    mock_docker_service.image_exists.return_value = False
+    mock_docker_service.load_image.side_effect = DockerError("daemon is busy")
+    mock_docker_service.save_image.side_effect = lambda image: iter([b"tar"])
+    archive = LocalImageArchive(tmp_path / "images")
+    archive.store("other:tag", "sha256:one", iter([b"tar"]))
+    service = CiExecutionService(
+        mock_git_service,
+        mock_config_handler,
+        mock_docker_service,
+        mock_fs,
+        image_archive=archive,
+    )
+
+    mock_docker_service.image_id.return_value = "sha256:one"
+    list(service.run(hook_type=None))
+    mock_docker_service.save_image.assert_not_called()
+    assert archive.open("test:latest") is not None
+
+    mock_docker_service.image_id.return_value = "sha256:two"
+    list(service.run(hook_type=None))
+    mock_docker_service.save_image.assert_called_once_with("test:latest")
+    assert archive.has("sha256:two")
+
+
+def test_ci_run_leaves_the_archive_off_by_default(
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+    valid_config_dict: Dict[str, Any],
+    tmp_path: Path,
+) -> None:
+    mock_config_handler.load_config_data.return_value = valid_config_dict
+    mock_fs.file_exists.return_value = False  # No .env
+    archive = LocalImageArchive(tmp_path / "images")
+    archive.store("test:latest", "sha256:one", iter([b"tar"]))
+    service = CiExecutionService(
+        mock_git_service,
+        mock_config_handler,
+        mock_docker_service,
+        mock_fs,
+        image_archive=archive,
+    )
+    list(service.run(hook_type=None))
+    mock_docker_service.load_image.assert_not_called()
+    mock_docker_service.save_image.assert_not_called()
+    mock_docker_service.pull_image.assert_called_once_with("test:latest")
+
+
 def test_ci_run_infrastructure_error_during_step(
     mock_git_service: MagicMock,
     mock_config_handler: MagicMock,
@@ -1239,8 +1496,9 @@ def test_run_pipeline_drains_queue_after_wait(
     )
     
     mock_queue_instance = MagicMock()
-    # First call to empty() returns False (has item), second returns True (empty)
-    mock_queue_instance.empty.side_effect = [False, True]
+    # The scheduler loop consumes one item, then sees an empty queue and stops;
+    # the drain phase then finds one more item before the queue is empty.
+    mock_queue_instance.empty.side_effect = [False, True, False, True]
     mock_queue_instance.get.return_value = PipelineEnd(status="SUCCESS") # Just a dummy event
     
     with patch("hookci.application.services.queue.Queue", return_value=mock_queue_instance):
@@ -1308,3 +1566,1487 @@ def test_threaded_step_wrapper_handles_generic_exception(
     assert isinstance(last_event, StepEnd)
     assert last_event.status == "FAILURE"
     assert last_event.exit_code == 1
+
+
+def test_run_pipeline_does_not_report_deadlock_for_pending_events(
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+    valid_config_dict: Dict[str, Any],
+) -> None:
+    """
+    Verify steps that finish before their events are consumed are not mistaken
+    for a stalled pipeline.
+    """
+    valid_config_dict["steps"] = [
+        {"name": f"Step {i}", "command": "echo"} for i in range(20)
+    ]
+    mock_config_handler.load_config_data.return_value = valid_config_dict
+    mock_fs.file_exists.return_value = False
+    service = CiExecutionService(
+        mock_git_service, mock_config_handler, mock_docker_service, mock_fs
+    )
+
+    events = list(service.run(hook_type=None))
+
+    assert len([e for e in events if isinstance(e, StepEnd)]) == 20
+    assert events[-1] == PipelineEnd(status="SUCCESS")
+
+
+@pytest.fixture
+def mock_image_index() -> MagicMock:
+    """Fixture for a mocked IImageIndex."""
+    index = cast(MagicMock, create_autospec(IImageIndex, instance=True))
+    index.load.return_value = {}
+    return index
+
+
+@pytest.fixture
+def gc_service(
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_image_index: MagicMock,
+) -> ImageGcService:
+    return ImageGcService(
+        mock_git_service, mock_config_handler, mock_docker_service, mock_image_index
+    )
+
+
+def _images(mock_docker_service: MagicMock, mock_image_index: MagicMock) -> None:
+    """Four 100-byte images; 'd' was never recorded in the index. No setup images."""
+    mock_docker_service.list_images.side_effect = lambda repository: [
+        ImageInfo(tag=f"{repository}:{name}", size=100)
+        for name in ("abcd" if repository == "hookci/repo" else "")
+    ]
+    mock_image_index.load.return_value = {
+        "hookci/repo:a": ImageUsage(last_used=1.0, size=100),
+        "hookci/repo:b": ImageUsage(last_used=3.0, size=100),
+        "hookci/repo:c": ImageUsage(last_used=2.0, size=100),
+    }
+
+
+def test_gc_keeps_most_recently_used_images(
+    gc_service: ImageGcService, mock_docker_service: MagicMock, mock_image_index: MagicMock
+) -> None:
+    """Verify the newest images survive and untracked ones count as the oldest."""
+    _images(mock_docker_service, mock_image_index)
+    result = gc_service.collect(ImageGc(keep=2))
+
+    assert [i.tag for i in result.kept] == ["hookci/repo:b", "hookci/repo:c"]
+    assert [i.tag for i in result.removed] == ["hookci/repo:a", "hookci/repo:d"]
+    assert result.freed_bytes == 200
+    assert mock_docker_service.list_images.call_args_list == [
+        call("hookci/repo"),
+        call("hookci/repo-setup"),
+    ]
+    assert mock_docker_service.remove_image.call_args_list == [
+        call("hookci/repo:a"),
+        call("hookci/repo:d"),
+    ]
+    assert list(mock_image_index.forget.call_args[0][0]) == ["hookci/repo:a", "hookci/repo:d"]
+
+
+def test_gc_collects_setup_images_separately(
+    gc_service: ImageGcService, mock_docker_service: MagicMock, mock_image_index: MagicMock
+) -> None:
+    """Verify each repository keeps its own most recent images."""
+    mock_docker_service.list_images.side_effect = lambda repository: [
+        ImageInfo(tag=f"{repository}:{name}", size=100) for name in "ab"
+    ]
+    mock_image_index.load.return_value = {
+        "hookci/repo:a": ImageUsage(last_used=2.0),
+        "hookci/repo-setup:b": ImageUsage(last_used=1.0),
+    }
+    assert not gc_service.needs_collection(ImageGc(keep=1))
+    result = gc_service.collect(ImageGc(keep=1))
+    assert [i.tag for i in result.kept] == ["hookci/repo:a", "hookci/repo-setup:b"]
+    assert [i.tag for i in result.removed] == ["hookci/repo:b", "hookci/repo-setup:a"]
+
+
+def test_gc_respects_size_budget(
+    gc_service: ImageGcService, mock_docker_service: MagicMock, mock_image_index: MagicMock
+) -> None:
+    """Verify the oldest kept images go until the rest fit, keeping at least one."""
+    _images(mock_docker_service, mock_image_index)
+    result = gc_service.collect(ImageGc.model_validate({"keep": 3, "max_size": "150B"}))
+    assert [i.tag for i in result.kept] == ["hookci/repo:b"]
+
+    result = gc_service.collect(ImageGc.model_validate({"keep": 3, "max_size": "1B"}))
+    assert [i.tag for i in result.kept] == ["hookci/repo:b"]
+
+
+def test_gc_dry_run_removes_nothing(
+    gc_service: ImageGcService, mock_docker_service: MagicMock, mock_image_index: MagicMock
+) -> None:
+    _images(mock_docker_service, mock_image_index)
+    result = gc_service.collect(ImageGc(keep=1), dry_run=True)
+    assert len(result.removed) == 3
+    mock_docker_service.remove_image.assert_not_called()
+    mock_image_index.forget.assert_not_called()
+
+
+def test_gc_keeps_images_that_cannot_be_removed(
+    gc_service: ImageGcService, mock_docker_service: MagicMock, mock_image_index: MagicMock
+) -> None:
+    """Verify an image still used by a container is reported as kept."""
+    _images(mock_docker_service, mock_image_index)
+    mock_docker_service.remove_image.side_effect = [DockerError("in use"), None, None]
+    result = gc_service.collect(ImageGc(keep=1))
+    assert [i.tag for i in result.removed] == ["hookci/repo:a", "hookci/repo:d"]
+    assert "hookci/repo:c" in [i.tag for i in result.kept]
+
+
+def test_gc_needs_collection_uses_index_only(
+    gc_service: ImageGcService, mock_docker_service: MagicMock, mock_image_index: MagicMock
+) -> None:
+    """Verify the post-run check never calls the daemon."""
+    mock_image_index.load.return_value = {
+        "hookci/repo:a": ImageUsage(last_used=1.0, size=100),
+        "hookci/repo:b": ImageUsage(last_used=2.0, size=100),
+        "hookci/other:a": ImageUsage(last_used=2.0, size=100),
+    }
+    assert gc_service.needs_collection(ImageGc(keep=2)) is False
+    assert gc_service.needs_collection(ImageGc(keep=1)) is True
+    assert gc_service.needs_collection(ImageGc.model_validate({"max_size": "150B"})) is True
+    assert gc_service.needs_collection(ImageGc.model_validate({"max_size": "1KB"})) is False
+
+    mock_image_index.load.return_value["hookci/repo:c"] = ImageUsage(last_used=3.0)
+    assert gc_service.needs_collection(ImageGc.model_validate({"max_size": "1KB"})) is True
+    mock_docker_service.list_images.assert_not_called()
+
+
+def test_gc_load_policy(
+    gc_service: ImageGcService,
+    mock_config_handler: MagicMock,
+    valid_config_dict: Dict[str, Any],
+) -> None:
+    valid_config_dict["docker"] = {"dockerfile": "Dockerfile", "gc": {"keep": 5}}
+    mock_config_handler.load_config_data.return_value = valid_config_dict
+    assert gc_service.load_policy() == ImageGc(keep=5)
+
+    mock_config_handler.load_config_data.side_effect = ConfigurationParseError("bad")
+    assert gc_service.load_policy() == ImageGc()
+
+
+def test_ci_run_records_image_use_and_collects_old_images(
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+    valid_config_dict: Dict[str, Any],
+) -> None:
+    """Verify a Dockerfile run marks its image used, then triggers the collection."""
+    valid_config_dict["docker"] = {"dockerfile": "Dockerfile", "gc": {"keep": 2}}
+    mock_config_handler.load_config_data.return_value = valid_config_dict
+    mock_fs.file_exists.return_value = False
+    mock_docker_service.image_exists.return_value = True
+    image_gc = create_autospec(ImageGcService, instance=True)
+    image_gc.needs_collection.return_value = True
+    image_gc.collect.return_value.removed = [ImageInfo(tag="hookci/repo:old", size=10)]
+    image_gc.collect.return_value.freed_bytes = 10
+    service = CiExecutionService(
+        mock_git_service, mock_config_handler, mock_docker_service, mock_fs, image_gc
+    )
+
+    events = list(service.run(hook_type=None))
+
+    assert isinstance(events[-1], PipelineEnd)
+    image_gc.mark_used.assert_called_once_with("hookci/repo:hash123")
+    image_gc.collect.assert_called_once_with(ImageGc(keep=2))
+
+
+def test_ci_run_skips_collection_when_disabled_or_failing(
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+    valid_config_dict: Dict[str, Any],
+) -> None:
+    """Verify 'auto: false' disables the trigger and cleanup errors never fail a run."""
+    mock_fs.file_exists.return_value = False
+    image_gc = create_autospec(ImageGcService, instance=True)
+    service = CiExecutionService(
+        mock_git_service, mock_config_handler, mock_docker_service, mock_fs, image_gc
+    )
+
+    valid_config_dict["docker"] = {"dockerfile": "Dockerfile", "gc": {"auto": False}}
+    mock_config_handler.load_config_data.return_value = valid_config_dict
+    list(service.run(hook_type=None))
+    image_gc.needs_collection.assert_not_called()
+
+    valid_config_dict["docker"] = {"dockerfile": "Dockerfile"}
+    image_gc.needs_collection.side_effect = DockerError("daemon gone")
+    events = list(service.run(hook_type=None))
+    assert isinstance(events[-1], PipelineEnd)
+    assert events[-1].status == "SUCCESS"
+    image_gc.collect.assert_not_called()
+
+
+def test_scheduler_starts_longest_chains_first(
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+) -> None:
+    """Verify the scheduler reuses the validated graph and favours critical paths."""
+    config = Configuration(
+        version="1.0",
+        steps=[
+            Step(name="Short", command="cmd"),
+            Step(name="Long", command="cmd"),
+            Step(name="Tail", command="cmd", depends_on=["Long"]),
+        ],
+    )
+    service = CiExecutionService(
+        mock_git_service, mock_config_handler, mock_docker_service, mock_fs
+    )
+
+    steps_by_name, incoming_edges, outgoing_edges = service._initialize_dag_structures(config)
+
+    assert list(incoming_edges) == ["Long", "Short", "Tail"]
+    assert incoming_edges == {"Long": 0, "Short": 0, "Tail": 1}
+    assert outgoing_edges is config.graph.dependents
+    assert steps_by_name["Tail"].depends_on == ["Long"]
+
+
+def _artifacts_config(retain: bool = False) -> Configuration:
+    return Configuration(
+        version="1.0",
+        artifacts=Artifacts(retain=retain),
+        steps=[
+            Step(name="Build", command="make", outputs=["dist"]),
+            Step(name="Test", command="pytest", needs_artifacts=["dist"]),
+            Step(name="Lint", command="lint"),
+        ],
+    )
+
+
+def test_ci_run_shares_artifacts_through_a_run_volume(
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+) -> None:
+    """Verify producers write the volume, consumers read it and it is dropped after."""
+    service = CiExecutionService(
+        mock_git_service, mock_config_handler, mock_docker_service, mock_fs
+    )
+    events = list(service._schedule_steps(_artifacts_config(), _placements(), {}))
+
+    assert isinstance(events[-1], PipelineEnd) and events[-1].status == "SUCCESS"
+    volume = mock_docker_service.create_volume.call_args.args[0]
+    assert volume.startswith(constants.ARTIFACTS_VOLUME_PREFIX)
+    mock_docker_service.remove_volume.assert_called_once_with(volume)
+
+    runs = {
+        c.kwargs["command"].splitlines()[-1]: c.kwargs
+        for c in mock_docker_service.run_command_in_container.call_args_list
+    }
+    assert runs["make"]["command"] == "mkdir -p /artifacts/dist || exit 1\nmake"
+    assert runs["make"]["volumes"] == [VolumeMount(name=volume, target="/artifacts")]
+    assert runs["make"]["env"][constants.ARTIFACTS_ENV] == "/artifacts"
+    assert runs["pytest"]["volumes"] == [
+        VolumeMount(name=volume, target="/artifacts", read_only=True)
+    ]
+    assert "volumes" not in runs["lint"]
+
+
+def test_ci_run_retains_artifacts_or_survives_volume_errors(
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+) -> None:
+    service = CiExecutionService(
+        mock_git_service, mock_config_handler, mock_docker_service, mock_fs
+    )
+    events = list(service._schedule_steps(_artifacts_config(retain=True), _placements(), {}))
+    assert isinstance(events[-1], PipelineEnd) and events[-1].status == "SUCCESS"
+    mock_docker_service.remove_volume.assert_not_called()
+
+    mock_docker_service.remove_volume.side_effect = DockerError("in use")
+    events = list(service._schedule_steps(_artifacts_config(), _placements(), {}))
+    assert isinstance(events[-1], PipelineEnd) and events[-1].status == "SUCCESS"
+
+    mock_docker_service.create_volume.side_effect = DockerError("no space")
+    events = list(service._schedule_steps(_artifacts_config(), _placements(), {}))
+    assert events == [PipelineEnd(status="FAILURE")]
+
+
+def _placements() -> Dict[str, StepPlacement]:
+    return {
+        name: StepPlacement(image="test:latest") for name in ("Build", "Test", "Lint")
+    }
+
+
+
+def _selection_config() -> Configuration:
+    return Configuration(
+        version="1.0",
+        steps=[
+            Step(name="Build", command="make", outputs=["dist"]),
+            Step(name="Lint", command="lint"),
+            Step(name="Test", command="pytest", depends_on=["Lint"], needs_artifacts=["dist"]),
+            Step(name="Deploy", command="deploy", depends_on=["Test"]),
+            Step(name="Docs", command="mkdocs", depends_on=["Build"]),
+        ],
+    )
+
+
+@pytest.mark.parametrize(
+    ("options", "expected"),
+    [
+        (RunOptions(), ["Build", "Lint", "Test", "Deploy", "Docs"]),
+        (RunOptions(only=("Test",)), ["Build", "Lint", "Test"]),
+        (RunOptions(from_steps=("Lint",)), ["Lint", "Test", "Deploy"]),
+        (RunOptions(until=("Test",)), ["Build", "Lint", "Test", "Docs"]),
+        (RunOptions(from_steps=("Build",), until=("Test",)), ["Build", "Test", "Docs"]),
+        (RunOptions(only=("Deploy", "Docs"), from_steps=("Lint",)), ["Lint", "Test", "Deploy"]),
+    ],
+)
+def test_select_steps(options: RunOptions, expected: List[str]) -> None:
+    """Verify each option selects its part of the graph and combined options intersect."""
+    selected = _select_steps(_selection_config(), options)
+    assert [s.name for s in selected.steps] == expected
+
+
+def test_select_steps_prunes_unselected_dependencies(caplog: pytest.LogCaptureFixture) -> None:
+    """Verify dependencies on steps left out count as met, artifacts included."""
+    selected = _select_steps(_selection_config(), RunOptions(from_steps=("Lint",)))
+    test = next(s for s in selected.steps if s.name == "Test")
+    assert test.depends_on == ["Lint"]
+    assert test.needs_artifacts == []
+    assert selected.graph.order == ["Lint", "Test", "Deploy"]
+    assert "needs artifact 'dist', but the step producing it is not selected" in caplog.text
+
+
+def test_select_steps_rejects_bad_selections() -> None:
+    with pytest.raises(StepSelectionError, match="Unknown step 'Tset'"):
+        _select_steps(_selection_config(), RunOptions(only=("Tset",)))
+    with pytest.raises(StepSelectionError, match="matches no steps"):
+        _select_steps(_selection_config(), RunOptions(from_steps=("Deploy",), until=("Lint",)))
+
+
+def test_ci_run_only_runs_the_selected_steps(
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+    valid_config_dict: Dict[str, Any],
+) -> None:
+    """Verify unselected steps never reach Docker."""
+    valid_config_dict["steps"] = [
+        {"name": "Lint", "command": "lint"},
+        {"name": "Test", "command": "pytest", "depends_on": ["Lint"]},
+        {"name": "Slow", "command": "e2e"},
+    ]
+    mock_config_handler.load_config_data.return_value = valid_config_dict
+    mock_fs.file_exists.return_value = False
+    service = CiExecutionService(
+        mock_git_service, mock_config_handler, mock_docker_service, mock_fs
+    )
+    events = list(service.run(hook_type=None, only=["Test"]))
+
+    start = next(e for e in events if isinstance(e, PipelineStart))
+    assert start.total_steps == 2
+    commands = sorted(
+        c.kwargs["command"]
+        for c in mock_docker_service.run_command_in_container.call_args_list
+    )
+    assert commands == ["lint", "pytest"]
+
+
+@pytest.fixture
+def resumable_service(
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+) -> CiExecutionService:
+    """A service whose checkpoints live in memory, over a two-file tree."""
+    store = cast(MagicMock, create_autospec(ICheckpointStore, instance=True))
+    saved: List[Checkpoint] = []
+    store.save.side_effect = lambda repo, checkpoint: saved.append(checkpoint)
+    store.load.side_effect = lambda repo: saved[-1] if saved else None
+    mock_git_service.list_files.return_value = ["src/app.py", "docs/index.md"]
+    mock_git_service.get_file_fingerprints.return_value = {
+        "src/app.py": "a1",
+        "docs/index.md": "d1",
+    }
+    return CiExecutionService(
+        mock_git_service,
+        mock_config_handler,
+        mock_docker_service,
+        mock_fs,
+        checkpoints=store,
+    )
+
+
+def _resume_config(test_command: str = "pytest") -> Configuration:
+    return Configuration(
+        version="1.0",
+        steps=[
+            Step(name="Build", command="make", inputs=["src"]),
+            Step(name="Docs", command="mkdocs", inputs=["docs/*.md"]),
+            Step(name="Test", command=test_command, depends_on=["Build"]),
+        ],
+    )
+
+
+def _run_with_resume(
+    service: CiExecutionService, config: Configuration
+) -> Dict[str, StepEnd]:
+    placements = {s.name: StepPlacement(image="test:latest") for s in config.steps}
+    events = service._schedule_steps(config, placements, {}, RunOptions(resume=True))
+    return {e.step.name: e for e in events if isinstance(e, StepEnd)}
+
+
+def test_resume_restarts_from_the_failed_frontier(
+    resumable_service: CiExecutionService,
+    mock_git_service: MagicMock,
+    mock_docker_service: MagicMock,
+) -> None:
+    """Verify successes with unchanged inputs are reused and failures run again."""
+    def run(*args: Any, **kwargs: Any) -> Generator[Tuple[LogStream, str], None, int]:
+        yield "stdout", "out"
+        return 1 if kwargs["command"] == "pytest" else 0
+
+    mock_docker_service.run_command_in_container.side_effect = run
+    first = _run_with_resume(resumable_service, _resume_config())
+    assert first["Test"].status == "FAILURE"
+    assert not any(e.reused for e in first.values())
+
+    # Fixing the failure changes the tree, but not Build's or Docs' inputs.
+    mock_git_service.get_file_fingerprints.return_value = {
+        "src/app.py": "a1",
+        "docs/index.md": "d1",
+        "tests/test_app.py": "t1",
+    }
+    mock_docker_service.run_command_in_container.reset_mock()
+    second = _run_with_resume(resumable_service, _resume_config())
+    assert second["Build"].reused and second["Docs"].reused
+    assert not second["Test"].reused and second["Test"].status == "FAILURE"
+    commands = [
+        c.kwargs["command"]
+        for c in mock_docker_service.run_command_in_container.call_args_list
+    ]
+    assert commands == ["pytest"]
+
+
+def test_resume_invalidates_changed_inputs_and_config(
+    resumable_service: CiExecutionService,
+    mock_git_service: MagicMock,
+) -> None:
+    """Verify a changed input file or step definition reruns the step and its dependents."""
+    _run_with_resume(resumable_service, _resume_config())
+
+    mock_git_service.get_file_fingerprints.return_value = {
+        "src/app.py": "a2",
+        "docs/index.md": "d1",
+    }
+    ends = _run_with_resume(resumable_service, _resume_config())
+    assert [name for name, e in ends.items() if e.reused] == ["Docs"]
+
+    ends = _run_with_resume(resumable_service, _resume_config("pytest -x"))
+    assert sorted(name for name, e in ends.items() if e.reused) == ["Build", "Docs"]
+
+
+def test_runs_without_resume_do_not_fingerprint_the_tree(
+    resumable_service: CiExecutionService,
+    mock_git_service: MagicMock,
+    mock_docker_service: MagicMock,
+) -> None:
+    """
+    Verify only runs that resume list and fingerprint files, and that a
+    resuming run records the checkpoint the next one resumes from.
+    """
+    config = _resume_config()
+    placements = {s.name: StepPlacement(image="test:latest") for s in config.steps}
+    list(resumable_service._schedule_steps(config, placements, {}))
+    mock_git_service.list_files.assert_not_called()
+    mock_git_service.get_file_fingerprints.assert_not_called()
+
+    ends = _run_with_resume(resumable_service, config)
+    assert not any(e.reused for e in ends.values())
+    ends = _run_with_resume(resumable_service, config)
+    assert all(e.reused for e in ends.values())
+    assert mock_docker_service.run_command_in_container.call_count == 6
+
+    mock_git_service.list_files.side_effect = GitCommandError("not a repository")
+    ends = _run_with_resume(resumable_service, config)
+    assert not any(e.reused for e in ends.values())
+
+
+def test_resume_runs_producers_again_for_steps_needing_their_outputs(
+    resumable_service: CiExecutionService,
+    mock_docker_service: MagicMock,
+) -> None:
+    """Verify a reused step's artifacts are rebuilt when a step needing them runs."""
+    config = Configuration(
+        version="1.0",
+        steps=[
+            Step(name="Build", command="make", inputs=["src"], outputs=["dist"]),
+            Step(name="Test", command="pytest", needs_artifacts=["dist"]),
+        ],
+    )
+
+    def run(*args: Any, **kwargs: Any) -> Generator[Tuple[LogStream, str], None, int]:
+        yield "stdout", "out"
+        return 1 if "pytest" in kwargs["command"] else 0
+
+    mock_docker_service.run_command_in_container.side_effect = run
+    _run_with_resume(resumable_service, config)
+    ends = _run_with_resume(resumable_service, config)
+    assert not any(e.reused for e in ends.values())
+    assert mock_docker_service.run_command_in_container.call_count == 4
+
+
+def test_shared_cache_reuses_results_across_clones(
+    tmp_path: Path,
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+) -> None:
+    """Verify a clone reuses another's successes, without resuming, until its image differs."""
+    mock_git_service.list_files.return_value = ["src/app.py"]
+    mock_git_service.get_file_fingerprints.return_value = {"src/app.py": "a1"}
+    mock_docker_service.image_id.return_value = "sha256:one"
+    config = _resume_config().model_copy(update={"cache": Cache(shared=True)})
+    placements = {s.name: StepPlacement(image="test:latest") for s in config.steps}
+
+    def clone() -> CiExecutionService:
+        return CiExecutionService(
+            mock_git_service,
+            mock_config_handler,
+            mock_docker_service,
+            mock_fs,
+            results=SqliteResultCache(tmp_path / "results.sqlite"),
+        )
+
+    def ends() -> Dict[str, StepEnd]:
+        events = clone()._schedule_steps(config, placements, {})
+        return {e.step.name: e for e in events if isinstance(e, StepEnd)}
+
+    assert not any(e.reused for e in ends().values())
+    assert all(e.reused and e.status == "SUCCESS" for e in ends().values())
+    assert mock_docker_service.run_command_in_container.call_count == 3
+
+    # The same tag now names another image.
+    mock_docker_service.image_id.return_value = "sha256:two"
+    assert not any(e.reused for e in ends().values())
+
+    # Without the cache or checkpoints there is nothing to key.
+    mock_git_service.list_files.reset_mock()
+    unshared = config.model_copy(update={"cache": None})
+    list(clone()._schedule_steps(unshared, placements, {}))
+    mock_git_service.list_files.assert_not_called()
+    assert mock_docker_service.run_command_in_container.call_count == 9
+
+
+def test_output_files_are_restored_instead_of_running_the_step(
+    tmp_path: Path,
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+) -> None:
+    """Verify a stored run's files come back, and are not inputs of its key."""
+    type(mock_git_service).git_root = PropertyMock(return_value=tmp_path)
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "app.ts").write_text("source")
+
+    def build(*args: Any, **kwargs: Any) -> Generator[Tuple[LogStream, str], None, int]:
+        (tmp_path / "dist").mkdir(exist_ok=True)
+        (tmp_path / "dist" / "app.js").write_text("compiled")
+        yield "stdout", "built"
+        return 0
+
+    def fingerprints(paths: List[str]) -> Dict[str, str]:
+        return {p: (tmp_path / p).read_text() for p in paths}
+
+    mock_git_service.list_files.side_effect = lambda: sorted(
+        p.relative_to(tmp_path).as_posix() for p in tmp_path.rglob("*") if p.is_file()
+    )
+    mock_git_service.get_file_fingerprints.side_effect = fingerprints
+    mock_docker_service.run_command_in_container.side_effect = build
+    service = CiExecutionService(
+        mock_git_service,
+        mock_config_handler,
+        mock_docker_service,
+        mock_fs,
+        outputs=LocalOutputStore(),
+    )
+    config = Configuration(
+        version="1.0",
+        steps=[Step(name="Build", command="tsc", inputs=["src"], output_files=["dist"])],
+    )
+    placements = {"Build": StepPlacement(image="test:latest")}
+
+    def ends() -> Dict[str, StepEnd]:
+        events = service._schedule_steps(config, placements, {})
+        return {e.step.name: e for e in events if isinstance(e, StepEnd)}
+
+    assert not ends()["Build"].reused
+    (tmp_path / "dist" / "app.js").unlink()
+    assert ends()["Build"].reused
+    assert (tmp_path / "dist" / "app.js").read_text() == "compiled"
+    assert mock_docker_service.run_command_in_container.call_count == 1
+
+    (tmp_path / "src" / "app.ts").write_text("changed")
+    assert not ends()["Build"].reused
+
+
+def test_snapshot_steps_commit_and_reuse_their_setup_image(
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+) -> None:
+    """Verify the setup step is committed once, then skipped while its key files hold."""
+    mock_git_service.list_files.return_value = ["package-lock.json", "src/app.js"]
+    mock_git_service.get_file_fingerprints.side_effect = lambda paths: {
+        p: "lock1" for p in paths
+    }
+    mock_docker_service.image_id.return_value = "sha256:node"
+    service = CiExecutionService(
+        mock_git_service, mock_config_handler, mock_docker_service, mock_fs
+    )
+    config = Configuration(
+        version="1.0",
+        steps=[
+            Step(name="Setup", command="npm ci", snapshot=True, key_files=["package-lock.json"]),
+            Step(name="Test", command="npm test", depends_on=["Setup"]),
+            Step(name="Lint", command="eslint"),
+        ],
+    )
+    placements = {s.name: StepPlacement(image="node:22") for s in config.steps}
+
+    def run() -> Dict[str, StepEnd]:
+        events = service._schedule_steps(config, placements, {})
+        return {e.step.name: e for e in events if isinstance(e, StepEnd)}
+
+    first = run()
+    assert all(e.status == "SUCCESS" and not e.reused for e in first.values())
+    mock_docker_service.start_persistent_container.assert_called_once_with(
+        "node:22", Path("/repo"), None
+    )
+    tag = mock_docker_service.commit_container.call_args[0][1]
+    assert tag.startswith("hookci/repo-setup:")
+    mock_docker_service.commit_container.assert_called_once_with("container-123", tag)
+    mock_docker_service.stop_and_remove_container.assert_called_once_with("container-123")
+    images = {
+        c.kwargs["command"]: c.kwargs["image"]
+        for c in mock_docker_service.run_command_in_container.call_args_list
+    }
+    assert images == {"npm test": tag, "eslint": "node:22"}
+
+    mock_docker_service.image_exists.side_effect = lambda t: t == tag
+    mock_docker_service.run_command_in_container.reset_mock()
+    second = run()
+    assert second["Setup"].reused and not second["Test"].reused
+    assert mock_docker_service.exec_in_container.call_count == 1
+    assert len(mock_docker_service.run_command_in_container.call_args_list) == 2
+
+    mock_git_service.get_file_fingerprints.side_effect = lambda paths: {
+        p: "lock2" for p in paths
+    }
+    assert not run()["Setup"].reused
+
+
+def test_failed_snapshot_is_not_committed(
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+) -> None:
+    def fail(*args: Any, **kwargs: Any) -> Generator[Tuple[LogStream, str], None, int]:
+        yield "stderr", "npm ERR!"
+        return 1
+
+    mock_git_service.list_files.return_value = []
+    mock_git_service.get_file_fingerprints.return_value = {}
+    mock_docker_service.image_id.return_value = "sha256:node"
+    mock_docker_service.exec_in_container.side_effect = fail
+    service = CiExecutionService(
+        mock_git_service, mock_config_handler, mock_docker_service, mock_fs
+    )
+    config = Configuration(
+        version="1.0",
+        steps=[Step(name="Setup", command="npm ci", snapshot=True, key_files=["x"])],
+    )
+    events = list(
+        service._schedule_steps(config, {"Setup": StepPlacement(image="node:22")}, {})
+    )
+    assert events[-1] == PipelineEnd(status="FAILURE")
+    mock_docker_service.commit_container.assert_not_called()
+    mock_docker_service.stop_and_remove_container.assert_called_once_with("container-123")
+
+
+def test_snapshot_container_is_removed_before_the_artifacts_volume(
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+) -> None:
+    """
+    Verify the setup container is handed off for removal before the volume
+    it mounts is dropped; the removal of the volume awaits it.
+    """
+    mock_git_service.list_files.return_value = []
+    mock_git_service.get_file_fingerprints.return_value = {}
+    mock_docker_service.image_id.return_value = "sha256:node"
+    service = CiExecutionService(
+        mock_git_service, mock_config_handler, mock_docker_service, mock_fs
+    )
+    config = Configuration(
+        version="1.0",
+        steps=[
+            Step(name="Setup", command="npm ci", snapshot=True, key_files=["x"], outputs=["deps"]),
+            Step(name="Test", command="npm test", needs_artifacts=["deps"]),
+        ],
+    )
+    placements = {s.name: StepPlacement(image="node:22") for s in config.steps}
+    events = list(service._schedule_steps(config, placements, {}))
+
+    assert events[-1] == PipelineEnd(status="SUCCESS")
+    calls = [c[0] for c in mock_docker_service.mock_calls]
+    assert calls.index("stop_and_remove_container") < calls.index("remove_volume")
+
+
+def test_host_steps_run_on_the_host_executor(
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+) -> None:
+    """Verify host steps skip Docker, even in a debug session, and others do not."""
+    def lint(*args: Any, **kwargs: Any) -> Generator[Tuple[LogStream, str], None, int]:
+        yield "stdout", "clean\n"
+        return 0
+
+    host = MagicMock()
+    host.run_command.side_effect = lint
+    service = CiExecutionService(
+        mock_git_service,
+        mock_config_handler,
+        mock_docker_service,
+        mock_fs,
+        executors={"host": host},
+    )
+    config = Configuration(
+        version="1.0",
+        steps=[
+            Step(name="Lint", command="ruff check", executor="host", env={"A": "1"}),
+            Step(name="Test", command="pytest", depends_on=["Lint"]),
+        ],
+    )
+    placements = {name: StepPlacement(image="img") for name in ("Lint", "Test")}
+    events = list(
+        service._schedule_steps(
+            config, placements, {"B": "2"}, session=DebugSession(mock_docker_service)
+        )
+    )
+
+    assert events[-1] == PipelineEnd(status="SUCCESS")
+    assert host.run_command.call_args.kwargs["command"] == "ruff check"
+    assert host.run_command.call_args.kwargs["env"] == {"A": "1", "B": "2"}
+    assert host.run_command.call_args.kwargs["workdir"] == Path("/repo")
+    mock_docker_service.start_persistent_container.assert_called_once()
+    mock_docker_service.exec_in_container.assert_called_once()
+    assert mock_docker_service.exec_in_container.call_args.kwargs["command"] == "pytest"
+    mock_docker_service.run_command_in_container.assert_not_called()
+
+
+def test_cancel_stops_running_host_steps(
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """Verify a cancelled run does not wait for its host steps to finish."""
+    service = CiExecutionService(
+        mock_git_service,
+        mock_config_handler,
+        mock_docker_service,
+        mock_fs,
+        executors={"host": HostExecutor()},
+    )
+    config = Configuration(
+        version="1.0", steps=[Step(name="Serve", command="sleep 30", executor="host")]
+    )
+    cancel = threading.Event()
+    timer = threading.Timer(0.2, cancel.set)
+    timer.start()
+    start = time.monotonic()
+    events = list(
+        service._schedule_steps(
+            config,
+            {"Serve": StepPlacement(image="img", workdir=tmp_path)},
+            {},
+            session=ContainerSession(mock_docker_service),
+            cancel=cancel,
+        )
+    )
+    timer.join()
+    assert isinstance(events[-1], PipelineCancelled)
+    assert time.monotonic() - start < 5
+
+
+def test_step_fails_without_its_executor(
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    service = CiExecutionService(
+        mock_git_service, mock_config_handler, mock_docker_service, mock_fs
+    )
+    config = Configuration(
+        version="1.0", steps=[Step(name="Lint", command="ruff", executor="host")]
+    )
+    events = list(service._schedule_steps(config, {"Lint": StepPlacement(image="img")}, {}))
+    assert events[-1] == PipelineEnd(status="FAILURE")
+    assert "No 'host' executor is available." in caplog.text
+
+
+@pytest.fixture
+def monorepo_service(
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+) -> CiExecutionService:
+    """
+    Three packages and a root step; 'web' uses 'core' and builds its own image,
+    'docs' keeps the default one.
+    """
+    root = Path("/repo")
+    configs: Dict[Path, Dict[str, Any]] = {
+        root / ".hookci" / "hookci.yaml": {
+            "version": "1.0",
+            "docker": {"image": "root:latest"},
+            "monorepo": {
+                "packages": ["packages/*"],
+                "dependencies": {"packages/web": ["packages/core"]},
+            },
+            "steps": [{"name": "Lint", "command": "lint"}],
+        },
+        root / "packages/core/hookci.yaml": {
+            "version": "1.0",
+            "docker": {"image": "test:latest"},
+            "steps": [
+                {"name": "Build", "command": "make"},
+                {"name": "Test", "command": "make test", "depends_on": ["Build"]},
+            ],
+        },
+        root / "packages/web/hookci.yaml": {
+            "version": "1.0",
+            "docker": {"dockerfile": "Dockerfile"},
+            "steps": [{"name": "Test", "command": "npm test"}],
+        },
+        root / "packages/docs/hookci.yaml": {
+            "version": "1.0",
+            "steps": [{"name": "Build", "command": "mkdocs build"}],
+        },
+    }
+    mock_config_handler.load_config_data.side_effect = lambda path: configs[path]
+    mock_fs.file_exists.return_value = False
+    mock_fs.glob.return_value = [
+        root / "packages/core/hookci.yaml",
+        root / "packages/docs/hookci.yaml",
+        root / "packages/web/hookci.yaml",
+    ]
+    return CiExecutionService(
+        mock_git_service, mock_config_handler, mock_docker_service, mock_fs
+    )
+
+
+def test_monorepo_packages_keep_their_artifacts_apart(
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+) -> None:
+    """Verify two packages may both produce an artifact named 'dist'."""
+    service = CiExecutionService(
+        mock_git_service, mock_config_handler, mock_docker_service, mock_fs
+    )
+    package = Configuration(
+        version="1.0",
+        steps=[
+            Step(name="Build", command="make", outputs=["dist"]),
+            Step(name="Test", command="make test", needs_artifacts=["dist"]),
+        ],
+    )
+    merged, _ = service._merge_packages(
+        Configuration(version="1.0", steps=[]), {"pkg/a": package, "pkg/b": package}
+    )
+
+    steps = {s.name: s for s in merged.steps}
+    assert steps["pkg/b: Build"].outputs == ["pkg/b/dist"]
+    assert steps["pkg/b: Test"].needs_artifacts == ["pkg/b/dist"]
+    assert merged.graph.dependencies["pkg/b: Test"] == ["pkg/b: Build"]
+    command, env, _ = service._step_invocation(steps["pkg/a: Build"], {}, "pkg/a", "vol")
+    assert command.startswith("mkdir -p /artifacts/pkg/a/dist || exit 1\n")
+    assert env["HOOKCI_ARTIFACTS"] == "/artifacts/pkg/a"
+
+
+def _loaded_configs(mock_config_handler: MagicMock) -> List[str]:
+    return [str(c.args[0]) for c in mock_config_handler.load_config_data.call_args_list]
+
+
+def test_monorepo_runs_only_affected_packages(
+    monorepo_service: CiExecutionService,
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+) -> None:
+    """Verify a change in 'core' runs 'core' and its user 'web', never parsing 'docs'."""
+    mock_git_service.get_changed_files.return_value = ["packages/core/lib.py"]
+
+    events = list(monorepo_service.run(hook_type="pre-commit"))
+
+    mock_fs.glob.assert_called_once_with(Path("/repo"), "packages/*/hookci.yaml")
+    mock_git_service.get_changed_files.assert_called_once_with("pre-commit")
+    assert _loaded_configs(mock_config_handler) == [
+        "/repo/.hookci/hookci.yaml",
+        "/repo/packages/core/hookci.yaml",
+        "/repo/packages/web/hookci.yaml",
+    ]
+    started = {e.step.name for e in events if isinstance(e, StepStart)}
+    assert started == {"packages/core: Build", "packages/core: Test", "packages/web: Test"}
+    assert events[0] == PipelineStart(total_steps=3, log_level=LogLevel.INFO)
+    assert events[-1] == PipelineEnd(status="SUCCESS")
+
+    mock_docker_service.calculate_dockerfile_hash.assert_called_once_with(
+        Path("/repo/packages/web/Dockerfile")
+    )
+    runs = {
+        c.kwargs["command"]: c.kwargs["image"]
+        for c in mock_docker_service.run_command_in_container.call_args_list
+    }
+    assert runs == {
+        "cd packages/core || exit 1\nmake": "test:latest",
+        "cd packages/core || exit 1\nmake test": "test:latest",
+        "cd packages/web || exit 1\nnpm test": "hookci/repo:hash123",
+    }
+
+
+def test_monorepo_root_changes_run_root_steps(
+    monorepo_service: CiExecutionService,
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+) -> None:
+    """Verify paths outside every package run the root configuration's own steps."""
+    mock_git_service.get_changed_files.return_value = ["README.md"]
+
+    events = list(monorepo_service.run(hook_type="pre-push"))
+
+    assert _loaded_configs(mock_config_handler) == ["/repo/.hookci/hookci.yaml"]
+    assert [e.step.name for e in events if isinstance(e, StepStart)] == ["Lint"]
+    run = mock_docker_service.run_command_in_container.call_args
+    assert run.kwargs["command"] == "lint"
+    assert run.kwargs["image"] == "root:latest"
+
+
+def test_monorepo_skips_when_nothing_is_affected(
+    monorepo_service: CiExecutionService, mock_git_service: MagicMock
+) -> None:
+    mock_git_service.get_changed_files.return_value = []
+    assert list(monorepo_service.run(hook_type="pre-commit")) == []
+
+
+def test_monorepo_manual_run_and_git_failure_run_everything(
+    monorepo_service: CiExecutionService, mock_git_service: MagicMock
+) -> None:
+    """Verify manual runs and unknown changes fall back to every package."""
+    events = list(monorepo_service.run(hook_type=None))
+    assert len([e for e in events if isinstance(e, StepStart)]) == 5
+    mock_git_service.get_changed_files.assert_not_called()
+
+    mock_git_service.get_changed_files.side_effect = GitCommandError("no upstream")
+    events = list(monorepo_service.run(hook_type="pre-push"))
+    assert len([e for e in events if isinstance(e, StepStart)]) == 5
+
+
+def test_monorepo_rejects_unknown_dependency(
+    monorepo_service: CiExecutionService, mock_fs: MagicMock
+) -> None:
+    mock_fs.glob.return_value = [Path("/repo/packages/web/hookci.yaml")]
+    with pytest.raises(ConfigurationParseError, match="unknown package 'packages/core'"):
+        list(monorepo_service.run(hook_type=None))
+
+
+def test_monorepo_selection_prepares_only_needed_images(
+    monorepo_service: CiExecutionService, mock_docker_service: MagicMock
+) -> None:
+    """Verify packages without selected steps do not build or pull their image."""
+    events = list(monorepo_service.run(hook_type=None, only=["packages/core: Test"]))
+
+    started = [e.step.name for e in events if isinstance(e, StepStart)]
+    assert started == ["packages/core: Build", "packages/core: Test"]
+    mock_docker_service.pull_image.assert_called_once_with("test:latest")
+    mock_docker_service.calculate_dockerfile_hash.assert_not_called()
+
+
+def test_warm_pool_reuses_idle_containers_and_drops_broken_ones(
+    mock_docker_service: MagicMock,
+) -> None:
+    mock_docker_service.start_persistent_container.side_effect = (
+        f"c{i}" for i in itertools.count()
+    )
+    pool = WarmContainerPool(mock_docker_service, artifacts_volume="vol")
+    step = Step(name="Build", command="make")
+
+    first = pool.acquire("img", Path("/repo"))
+    pool.release(step, first, "FAILURE")
+    assert pool.acquire("img", Path("/repo")) == first
+    assert pool.acquire("other", Path("/repo")) == "c1"
+    mock_docker_service.start_persistent_container.assert_called_with(
+        image="other",
+        workdir=Path("/repo"),
+        volumes=[VolumeMount(name="vol", target=constants.ARTIFACTS_DIR)],
+    )
+
+    pool.release(step, first, None)  # The container broke
+    mock_docker_service.stop_and_remove_container.assert_called_once_with(first)
+    pool.cancel()  # Stops the steps still running
+    pool.close()
+    removed = [c.args[0] for c in mock_docker_service.stop_and_remove_container.call_args_list]
+    assert removed == [first, "c1"]
+
+
+def test_watch_plan_covers_every_package(
+    monorepo_service: CiExecutionService,
+) -> None:
+    """Verify steps without inputs follow their package and its dependents."""
+    plan_events = monorepo_service._watch_plan()
+    try:
+        while True:
+            next(plan_events)
+    except StopIteration as e:
+        plan, pool = e.value
+    assert plan is not None and pool is not None and pool.artifacts_volume is None
+
+    assert plan.affected_steps({"packages/core/src/lib.c"}) == {
+        "packages/core: Build",
+        "packages/core: Test",
+        "packages/web: Test",
+    }
+    assert plan.affected_steps({"README.md"}) == {"Lint"}
+    assert plan.replanned_by({"packages/docs/hookci.yaml"})
+    assert plan.replanned_by({".env"})
+    assert not plan.replanned_by({"packages/docs/index.md"})
+
+
+@pytest.fixture
+def watched_service(
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+) -> Tuple[CiExecutionService, "queue.Queue[Optional[Set[str]]]", MagicMock]:
+    """A service watching a fake tree; put change batches in the queue."""
+    changes: "queue.Queue[Optional[Set[str]]]" = queue.Queue()
+
+    def stream(debounce: float) -> Iterator[Set[str]]:
+        while (batch := changes.get()) is not None:
+            yield batch
+
+    watcher = cast(MagicMock, create_autospec(IFileWatcher, instance=True))
+    watcher.changes.side_effect = stream
+    watcher.close.side_effect = lambda: changes.put(None)
+    mock_git_service.list_files.return_value = ["src/app.py", "docs/index.md"]
+    mock_config_handler.load_config_data.return_value = {
+        "version": "1.0",
+        "docker": {"image": "test:latest"},
+        "steps": [
+            {"name": "Build", "command": "make", "inputs": ["src"]},
+            {"name": "Docs", "command": "mkdocs", "inputs": ["docs"]},
+            {"name": "Test", "command": "pytest", "depends_on": ["Build"]},
+        ],
+    }
+    mock_fs.file_exists.return_value = False
+    mock_docker_service.start_persistent_container.side_effect = (
+        f"c{i}" for i in itertools.count()
+    )
+    service = CiExecutionService(
+        mock_git_service, mock_config_handler, mock_docker_service, mock_fs, watcher=watcher
+    )
+    return service, changes, watcher
+
+
+def _events_until(
+    events: Iterator[PipelineEvent], kind: Type[Any]
+) -> List[PipelineEvent]:
+    collected = []
+    for event in events:
+        collected.append(event)
+        if isinstance(event, kind):
+            break
+    return collected
+
+
+def test_watch_reruns_the_steps_concerned_by_changes(
+    watched_service: Tuple[CiExecutionService, "queue.Queue[Optional[Set[str]]]", MagicMock],
+    mock_docker_service: MagicMock,
+    mock_config_handler: MagicMock,
+) -> None:
+    """Verify the first run covers everything and later ones only what changed."""
+    service, changes, watcher = watched_service
+    events = service.watch(0)
+
+    first = _events_until(events, PipelineEnd)
+    assert {e.step.name for e in first if isinstance(e, StepEnd)} == {"Build", "Docs", "Test"}
+    mock_docker_service.pull_image.assert_called_once()
+    started = mock_docker_service.start_persistent_container.call_count
+
+    changes.put({"build/app.o"})  # Not visible to steps
+    changes.put({"src/app.py"})
+    second = _events_until(events, PipelineEnd)
+    assert second[0] == ChangesDetected(paths=["src/app.py"], steps=["Build", "Test"])
+    assert [e.step.name for e in second if isinstance(e, StepEnd)] == ["Build", "Test"]
+    # The image is not prepared again, and idle containers are reused.
+    mock_docker_service.pull_image.assert_called_once()
+    assert mock_docker_service.start_persistent_container.call_count == started
+
+    changes.put({".hookci/hookci.yaml"})
+    third = _events_until(events, PipelineEnd)
+    assert not any(isinstance(e, ChangesDetected) for e in third)
+    assert len([e for e in third if isinstance(e, StepEnd)]) == 3
+    assert mock_config_handler.load_config_data.call_count == 2
+
+    events.close()
+    watcher.close.assert_called_once()
+    # Containers of the first plan go with it; the others when watching stops.
+    started = mock_docker_service.start_persistent_container.call_count
+    assert mock_docker_service.stop_and_remove_container.call_count == started
+
+
+def test_watch_cancels_runs_superseded_by_changes(
+    watched_service: Tuple[CiExecutionService, "queue.Queue[Optional[Set[str]]]", MagicMock],
+    mock_docker_service: MagicMock,
+) -> None:
+    """Verify a change mid-run kills the running steps and runs them again."""
+    service, changes, _ = watched_service
+    removed = threading.Event()
+    calls = itertools.count()
+
+    def run(
+        container_id: str, command: str, env: Dict[str, str]
+    ) -> Generator[Tuple[LogStream, str], None, int]:
+        if command == "make" and next(calls) == 0:
+            removed.wait(5)
+            return 137
+        yield "stdout", command
+        return 0
+
+    mock_docker_service.exec_in_container.side_effect = run
+    mock_docker_service.stop_and_remove_container.side_effect = lambda c: removed.set()
+    events = service.watch(0)
+
+    first = _events_until(events, StepStart)
+    changes.put({"docs/index.md"})
+    first += _events_until(events, PipelineCancelled)
+    assert "Build" not in {e.step.name for e in first if isinstance(e, StepEnd)}
+    assert removed.is_set()
+
+    # The cancelled run covered every step, so the next one does too.
+    second = _events_until(events, PipelineEnd)
+    assert not any(isinstance(e, ChangesDetected) for e in second)
+    assert {e.step.name for e in second if isinstance(e, StepEnd)} == {"Build", "Docs", "Test"}
+    events.close()
+
+
+@pytest.fixture
+def speculating_service(
+    tmp_path: Path,
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+    valid_config_dict: Dict[str, Any],
+) -> Tuple[CiExecutionService, "queue.Queue[Optional[Set[str]]]"]:
+    """A service speculating in tmp_path; put Git directory changes in the queue."""
+    changes: "queue.Queue[Optional[Set[str]]]" = queue.Queue()
+
+    def stream(debounce: float) -> Iterator[Set[str]]:
+        while (batch := changes.get()) is not None:
+            yield batch
+
+    watcher = cast(MagicMock, create_autospec(IFileWatcher, instance=True))
+    watcher.changes.side_effect = stream
+    watcher.close.side_effect = lambda: changes.put(None)
+    type(mock_git_service).git_root = PropertyMock(return_value=tmp_path)
+    type(mock_git_service).git_dir = PropertyMock(return_value=tmp_path / ".git")
+    mock_git_service.write_index_tree.return_value = "tree1"
+    mock_config_handler.load_config_data.return_value = valid_config_dict
+    mock_fs.file_exists.return_value = False
+    service = CiExecutionService(
+        mock_git_service,
+        mock_config_handler,
+        mock_docker_service,
+        mock_fs,
+        watcher=watcher,
+        speculations=JsonSpeculationStore(poll_interval=0.01),
+    )
+    return service, changes
+
+
+def test_pre_commit_reuses_the_speculative_run_of_its_tree(
+    tmp_path: Path,
+    speculating_service: Tuple[CiExecutionService, "queue.Queue[Optional[Set[str]]]"],
+    mock_git_service: MagicMock,
+    mock_docker_service: MagicMock,
+) -> None:
+    service, _ = speculating_service
+    events = service.speculate(0)
+    speculated = _events_until(events, PipelineEnd)
+    events.close()
+
+    snapshot = tmp_path / ".hookci" / "cache" / "speculation" / "tree-tree1"
+    assert speculated[0] == SpeculationStart(tree="tree1")
+    mock_git_service.export_tree.assert_called_once_with("tree1", snapshot)
+    mock_docker_service.start_persistent_container.assert_called_once_with(
+        image="test:latest", workdir=snapshot
+    )
+    mock_docker_service.run_command_in_container.assert_not_called()
+    mock_git_service.list_files.assert_not_called()  # No checkpoint for a snapshot
+
+    replayed = list(service.run(hook_type="pre-commit"))
+    assert replayed == [
+        event.model_copy(update={"reused": True}) if isinstance(event, StepEnd) else event
+        for event in speculated[1:]
+    ]
+    assert mock_docker_service.exec_in_container.call_count == 1
+
+    mock_git_service.write_index_tree.return_value = "tree2"
+    own = list(service.run(hook_type="pre-commit"))
+    assert [e for e in own if isinstance(e, StepEnd)][0].reused is False
+    mock_docker_service.run_command_in_container.assert_called_once()
+
+
+def test_speculate_cancels_the_run_of_a_stale_tree(
+    speculating_service: Tuple[CiExecutionService, "queue.Queue[Optional[Set[str]]]"],
+    mock_git_service: MagicMock,
+    mock_docker_service: MagicMock,
+) -> None:
+    """Verify staging another tree kills the running steps and verifies the new one."""
+    service, changes = speculating_service
+    removed = threading.Event()
+    calls = itertools.count()
+
+    def run(
+        container_id: str, command: str, env: Dict[str, str]
+    ) -> Generator[Tuple[LogStream, str], None, int]:
+        if next(calls) == 0:
+            removed.wait(5)
+            return 137
+        yield "stdout", command
+        return 0
+
+    mock_docker_service.exec_in_container.side_effect = run
+    mock_docker_service.stop_and_remove_container.side_effect = lambda c: removed.set()
+    events = service.speculate(0)
+
+    first = _events_until(events, StepStart)
+    changes.put({"objects", "index.lock"})  # Not the index itself
+    changes.put({"index"})  # Same tree as the running one
+    mock_git_service.write_index_tree.return_value = "tree2"
+    changes.put({"index"})
+    first += _events_until(events, PipelineCancelled)
+    assert removed.is_set()
+    assert not any(isinstance(e, StepEnd) for e in first)
+
+    second = _events_until(events, PipelineEnd)
+    assert second[0] == SpeculationStart(tree="tree2")
+    assert second[-1] == PipelineEnd(status="SUCCESS")
+    events.close()
+
+    # The pre-commit hook follows the run of its own tree only.
+    replayed = list(service.run(hook_type="pre-commit"))
+    assert replayed[-1] == PipelineEnd(status="SUCCESS")
+    assert all(e.reused for e in replayed if isinstance(e, StepEnd))
+
+
+def _line(text: str, step: str = "Test") -> LogLine:
+    return LogLine(line=f"{text}\n", stream="stdout", step_name=step)
+
+
+def test_event_channel_makes_steps_wait_for_room() -> None:
+    """Verify a full channel holds a step's next line until one is taken."""
+    channel = EventChannel(size=1, timeout=10)
+    channel.put(_line("first"))
+    producer = threading.Thread(target=channel.put, args=(_line("second"),))
+    producer.start()
+    producer.join(0.05)
+    assert producer.is_alive()
+
+    assert channel.get() == _line("first")
+    producer.join(5)
+    assert channel.get() == _line("second")
+
+
+def test_event_channel_suppresses_lines_under_overload(tmp_path: Path) -> None:
+    """
+    Verify lines finding no room are counted instead of forwarded, while
+    status events always pass and every line reaches the step's log.
+    """
+    logs = StepLogs(tmp_path)
+    channel = EventChannel(logs, size=1, timeout=0.01)
+    step = Step(name="Test", command="pytest")
+    channel.put(StepStart(step=step))
+    for i in range(5):
+        channel.put(_line(str(i)))
+    channel.put(StepEnd(step=step, status="SUCCESS", exit_code=0))
+    logs.close()
+
+    events = []
+    while not channel.empty():
+        events.append(channel.get())
+    assert events == [
+        StepStart(step=step),
+        _line("0"),
+        LogLinesSuppressed(step_name="Test", count=4, log_file=str(logs.path("Test"))),
+        StepEnd(step=step, status="SUCCESS", exit_code=0),
+    ]
+    assert logs.path("Test").read_text() == "0\n1\n2\n3\n4\n"
+
+
+def test_event_channel_reports_suppressed_lines_before_the_next_one() -> None:
+    """Verify an overloaded step forwards lines again, without waiting, once there is room."""
+    channel = EventChannel(size=1, timeout=0.01)
+    channel.put(_line("0"))
+    channel.put(_line("1"))
+    channel.put(_line("0", step="Other"))
+    assert channel.get() == _line("0")
+    channel.put(_line("2"))
+    assert channel.get() == LogLinesSuppressed(step_name="Test", count=1)
+    assert channel.get() == _line("2")
+    assert channel.empty()
+    channel.put(StepEnd(step=Step(name="Other", command="x"), status="SUCCESS", exit_code=0))
+    assert channel.get() == LogLinesSuppressed(step_name="Other", count=1)
+
+
+def test_scheduler_runs_as_many_steps_as_the_docker_service_takes(
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+) -> None:
+    """Verify independent steps run all at once when the Docker service can take them."""
+    steps = 12
+    mock_docker_service.capacity = steps
+    mock_config_handler.load_config_data.return_value = {
+        "version": LATEST_CONFIG_VERSION,
+        "docker": {"image": "python:3.10-slim"},
+        "steps": [{"name": f"S{i}", "command": "true"} for i in range(steps)],
+    }
+    barrier = threading.Barrier(steps, timeout=5)
+
+    def run(*args: Any, **kwargs: Any) -> Generator[Tuple[LogStream, str], None, int]:
+        barrier.wait()  # Breaks unless every step runs at the same time.
+        yield "stdout", "ok"
+        return 0
+
+    mock_docker_service.run_command_in_container.side_effect = run
+    service = CiExecutionService(
+        mock_git_service, mock_config_handler, mock_docker_service, mock_fs
+    )
+    events = list(service.run(hook_type=None))
+    assert events[-1] == PipelineEnd(status="SUCCESS")
+
+
+def test_run_refreshes_the_workspace_once(
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+    valid_config_dict: Dict[str, Any],
+    tmp_path: Path,
+) -> None:
+    """Verify each run has remote daemons take a new copy of the workspace, once."""
+    type(mock_git_service).git_root = PropertyMock(return_value=tmp_path)
+    mock_config_handler.load_config_data.return_value = valid_config_dict
+    mock_fs.file_exists.return_value = False
+    service = CiExecutionService(
+        mock_git_service, mock_config_handler, mock_docker_service, mock_fs
+    )
+    list(service.run(hook_type=None))
+    mock_docker_service.refresh_workspace.assert_called_once_with(tmp_path)
+
+
+def test_standard_pipeline_suppresses_a_log_flood(
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """Verify a step flooding a stalled UI is summarized, with every line stored."""
+    type(mock_git_service).git_root = PropertyMock(return_value=tmp_path)
+    mock_config_handler.load_config_data.return_value = {
+        "version": LATEST_CONFIG_VERSION,
+        "docker": {"image": "python:3.10-slim"},
+        "steps": [{"name": "Flood", "command": "yes"}],
+    }
+    flooded = threading.Event()
+
+    def flood(*args: Any, **kwargs: Any) -> Generator[Tuple[LogStream, str], None, int]:
+        for i in range(50):
+            yield "stdout", f"{i}\n"
+        flooded.set()
+        return 0
+
+    mock_docker_service.run_command_in_container.side_effect = flood
+    store = LocalStepLogStore()
+    service = CiExecutionService(
+        mock_git_service, mock_config_handler, mock_docker_service, mock_fs, step_logs=store
+    )
+    bounded = partial(EventChannel, size=1, timeout=0.01)
+    with patch("hookci.application.services.EventChannel", bounded):
+        events = service.run(hook_type=None)
+        seen = _events_until(events, LogLine)
+        assert flooded.wait(5)  # The UI stalls until the step is done.
+        seen += list(events)
+
+    suppressed = [e for e in seen if isinstance(e, LogLinesSuppressed)]
+    lines = [e for e in seen if isinstance(e, LogLine)]
+    assert suppressed and len(lines) + sum(e.count for e in suppressed) == 50
+    assert seen[-1] == PipelineEnd(status="SUCCESS")
+    [run] = store.runs(tmp_path)
+    logs = StepLogs(run)
+    assert logs.path("Flood").read_text() == "".join(f"{i}\n" for i in range(50))
+
+
+def test_run_stores_the_output_of_every_step(
+    mock_git_service: MagicMock,
+    mock_config_handler: MagicMock,
+    mock_docker_service: MagicMock,
+    mock_fs: MagicMock,
+    valid_config_dict: Dict[str, Any],
+    tmp_path: Path,
+) -> None:
+    type(mock_git_service).git_root = PropertyMock(return_value=tmp_path)
+    mock_config_handler.load_config_data.return_value = valid_config_dict
+    mock_fs.file_exists.return_value = False
+    store = LocalStepLogStore()
+    service = CiExecutionService(
+        mock_git_service, mock_config_handler, mock_docker_service, mock_fs, step_logs=store
+    )
+    list(service.run(hook_type=None))
+
+    names = [step["name"] for step in valid_config_dict["steps"]]
+    [run] = store.runs(tmp_path)
+    logs = StepLogs(run)
+    assert sorted(p.name for p in run.iterdir()) == sorted(
+        logs.path(name).name for name in names
+    )
+    assert all(logs.path(name).read_text() == "log line 1" for name in names)
@@ -18,15 +18,18 @@
 Tests for the domain configuration models.
 """
 import pytest
-from pydantic import ValidationError
+from pydantic import ByteSize, ValidationError
 
 from hookci.application.constants import LATEST_CONFIG_VERSION
 from hookci.domain.config import (
     Configuration,
     Docker,
     Hooks,
+    ImageGc,
     LogLevel,
+    Monorepo,
     Step,
+    StepGraph,
     create_default_config,
 )
 
@@ -83,6 +86,18 @@ def test_docker_model_validation() -> None:
         Docker()
 
 
+def test_docker_gc_policy() -> None:
+    """Verify the image GC policy parses human-readable sizes and stays optional."""
+    docker = Docker.model_validate(
+        {"dockerfile": "Dockerfile", "gc": {"keep": 2, "max_size": "10GB"}}
+    )
+    assert docker.gc == ImageGc(keep=2, max_size=ByteSize(10_000_000_000))
+    assert Docker(image="img").gc is None
+
+    with pytest.raises(ValidationError):
+        ImageGc(keep=0)
+
+
 def test_log_level_validation() -> None:
     """Verify that log_level accepts valid enum members and rejects invalid strings."""
     # Valid string that matches enum member. We ignore the mypy error because
@@ -140,3 +155,140 @@ def test_dag_validation_valid_diamond() -> None:
     ]
     config = Configuration(version="1.0", steps=steps)
     assert len(config.steps) == 4
+
+
+def test_dag_validation_reports_cycle_path() -> None:
+    """Verify the error names the steps on the cycle, not those downstream of it."""
+    steps = [
+        Step(name="Root", command="cmd"),
+        Step(name="A", command="cmd", depends_on=["Root", "C"]),
+        Step(name="B", command="cmd", depends_on=["A"]),
+        Step(name="C", command="cmd", depends_on=["B"]),
+        Step(name="Downstream", command="cmd", depends_on=["C"]),
+    ]
+    with pytest.raises(ValidationError) as excinfo:
+        Configuration(version="1.0", steps=steps)
+    assert "Circular dependency detected in steps: A -> C -> B -> A." in str(excinfo.value)
+
+
+def test_artifacts_add_implicit_dependencies() -> None:
+    """Verify a step needing an artifact waits for the step producing it."""
+    steps = [
+        Step(name="Test", command="cmd", needs_artifacts=["dist"]),
+        Step(name="Build", command="cmd", outputs=["dist"]),
+    ]
+    config = Configuration(version="1.0", steps=steps)
+    assert config.graph.order == ["Build", "Test"]
+    assert config.graph.dependencies["Test"] == ["Build"]
+    assert config.artifacts is None
+
+
+def test_artifacts_validation_errors() -> None:
+    """Verify artifacts have exactly one producer."""
+    with pytest.raises(ValidationError, match="Artifact 'dist' is produced by both 'A' and 'B'"):
+        Configuration(
+            version="1.0",
+            steps=[
+                Step(name="A", command="cmd", outputs=["dist"]),
+                Step(name="B", command="cmd", outputs=["dist"]),
+            ],
+        )
+    with pytest.raises(ValidationError, match="Step 'A' needs unknown artifact 'dist'"):
+        Configuration(
+            version="1.0",
+            steps=[Step(name="A", command="cmd", needs_artifacts=["dist"])],
+        )
+
+
+def test_snapshot_step_validation() -> None:
+    """Verify snapshot steps and key files come together, on critical steps only."""
+    step = Step(name="Setup", command="npm ci", snapshot=True, key_files=["package-lock.json"])
+    assert step.snapshot
+    with pytest.raises(ValidationError, match='Snapshot step "Setup" needs "key_files"'):
+        Step(name="Setup", command="npm ci", snapshot=True)
+    with pytest.raises(ValidationError, match="is not a snapshot step"):
+        Step(name="Setup", command="npm ci", key_files=["package-lock.json"])
+    with pytest.raises(ValidationError, match="must be critical"):
+        Step(
+            name="Setup", command="npm ci", snapshot=True, key_files=["a"], critical=False
+        )
+
+
+def test_host_steps_cannot_use_images_or_artifacts() -> None:
+    assert Step(name="Lint", command="ruff", executor="host").executor == "host"
+    assert Step(name="Test", command="pytest", executor="sandbox").executor == "sandbox"
+    with pytest.raises(ValidationError, match="only \"docker\" steps"):
+        Step(name="Lint", command="ruff", executor="host", outputs=["report"])
+    with pytest.raises(ValidationError, match="only \"docker\" steps"):
+        Step(name="Setup", command="npm ci", executor="host", snapshot=True, key_files=["a"])
+    with pytest.raises(ValidationError, match="only \"docker\" steps"):
+        Step(name="Test", command="pytest", executor="sandbox", needs_artifacts=["build"])
+    with pytest.raises(ValidationError):
+        Step.model_validate({"name": "Lint", "command": "ruff", "executor": "vm"})
+
+
+def test_step_graph_levels_and_critical_path() -> None:
+    """Verify the graph is sorted once, with levels and longest chains per step."""
+    steps = [
+        Step(name="End", command="cmd", depends_on=["A", "B"]),
+        Step(name="Start", command="cmd"),
+        Step(name="A", command="cmd", depends_on=["Start", "Start"]),
+        Step(name="B", command="cmd", depends_on=["A"]),
+        Step(name="Lone", command="cmd"),
+    ]
+    graph = Configuration(version="1.0", steps=steps).graph
+
+    assert graph.order == ["Start", "Lone", "A", "B", "End"]
+    assert graph.levels == [["Start", "Lone"], ["A"], ["B"], ["End"]]
+    assert graph.dependencies["A"] == ["Start"]
+    assert graph.dependents["A"] == ["End", "B"]
+    assert graph.critical_path == {"End": 1, "Start": 4, "A": 3, "B": 2, "Lone": 1}
+
+
+def test_step_graph_closures() -> None:
+    """Verify ancestors and descendants follow dependencies transitively."""
+    steps = [
+        Step(name="Build", command="cmd"),
+        Step(name="Lint", command="cmd"),
+        Step(name="Test", command="cmd", depends_on=["Build", "Lint"]),
+        Step(name="Deploy", command="cmd", depends_on=["Test"]),
+        Step(name="Docs", command="cmd", depends_on=["Build"]),
+    ]
+    graph = StepGraph.build(steps)
+    assert graph.ancestors(["Deploy"]) == {"Deploy", "Test", "Build", "Lint"}
+    assert graph.ancestors(["Docs", "Lint"]) == {"Docs", "Build", "Lint"}
+    assert graph.descendants(["Build"]) == {"Build", "Test", "Deploy", "Docs"}
+    assert graph.descendants(["Deploy"]) == {"Deploy"}
+
+
+def test_step_graph_handles_long_chains() -> None:
+    """Verify validation does not recurse, so chains beyond the recursion limit pass."""
+    steps = [Step(name="s0", command="cmd")] + [
+        Step(name=f"s{i}", command="cmd", depends_on=[f"s{i - 1}"]) for i in range(1, 5000)
+    ]
+    graph = StepGraph.build(steps)
+    assert len(graph.levels) == 5000
+    assert graph.critical_path["s0"] == 5000
+
+
+def test_monorepo_affected_packages() -> None:
+    """Verify paths go to their deepest package and changes reach every user."""
+    monorepo = Monorepo(
+        packages=["packages/*"],
+        dependencies={
+            "packages/api": ["packages/core"],
+            "packages/web": ["packages/api"],
+            "packages/core": ["packages/web"],  # Cycles must not loop forever
+            "packages/docs": ["."],
+        },
+    )
+    packages = ["packages/core", "packages/api", "packages/web", "packages/core/sub", "packages/docs"]
+
+    assert monorepo.affected(packages, ["packages/core/sub/x.py"]) == {"packages/core/sub"}
+    assert monorepo.affected(packages, ["packages/api/main.py"]) == {
+        "packages/api",
+        "packages/web",
+        "packages/core",
+    }
+    assert monorepo.affected(packages, ["README.md"]) == {".", "packages/docs"}
+    assert monorepo.affected(packages, []) == set()
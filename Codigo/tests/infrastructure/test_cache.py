@@ -0,0 +1,59 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Tests for the helpers shared by the on-disk stores."""
+from pathlib import Path
+
+import pytest
+
+from hookci.infrastructure.cache import atomic_write, cache_dir
+
+
+def test_cache_dir_is_created_only_on_request(tmp_path: Path) -> None:
+    directory = cache_dir(tmp_path)
+    assert directory == tmp_path / ".hookci" / "cache"
+    assert not directory.exists()
+
+    assert cache_dir(tmp_path, create=True) == directory
+    assert (directory / ".gitignore").read_text() == "*\n"
+
+
+def test_cache_dir_keeps_an_edited_gitignore(tmp_path: Path) -> None:
+    gitignore = cache_dir(tmp_path, create=True) / ".gitignore"
+    gitignore.write_text("*\n!keep\n")
+    cache_dir(tmp_path, create=True)
+    assert gitignore.read_text() == "*\n!keep\n"
+
+
+def test_atomic_write_replaces_the_file(tmp_path: Path) -> None:
+    path = tmp_path / "data.json"
+    path.write_text("old")
+    with atomic_write(path) as tmp:
+        tmp.write_text("new")
+        assert path.read_text() == "old"
+    assert path.read_text() == "new"
+    assert [p.name for p in tmp_path.iterdir()] == ["data.json"]
+
+
+def test_failed_atomic_write_leaves_the_file_alone(tmp_path: Path) -> None:
+    path = tmp_path / "data.json"
+    path.write_text("old")
+    with pytest.raises(RuntimeError):
+        with atomic_write(path) as tmp:
+            tmp.write_text("half")
+            raise RuntimeError("interrupted")
+    assert path.read_text() == "old"
+    assert [p.name for p in tmp_path.iterdir()] == ["data.json"]
@@ -0,0 +1,61 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Tests for the run checkpoint store."""
+from pathlib import Path
+
+import pytest
+
+from hookci.infrastructure.checkpoint import Checkpoint, JsonCheckpointStore, StepRecord
+from hookci.infrastructure.errors import FileSystemError
+
+
+@pytest.fixture
+def checkpoint() -> Checkpoint:
+    return Checkpoint(
+        tree_hash="tree",
+        config_hash="config",
+        steps={"Build": StepRecord(status="SUCCESS", key="k1")},
+    )
+
+
+def test_save_and_load(tmp_path: Path, checkpoint: Checkpoint) -> None:
+    """Verify the checkpoint round-trips and its directory stays out of commits."""
+    store = JsonCheckpointStore()
+    assert store.load(tmp_path) is None
+
+    store.save(tmp_path, checkpoint)
+    assert store.load(tmp_path) == checkpoint
+    path = store.path(tmp_path)
+    assert path == tmp_path / ".hookci" / "cache" / "checkpoint.json"
+    assert (path.parent / ".gitignore").read_text() == "*\n"
+    assert not list(path.parent.glob(".checkpoint.json-*"))
+
+
+def test_unreadable_checkpoint_is_ignored(
+    tmp_path: Path, caplog: pytest.LogCaptureFixture
+) -> None:
+    store = JsonCheckpointStore()
+    store.path(tmp_path).parent.mkdir(parents=True)
+    store.path(tmp_path).write_text('{"tree_hash": 1}')
+    assert store.load(tmp_path) is None
+    assert "Ignoring unreadable checkpoint" in caplog.text
+
+
+def test_save_failure_is_reported(tmp_path: Path, checkpoint: Checkpoint) -> None:
+    (tmp_path / ".hookci").write_text("not a directory")
+    with pytest.raises(FileSystemError, match="Failed to write checkpoint"):
+        JsonCheckpointStore().save(tmp_path, checkpoint)
@@ -0,0 +1,399 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Tests for the multi-daemon Docker cluster service."""
+import os
+import threading
+from pathlib import Path
+from typing import Any, Generator, List, Tuple, cast
+from unittest.mock import MagicMock, create_autospec
+
+import pytest
+
+from hookci.application.events import LogStream
+from hookci.application.results import ImageInfo
+from hookci.infrastructure.cluster import (
+    DockerClusterService,
+    DockerEndpoint,
+    parse_docker_hosts,
+)
+from hookci.infrastructure.docker import DockerService, VolumeMount
+from hookci.infrastructure.errors import DockerError
+
+
+def _mock_service() -> MagicMock:
+    """Creates a DockerService double whose commands succeed immediately."""
+    service = cast(MagicMock, create_autospec(DockerService, instance=True))
+
+    def run_success(
+        *args: Any, **kwargs: Any
+    ) -> Generator[Tuple[LogStream, str], None, int]:
+        yield "stdout", "ok\n"
+        return 0
+
+    def build_success(*args: Any, **kwargs: Any) -> Generator[Tuple[int, str], None, None]:
+        yield 1, "Step 1/1 : FROM scratch"
+
+    def pull_success(*args: Any, **kwargs: Any) -> Generator[None, None, None]:
+        yield
+
+    service.run_command_in_container.side_effect = run_success
+    service.build_image.side_effect = build_success
+    service.pull_image.side_effect = pull_success
+    service.image_exists.return_value = False
+    return service
+
+
+@pytest.fixture
+def services() -> List[MagicMock]:
+    return [_mock_service(), _mock_service()]
+
+
+@pytest.fixture
+def cluster(services: List[MagicMock]) -> DockerClusterService:
+    endpoints = [
+        DockerEndpoint(url="unix:///var/run/docker.sock", capacity=1),
+        DockerEndpoint(url="tcp://buildbox:2375", capacity=3),
+    ]
+    return DockerClusterService(endpoints, services=cast(List[DockerService], services))
+
+
+def test_parse_docker_hosts() -> None:
+    """Verify endpoint lists are parsed with optional capacities."""
+    endpoints = parse_docker_hosts("unix:///var/run/docker.sock=4, tcp://box:2375 ,ssh://u@h")
+    assert endpoints == [
+        DockerEndpoint(url="unix:///var/run/docker.sock", capacity=4),
+        DockerEndpoint(url="tcp://box:2375", capacity=1),
+        DockerEndpoint(url="ssh://u@h", capacity=1),
+    ]
+
+
+def test_parse_docker_hosts_empty() -> None:
+    """Verify an empty endpoint list is rejected."""
+    with pytest.raises(DockerError, match="No Docker endpoints"):
+        parse_docker_hosts(" , ")
+
+
+def test_cluster_requires_endpoints() -> None:
+    """Verify a cluster cannot be built without endpoints."""
+    with pytest.raises(DockerError, match="At least one Docker endpoint"):
+        DockerClusterService([])
+
+
+def test_cluster_capacity(cluster: DockerClusterService) -> None:
+    assert cluster.capacity == 4
+
+
+def test_image_id_is_shared_when_endpoints_agree(
+    cluster: DockerClusterService, services: List[MagicMock]
+) -> None:
+    for service in services:
+        service.image_id.return_value = "sha256:same"
+    assert cluster.image_id("python:3.12") == "sha256:same"
+
+
+def test_image_id_does_not_depend_on_endpoint_order(
+    cluster: DockerClusterService, services: List[MagicMock]
+) -> None:
+    """Verify an image built on each endpoint gets one ID, whichever endpoint comes first."""
+    services[0].image_id.return_value = "sha256:a"
+    services[1].image_id.return_value = "sha256:b"
+    combined = cluster.image_id("hookci/repo:abc")
+    assert combined not in ("sha256:a", "sha256:b")
+
+    services[0].image_id.return_value = "sha256:b"
+    services[1].image_id.return_value = "sha256:a"
+    assert cluster.image_id("hookci/repo:abc") == combined
+
+    services[1].image_id.return_value = "sha256:c"
+    assert cluster.image_id("hookci/repo:abc") != combined
+
+
+def test_run_places_steps_on_least_loaded_endpoint(
+    cluster: DockerClusterService, services: List[MagicMock], tmp_path: Path
+) -> None:
+    """Verify placement follows the load-to-capacity ratio of each endpoint."""
+    running = [
+        cluster.run_command_in_container("img", f"cmd{i}", tmp_path) for i in range(4)
+    ]
+    for gen in running:
+        next(gen)  # Start each step so it holds its slot
+
+    assert services[0].run_command_in_container.call_count == 1
+    assert services[1].run_command_in_container.call_count == 3
+
+    for gen in running:
+        assert list(gen) == []
+    assert cluster._active == [0, 0]
+
+
+def test_run_waits_for_a_free_slot(
+    cluster: DockerClusterService, services: List[MagicMock], tmp_path: Path
+) -> None:
+    """Verify a step beyond the total capacity blocks until a slot frees up."""
+    running = [
+        cluster.run_command_in_container("img", f"cmd{i}", tmp_path) for i in range(4)
+    ]
+    for gen in running:
+        next(gen)
+
+    started = threading.Event()
+
+    def fifth_step() -> None:
+        list(cluster.run_command_in_container("img", "cmd4", tmp_path))
+        started.set()
+
+    thread = threading.Thread(target=fifth_step)
+    thread.start()
+    assert not started.wait(timeout=0.1)
+
+    list(running[0])
+    thread.join(timeout=2)
+    assert started.is_set()
+    for gen in running[1:]:
+        list(gen)
+
+
+def test_run_releases_slot_on_error(
+    cluster: DockerClusterService, services: List[MagicMock], tmp_path: Path
+) -> None:
+    """Verify a failing step gives its slot back."""
+    services[1].run_command_in_container.side_effect = DockerError("boom")
+    with pytest.raises(DockerError):
+        list(cluster.run_command_in_container("img", "cmd", tmp_path))
+    assert cluster._active == [0, 0]
+
+
+def test_image_exists_requires_every_endpoint(
+    cluster: DockerClusterService, services: List[MagicMock]
+) -> None:
+    services[0].image_exists.return_value = True
+    assert cluster.image_exists("img") is False
+    services[1].image_exists.return_value = True
+    assert cluster.image_exists("img") is True
+
+
+def test_pull_image_only_on_missing_endpoints(
+    cluster: DockerClusterService, services: List[MagicMock]
+) -> None:
+    services[0].image_exists.return_value = True
+    list(cluster.pull_image("img"))
+    services[0].pull_image.assert_not_called()
+    services[1].pull_image.assert_called_once_with("img")
+
+
+def test_pull_image_failure_is_reported(
+    cluster: DockerClusterService, services: List[MagicMock]
+) -> None:
+    services[1].pull_image.side_effect = DockerError("no registry")
+    with pytest.raises(DockerError, match="Failed to pull 'img' on every endpoint"):
+        list(cluster.pull_image("img"))
+
+
+def test_build_image_on_every_missing_endpoint(
+    cluster: DockerClusterService, services: List[MagicMock], tmp_path: Path
+) -> None:
+    """Verify progress comes from one endpoint while the others build too."""
+    progress = list(cluster.build_image(tmp_path / "Dockerfile", "tag"))
+    assert progress == [(1, "Step 1/1 : FROM scratch")]
+    services[0].build_image.assert_called_once()
+    services[1].build_image.assert_called_once()
+
+
+def test_build_image_skipped_when_present_everywhere(
+    cluster: DockerClusterService, services: List[MagicMock], tmp_path: Path
+) -> None:
+    for service in services:
+        service.image_exists.return_value = True
+    assert list(cluster.build_image(tmp_path / "Dockerfile", "tag")) == []
+    services[0].build_image.assert_not_called()
+
+
+def test_build_image_secondary_failure(
+    cluster: DockerClusterService, services: List[MagicMock], tmp_path: Path
+) -> None:
+    services[1].build_image.side_effect = DockerError("disk full")
+    with pytest.raises(DockerError, match="secondary endpoint"):
+        list(cluster.build_image(tmp_path / "Dockerfile", "tag"))
+
+
+def test_dockerfile_helpers_delegate(
+    cluster: DockerClusterService, services: List[MagicMock], tmp_path: Path
+) -> None:
+    services[0].count_dockerfile_steps.return_value = 3
+    services[0].calculate_dockerfile_hash.return_value = "abc"
+    assert cluster.count_dockerfile_steps(tmp_path) == 3
+    assert cluster.calculate_dockerfile_hash(tmp_path) == "abc"
+
+
+def test_list_images_merges_endpoints(
+    cluster: DockerClusterService, services: List[MagicMock]
+) -> None:
+    """Verify each tag is reported once, with its largest size."""
+    services[0].list_images.return_value = [
+        ImageInfo(tag="hookci/repo:a", size=10),
+        ImageInfo(tag="hookci/repo:b", size=20),
+    ]
+    services[1].list_images.return_value = [ImageInfo(tag="hookci/repo:a", size=30)]
+    images = cluster.list_images("hookci/repo")
+    assert sorted((i.tag, i.size) for i in images) == [
+        ("hookci/repo:a", 30),
+        ("hookci/repo:b", 20),
+    ]
+
+
+def test_remove_image_on_every_endpoint(
+    cluster: DockerClusterService, services: List[MagicMock]
+) -> None:
+    cluster.remove_image("hookci/repo:a")
+    for service in services:
+        service.remove_image.assert_called_once_with("hookci/repo:a")
+
+    services[0].remove_image.side_effect = DockerError("in use")
+    with pytest.raises(DockerError, match="remove image"):
+        cluster.remove_image("hookci/repo:a")
+
+
+def test_steps_follow_their_volume(
+    cluster: DockerClusterService, services: List[MagicMock], tmp_path: Path
+) -> None:
+    """Verify a volume lives on one endpoint and steps mounting it run there."""
+    cluster.create_volume("vol")
+    services[1].create_volume.assert_called_once_with("vol")
+
+    # With the larger endpoint full, an unpinned step would go to the other one.
+    cluster._active = [0, 3]
+    released = threading.Event()
+
+    def pinned_step() -> None:
+        list(
+            cluster.run_command_in_container(
+                "img", "cmd", tmp_path, volumes=[VolumeMount(name="vol", target="/a")]
+            )
+        )
+        released.set()
+
+    thread = threading.Thread(target=pinned_step)
+    thread.start()
+    assert not released.wait(timeout=0.1)
+    cluster._release(1)
+    thread.join(timeout=2)
+    assert released.is_set()
+    services[0].run_command_in_container.assert_not_called()
+    services[1].run_command_in_container.assert_called_once()
+
+    cluster.remove_volume("vol")
+    services[1].remove_volume.assert_called_once_with("vol")
+    cluster.remove_volume("vol")
+    assert services[1].remove_volume.call_count == 1
+
+
+def test_step_cannot_span_volume_endpoints(
+    cluster: DockerClusterService, tmp_path: Path
+) -> None:
+    cluster._volume_owners.update({"a": 0, "b": 1})
+    volumes = [VolumeMount(name="a", target="/a"), VolumeMount(name="b", target="/b")]
+    with pytest.raises(DockerError, match="different endpoints"):
+        list(cluster.run_command_in_container("img", "cmd", tmp_path, volumes=volumes))
+
+
+def test_persistent_containers_are_pinned(
+    cluster: DockerClusterService, services: List[MagicMock], tmp_path: Path
+) -> None:
+    """Verify exec and removal go to the endpoint that started the container."""
+    services[1].start_persistent_container.return_value = "c1"
+    services[1].exec_in_container.side_effect = services[1].run_command_in_container.side_effect
+
+    container_id = cluster.start_persistent_container("img", tmp_path)
+    assert container_id == "c1"
+    assert cluster._active == [0, 1]
+
+    assert list(cluster.exec_in_container("c1", "ls")) == [("stdout", "ok\n")]
+    cluster.stop_and_remove_container("c1")
+    services[1].stop_and_remove_container.assert_called_once_with("c1")
+    assert cluster._active == [0, 0]
+
+
+def test_persistent_container_start_failure_releases_slot(
+    cluster: DockerClusterService, services: List[MagicMock], tmp_path: Path
+) -> None:
+    services[1].start_persistent_container.side_effect = DockerError("boom")
+    with pytest.raises(DockerError):
+        cluster.start_persistent_container("img", tmp_path)
+    assert cluster._active == [0, 0]
+
+
+def test_commit_copies_the_image_to_other_endpoints(
+    cluster: DockerClusterService, services: List[MagicMock], tmp_path: Path
+) -> None:
+    services[1].start_persistent_container.return_value = "c1"
+    services[1].save_image.return_value = iter([b"tar"])
+    cluster.start_persistent_container("img", tmp_path)
+
+    cluster.commit_container("c1", "hookci/repo-setup:abc")
+    services[1].commit_container.assert_called_once_with("c1", "hookci/repo-setup:abc")
+    services[0].load_image.assert_called_once()
+    assert list(services[0].load_image.call_args[0][0]) == [b"tar"]
+    services[1].load_image.assert_not_called()
+
+
+def test_load_image_on_every_endpoint(
+    cluster: DockerClusterService, services: List[MagicMock]
+) -> None:
+    """Verify each endpoint reads the whole archive."""
+    loaded: List[bytes] = []
+    for service in services:
+        service.load_image.side_effect = lambda tar: loaded.append(b"".join(tar))
+    cluster.load_image([b"layer-1", b"layer-2"])
+    assert loaded == [b"layer-1layer-2"] * len(services)
+
+
+def test_unknown_container_is_rejected(cluster: DockerClusterService) -> None:
+    with pytest.raises(DockerError, match="not managed by this cluster"):
+        list(cluster.exec_in_container("nope", "ls"))
+
+
+@pytest.mark.skipif(
+    "HOOKCI_TEST_DOCKER_HOSTS" not in os.environ,
+    reason="Set HOOKCI_TEST_DOCKER_HOSTS to run against real Docker daemons.",
+)
+def test_cluster_against_real_daemons(tmp_path: Path) -> None:
+    """
+    Runs a step on every endpoint listed in HOOKCI_TEST_DOCKER_HOSTS, e.g. a
+    second local dockerd started with `dockerd -H tcp://127.0.0.1:2375
+    --data-root /tmp/d2 --exec-root /tmp/d2x --pidfile /tmp/d2.pid --bridge none`.
+    """
+    (tmp_path / "marker.txt").write_text("synced\n")
+    endpoints = parse_docker_hosts(os.environ["HOOKCI_TEST_DOCKER_HOSTS"])
+    cluster = DockerClusterService(
+        [DockerEndpoint(url=e.url, capacity=1) for e in endpoints]
+    )
+    if not cluster.image_exists("alpine:3"):
+        list(cluster.pull_image("alpine:3"))
+
+    # Keep every step open so each lands on a different endpoint.
+    running = [
+        cluster.run_command_in_container("alpine:3", "cat marker.txt", tmp_path)
+        for _ in endpoints
+    ]
+    for gen in running:
+        output = [next(gen)[1]]
+        try:
+            while True:
+                output.append(next(gen)[1])
+        except StopIteration as e:
+            assert e.value == 0
+        assert "".join(output) == "synced\n"
@@ -15,16 +15,29 @@
 # along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
 
 """Tests for the Docker infrastructure service."""
+import http.server
+import json
+import logging
+import os
+import re
+import socketserver
 import struct
+import threading
 from pathlib import Path
-from typing import Generator
+from typing import Dict, Generator, List
 from unittest.mock import MagicMock, patch
 
 import pytest
-from docker.errors import APIError, BuildError, DockerException, ImageNotFound
+from docker.errors import APIError, BuildError, DockerException, ImageNotFound, NotFound
 
-from hookci.infrastructure.docker import DockerService
+from hookci.application.constants import LATEST_CONFIG_VERSION
+from hookci.application.events import LogLine, StepEnd
+from hookci.application.services import CiExecutionService, StepPlacement
+from hookci.domain.config import Configuration, Docker, Step
+from hookci.infrastructure.docker import DockerService, VolumeMount
 from hookci.infrastructure.errors import DockerError
+from hookci.infrastructure.reaper import RUN_ID
+from hookci.tracing import latency
 
 
 @pytest.fixture
@@ -34,12 +47,13 @@ def mock_docker_client() -> MagicMock:
 
 
 @pytest.fixture
-def docker_service(mock_docker_client: MagicMock) -> DockerService:
+def docker_service(mock_docker_client: MagicMock) -> Generator[DockerService, None, None]:
     """Provides a DockerService instance with a mocked client."""
     with patch("docker.from_env", return_value=mock_docker_client):
         service = DockerService()
         mock_docker_client.ping.assert_called_once()
-        return service
+    yield service
+    service.reaper.close()
 
 
 def test_docker_service_init_failure() -> None:
@@ -79,6 +93,75 @@ def test_image_exists_api_error(
         docker_service.image_exists("my-tag")
 
 
+def test_image_id(docker_service: DockerService, mock_docker_client: MagicMock) -> None:
+    mock_docker_client.images.get.return_value.id = "sha256:abc"
+    assert docker_service.image_id("my-tag") == "sha256:abc"
+    mock_docker_client.images.get.side_effect = ImageNotFound("not found")  # type: ignore[no-untyped-call]
+    with pytest.raises(DockerError, match="inspecting image 'my-tag'"):
+        docker_service.image_id("my-tag")
+
+
+def test_list_images_filters_repository(
+    docker_service: DockerService, mock_docker_client: MagicMock
+) -> None:
+    """Verify one API call lists the repository's tags and drops foreign ones."""
+    mock_docker_client.api.images.return_value = [
+        {"RepoTags": ["hookci/repo:a", "other:latest"], "Size": 100},
+        {"RepoTags": None, "Size": 5},
+        {"RepoTags": ["hookci/repo:b"], "Size": None},
+    ]
+    images = docker_service.list_images("hookci/repo")
+    assert [(i.tag, i.size) for i in images] == [("hookci/repo:a", 100), ("hookci/repo:b", 0)]
+    mock_docker_client.api.images.assert_called_once_with(name="hookci/repo")
+
+
+def test_list_images_api_error(
+    docker_service: DockerService, mock_docker_client: MagicMock
+) -> None:
+    mock_docker_client.api.images.side_effect = APIError("server error")  # type: ignore[no-untyped-call]
+    with pytest.raises(DockerError, match="listing images"):
+        docker_service.list_images("hookci/repo")
+
+
+def test_remove_image(
+    docker_service: DockerService, mock_docker_client: MagicMock
+) -> None:
+    """Verify removal tolerates images that are already gone."""
+    docker_service.remove_image("hookci/repo:a")
+    mock_docker_client.api.remove_image.assert_called_once_with("hookci/repo:a")
+
+    mock_docker_client.api.remove_image.side_effect = ImageNotFound("gone")  # type: ignore[no-untyped-call]
+    docker_service.remove_image("hookci/repo:a")
+
+    mock_docker_client.api.remove_image.side_effect = APIError("conflict")  # type: ignore[no-untyped-call]
+    with pytest.raises(DockerError, match="Could not remove image"):
+        docker_service.remove_image("hookci/repo:a")
+
+
+def test_create_and_remove_volume(
+    docker_service: DockerService, mock_docker_client: MagicMock
+) -> None:
+    """Verify volumes carry the run labels and removal tolerates missing ones."""
+    docker_service.create_volume("hookci-artifacts-1")
+    kwargs = mock_docker_client.api.create_volume.call_args.kwargs
+    assert kwargs["name"] == "hookci-artifacts-1"
+    assert kwargs["labels"]["hookci.run-id"] == RUN_ID
+
+    docker_service.remove_volume("hookci-artifacts-1")
+    mock_docker_client.api.remove_volume.assert_called_once_with(
+        "hookci-artifacts-1", force=True
+    )
+    mock_docker_client.api.remove_volume.side_effect = NotFound("gone")  # type: ignore[no-untyped-call]
+    docker_service.remove_volume("hookci-artifacts-1")
+
+    mock_docker_client.api.remove_volume.side_effect = APIError("in use")  # type: ignore[no-untyped-call]
+    with pytest.raises(DockerError, match="Could not remove volume"):
+        docker_service.remove_volume("hookci-artifacts-1")
+    mock_docker_client.api.create_volume.side_effect = APIError("no space")  # type: ignore[no-untyped-call]
+    with pytest.raises(DockerError, match="Could not create volume"):
+        docker_service.create_volume("hookci-artifacts-1")
+
+
 def test_pull_image_success(
     docker_service: DockerService, mock_docker_client: MagicMock
 ) -> None:
@@ -236,20 +319,38 @@ def test_demultiplex_docker_stream_incomplete_final_chunk(
     assert logs == [("stdout", "hello"), ("stdout", "world")]
 
 
+@pytest.fixture
+def mock_read_socket() -> Generator[MagicMock, None, None]:
+    """Patches the raw socket reader used for attached containers."""
+    with patch("hookci.infrastructure.docker.read_socket") as mock:
+        mock.return_value = b""
+        yield mock
+
+
+def _setup_run(
+    mock_docker_client: MagicMock, mock_read_socket: MagicMock, chunks: List[bytes], status: int
+) -> MagicMock:
+    """Configures the low-level API for one container run and returns it."""
+    api: MagicMock = mock_docker_client.api
+    api.create_container.return_value = {"Id": "c1"}
+    api.wait.return_value = {"StatusCode": status}
+    mock_read_socket.side_effect = [*chunks, b""]
+    return api
+
+
 def test_run_command_success_demultiplexes_and_returns_code(
-    docker_service: DockerService, mock_docker_client: MagicMock, tmp_path: Path
+    docker_service: DockerService,
+    mock_docker_client: MagicMock,
+    mock_read_socket: MagicMock,
+    tmp_path: Path,
 ) -> None:
     """Verify a command runs, yields demultiplexed logs, and returns the correct exit code."""
-    mock_container = MagicMock()
-    mock_docker_client.containers.run.return_value = mock_container
-    log_stream = create_docker_log_stream(
-        [(1, "stdout line 1\n"), (2, "stderr line 1\n")]
+    log_stream = b"".join(
+        create_docker_log_stream([(1, "stdout line 1\n"), (2, "stderr line 1\n")])
     )
-    mock_container.logs.return_value = log_stream
-    mock_container.wait.return_value = {"StatusCode": 0}
-    command_str = "pytest"
+    api = _setup_run(mock_docker_client, mock_read_socket, [log_stream[:5], log_stream[5:]], 3)
     command_generator = docker_service.run_command_in_container(
-        image="my-image", command=command_str, workdir=tmp_path, env={"CI": "true"}
+        image="my-image", command="pytest", workdir=tmp_path, env={"CI": "true"}
     )
     logs = []
     exit_code = -1
@@ -259,51 +360,152 @@ def test_run_command_success_demultiplexes_and_returns_code(
     except StopIteration as e:
         exit_code = e.value
     assert logs == [("stdout", "stdout line 1\n"), ("stderr", "stderr line 1\n")]
-    assert exit_code == 0
-    mock_container.remove.assert_called_once()
+    assert exit_code == 3
+
+    assert api.create_container.call_args.kwargs["environment"] == {"CI": "true"}
+    api.wait.assert_called_once_with("c1")
+    api.attach_socket.return_value.close.assert_called_once()
+    # The stopped container is removed off the step's critical path.
+    docker_service.reaper.flush()
+    api.remove_container.assert_called_once_with("c1", force=True)
+
+
+def test_run_command_attaches_and_waits_before_start(
+    docker_service: DockerService,
+    mock_docker_client: MagicMock,
+    mock_read_socket: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """Verify no output can be missed, whatever the step's duration."""
+    api = _setup_run(mock_docker_client, mock_read_socket, [], 0)
+    list(docker_service.run_command_in_container("img", "true", tmp_path))
+
+    calls = [c[0] for c in api.mock_calls if c[0] in ("create_container", "attach_socket", "start", "wait")]
+    assert calls == ["create_container", "attach_socket", "start", "wait"]
+
+
+def test_run_command_mounts_volumes(
+    docker_service: DockerService,
+    mock_docker_client: MagicMock,
+    mock_read_socket: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """Verify named volumes are bound next to the workspace with their mode."""
+    api = _setup_run(mock_docker_client, mock_read_socket, [], 0)
+    volumes = [
+        VolumeMount(name="out", target="/artifacts"),
+        VolumeMount(name="ref", target="/ref", read_only=True),
+    ]
+    list(docker_service.run_command_in_container("img", "true", tmp_path, volumes=volumes))
+
+    binds = api.create_host_config.call_args.kwargs["binds"]
+    assert binds["out"] == {"bind": "/artifacts", "mode": "rw"}
+    assert binds["ref"] == {"bind": "/ref", "mode": "ro"}
+    assert len(binds) == 3
+
+
+def test_run_command_records_phase_latency(
+    docker_service: DockerService,
+    mock_docker_client: MagicMock,
+    mock_read_socket: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """Verify each lifecycle phase is counted."""
+    _setup_run(mock_docker_client, mock_read_socket, [], 0)
+    mock_read_socket.side_effect = None  # Every run ends at once
+    latency.reset()
+    for _ in range(2):
+        list(docker_service.run_command_in_container("img", "true", tmp_path))
+
+    docker_service.reaper.flush()
+    summary = latency.summary()
+    for phase in ("create", "attach", "start", "wait", "remove"):
+        assert summary[f"container.{phase}"].count == 2
+
+
+def test_run_command_retries_interrupted_reads(
+    docker_service: DockerService,
+    mock_docker_client: MagicMock,
+    mock_read_socket: MagicMock,
+    tmp_path: Path,
+) -> None:
+    log_stream = b"".join(create_docker_log_stream([(1, "ok\n")]))
+    _setup_run(mock_docker_client, mock_read_socket, [None, log_stream], 0)  # type: ignore[list-item]
+    assert list(docker_service.run_command_in_container("img", "cmd", tmp_path)) == [
+        ("stdout", "ok\n")
+    ]
 
 
 def test_run_command_no_cleanup_if_container_fails_to_create(
-    docker_service: DockerService, mock_docker_client: MagicMock, tmp_path: Path
+    docker_service: DockerService,
+    mock_docker_client: MagicMock,
+    mock_read_socket: MagicMock,
+    tmp_path: Path,
 ) -> None:
-    """Verify container.remove is not called if the container object is never created."""
-    mock_container = MagicMock()
-    # Mock the run call to first assign the mock, then raise an error.
-    # This is a bit tricky, so we'll just check that remove is not called on the mock.
-    mock_docker_client.containers.run.side_effect = APIError("server error")  # type: ignore[no-untyped-call]
+    """Verify no removal is attempted if the container is never created."""
+    mock_docker_client.api.create_container.side_effect = APIError("server error")  # type: ignore[no-untyped-call]
 
     with pytest.raises(DockerError):
-        # We need a new mock for each test to check call counts accurately
-        docker_service.client.containers.run.return_value = mock_container
         list(docker_service.run_command_in_container("img", "cmd", tmp_path))
 
-    # The key assertion: remove should not have been called because the 'container'
-    # variable in the try block was never successfully assigned.
-    mock_container.remove.assert_not_called()
+    mock_docker_client.api.remove_container.assert_not_called()
+    mock_docker_client.api.start.assert_not_called()
 
 
-def test_run_command_cleanup_failure_is_logged(
-    docker_service: DockerService, mock_docker_client: MagicMock, tmp_path: Path
+def test_run_command_removes_container_when_interrupted(
+    docker_service: DockerService,
+    mock_docker_client: MagicMock,
+    mock_read_socket: MagicMock,
+    tmp_path: Path,
 ) -> None:
-    """Verify that exceptions during container cleanup are logged and do not crash."""
-    mock_container = MagicMock()
-    mock_docker_client.containers.run.return_value = mock_container
-    # Set up the container to fail on remove
-    mock_container.remove.side_effect = DockerException("Cleanup failure")
-    mock_container.wait.return_value = {"StatusCode": 0}
-    mock_container.logs.return_value = iter([])
+    """Verify a step closed before its container exits removes the container."""
+    log_stream = b"".join(create_docker_log_stream([(1, "working\n")]))
+    api = _setup_run(mock_docker_client, mock_read_socket, [log_stream], 0)
+    command_generator = docker_service.run_command_in_container("img", "cmd", tmp_path)
+    next(command_generator)
+    command_generator.close()
 
-    with patch("hookci.infrastructure.docker.logger") as mock_logger:
+    docker_service.reaper.flush()
+    api.remove_container.assert_called_once_with("c1", force=True)
+
+
+def test_run_command_failed_start_hands_container_to_reaper(
+    docker_service: DockerService,
+    mock_docker_client: MagicMock,
+    mock_read_socket: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """Verify a container that never started is removed in the background."""
+    api = _setup_run(mock_docker_client, mock_read_socket, [], 0)
+    api.start.side_effect = APIError("port in use")  # type: ignore[no-untyped-call]
+
+    with pytest.raises(DockerError, match="port in use"):
         list(docker_service.run_command_in_container("img", "cmd", tmp_path))
-        mock_logger.warning.assert_called_once()
-        assert "Failed to remove transient container" in mock_logger.warning.call_args[0][0]
+
+    docker_service.reaper.flush()
+    api.remove_container.assert_called_once_with("c1", force=True)
+
+
+def test_run_command_labels_container(
+    docker_service: DockerService,
+    mock_docker_client: MagicMock,
+    mock_read_socket: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """Verify step containers carry the run and repository labels."""
+    api = _setup_run(mock_docker_client, mock_read_socket, [], 0)
+    list(docker_service.run_command_in_container("img", "cmd", tmp_path))
+
+    labels = api.create_container.call_args.kwargs["labels"]
+    assert labels["hookci.run-id"] == RUN_ID
+    assert labels["hookci.repo"] == str(tmp_path)
 
 
 def test_run_command_api_error(
     docker_service: DockerService, mock_docker_client: MagicMock, tmp_path: Path
 ) -> None:
     """Verify DockerError is raised on a container run API error."""
-    mock_docker_client.containers.run.side_effect = APIError("server error")  # type: ignore[no-untyped-call]
+    mock_docker_client.api.create_container.side_effect = APIError("server error")  # type: ignore[no-untyped-call]
     with pytest.raises(DockerError, match="Docker error:"):
         list(docker_service.run_command_in_container("my-image", "cmd", tmp_path))
 
@@ -312,7 +514,7 @@ def test_run_command_image_not_found(
     docker_service: DockerService, mock_docker_client: MagicMock, tmp_path: Path
 ) -> None:
     """Verify DockerError is raised when the image is not found."""
-    mock_docker_client.containers.run.side_effect = ImageNotFound("not found")  # type: ignore[no-untyped-call]
+    mock_docker_client.api.create_container.side_effect = ImageNotFound("not found")  # type: ignore[no-untyped-call]
     with pytest.raises(DockerError, match="Docker image 'my-image' not found"):
         list(docker_service.run_command_in_container("my-image", "cmd", tmp_path))
 
@@ -373,9 +575,14 @@ def test_start_persistent_container(
     mock_container.id = "persistent_id_123"
     mock_docker_client.containers.run.return_value = mock_container
     container_id = docker_service.start_persistent_container(
-        image="my-image", workdir=tmp_path
+        image="my-image",
+        workdir=tmp_path,
+        volumes=[VolumeMount(name="out", target="/artifacts", read_only=True)],
     )
     assert container_id == "persistent_id_123"
+    kwargs = mock_docker_client.containers.run.call_args.kwargs
+    assert kwargs["labels"]["hookci.run-id"] == RUN_ID
+    assert kwargs["volumes"]["out"] == {"bind": "/artifacts", "mode": "ro"}
 
 
 def test_start_persistent_container_image_not_found(
@@ -454,49 +661,50 @@ def test_exec_in_container_raises_if_exit_code_is_none(
         list(docker_service.exec_in_container("c1", "cmd"))
 
 
-def test_stop_and_remove_container_success(
+def test_stop_and_remove_container_uses_reaper(
     docker_service: DockerService, mock_docker_client: MagicMock
 ) -> None:
-    """Verify container is stopped and removed successfully."""
-    mock_container = MagicMock()
-    mock_docker_client.containers.get.return_value = mock_container
-
+    """Verify the container is killed and removed in the background."""
     docker_service.stop_and_remove_container("container_id")
+    docker_service.reaper.flush()
 
-    mock_container.stop.assert_called_once_with(timeout=1)
-    mock_container.remove.assert_called_once()
-
-
-@patch("hookci.infrastructure.docker.logger")
-@pytest.mark.parametrize(
-    "fail_on",
-    [
-        "get",
-        "stop",
-        "remove",
-    ],
-)
-def test_stop_and_remove_container_api_error(
-    mock_logger: MagicMock,
-    fail_on: str,
-    docker_service: DockerService,
-    mock_docker_client: MagicMock,
+    mock_docker_client.api.remove_container.assert_called_once_with(
+        "container_id", force=True
+    )
+
+
+def test_remove_volume_waits_for_pending_container_removals(
+    docker_service: DockerService, mock_docker_client: MagicMock
 ) -> None:
-    """Verify API errors during cleanup are caught and logged as warnings."""
-    mock_container = MagicMock()
-    if fail_on == "get":
-        mock_docker_client.containers.get.side_effect = APIError("not found")  # type: ignore[no-untyped-call]
-    else:
-        mock_docker_client.containers.get.return_value = mock_container
-        if fail_on == "stop":
-            mock_container.stop.side_effect = APIError("cannot stop")  # type: ignore[no-untyped-call]
-        elif fail_on == "remove":
-            mock_container.remove.side_effect = APIError("cannot remove")  # type: ignore[no-untyped-call]
+    """Verify a volume outlives the session containers that mounted it."""
+    calls: List[str] = []
+    mock_docker_client.api.remove_container.side_effect = lambda cid, force: calls.append(cid)
+    mock_docker_client.api.remove_volume.side_effect = lambda name, force: calls.append(name)
+
+    docker_service.stop_and_remove_container("session")
+    docker_service.remove_volume("hookci-artifacts-1")
+    assert calls == ["session", "hookci-artifacts-1"]
+
+
+def test_commit_container(docker_service: DockerService, mock_docker_client: MagicMock) -> None:
+    docker_service.commit_container("cid", "hookci/repo-setup:abc")
+    mock_docker_client.containers.get.assert_called_once_with("cid")
+    mock_docker_client.containers.get.return_value.commit.assert_called_once_with(
+        repository="hookci/repo-setup", tag="abc"
+    )
+    mock_docker_client.containers.get.side_effect = NotFound("gone")  # type: ignore[no-untyped-call]
+    with pytest.raises(DockerError, match="Could not commit container to 'hookci/repo-setup:abc'"):
+        docker_service.commit_container("cid", "hookci/repo-setup:abc")
 
-    docker_service.stop_and_remove_container("container_id")
 
-    mock_logger.warning.assert_called_once()
-    assert "Could not stop or remove container" in mock_logger.warning.call_args[0][0]
+def test_save_and_load_image(docker_service: DockerService, mock_docker_client: MagicMock) -> None:
+    mock_docker_client.api.get_image.return_value = iter([b"a", b"b"])
+    assert list(docker_service.save_image("img")) == [b"a", b"b"]
+    docker_service.load_image([b"a"])
+    mock_docker_client.api.load_image.assert_called_once_with([b"a"])
+    mock_docker_client.api.load_image.side_effect = APIError("bad tar")  # type: ignore[no-untyped-call]
+    with pytest.raises(DockerError, match="Could not load image"):
+        docker_service.load_image([b"a"])
 
 
 def test_start_persistent_container_api_error(
@@ -521,3 +729,266 @@ def test_format_error_msg_falls_back_to_str(docker_service: DockerService) -> No
     generic_error = DockerException("Generic docker error")
     msg = docker_service._format_error_msg(generic_error)
     assert msg == "Generic docker error"
+
+
+def test_docker_service_with_base_url() -> None:
+    """Verify a daemon URL selects a dedicated client and marks TCP daemons as remote."""
+    with patch("docker.DockerClient") as mock_client_cls:
+        service = DockerService(base_url="tcp://buildbox:2375")
+    assert all(
+        c.kwargs["base_url"] == "tcp://buildbox:2375" for c in mock_client_cls.call_args_list
+    )
+    assert service.is_remote is True
+
+    with patch("docker.DockerClient"):
+        assert DockerService(base_url="unix:///run/d2.sock").is_remote is False
+
+
+def test_docker_service_with_base_url_init_failure() -> None:
+    """Verify the failing daemon URL is part of the connection error."""
+    with patch("docker.DockerClient") as mock_client_cls:
+        mock_client_cls.return_value.ping.side_effect = DockerException("refused")
+        with pytest.raises(DockerError, match="at tcp://buildbox:2375"):
+            DockerService(base_url="tcp://buildbox:2375")
+
+
+def test_connection_pools_follow_parallelism() -> None:
+    """Verify pools fit the steps run at once and streams get a client of their own."""
+    with patch("docker.from_env") as mock_from_env:
+        DockerService(parallelism=8).reaper.close()
+    control, streams = mock_from_env.call_args_list
+    assert control.kwargs == {"max_pool_size": 10}
+    assert streams.kwargs["max_pool_size"] == 16
+    assert streams.kwargs["timeout"] is None
+
+
+@pytest.fixture
+def remote_docker_service(mock_docker_client: MagicMock) -> DockerService:
+    """Provides a DockerService that talks to a mocked remote daemon."""
+    with patch("docker.DockerClient", return_value=mock_docker_client):
+        return DockerService(base_url="tcp://buildbox:2375")
+
+
+def test_remote_run_syncs_workspace_once(
+    remote_docker_service: DockerService, mock_docker_client: MagicMock, tmp_path: Path
+) -> None:
+    """Verify remote steps mount a synced volume instead of the host path."""
+    (tmp_path / "file.txt").write_text("content")
+    mock_docker_client.api.create_container.side_effect = [{"Id": i} for i in ("helper", "s1", "s2")]
+    uploaded = []
+    mock_docker_client.api.put_archive.side_effect = lambda cid, path, data: uploaded.append(
+        b"".join(data)
+    )
+    mock_docker_client.api.wait.return_value = {"StatusCode": 0}
+
+    with patch("hookci.infrastructure.docker.read_socket", return_value=b""):
+        for _ in range(2):
+            list(remote_docker_service.run_command_in_container("img", "cmd", tmp_path))
+
+    assert mock_docker_client.api.put_archive.call_count == 1
+    assert b"file.txt" in uploaded[0]
+    remote_docker_service.reaper.flush()
+    removed = [c.args[0] for c in mock_docker_client.api.remove_container.call_args_list]
+    assert sorted(removed) == ["helper", "s1", "s2"]
+    volumes = mock_docker_client.api.create_host_config.call_args.kwargs["binds"]
+    (volume_name,) = volumes
+    assert volume_name.startswith("hookci-ws-")
+    mock_docker_client.volumes.create.assert_called_once()
+    assert mock_docker_client.volumes.create.call_args.kwargs["name"] == volume_name
+
+
+def test_remote_workspace_is_synced_once_per_run(
+    remote_docker_service: DockerService, mock_docker_client: MagicMock, tmp_path: Path
+) -> None:
+    """
+    Verify host changes during a run leave its volume alone, and a refresh
+    for the next run syncs a new volume and drops the old one.
+    """
+    (tmp_path / "file.txt").write_text("content")
+    mock_docker_client.api.create_container.return_value = {"Id": "helper"}
+    uploaded = []
+    mock_docker_client.api.put_archive.side_effect = lambda cid, path, data: uploaded.append(
+        b"".join(data)
+    )
+    first = remote_docker_service._sync_workspace(tmp_path, "img")
+    (tmp_path / "new.txt").write_text("edited")
+    assert remote_docker_service._sync_workspace(tmp_path, "img") == first
+    assert len(uploaded) == 1
+
+    old = MagicMock()
+    old.name = first
+    mock_docker_client.volumes.list.return_value = [old]
+    remote_docker_service.refresh_workspace(tmp_path)
+    second = remote_docker_service._sync_workspace(tmp_path, "img")
+
+    assert second != first
+    assert b"new.txt" in uploaded[1]
+    labels = mock_docker_client.volumes.list.call_args.kwargs["filters"]["label"]
+    assert f"hookci.repo={tmp_path}" in labels
+    old.remove.assert_called_once_with(force=True)
+
+
+def test_remote_sync_keeps_volumes_still_in_use(
+    remote_docker_service: DockerService, mock_docker_client: MagicMock, tmp_path: Path
+) -> None:
+    """Verify an older workspace volume some container still mounts is kept."""
+    busy = MagicMock()
+    busy.name = "hookci-ws-older"
+    busy.remove.side_effect = APIError("in use")  # type: ignore[no-untyped-call]
+    mock_docker_client.volumes.list.return_value = [busy]
+    mock_docker_client.api.create_container.return_value = {"Id": "helper"}
+    with patch("hookci.infrastructure.docker.logger") as mock_logger:
+        remote_docker_service._sync_workspace(tmp_path, "img")
+    assert "Keeping workspace volume 'hookci-ws-older'" in mock_logger.debug.call_args[0][0]
+
+
+def test_remote_sync_failure(
+    remote_docker_service: DockerService, mock_docker_client: MagicMock, tmp_path: Path
+) -> None:
+    """Verify sync errors are wrapped in DockerError."""
+    mock_docker_client.volumes.create.side_effect = APIError("no space")  # type: ignore[no-untyped-call]
+    with pytest.raises(DockerError, match="Failed to sync workspace"):
+        remote_docker_service._sync_workspace(tmp_path, "img")
+
+
+def test_tar_stream_reports_archive_errors(
+    docker_service: DockerService, tmp_path: Path
+) -> None:
+    """Verify a failure in the tar writer thread surfaces to the consumer."""
+    with patch("tarfile.TarFile.add", side_effect=PermissionError("denied")):
+        with pytest.raises(DockerError, match="Could not archive workspace"):
+            list(docker_service._tar_stream(tmp_path))
+
+
+def test_failed_upload_stops_the_tar_writer(
+    remote_docker_service: DockerService, mock_docker_client: MagicMock, tmp_path: Path
+) -> None:
+    """Verify an upload that stops midway does not leave the writer blocked."""
+    (tmp_path / "big.bin").write_bytes(os.urandom(4 * 1024 * 1024))
+    mock_docker_client.api.create_container.return_value = {"Id": "helper"}
+
+    def upload(cid: str, path: str, data: Generator[bytes, None, None]) -> None:
+        next(data)
+        raise APIError("connection reset")  # type: ignore[no-untyped-call]
+
+    mock_docker_client.api.put_archive.side_effect = upload
+    before = set(threading.enumerate())
+    with pytest.raises(DockerError, match="Failed to sync workspace"):
+        remote_docker_service._sync_workspace(tmp_path, "img")
+
+    assert set(threading.enumerate()) <= before
+
+
+class _FakeDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    A Docker daemon on a Unix socket that runs no containers: each one
+    writes a line naming itself and exits with a code derived from its ID,
+    but only once `hold` of them are running at the same time.
+    """
+
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, path: str, hold: int) -> None:
+        super().__init__(path, _DaemonHandler)
+        self.lock = threading.Lock()
+        self.running = threading.Barrier(hold)
+        self.started: Dict[str, threading.Event] = {}
+        self.exited: Dict[str, threading.Event] = {}
+
+
+class _DaemonHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: _FakeDaemon
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+    def _reply(self, status: int, body: object = None) -> None:
+        data = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        path = self.path.split("?")[0]
+        if path.endswith("/version"):
+            self._reply(200, {"ApiVersion": "1.44", "Version": "fake"})
+        elif path.endswith("/containers/json"):
+            self._reply(200, [])
+        else:
+            self._reply(200, "OK")
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.split("?")[0].endswith("/containers/create"):
+            with self.server.lock:
+                container_id = f"c{len(self.server.started)}"
+                self.server.started[container_id] = threading.Event()
+                self.server.exited[container_id] = threading.Event()
+            self._reply(201, {"Id": container_id})
+            return
+        match = re.search(r"/containers/(\w+)/(\w+)", self.path)
+        assert match, self.path
+        container_id, action = match.groups()
+        if action == "start":
+            self.server.started[container_id].set()
+            self._reply(204)
+        elif action == "attach":
+            self.send_response(101)
+            self.send_header("Content-Type", "application/vnd.docker.raw-stream")
+            self.send_header("Connection", "Upgrade")
+            self.send_header("Upgrade", "tcp")
+            self.end_headers()
+            self.server.started[container_id].wait(timeout=30)
+            self.server.running.wait(timeout=30)
+            self.wfile.write(b"".join(create_docker_log_stream([(1, f"{container_id}\n")])))
+            self.server.exited[container_id].set()
+            self.close_connection = True
+        elif action == "wait":
+            self.server.exited[container_id].wait(timeout=30)
+            self._reply(200, {"StatusCode": int(container_id[1:]) % 3})
+
+    def do_DELETE(self) -> None:
+        self._reply(204)
+
+
+def test_64_parallel_steps_against_a_socket_daemon(
+    tmp_path: Path, caplog: pytest.LogCaptureFixture
+) -> None:
+    """
+    Verify the scheduler runs 64 steps at once against a daemon on a Unix
+    socket sized for them, each getting its output and exit code, without
+    overflowing a connection pool.
+    """
+    steps = 64
+    socket_path = tmp_path / "d.sock"
+    daemon = _FakeDaemon(str(socket_path), hold=steps)
+    threading.Thread(target=daemon.serve_forever, daemon=True).start()
+    service = DockerService(base_url=f"unix://{socket_path}", parallelism=steps)
+    git_service = MagicMock()
+    git_service.git_root = tmp_path
+    scheduler = CiExecutionService(git_service, MagicMock(), service, MagicMock())
+    config = Configuration(
+        version=LATEST_CONFIG_VERSION,
+        docker=Docker(image="img"),
+        steps=[Step(name=f"S{i}", command="cmd", critical=False) for i in range(steps)],
+    )
+    placements = {s.name: StepPlacement(image="img") for s in config.steps}
+
+    try:
+        with caplog.at_level(logging.WARNING, logger="urllib3"):
+            events = list(scheduler._run_scheduler(config, placements, {}))
+    finally:
+        service.reaper.close()
+        daemon.shutdown()
+        daemon.server_close()
+
+    assert not daemon.running.broken
+    lines = {e.step_name: e.line for e in events if isinstance(e, LogLine)}
+    assert sorted(lines.values()) == sorted(f"c{i}\n" for i in range(steps))
+    for end in (e for e in events if isinstance(e, StepEnd)):
+        assert end.exit_code == int(lines[end.step.name][1:]) % 3
+    assert "Connection pool is full" not in caplog.text
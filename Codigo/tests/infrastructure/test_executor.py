@@ -0,0 +1,186 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Tests for the step executors."""
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Generator, List, Tuple
+from unittest.mock import MagicMock
+
+import pytest
+
+from hookci.application.events import LogStream
+from hookci.infrastructure import constants
+from hookci.infrastructure.docker import VolumeMount
+from hookci.infrastructure.errors import ExecutorError
+from hookci.infrastructure.executor import DockerExecutor, HostExecutor, SandboxExecutor
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="Needs a POSIX shell.")
+
+
+def _can_sandbox() -> bool:
+    try:
+        return (
+            subprocess.run(
+                [constants.SANDBOX_UNSHARE, "--user", "--map-root-user", "--mount", "true"],
+                capture_output=True,
+            ).returncode
+            == 0
+        )
+    except OSError:
+        return False
+
+
+needs_sandbox = pytest.mark.skipif(
+    not _can_sandbox(), reason="Needs unshare and unprivileged user namespaces."
+)
+
+
+def _drain(
+    command: Generator[Tuple[LogStream, str], None, int],
+) -> Tuple[List[Tuple[LogStream, str]], int]:
+    logs = []
+    try:
+        while True:
+            logs.append(next(command))
+    except StopIteration as e:
+        return logs, e.value
+
+
+def test_host_executor_streams_lines_and_returns_the_exit_code(tmp_path: Path) -> None:
+    """Verify the command runs in the working tree with the step's environment."""
+    (tmp_path / "file.txt").write_text("content")
+    logs, code = _drain(
+        HostExecutor().run_command(
+            "ignored:image",
+            'cat file.txt; echo; echo "$STEP_VAR" >&2; printf tail; exit 3',
+            tmp_path,
+            env={"STEP_VAR": "from step"},
+        )
+    )
+    assert code == 3
+    assert sorted(logs) == [
+        ("stderr", "from step\n"),
+        ("stdout", "content\n"),
+        ("stdout", "tail"),
+    ]
+
+
+def test_host_executor_inherits_the_environment(tmp_path: Path) -> None:
+    logs, code = _drain(HostExecutor().run_command("", 'echo "$PATH"', tmp_path))
+    assert (code, logs) == (0, [("stdout", f"{os.environ['PATH']}\n")])
+
+
+def test_host_executor_reports_signals_like_a_shell(tmp_path: Path) -> None:
+    _, code = _drain(HostExecutor().run_command("", "kill -TERM $$", tmp_path))
+    assert code == 143
+
+
+def test_host_executor_kills_a_command_cut_short(tmp_path: Path) -> None:
+    """Verify closing the stream kills the command and everything it started."""
+    pid_file = tmp_path / "pid"
+    command = HostExecutor().run_command(
+        "", f"sleep 30 & echo $! > {pid_file}; echo started; wait", tmp_path
+    )
+    assert next(command) == ("stdout", "started\n")
+    command.close()
+
+    pid = int(pid_file.read_text())
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            break
+        time.sleep(0.01)
+    else:
+        pytest.fail("The background process survived its step.")
+
+
+def test_host_executor_stops_a_cancelled_command(tmp_path: Path) -> None:
+    """Verify cancelling kills a command that is still running and silent."""
+    cancel = threading.Event()
+    command = HostExecutor().run_command(
+        "", "echo started; sleep 30", tmp_path, cancel=cancel
+    )
+    assert next(command) == ("stdout", "started\n")
+    cancel.set()
+    start = time.monotonic()
+    logs, code = _drain(command)
+    assert (logs, code) == ([], 137)
+    assert time.monotonic() - start < 5
+
+
+def test_host_executor_start_failure(tmp_path: Path) -> None:
+    with pytest.raises(ExecutorError, match="Could not start the command"):
+        next(HostExecutor().run_command("", "true", tmp_path / "missing"))
+
+
+def test_docker_executor_runs_a_transient_container(tmp_path: Path) -> None:
+    docker = MagicMock()
+    volumes = [VolumeMount(name="v", target="/artifacts")]
+    result = DockerExecutor(docker).run_command("img", "make", tmp_path, {"A": "1"}, volumes)
+    assert result is docker.run_command_in_container.return_value
+    docker.run_command_in_container.assert_called_once_with(
+        image="img", command="make", workdir=tmp_path, env={"A": "1"}, volumes=volumes
+    )
+
+
+@needs_sandbox
+def test_sandbox_executor_isolates_the_command(tmp_path: Path) -> None:
+    """Verify only the working tree and a private /tmp are writable."""
+    workdir = tmp_path / "my repo"
+    workdir.mkdir()
+    scratch = Path("/tmp") / f"hookci-scratch-{os.getpid()}"
+    logs, code = _drain(
+        SandboxExecutor().run_command(
+            "",
+            f'echo "$$ $STEP_VAR $(pwd)"; echo built > out; touch {scratch} && echo scratch; '
+            "touch /hookci-sandbox 2>/dev/null || echo read-only; exit 4",
+            workdir,
+            env={"STEP_VAR": "set"},
+        )
+    )
+    assert code == 4
+    assert logs == [
+        ("stdout", f"1 set {workdir}\n"),
+        ("stdout", "scratch\n"),
+        ("stdout", "read-only\n"),
+    ]
+    assert (workdir / "out").read_text() == "built\n"
+    assert not scratch.exists()
+    assert not Path("/hookci-sandbox").exists()
+
+
+@needs_sandbox
+def test_sandbox_executor_kills_a_command_cut_short(tmp_path: Path) -> None:
+    command = SandboxExecutor().run_command("", "echo started; sleep 30", tmp_path)
+    assert next(command) == ("stdout", "started\n")
+    start = time.monotonic()
+    command.close()
+    assert time.monotonic() - start < 5
+
+
+def test_sandbox_executor_start_failure(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(constants, "SANDBOX_UNSHARE", str(tmp_path / "no-unshare"))
+    with pytest.raises(ExecutorError, match="Could not start the command in a sandbox"):
+        next(SandboxExecutor().run_command("", "true", tmp_path))
@@ -81,6 +81,19 @@ def test_local_fs_make_executable(tmp_path: Path) -> None:
     assert file_path.stat().st_mode & stat.S_IEXEC
 
 
+def test_local_fs_glob(tmp_path: Path) -> None:
+    """Verify glob returns sorted matches below the root."""
+    for name in ("b", "a", "c"):
+        (tmp_path / "packages" / name).mkdir(parents=True)
+    (tmp_path / "packages" / "b" / "hookci.yaml").touch()
+    (tmp_path / "packages" / "a" / "hookci.yaml").touch()
+    matches = LocalFileSystem().glob(tmp_path, "packages/*/hookci.yaml")
+    assert matches == [
+        tmp_path / "packages" / "a" / "hookci.yaml",
+        tmp_path / "packages" / "b" / "hookci.yaml",
+    ]
+
+
 def test_local_fs_error_handling(tmp_path: Path) -> None:
     """Verify LocalFileSystem raises FileSystemError on failure."""
     fs = LocalFileSystem()
@@ -247,3 +260,158 @@ def test_get_staged_commit_message_read_error(
     mock_fs.read_file.side_effect = FileSystemError("Permission denied")
     with pytest.raises(GitCommandError, match="Could not read or parse"):
         service.get_staged_commit_message()
+
+
+@pytest.mark.parametrize(
+    ("hook_type", "expected_args"),
+    [
+        ("pre-commit", ["diff", "--cached", "--name-only", "--no-renames", "-z"]),
+        ("pre-push", ["diff", "--name-only", "--no-renames", "-z", "@{upstream}...HEAD"]),
+    ],
+)
+@patch("subprocess.run")
+def test_get_changed_files(
+    mock_subprocess: Mock,
+    hook_type: str,
+    expected_args: list[str],
+    tmp_path: Path,
+    mock_fs: Mock,
+) -> None:
+    """Verify changed paths are split on NUL so unusual names survive."""
+    git_service = GitService(fs=mock_fs)
+    git_service.git_root = tmp_path
+    mock_subprocess.return_value = subprocess.CompletedProcess(
+        args=[], returncode=0, stdout="a.py\0dir/with space.txt\0"
+    )
+    assert git_service.get_changed_files(hook_type) == ["a.py", "dir/with space.txt"]
+    assert mock_subprocess.call_args[0][0] == ["git", *expected_args]
+
+
+@pytest.mark.parametrize(
+    ("output", "fsmonitor"),
+    [
+        ("true", True),
+        (".git/hooks/query-watchman", True),
+        ("False", False),
+    ],
+)
+def test_detects_fsmonitor(output: str, fsmonitor: bool, mock_fs: Mock) -> None:
+    git_service = GitService(fs=mock_fs)
+    with patch.object(git_service, "_run_git_command", return_value=output):
+        assert git_service.fsmonitor_enabled is fsmonitor
+
+
+def test_fsmonitor_defaults_to_off(mock_fs: Mock) -> None:
+    """Verify `git config` exiting non-zero (not set) means it is off."""
+    git_service = GitService(fs=mock_fs)
+    with patch.object(git_service, "_run_git_command", side_effect=GitCommandError("")):
+        assert git_service.fsmonitor_enabled is False
+
+
+@patch("subprocess.run")
+def test_get_worktree_changes(mock_subprocess: Mock, tmp_path: Path, mock_fs: Mock) -> None:
+    """Verify only working-tree changes count, and the leading status space survives."""
+    git_service = GitService(fs=mock_fs)
+    git_service.git_root = tmp_path
+    mock_subprocess.return_value = subprocess.CompletedProcess(
+        args=[], returncode=0, stdout=" M a.py\0M  staged.py\0?? new file\0 D gone.py\0"
+    )
+    assert git_service.get_worktree_changes() == ["a.py", "new file", "gone.py"]
+
+
+@patch("subprocess.run")
+def test_list_files(mock_subprocess: Mock, tmp_path: Path, mock_fs: Mock) -> None:
+    """Verify tracked and untracked files are listed once, ignored ones left to Git."""
+    git_service = GitService(fs=mock_fs)
+    git_service.git_root = tmp_path
+    mock_subprocess.return_value = subprocess.CompletedProcess(
+        args=[], returncode=0, stdout="a.py\0conflict.py\0conflict.py\0new file\0"
+    )
+    assert git_service.list_files() == ["a.py", "conflict.py", "new file"]
+    assert mock_subprocess.call_args[0][0] == [
+        "git", "ls-files", "-z", "--cached", "--others", "--exclude-standard"
+    ]
+
+
+def test_fingerprints_use_stat_cache_without_fsmonitor(tmp_path: Path, mock_fs: Mock) -> None:
+    git_service = GitService(fs=mock_fs)
+    git_service.git_root = tmp_path
+    git_service.fsmonitor_enabled = False
+    with patch.object(GitService, "stat_cache") as mock_cache:
+        mock_cache.fingerprints.return_value = {"a.py": "1"}
+        assert git_service.get_file_fingerprints(["a.py"]) == {"a.py": "1"}
+    mock_cache.fingerprints.assert_called_once_with(tmp_path, ["a.py"])
+
+
+def test_fingerprints_come_from_index_with_fsmonitor(tmp_path: Path, mock_fs: Mock) -> None:
+    """Verify clean tracked files use index IDs and only the rest are hashed."""
+    git_service = GitService(fs=mock_fs)
+    git_service.git_root = tmp_path
+    git_service.fsmonitor_enabled = True
+    index = (
+        "100644 aaa 0\tclean.py\0"
+        "100644 bbb 0\tdirty.py\0"
+        "160000 ccc 0\tsubmodule\0"
+        "100644 ddd 1\tconflict.py\0"
+    )
+    outputs = {"status": " M dirty.py\0?? new.py\0", "ls-files": index}
+
+    def run(*args: str, strip: bool = True) -> str:
+        return outputs[args[0]]
+
+    with (
+        patch.object(git_service, "_run_git_command", side_effect=run),
+        patch.object(GitService, "stat_cache") as mock_cache,
+    ):
+        mock_cache.fingerprints.return_value = {"dirty.py": "b2", "new.py": "n"}
+        result = git_service.get_file_fingerprints(
+            ["clean.py", "dirty.py", "new.py", "submodule", "conflict.py"]
+        )
+
+    assert result == {"clean.py": "aaa", "dirty.py": "b2", "new.py": "n"}
+    mock_cache.fingerprints.assert_called_once_with(
+        tmp_path, ["dirty.py", "new.py", "submodule", "conflict.py"]
+    )
+
+
+def test_fingerprints_match_the_index_through_clean_filters(
+    tmp_path: Path, mock_fs: Mock
+) -> None:
+    """Verify both routes key a file with line-ending conversion by its index blob ID."""
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / ".gitattributes").write_text("*.txt text eol=lf\n")
+    (repo / "crlf.txt").write_bytes(b"a\r\nb\r\n")
+    subprocess.run(["git", "init", "-q"], cwd=repo, check=True)
+    subprocess.run(["git", "add", "-A"], cwd=repo, check=True)
+    git_service = GitService(fs=mock_fs)
+    git_service.git_root = repo
+    indexed = git_service._index_blob_ids()["crlf.txt"]
+
+    git_service.fsmonitor_enabled = False
+    assert git_service.get_file_fingerprints(["crlf.txt", "gone.txt"]) == {"crlf.txt": indexed}
+    assert git_service._hash_files(["gone.txt", "crlf.txt"]) == {"crlf.txt": indexed}
+
+
+def test_export_tree_leaves_the_index_alone(tmp_path: Path, mock_fs: Mock) -> None:
+    """Verify the staged tree is exported as staged, not as in the working tree."""
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "a.py").write_text("staged")
+    (repo / "untracked.py").write_text("")
+    git = ["git", "-c", "user.name=t", "-c", "user.email=t@t"]
+    subprocess.run([*git, "init", "-q"], cwd=repo, check=True)
+    subprocess.run([*git, "add", "a.py"], cwd=repo, check=True)
+    (repo / "a.py").write_text("unstaged")
+    git_service = GitService(fs=mock_fs)
+    git_service.git_root = repo
+
+    tree = git_service.write_index_tree()
+    index_before = (repo / ".git" / "index").read_bytes()
+    destination = tmp_path / "snapshot"
+    git_service.export_tree(tree, destination)
+
+    assert git_service.git_dir == repo / ".git"
+    assert (destination / "a.py").read_text() == "staged"
+    assert not (destination / "untracked.py").exists()
+    assert (repo / ".git" / "index").read_bytes() == index_before
@@ -0,0 +1,101 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Tests for the machine-wide image archive."""
+import os
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from hookci.infrastructure.errors import FileSystemError
+from hookci.infrastructure.image_archive import LocalImageArchive, default_archive_dir
+
+
+@pytest.fixture
+def archive(tmp_path: Path) -> LocalImageArchive:
+    return LocalImageArchive(tmp_path / "images")
+
+
+def test_default_dir_follows_xdg(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    assert default_archive_dir() == tmp_path / "hookci" / "images"
+
+
+def test_stored_archive_can_be_read_more_than_once(archive: LocalImageArchive) -> None:
+    """Verify each daemon loading an archive reads it whole."""
+    assert archive.open("python:3.13") is None
+    archive.store("python:3.13", "sha256:a", iter([b"layer-1", b"layer-2"]))
+
+    stored = archive.open("python:3.13")
+    assert stored is not None
+    assert b"".join(stored) == b"".join(stored) == b"layer-1layer-2"
+    assert archive.open("python:3.12") is None
+
+
+def test_archives_are_keyed_by_image_id(archive: LocalImageArchive) -> None:
+    """Verify tags of one image share its archive, and a moved tag follows the new image."""
+    archive.store("python:3.13", "sha256:a", iter([b"old"]))
+    assert archive.has("sha256:a") and not archive.has("sha256:b")
+    archive.link("python:3", "sha256:a")
+    stored = archive.open("python:3")
+    assert stored is not None and b"".join(stored) == b"old"
+
+    archive.store("python:3.13", "sha256:b", iter([b"new"]))
+    stored = archive.open("python:3.13")
+    assert stored is not None and b"".join(stored) == b"new"
+    stored = archive.open("python:3")
+    assert stored is not None and b"".join(stored) == b"old"
+
+
+def test_failed_store_leaves_nothing_behind(archive: LocalImageArchive) -> None:
+    """Verify an interrupted export keeps the previous archive and no partial file."""
+    archive.store("img", "sha256:a", iter([b"old"]))
+
+    def broken() -> Iterator[bytes]:
+        yield b"partial"
+        raise OSError("connection reset")
+
+    with pytest.raises(FileSystemError, match="archive of image 'img'"):
+        archive.store("img", "sha256:b", broken())
+    assert sorted(os.listdir(archive.directory)) == sorted(
+        [archive.path("sha256:a").name, archive.ref_path("img").name]
+    )
+    stored = archive.open("img")
+    assert stored is not None and b"".join(stored) == b"old"
+
+
+def test_discard(archive: LocalImageArchive) -> None:
+    archive.store("img", "sha256:a", iter([b"tar"]))
+    archive.discard("img")
+    archive.discard("img")
+    assert archive.open("img") is None
+    assert os.listdir(archive.directory) == []
+
+
+def test_evict_drops_least_recently_used(archive: LocalImageArchive) -> None:
+    """Verify opening an archive keeps it over ones used longer ago."""
+    for i, image in enumerate(["a", "b", "c"]):
+        archive.store(image, f"sha256:{image}", iter([b"x" * 100]))
+        os.utime(archive.path(f"sha256:{image}"), ns=(i * 10**9, i * 10**9))
+    assert archive.open("a") is not None
+
+    assert archive.evict(250) == 1
+    assert archive.open("b") is None
+    assert not archive.ref_path("b").exists()
+    assert archive.open("a") is not None and archive.open("c") is not None
+    assert archive.evict(250) == 0
+    assert LocalImageArchive(archive.directory / "missing").evict(0) == 0
@@ -0,0 +1,91 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Tests for the image last-use index."""
+import json
+from pathlib import Path
+
+import pytest
+
+from hookci.infrastructure.errors import FileSystemError
+from hookci.infrastructure.image_index import (
+    ImageUsage,
+    JsonImageIndex,
+    default_index_path,
+)
+
+
+@pytest.fixture
+def index(tmp_path: Path) -> JsonImageIndex:
+    return JsonImageIndex(tmp_path / "state" / "images.json")
+
+
+def test_default_index_path_follows_xdg(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    monkeypatch.setenv("XDG_STATE_HOME", str(tmp_path))
+    assert default_index_path() == tmp_path / "hookci" / "images.json"
+    monkeypatch.delenv("XDG_STATE_HOME")
+    monkeypatch.setenv("HOME", str(tmp_path))
+    assert default_index_path() == tmp_path / ".local" / "state" / "hookci" / "images.json"
+
+
+def test_load_missing_index_is_empty(index: JsonImageIndex) -> None:
+    assert index.load() == {}
+
+
+def test_touch_records_use_and_keeps_size(index: JsonImageIndex) -> None:
+    """Verify touching an image refreshes its timestamp without losing its size."""
+    index.touch("hookci/repo:a")
+    first = index.load()["hookci/repo:a"]
+    assert first.size is None
+
+    index.record_sizes({"hookci/repo:a": 100, "hookci/repo:unknown": 5})
+    index.touch("hookci/repo:a")
+    entries = index.load()
+    assert list(entries) == ["hookci/repo:a"]
+    assert entries["hookci/repo:a"].size == 100
+    assert entries["hookci/repo:a"].last_used >= first.last_used
+
+
+def test_forget_drops_entries(index: JsonImageIndex) -> None:
+    index.touch("hookci/repo:a")
+    index.touch("hookci/repo:b")
+    index.forget(["hookci/repo:a", "hookci/repo:missing"])
+    assert list(index.load()) == ["hookci/repo:b"]
+    assert not list(index.path.parent.glob(f".{index.path.name}-*"))
+
+
+def test_unreadable_index_is_ignored(
+    index: JsonImageIndex, caplog: pytest.LogCaptureFixture
+) -> None:
+    """Verify a corrupt index is treated as empty and rewritten on the next update."""
+    index.path.parent.mkdir(parents=True)
+    index.path.write_text("{not json")
+    assert index.load() == {}
+    assert "Ignoring unreadable image index" in caplog.text
+
+    index.touch("hookci/repo:a")
+    data = json.loads(index.path.read_text())
+    assert ImageUsage.model_validate(data["hookci/repo:a"]).size is None
+
+
+def test_update_failure_raises_filesystem_error(tmp_path: Path) -> None:
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    index = JsonImageIndex(blocker / "images.json")
+    with pytest.raises(FileSystemError, match="Failed to update image index"):
+        index.touch("hookci/repo:a")
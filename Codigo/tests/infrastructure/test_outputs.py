@@ -0,0 +1,114 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Tests for the store of the files steps produce."""
+import os
+import stat
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from hookci.infrastructure.errors import FileSystemError
+from hookci.infrastructure.outputs import LocalOutputStore
+
+
+@pytest.fixture
+def store() -> LocalOutputStore:
+    return LocalOutputStore()
+
+
+def _build(repo: Path) -> None:
+    (repo / "dist").mkdir(parents=True, exist_ok=True)
+    (repo / "dist" / "app.js").write_text("app")
+    (repo / "dist" / "run").write_text("#!/bin/sh\n")
+    (repo / "dist" / "run").chmod(0o755)
+    (repo / "dist" / "latest").symlink_to("app.js")
+
+
+def test_archive_and_restore(tmp_path: Path, store: LocalOutputStore) -> None:
+    """Verify files, modes and links come back after the working tree lost them."""
+    _build(tmp_path)
+    store.archive(tmp_path, "k1", "Build", ["dist/app.js", "dist/run", "dist/latest", "dist"])
+    assert store.has(tmp_path, "k1") and not store.has(tmp_path, "k2")
+    assert (tmp_path / ".hookci" / "cache" / ".gitignore").read_text() == "*\n"
+
+    (tmp_path / "dist" / "app.js").write_text("stale")
+    (tmp_path / "dist" / "run").unlink()
+    (tmp_path / "dist" / "latest").unlink()
+    assert store.restore(tmp_path, "k1")
+    assert (tmp_path / "dist" / "app.js").read_text() == "app"
+    assert os.access(tmp_path / "dist" / "run", os.X_OK)
+    assert os.readlink(tmp_path / "dist" / "latest") == "app.js"
+    assert not store.restore(tmp_path, "k2")
+
+
+def test_restore_falls_back_to_hardlinks_then_copies(
+    tmp_path: Path, store: LocalOutputStore
+) -> None:
+    _build(tmp_path)
+    store.archive(tmp_path, "k", "Build", ["dist/app.js"])
+    target = tmp_path / "dist" / "app.js"
+
+    with patch("hookci.infrastructure.outputs._clone_file", return_value=False):
+        assert store.restore(tmp_path, "k")
+        st = target.stat()
+        assert st.st_nlink == 2 and not st.st_mode & stat.S_IWUSR
+
+        with patch("hookci.infrastructure.outputs.os.link", side_effect=OSError("EXDEV")):
+            assert store.restore(tmp_path, "k")
+    st = target.stat()
+    assert st.st_nlink == 1 and st.st_mode & stat.S_IWUSR
+    assert target.read_text() == "app"
+
+
+def test_modified_objects_are_not_restored(tmp_path: Path, store: LocalOutputStore) -> None:
+    """Verify a write through a hardlink makes the run a miss, and is not archived again."""
+    _build(tmp_path)
+    store.archive(tmp_path, "k1", "Build", ["dist/app.js"])
+    with patch("hookci.infrastructure.outputs._clone_file", return_value=False):
+        assert store.restore(tmp_path, "k1")
+    target = tmp_path / "dist" / "app.js"
+    target.chmod(0o644)
+    target.write_text("tampered")
+    assert not store.restore(tmp_path, "k1")
+
+    target.unlink()
+    target.write_text("app")
+    store.archive(tmp_path, "k2", "Build", ["dist/app.js"])
+    target.unlink()
+    assert store.restore(tmp_path, "k2")
+    assert target.read_text() == "app"
+
+
+def test_only_the_latest_runs_of_a_step_are_kept(
+    tmp_path: Path, store: LocalOutputStore
+) -> None:
+    (tmp_path / "out").write_text("docs")
+    store.archive(tmp_path, "docs", "Docs", ["out"])
+    for i in range(5):
+        (tmp_path / "out").write_text(f"build {i}")
+        store.archive(tmp_path, f"b{i}", "Build", ["out"])
+        os.utime(store.directory(tmp_path) / f"b{i}.json", ns=(i, i))
+
+    kept = sorted(p.stem for p in store.directory(tmp_path).glob("*.json"))
+    assert kept == ["b2", "b3", "b4", "docs"]
+    assert len(list((store.directory(tmp_path) / "objects").iterdir())) == 4
+
+
+def test_archive_failure_is_reported(tmp_path: Path, store: LocalOutputStore) -> None:
+    with pytest.raises(FileSystemError, match="outputs of step 'Build'"):
+        store.archive(tmp_path, "k", "Build", ["missing"])
@@ -0,0 +1,155 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Tests for the background container reaper."""
+import os
+import threading
+from typing import Generator, List
+from unittest.mock import MagicMock, patch
+
+import pytest
+from docker.errors import APIError, NotFound
+
+from hookci.infrastructure.reaper import (
+    HOSTNAME,
+    RUN_ID,
+    ContainerReaper,
+    container_labels,
+    is_orphan,
+)
+
+DEAD_PID = "999999999"
+
+
+@pytest.fixture
+def api() -> MagicMock:
+    mock = MagicMock()
+    mock.containers.return_value = []
+    return mock
+
+
+@pytest.fixture
+def reaper(api: MagicMock) -> Generator[ContainerReaper, None, None]:
+    reaper = ContainerReaper(api, sweep=False)
+    yield reaper
+    reaper.close()
+
+
+def _labels(run_id: str = "other-run", host: str = HOSTNAME, pid: str = DEAD_PID) -> dict[str, str]:
+    return {"hookci.run-id": run_id, "hookci.host": host, "hookci.pid": pid}
+
+
+def test_container_labels() -> None:
+    labels = container_labels("/repo")
+    assert labels == {
+        "hookci.run-id": RUN_ID,
+        "hookci.host": HOSTNAME,
+        "hookci.pid": str(os.getpid()),
+        "hookci.repo": "/repo",
+    }
+    assert "hookci.repo" not in container_labels()
+
+
+@pytest.mark.parametrize(
+    "labels, expected",
+    [
+        (_labels(), True),
+        (_labels(pid=str(os.getpid())), False),
+        (_labels(run_id=RUN_ID), False),
+        (_labels(host="another-host"), False),
+        (_labels(pid="not-a-pid"), False),
+        ({}, False),
+    ],
+)
+def test_is_orphan(labels: dict[str, str], expected: bool) -> None:
+    """Verify only containers of dead runs on this host count as orphans."""
+    assert is_orphan(labels) is expected
+
+
+def test_submitted_containers_are_removed_in_one_batch(api: MagicMock) -> None:
+    """Verify removals submitted together are handled in a single batch."""
+    batches: List[int] = []
+    reaper = ContainerReaper(api, sweep=False, batch_interval=0.2)
+    original = reaper._remove
+
+    def remove(container_id: str) -> None:
+        batches.append(reaper._queue.unfinished_tasks)
+        original(container_id)
+
+    with patch.object(reaper, "_remove", side_effect=remove):
+        for i in range(3):
+            reaper.submit(f"c{i}")
+        reaper.flush()
+    reaper.close()
+
+    assert [c.args for c in api.remove_container.call_args_list] == [("c0",), ("c1",), ("c2",)]
+    # Every removal happened while all three were still queued.
+    assert batches == [3, 2, 1]
+
+
+def test_submit_does_not_wait_for_removal(reaper: ContainerReaper, api: MagicMock) -> None:
+    """Verify a slow removal never blocks the caller."""
+    release = threading.Event()
+    api.remove_container.side_effect = lambda *args, **kwargs: release.wait(5)
+
+    reaper.submit("slow")
+    assert api.remove_container.call_count <= 1
+    release.set()
+    reaper.flush()
+    api.remove_container.assert_called_once_with("slow", force=True)
+
+
+def test_removal_errors_are_logged(reaper: ContainerReaper, api: MagicMock) -> None:
+    api.remove_container.side_effect = [NotFound("gone"), APIError("busy")]  # type: ignore[no-untyped-call]
+    with patch("hookci.infrastructure.reaper.logger") as mock_logger:
+        reaper.submit("gone")
+        reaper.submit("busy")
+        reaper.flush()
+    mock_logger.warning.assert_called_once()
+    assert "Could not remove container busy" in mock_logger.warning.call_args[0][0]
+
+
+def test_close_waits_for_pending_removals(api: MagicMock) -> None:
+    reaper = ContainerReaper(api, sweep=False, batch_interval=10)
+    reaper.submit("c1")
+    reaper.close()
+    api.remove_container.assert_called_once_with("c1", force=True)
+
+    # After closing, removals happen synchronously.
+    reaper.submit("c2")
+    api.remove_container.assert_called_with("c2", force=True)
+
+
+def test_sweep_removes_orphans_with_one_list_call(api: MagicMock) -> None:
+    """Verify the startup sweep lists labeled containers once and removes dead runs."""
+    api.containers.return_value = [
+        {"Id": "dead", "Labels": _labels()},
+        {"Id": "alive", "Labels": _labels(pid=str(os.getpid()))},
+        {"Id": "mine", "Labels": _labels(run_id=RUN_ID)},
+        {"Id": "unlabeled", "Labels": None},
+    ]
+    reaper = ContainerReaper(api)
+    reaper.close()  # The sweep runs first on the reaper thread
+
+    api.containers.assert_called_once_with(all=True, filters={"label": "hookci.run-id"})
+    api.remove_container.assert_called_once_with("dead", force=True)
+
+
+def test_sweep_list_failure_is_logged(reaper: ContainerReaper, api: MagicMock) -> None:
+    api.containers.side_effect = APIError("daemon busy")  # type: ignore[no-untyped-call]
+    with patch("hookci.infrastructure.reaper.logger") as mock_logger:
+        assert reaper.sweep_orphans() == []
+    assert "Could not list leftover containers" in mock_logger.warning.call_args[0][0]
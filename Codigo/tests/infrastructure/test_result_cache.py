@@ -0,0 +1,98 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Tests for the machine-wide step result cache."""
+import itertools
+import multiprocessing
+import time
+from pathlib import Path
+from typing import List
+from unittest.mock import patch
+
+import pytest
+
+from hookci.infrastructure.result_cache import SqliteResultCache, default_cache_path
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> SqliteResultCache:
+    return SqliteResultCache(tmp_path / "hookci" / "results.sqlite")
+
+
+def test_default_path_follows_xdg(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    assert default_cache_path() == tmp_path / "hookci" / "results.sqlite"
+    monkeypatch.delenv("XDG_CACHE_HOME")
+    assert default_cache_path() == Path.home() / ".cache" / "hookci" / "results.sqlite"
+
+
+def test_hits_are_shared_between_instances(cache: SqliteResultCache) -> None:
+    """Verify keys added by one clone's process are hits for another's."""
+    assert cache.hits(["a", "b"]) == set()
+    cache.add(["a", "c"])
+    other = SqliteResultCache(cache.path)
+    assert other.hits(["a", "b", "c"]) == {"a", "c"}
+    assert other.hits([]) == set()
+
+
+def _add_keys(path: Path, worker: int) -> None:
+    cache = SqliteResultCache(path)
+    for i in range(50):
+        cache.add([f"{worker}-{i}"])
+
+
+def test_concurrent_processes_lose_no_writes(cache: SqliteResultCache) -> None:
+    cache.add(["seed"])  # Create the database before the workers race.
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_add_keys, args=(cache.path, w)) for w in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+    keys = [f"{w}-{i}" for w in range(4) for i in range(50)]
+    assert cache.hits(keys) == set(keys)
+
+
+def test_evict_drops_least_recently_used(cache: SqliteResultCache) -> None:
+    """Verify eviction keeps recently hit keys and brings the cache under its cap."""
+    # Fractional, like real timestamps: SQLite stores whole ones as smaller
+    # integers, and rows must not grow once real time takes over.
+    clock = itertools.count()
+    with patch.object(time, "time", lambda: 1_700_000_000.5 + next(clock)):
+        keys: List[str] = [f"{i:064x}" for i in range(2000)]
+        cache.add(keys)
+        cache.hits(keys[:10])  # The oldest entries were just used.
+
+        assert cache.evict(1 << 30) == 0
+        dropped = cache.evict(64 * 1024)
+
+    assert 0 < dropped < len(keys)
+    remaining = cache.hits(keys)
+    assert set(keys[:10]) <= remaining
+    assert keys[10] not in remaining and keys[-1] in remaining
+    assert cache.evict(64 * 1024) == 0
+
+
+def test_unusable_database_disables_the_cache(
+    tmp_path: Path, caplog: pytest.LogCaptureFixture
+) -> None:
+    (tmp_path / "hookci").write_text("not a directory")
+    cache = SqliteResultCache(tmp_path / "hookci" / "results.sqlite")
+    cache.add(["a"])
+    assert cache.hits(["a"]) == set()
+    assert cache.evict(0) == 0
+    assert "Could not open the result cache" in caplog.text
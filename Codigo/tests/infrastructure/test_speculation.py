@@ -0,0 +1,112 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Tests for the speculative run store."""
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+from hookci.infrastructure.errors import FileSystemError
+from hookci.infrastructure.speculation import JsonSpeculationStore, SpeculativeRun
+
+
+@pytest.fixture
+def store() -> JsonSpeculationStore:
+    return JsonSpeculationStore(poll_interval=0.01)
+
+
+def test_save_and_load(tmp_path: Path, store: JsonSpeculationStore) -> None:
+    """Verify the record round-trips and its directory stays out of commits."""
+    assert store.load(tmp_path) is None
+    run = SpeculativeRun(key="k", tree="t", pid=os.getpid())
+    store.save(tmp_path, run)
+    assert store.load(tmp_path) == run
+    assert store.directory(tmp_path) == tmp_path / ".hookci" / "cache" / "speculation"
+    assert (tmp_path / ".hookci" / "cache" / ".gitignore").read_text() == "*\n"
+
+
+def test_unreadable_record_is_ignored(
+    tmp_path: Path, store: JsonSpeculationStore, caplog: pytest.LogCaptureFixture
+) -> None:
+    store.directory(tmp_path).mkdir(parents=True)
+    (store.directory(tmp_path) / "run.json").write_text("{")
+    assert store.load(tmp_path) is None
+    assert "Ignoring unreadable speculative run record" in caplog.text
+
+
+def test_save_failure_is_reported(tmp_path: Path, store: JsonSpeculationStore) -> None:
+    (tmp_path / ".hookci").write_text("not a directory")
+    with pytest.raises(FileSystemError, match="speculative run record"):
+        store.save(tmp_path, SpeculativeRun(key="k", tree="t", pid=1))
+
+
+def test_only_the_latest_snapshot_and_log_are_kept(
+    tmp_path: Path, store: JsonSpeculationStore
+) -> None:
+    old = store.snapshot(tmp_path, "t1")
+    (old / "file").write_text("x")
+    store.open_log(tmp_path, "k1").close()
+
+    new = store.snapshot(tmp_path, "t2")
+    store.open_log(tmp_path, "k2").close()
+    assert not old.exists()
+    assert new.is_dir() and not any(new.iterdir())
+    assert sorted(p.name for p in store.directory(tmp_path).iterdir()) == [
+        "k2.jsonl",
+        "tree-t2",
+    ]
+
+
+def test_follow_waits_for_the_run_to_end(tmp_path: Path, store: JsonSpeculationStore) -> None:
+    run = SpeculativeRun(key="k", tree="t", pid=os.getpid())
+    log = store.open_log(tmp_path, "k")
+    store.save(tmp_path, run)
+    log.write("first\nsec")
+    log.flush()
+
+    lines = store.follow(tmp_path, run)
+    assert next(lines) == "first"
+
+    def finish() -> None:
+        log.write("ond\nthird\n")
+        log.close()
+        store.save(tmp_path, run.model_copy(update={"done": True, "status": "SUCCESS"}))
+
+    writer = threading.Timer(0.05, finish)
+    writer.start()
+    assert list(lines) == ["second", "third"]
+    writer.join()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Needs POSIX process semantics.")
+def test_follow_stops_when_the_run_is_gone(
+    tmp_path: Path, store: JsonSpeculationStore
+) -> None:
+    """Verify a run whose process died, or that was replaced, is not waited for."""
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    dead = SpeculativeRun(key="k", tree="t", pid=process.pid)
+    store.open_log(tmp_path, "k").close()
+    store.save(tmp_path, dead)
+    assert list(store.follow(tmp_path, dead)) == []
+
+    replaced = SpeculativeRun(key="k", tree="t", pid=os.getpid())
+    store.save(tmp_path, SpeculativeRun(key="other", tree="u", pid=os.getpid()))
+    assert list(store.follow(tmp_path, replaced)) == []
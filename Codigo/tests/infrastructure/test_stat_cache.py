@@ -0,0 +1,96 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Tests for the stat-based file fingerprint cache."""
+import os
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from hookci.infrastructure import stat_cache as stat_cache_module
+from hookci.infrastructure.stat_cache import StatCache
+
+# `git hash-object` of a file containing "hi\n".
+HI_BLOB = "45b983be36b73c0788dc9cbcb76cbb80fc7bb057"
+
+
+def _write_old(path: Path, content: str) -> None:
+    """Writes a file dated outside the racy window."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    old = time.time() - 60
+    os.utime(path, (old, old))
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> StatCache:
+    return StatCache(tmp_path / ".hookci" / "cache" / "stat.sqlite")
+
+
+def test_fingerprints_match_git_blob_ids(cache: StatCache, tmp_path: Path) -> None:
+    _write_old(tmp_path / "a.txt", "hi\n")
+    (tmp_path / "link").symlink_to("a.txt")
+    (tmp_path / "dir").mkdir()
+
+    result = cache.fingerprints(tmp_path, ["a.txt", "link", "dir", "missing.txt"])
+
+    assert result["a.txt"] == HI_BLOB
+    # Git stores a symlink as a blob of its target path.
+    assert result["link"] == "8d14cbf983b3fad683171c9418998d9f68340823"
+    assert set(result) == {"a.txt", "link"}
+    assert (tmp_path / ".hookci" / "cache" / ".gitignore").read_text() == "*\n"
+
+
+def test_unchanged_files_are_not_read_again(cache: StatCache, tmp_path: Path) -> None:
+    """Verify a second lookup, even from a new process, only stats the files."""
+    _write_old(tmp_path / "a.txt", "hi\n")
+    cache.fingerprints(tmp_path, ["a.txt"])
+    cache.close()
+
+    with patch.object(stat_cache_module, "blob_id") as mock_blob_id:
+        assert StatCache(cache.path).fingerprints(tmp_path, ["a.txt"]) == {"a.txt": HI_BLOB}
+    mock_blob_id.assert_not_called()
+
+
+def test_changed_files_are_hashed_again(cache: StatCache, tmp_path: Path) -> None:
+    _write_old(tmp_path / "a.txt", "hi\n")
+    first = cache.fingerprints(tmp_path, ["a.txt"])["a.txt"]
+    _write_old(tmp_path / "a.txt", "bye\n")
+    assert cache.fingerprints(tmp_path, ["a.txt"])["a.txt"] != first
+
+
+def test_recently_modified_files_are_not_cached(cache: StatCache, tmp_path: Path) -> None:
+    """Verify files inside the racy window are hashed on every lookup."""
+    (tmp_path / "a.txt").write_text("hi\n")
+    cache.fingerprints(tmp_path, ["a.txt"])
+    with patch.object(stat_cache_module, "blob_id", return_value="x") as mock_blob_id:
+        cache.fingerprints(tmp_path, ["a.txt"])
+    mock_blob_id.assert_called_once()
+
+
+def test_unusable_database_still_fingerprints(
+    tmp_path: Path, caplog: pytest.LogCaptureFixture
+) -> None:
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    cache = StatCache(blocker / "stat.sqlite")
+    _write_old(tmp_path / "a.txt", "hi\n")
+
+    assert cache.fingerprints(tmp_path, ["a.txt"]) == {"a.txt": HI_BLOB}
+    assert cache.fingerprints(tmp_path, ["a.txt"]) == {"a.txt": HI_BLOB}
+    assert caplog.text.count("Could not open the file cache") == 1
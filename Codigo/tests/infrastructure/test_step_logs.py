@@ -0,0 +1,81 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Tests for the step log store."""
+from pathlib import Path
+
+import pytest
+
+from hookci.infrastructure.errors import FileSystemError
+from hookci.infrastructure.step_logs import LocalStepLogStore, StepLogs
+
+
+def test_each_run_gets_its_own_directory(tmp_path: Path) -> None:
+    """Verify a new run leaves the previous one alone and the cache stays out of commits."""
+    store = LocalStepLogStore()
+    first = store.open(tmp_path)
+    second = store.open(tmp_path)
+    first.append("Test", "first\n")
+    second.append("Test", "second\n")
+    first.close()
+    second.close()
+    assert first.directory != second.directory
+    assert first.path("Test").read_text() == "first\n"
+    assert second.path("Test").read_text() == "second\n"
+    assert store.runs(tmp_path) == sorted([first.directory, second.directory])
+    assert (tmp_path / ".hookci" / "cache" / ".gitignore").read_text() == "*\n"
+
+
+def test_open_prunes_the_oldest_runs(tmp_path: Path) -> None:
+    store = LocalStepLogStore(keep=3)
+    runs = store.directory(tmp_path)
+    runs.mkdir(parents=True)
+    for name in ["20240101T000000Z-a", "20240102T000000Z-b", "20240103T000000Z-c"]:
+        (runs / name).mkdir()
+        (runs / name / "Test.log").write_text("old\n")
+
+    logs = store.open(tmp_path)
+    assert [p.name for p in store.runs(tmp_path)] == [
+        "20240102T000000Z-b",
+        "20240103T000000Z-c",
+        logs.directory.name,
+    ]
+
+
+def test_similar_step_names_get_their_own_files(tmp_path: Path) -> None:
+    logs = StepLogs(tmp_path)
+    paths = {logs.path(name) for name in ["pkg: test", "pkg/test", "pkg_test"]}
+    assert len(paths) == 3
+    assert all(p.parent == tmp_path and p.name.startswith("pkg_test-") for p in paths)
+
+
+def test_write_failure_drops_only_the_log(
+    tmp_path: Path, caplog: pytest.LogCaptureFixture
+) -> None:
+    logs = StepLogs(tmp_path / "missing")
+    logs.append("Test", "line\n")
+    logs.append("Test", "line\n")
+    logs.close()
+    assert caplog.text.count("Could not store the output of step 'Test'") == 1
+
+    logs.append("Test", "after close\n")  # A cancelled step still writing
+    assert caplog.text.count("Could not store") == 1
+
+
+def test_open_failure_is_reported(tmp_path: Path) -> None:
+    (tmp_path / ".hookci").write_text("not a directory")
+    with pytest.raises(FileSystemError, match="step log directory"):
+        LocalStepLogStore().open(tmp_path)
@@ -0,0 +1,85 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Tests for the inotify file watcher."""
+import queue
+import sys
+import threading
+from pathlib import Path
+from typing import Iterator, Set
+
+import pytest
+
+from hookci.infrastructure.watcher import InotifyWatcher
+
+pytestmark = pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="inotify is only available on Linux."
+)
+
+
+@pytest.fixture
+def batches(tmp_path: Path) -> Iterator["queue.Queue[Set[str]]"]:
+    """Collects the watcher's batches for the tree under tmp_path."""
+    (tmp_path / "src").mkdir()
+    watcher = InotifyWatcher()
+    watcher.watch(tmp_path, ["src"])
+    collected: "queue.Queue[Set[str]]" = queue.Queue()
+
+    def listen() -> None:
+        for batch in watcher.changes(0.05):
+            collected.put(batch)
+
+    thread = threading.Thread(target=listen)
+    thread.start()
+    yield collected
+    watcher.close()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+
+
+def test_changes_are_debounced_into_batches(
+    batches: "queue.Queue[Set[str]]", tmp_path: Path
+) -> None:
+    (tmp_path / "src" / "a.py").write_text("1")
+    (tmp_path / "b.txt").write_text("2")
+    (tmp_path / "src" / "a.py").write_text("3")
+    assert batches.get(timeout=5) == {"src/a.py", "b.txt"}
+
+    (tmp_path / "b.txt").unlink()
+    assert batches.get(timeout=5) == {"b.txt"}
+
+
+def test_new_directories_are_watched(
+    batches: "queue.Queue[Set[str]]", tmp_path: Path
+) -> None:
+    """Verify files in new directories are seen, and Git's own files are not."""
+    (tmp_path / "pkg" / "sub").mkdir(parents=True)
+    (tmp_path / "pkg" / "sub" / "c.py").write_text("1")
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".git" / "index").write_text("")
+    assert "pkg/sub/c.py" in batches.get(timeout=5)
+
+    (tmp_path / "pkg" / "sub" / "c.py").write_text("2")
+    assert batches.get(timeout=5) == {"pkg/sub/c.py"}
+    assert batches.empty()
+
+
+def test_close_before_iterating_releases_the_watcher(tmp_path: Path) -> None:
+    watcher = InotifyWatcher()
+    watcher.watch(tmp_path, [])
+    watcher.close()
+    watcher.close()
+    assert list(watcher.changes(0.05)) == []
@@ -17,14 +17,16 @@
 """
 Tests for the presentation (CLI) layer.
 """
+import io
+import json
 import subprocess
 from pathlib import Path
-from typing import Generator, cast
+from typing import Generator, List, Tuple, cast
 from unittest.mock import MagicMock, Mock, patch, call
 
 import pytest
 import typer
-from pydantic import BaseModel
+from pydantic import BaseModel, ByteSize
 from rich.console import Console, Group
 from rich.live import Live
 from rich.syntax import Syntax
@@ -37,6 +39,7 @@ from hookci.application.errors import (
     ProjectAlreadyInitializedError,
 )
 from hookci.application.events import (
+    ChangesDetected,
     DebugShellStarting,
     EventStatus,
     ImageBuildEnd,
@@ -45,17 +48,23 @@ from hookci.application.events import (
     ImagePullEnd,
     ImagePullStart,
     LogLine,
+    LogLinesSuppressed,
+    PipelineCancelled,
     PipelineEnd,
     PipelineEvent,
     PipelineStart,
+    SpeculationStart,
     StepEnd,
     StepStart,
 )
-from hookci.domain.config import LogLevel, Step
+from hookci.application.results import GcResult, ImageInfo
+from hookci.domain.config import ImageGc, LogLevel, Step
 from hookci.infrastructure.errors import InfrastructureError
 from hookci.presentation.cli import (
     DebugUI,
+    JsonlUI,
     PipelineUI,
+    PlainUI,
     _handle_error,
     _open_interactive_shell,
     app,
@@ -153,7 +162,7 @@ def test_run_success(mock_container: MagicMock) -> None:
 
     mock_container.ci_execution_service.run.return_value = event_generator()
     with patch("hookci.presentation.cli.Live"):  # Mock Rich Live display
-        result = runner.invoke(app, ["run"])
+        result = runner.invoke(app, ["run", "--output", "rich"])
 
     assert result.exit_code == 0
     assert "Pipeline finished successfully!" in result.stdout
@@ -168,7 +177,7 @@ def test_run_failure(mock_container: MagicMock) -> None:
 
     mock_container.ci_execution_service.run.return_value = event_generator()
     with patch("hookci.presentation.cli.Live"):
-        result = runner.invoke(app, ["run"])
+        result = runner.invoke(app, ["run", "--output", "rich"])
 
     assert result.exit_code == 1
     assert "Pipeline failed." in result.stdout
@@ -183,12 +192,116 @@ def test_run_warning(mock_container: MagicMock) -> None:
 
     mock_container.ci_execution_service.run.return_value = event_generator()
     with patch("hookci.presentation.cli.Live"):
-        result = runner.invoke(app, ["run"])
+        result = runner.invoke(app, ["run", "--output", "rich"])
 
     assert result.exit_code == 0
     assert "Pipeline finished with non-critical failures." in result.stdout
 
 
+def test_run_auto_output_uses_plain_text_without_a_terminal(
+    mock_container: MagicMock,
+) -> None:
+    """Verify a run whose stdout is not a terminal skips Rich's live display."""
+    mock_container.ci_execution_service.run.return_value = _jsonl_events()
+    with patch("hookci.presentation.cli.Live") as mock_live:
+        result = runner.invoke(app, ["run"])
+
+    assert result.exit_code == 0
+    mock_live.assert_not_called()
+    assert "--> Lint: ruff check ." in result.stdout
+    assert "<-- Lint: SUCCESS (exit code 0)" in result.stdout
+    assert "Pipeline finished successfully!" in result.stdout
+
+
+def test_watch_prints_each_run_and_stops_on_interrupt(mock_container: MagicMock) -> None:
+    """Verify watch runs are introduced by their changes and Ctrl+C ends cleanly."""
+    lint = Step(name="Lint", command="lint")
+    test = Step(name="Test", command="pytest")
+
+    def watch(debounce: float) -> Generator[PipelineEvent, None, None]:
+        yield PipelineStart(total_steps=1, log_level=LogLevel.INFO)
+        yield StepStart(step=test)
+        yield LogLine(line="boom", stream="stdout", step_name="Test")
+        yield StepEnd(step=test, status="FAILURE", exit_code=1)
+        yield PipelineEnd(status="FAILURE")
+        yield ChangesDetected(paths=[f"f{i}" for i in range(5)], steps=["Lint"])
+        yield PipelineStart(total_steps=1, log_level=LogLevel.INFO)
+        yield StepStart(step=lint)
+        yield PipelineCancelled()
+        yield ChangesDetected(paths=["README.md"], steps=[])
+        raise KeyboardInterrupt
+
+    mock_container.ci_execution_service.watch.side_effect = watch
+    result = runner.invoke(app, ["watch", "--debounce", "0.5"])
+
+    assert result.exit_code == 0
+    mock_container.ci_execution_service.watch.assert_called_once_with(0.5)
+    assert result.stdout.count("boom") == 1
+    assert "==> Changed: f0, f1, f2 and 2 more; running Lint" in result.stdout
+    assert "==> Run cancelled by newer changes" in result.stdout
+    assert "==> Changed: README.md; no step affected" in result.stdout
+    assert "Watching for changes" in result.stdout
+
+
+def test_speculate_introduces_each_staged_tree(mock_container: MagicMock) -> None:
+    lint = Step(name="Lint", command="lint")
+
+    def speculate(debounce: float) -> Generator[PipelineEvent, None, None]:
+        yield SpeculationStart(tree="a" * 40)
+        yield PipelineStart(total_steps=1, log_level=LogLevel.INFO)
+        yield StepStart(step=lint)
+        yield PipelineCancelled()
+        yield SpeculationStart(tree="b" * 40)
+        yield PipelineStart(total_steps=1, log_level=LogLevel.INFO)
+        yield StepStart(step=lint)
+        yield StepEnd(step=lint, status="SUCCESS", exit_code=0)
+        yield PipelineEnd(status="SUCCESS")
+        raise KeyboardInterrupt
+
+    mock_container.ci_execution_service.speculate.side_effect = speculate
+    result = runner.invoke(app, ["speculate", "--debounce", "0.5"])
+
+    assert result.exit_code == 0
+    mock_container.ci_execution_service.speculate.assert_called_once_with(0.5)
+    assert f"==> Verifying staged tree {'a' * 12}" in result.stdout
+    assert "==> Run cancelled by newer changes" in result.stdout
+    assert result.stdout.rstrip().endswith(
+        "==> Waiting for the index to change (Ctrl+C to stop)"
+    )
+
+
+def test_run_resume_reports_reused_steps(mock_container: MagicMock) -> None:
+    """Verify --resume reaches the service and reused steps are marked as such."""
+    step = Step(name="Lint", command="lint")
+    mock_container.ci_execution_service.run.return_value = iter(
+        [
+            PipelineStart(total_steps=1, log_level=LogLevel.INFO),
+            StepStart(step=step),
+            StepEnd(step=step, status="SUCCESS", exit_code=0, reused=True),
+            PipelineEnd(status="SUCCESS"),
+        ]
+    )
+    result = runner.invoke(app, ["run", "--resume", "--output", "plain"])
+
+    assert result.exit_code == 0
+    assert "<-- Lint: SUCCESS (reused)" in result.stdout
+    mock_container.ci_execution_service.run.assert_called_once_with(
+        hook_type=None, debug=False, resume=True, only=[], from_steps=[], until=[]
+    )
+
+
+def test_run_passes_step_selection(mock_container: MagicMock) -> None:
+    mock_container.ci_execution_service.run.return_value = iter([])
+    result = runner.invoke(
+        app, ["run", "--only", "Test", "--only", "Docs", "--from", "Lint", "--until", "Deploy"]
+    )
+    assert result.exit_code == 0
+    kwargs = mock_container.ci_execution_service.run.call_args.kwargs
+    assert kwargs["only"] == ["Test", "Docs"]
+    assert kwargs["from_steps"] == ["Lint"]
+    assert kwargs["until"] == ["Deploy"]
+
+
 def test_run_skipped(mock_container: MagicMock, mock_logger: MagicMock) -> None:
     """Verify a skipped 'run' exits gracefully and logs an info message."""
     # service.run() returns an empty generator when the run is skipped.
@@ -205,6 +318,164 @@ def test_run_skipped(mock_container: MagicMock, mock_logger: MagicMock) -> None:
     )
 
 
+def test_run_with_trace_writes_file(mock_container: MagicMock, tmp_path: Path) -> None:
+    """Verify '--trace' enables the tracer and writes the trace even on failure."""
+
+    def event_generator() -> Generator[PipelineEvent, None, None]:
+        yield PipelineStart(total_steps=1, log_level=LogLevel.INFO)
+        yield PipelineEnd(status="FAILURE")
+
+    mock_container.ci_execution_service.run.return_value = event_generator()
+    trace_path = tmp_path / "trace.json"
+    with patch("hookci.presentation.cli.Live"), patch(
+        "hookci.presentation.cli.tracer"
+    ) as mock_tracer:
+        result = runner.invoke(app, ["run", "--trace", str(trace_path)])
+
+    assert result.exit_code == 1
+    mock_tracer.enable.assert_called_once()
+    mock_tracer.write.assert_called_once_with(trace_path)
+
+
+def test_run_with_unwritable_trace_keeps_the_result(mock_container: MagicMock) -> None:
+    """Verify a trace that cannot be written is only warned about."""
+
+    def event_generator() -> Generator[PipelineEvent, None, None]:
+        yield PipelineStart(total_steps=1, log_level=LogLevel.INFO)
+        yield PipelineEnd(status="FAILURE")
+
+    mock_container.ci_execution_service.run.return_value = event_generator()
+    with patch("hookci.presentation.cli.Live"), patch(
+        "hookci.presentation.cli.tracer"
+    ) as mock_tracer, patch("hookci.presentation.cli.logger") as mock_logger:
+        mock_tracer.write.side_effect = PermissionError("denied")
+        result = runner.invoke(app, ["run", "--trace", "/trace.json"])
+
+    assert result.exit_code == 1
+    assert "Could not write the trace" in mock_logger.warning.call_args[0][0]
+
+
+def _jsonl_events() -> Generator[PipelineEvent, None, None]:
+    step = Step(name="Lint", command="ruff check .")
+    yield PipelineStart(total_steps=1, log_level=LogLevel.INFO)
+    yield StepStart(step=step)
+    yield LogLine(line="All checks passed!\n", stream="stdout", step_name="Lint")
+    yield StepEnd(step=step, status="SUCCESS", exit_code=0)
+    yield PipelineEnd(status="SUCCESS")
+
+
+def test_run_jsonl_output_to_stdout(mock_container: MagicMock) -> None:
+    """Verify '--output jsonl' prints only JSON records and bypasses Rich."""
+    mock_container.ci_execution_service.run.return_value = _jsonl_events()
+    with patch("hookci.presentation.cli.Live") as mock_live, patch(
+        "hookci.presentation.cli.log_to_stderr"
+    ) as mock_log_to_stderr:
+        result = runner.invoke(app, ["run", "--output", "jsonl"])
+
+    assert result.exit_code == 0
+    mock_live.assert_not_called()
+    mock_log_to_stderr.assert_called_once()
+    records = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [r["event"] for r in records] == [
+        "PipelineStart",
+        "StepStart",
+        "LogLine",
+        "StepEnd",
+        "PipelineEnd",
+    ]
+    assert [r["seq"] for r in records] == [1, 2, 3, 4, 5]
+    assert records[2]["data"] == {
+        "line": "All checks passed!\n",
+        "stream": "stdout",
+        "step_name": "Lint",
+    }
+    assert records[3]["data"]["step"]["name"] == "Lint"
+
+
+def test_run_jsonl_output_to_file_failure(
+    mock_container: MagicMock, tmp_path: Path
+) -> None:
+    """Verify '--output-file' receives the stream and failures set the exit code."""
+
+    def event_generator() -> Generator[PipelineEvent, None, None]:
+        yield PipelineStart(total_steps=0, log_level=LogLevel.INFO)
+        yield PipelineEnd(status="FAILURE")
+
+    mock_container.ci_execution_service.run.return_value = event_generator()
+    output_file = tmp_path / "events.jsonl"
+    with patch("hookci.presentation.cli.log_to_stderr") as mock_log_to_stderr:
+        result = runner.invoke(
+            app, ["run", "--output", "jsonl", "--output-file", str(output_file)]
+        )
+
+    assert result.exit_code == 1
+    assert result.stdout == ""
+    mock_log_to_stderr.assert_not_called()
+    records = [json.loads(line) for line in output_file.read_text().splitlines()]
+    assert records[-1]["data"] == {"status": "FAILURE"}
+
+
+def test_run_output_file_implies_jsonl(mock_container: MagicMock, tmp_path: Path) -> None:
+    """Verify '--output-file' alone selects the JSONL stream, and other formats are rejected."""
+    mock_container.ci_execution_service.run.return_value = _jsonl_events()
+    output_file = tmp_path / "events.jsonl"
+    result = runner.invoke(app, ["run", "--output-file", str(output_file)])
+    assert result.exit_code == 0
+    assert json.loads(output_file.read_text().splitlines()[-1])["event"] == "PipelineEnd"
+
+    result = runner.invoke(app, ["run", "--output", "plain", "--output-file", str(output_file)])
+    assert result.exit_code == 2
+    mock_container.ci_execution_service.run.assert_called_once()
+
+
+def test_run_jsonl_output_rejects_debug(mock_container: MagicMock) -> None:
+    """Verify the interactive debug shell cannot be combined with JSONL output."""
+    result = runner.invoke(app, ["run", "--output", "jsonl", "--debug"])
+    assert result.exit_code == 2
+    mock_container.ci_execution_service.run.assert_not_called()
+
+
+def test_gc_removes_old_images(mock_container: MagicMock) -> None:
+    """Verify 'gc' applies the option overrides and reports what was freed."""
+    service = mock_container.image_gc_service
+    service.load_policy.return_value = ImageGc(keep=3)
+    service.collect.return_value = GcResult(
+        kept=[ImageInfo(tag="hookci/repo:new", size=1000)],
+        removed=[ImageInfo(tag="hookci/repo:old", size=2000)],
+    )
+
+    result = runner.invoke(app, ["gc", "--keep", "1", "--max-size", "1GB"])
+
+    assert result.exit_code == 0
+    assert "hookci/repo:old" in result.stdout
+    assert "Removed 1 image(s), freeing 2.0KiB." in result.stdout
+    service.collect.assert_called_once_with(
+        ImageGc(keep=1, max_size=ByteSize(1_000_000_000)), dry_run=False
+    )
+
+
+def test_gc_dry_run_and_nothing_to_remove(mock_container: MagicMock) -> None:
+    service = mock_container.image_gc_service
+    service.load_policy.return_value = ImageGc()
+    service.collect.return_value = GcResult(
+        kept=[], removed=[ImageInfo(tag="hookci/repo:old", size=10)]
+    )
+    result = runner.invoke(app, ["gc", "--dry-run"])
+    assert "Would remove 1 image(s)" in result.stdout
+    service.collect.assert_called_once_with(ImageGc(), dry_run=True)
+
+    service.collect.return_value = GcResult(kept=[ImageInfo(tag="t", size=1)], removed=[])
+    result = runner.invoke(app, ["gc"])
+    assert "Nothing to remove; 1 image(s) kept." in result.stdout
+
+
+def test_gc_rejects_invalid_size(mock_container: MagicMock) -> None:
+    mock_container.image_gc_service.load_policy.return_value = ImageGc()
+    result = runner.invoke(app, ["gc", "--max-size", "lots"])
+    assert result.exit_code == 2
+    mock_container.image_gc_service.collect.assert_not_called()
+
+
 def test_run_unexpected_error(
     mock_container: MagicMock, mock_logger: MagicMock
 ) -> None:
@@ -448,6 +719,18 @@ class TestDebugUI:
             "[bold yellow]✖ Step 'Test Step' Failed (Status: WARNING)[/]"
         )
 
+    @patch("hookci.presentation.cli.console.print")
+    def test_debug_ui_groups_parallel_logs(self, mock_print: MagicMock) -> None:
+        """Verify log lines get a step header when parallel steps interleave."""
+        handler = DebugUI()
+        for name in ("A", "B"):
+            handler.handle_event(StepStart(step=Step(name=name, command="cmd")))
+        mock_print.reset_mock()
+        for name in ("B", "A", "A"):
+            handler.handle_event(LogLine(line="out", stream="stdout", step_name=name))
+        printed = [c.args[0] for c in mock_print.call_args_list]
+        assert printed == ["  [dim]out[/]", "[bold]│ A[/]", "  [dim]out[/]", "  [dim]out[/]"]
+
     @patch("hookci.presentation.cli.console.print")
     def test_debug_ui_handles_docker_events(self, mock_print: MagicMock) -> None:
         """Verify the DebugUI prints messages for Docker pull and build events."""
@@ -715,3 +998,154 @@ def test_run_debug_mode_with_single_event(mock_container: MagicMock) -> None:
     # The DebugUI for PipelineEnd just sets a status, it doesn't print.
     # The final status message is printed by the `run` function itself.
     assert "Pipeline finished successfully!" in result.stdout
+
+
+class TestJsonlUI:
+    """Tests for the JsonlUI class."""
+
+    def test_log_lines_are_batched(self) -> None:
+        """Verify log lines wait for a full batch while status events flush at once."""
+        stream = io.StringIO()
+        ui = JsonlUI(stream, batch_size=3, flush_interval=3600)
+
+        ui.handle_event(PipelineStart(total_steps=1, log_level=LogLevel.INFO))
+        assert len(stream.getvalue().splitlines()) == 1
+
+        for i in range(2):
+            ui.handle_event(LogLine(line=f"{i}\n", stream="stdout", step_name="s"))
+        assert len(stream.getvalue().splitlines()) == 1
+
+        ui.handle_event(LogLine(line="2\n", stream="stdout", step_name="s"))
+        assert len(stream.getvalue().splitlines()) == 4
+
+        ui.handle_event(LogLine(line="3\n", stream="stderr", step_name="s"))
+        ui.handle_event(PipelineEnd(status="WARNING"))
+        records = [json.loads(line) for line in stream.getvalue().splitlines()]
+        assert [r["seq"] for r in records] == list(range(1, 7))
+        assert ui.final_status == "WARNING"
+
+    def test_timestamps_are_monotonic(self) -> None:
+        stream = io.StringIO()
+        ui = JsonlUI(stream, flush_interval=0)
+        for i in range(5):
+            ui.handle_event(LogLine(line=f"{i}\n", stream="stdout", step_name="s"))
+        timestamps = [json.loads(line)["ts"] for line in stream.getvalue().splitlines()]
+        assert len(timestamps) == 5
+        assert timestamps == sorted(timestamps)
+        assert timestamps[0] >= 0
+
+
+class TestPlainUI:
+    """Tests for the PlainUI class."""
+
+    @pytest.fixture
+    def step(self) -> Step:
+        return Step(name="Test", command="pytest")
+
+    def _run(self, events: List[PipelineEvent]) -> Tuple[PlainUI, str]:
+        stream = io.StringIO()
+        ui = PlainUI(stream)
+        for event in events:
+            ui.handle_event(event)
+        ui.flush()
+        return ui, stream.getvalue()
+
+    def test_info_level_streams_prefixed_lines(self, step: Step) -> None:
+        """Verify INFO runs show each line as it arrives, without repeating failed output."""
+        passing = Step(name="Lint", command="ruff")
+        _, output = self._run(
+            [
+                PipelineStart(total_steps=2, log_level=LogLevel.INFO),
+                StepStart(step=passing),
+                StepStart(step=step),
+                LogLine(line="lint ok\n", stream="stdout", step_name="Lint"),
+                LogLine(line="1 failed\n", stream="stderr", step_name="Test"),
+                StepEnd(step=passing, status="SUCCESS", exit_code=0),
+                StepEnd(step=step, status="FAILURE", exit_code=1),
+                PipelineEnd(status="FAILURE"),
+            ]
+        )
+        assert output.index("[Lint] lint ok\n") < output.index("<-- Lint: SUCCESS")
+        assert output.count("1 failed") == 1
+        assert output.index("[Test] 1 failed\n") < output.index("<-- Test: FAILURE")
+        assert "Output of failed step" not in output
+
+    def test_failed_output_is_printed_once_at_the_end(self, step: Step) -> None:
+        """Verify ERROR runs hold back log lines and print failed output at the end."""
+        passing = Step(name="Lint", command="ruff")
+        ui, output = self._run(
+            [
+                PipelineStart(total_steps=2, log_level=LogLevel.ERROR),
+                StepStart(step=passing),
+                StepStart(step=step),
+                LogLine(line="lint ok\n", stream="stdout", step_name="Lint"),
+                LogLine(line="1 failed\n", stream="stdout", step_name="Test"),
+                StepEnd(step=passing, status="SUCCESS", exit_code=0),
+                StepEnd(step=step, status="FAILURE", exit_code=1),
+                PipelineEnd(status="FAILURE"),
+            ]
+        )
+
+        assert ui.final_status == "FAILURE"
+        assert "lint ok" not in output
+        assert output.count("1 failed") == 1
+        assert output.index("<-- Test: FAILURE (exit code 1)") < output.index(
+            "==> Output of failed step 'Test'\n$ pytest\n1 failed"
+        )
+        assert output.endswith("==> Pipeline finished: FAILURE\n")
+
+    def test_debug_level_streams_prefixed_lines(self, step: Step) -> None:
+        """Verify DEBUG runs stream every line with its step name and do not repeat it."""
+        _, output = self._run(
+            [
+                PipelineStart(total_steps=1, log_level=LogLevel.DEBUG),
+                StepStart(step=step),
+                LogLine(line="1 failed\n", stream="stderr", step_name="Test"),
+                StepEnd(step=step, status="FAILURE", exit_code=1),
+                PipelineEnd(status="FAILURE"),
+            ]
+        )
+        assert output.count("[Test] 1 failed\n") == 1
+        assert "Output of failed step" not in output
+
+    def test_suppressed_lines_are_noted_in_failed_output(self, step: Step) -> None:
+        _, output = self._run(
+            [
+                PipelineStart(total_steps=1, log_level=LogLevel.ERROR),
+                StepStart(step=step),
+                LogLine(line="1 failed\n", stream="stdout", step_name="Test"),
+                LogLinesSuppressed(step_name="Test", count=7, log_file="/repo/test.log"),
+                StepEnd(step=step, status="FAILURE", exit_code=1),
+                PipelineEnd(status="FAILURE"),
+            ]
+        )
+        assert (
+            "1 failed\n... 7 lines suppressed; full output in /repo/test.log ...\n" in output
+        )
+
+    def test_image_events(self) -> None:
+        _, output = self._run(
+            [
+                PipelineStart(total_steps=0, log_level=LogLevel.DEBUG),
+                ImagePullStart(image_name="python:3.13"),
+                ImagePullEnd(status="SUCCESS"),
+                ImageBuildStart(dockerfile_path="Dockerfile", tag="t", total_steps=2),
+                ImageBuildProgress(step=1, line="Step 1/2 : FROM scratch"),
+                ImageBuildEnd(status="FAILURE"),
+            ]
+        )
+        assert output.splitlines()[1:] == [
+            "==> Pulling image python:3.13",
+            "==> Image pull: SUCCESS",
+            "==> Building image t (2 steps)",
+            "    Step 1/2 : FROM scratch",
+            "==> Image build: FAILURE",
+        ]
+
+    def test_log_lines_are_written_in_batches(self, step: Step) -> None:
+        stream = MagicMock()
+        ui = PlainUI(stream, batch_size=100, flush_interval=3600)
+        ui.handle_event(PipelineStart(total_steps=1, log_level=LogLevel.DEBUG))
+        for i in range(250):
+            ui.handle_event(LogLine(line=f"{i}\n", stream="stdout", step_name="Test"))
+        assert stream.write.call_count == 3
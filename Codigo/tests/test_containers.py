@@ -28,6 +28,7 @@ from hookci.application.services import (
     ProjectInitService,
 )
 from hookci.containers import Container
+from hookci.infrastructure.cluster import DockerClusterService
 from hookci.infrastructure.docker import IDockerService
 from hookci.infrastructure.fs import IFileSystem, IScmService
 from hookci.infrastructure.yaml_handler import IConfigHandler
@@ -67,3 +68,14 @@ def test_container_docker_service_init_failure() -> None:
             mock_docker_service_class.side_effect = DockerException("cannot connect")
             with pytest.raises(DockerException):
                 _ = container.docker_service
+
+
+def test_container_builds_cluster_from_docker_hosts_env(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Verify HOOKCI_DOCKER_HOSTS switches the Docker service to a cluster."""
+    monkeypatch.setenv("HOOKCI_DOCKER_HOSTS", "unix:///a.sock=2,tcp://b:2375=8")
+    with patch("docker.DockerClient"):
+        service = Container().docker_service
+    assert isinstance(service, DockerClusterService)
+    assert service.capacity == 10
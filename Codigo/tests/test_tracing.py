@@ -0,0 +1,128 @@
+# Copyright (C) 2025 PUC Minas, Henrique Almeida, Gabriel Dolabela
+# This file is part of HookCI.
+
+# HookCI is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# HookCI is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with HookCI.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Tests for the Chrome trace-event tracer.
+"""
+import json
+import threading
+from pathlib import Path
+
+import pytest
+
+from hookci.tracing import LatencyCounters, Tracer
+
+
+def test_disabled_tracer_records_nothing(tmp_path: Path) -> None:
+    """Verify a disabled tracer hands out the shared no-op span and records nothing."""
+    tracer = Tracer()
+    assert tracer.span("a") is tracer.span("b")
+    with tracer.span("a"), tracer.track("step"):
+        tracer.instant("marker")
+
+    trace_path = tmp_path / "trace.json"
+    tracer.write(trace_path)
+    events = json.loads(trace_path.read_text())["traceEvents"]
+    assert [e["name"] for e in events] == ["thread_name"]
+
+
+def test_spans_and_instants_are_written(tmp_path: Path) -> None:
+    """Verify spans become complete events and instants are thread-scoped."""
+    tracer = Tracer()
+    tracer.enable()
+    with tracer.span("config.load", path="x"):
+        tracer.instant("marker")
+
+    trace_path = tmp_path / "trace.json"
+    tracer.write(trace_path)
+    trace = json.loads(trace_path.read_text())
+    events = {e["name"]: e for e in trace["traceEvents"]}
+
+    span = events["config.load"]
+    assert span["ph"] == "X"
+    assert span["dur"] >= 0
+    assert span["args"] == {"path": "x"}
+    assert span["tid"] == 0
+    assert events["marker"]["ph"] == "i"
+    assert events["marker"]["s"] == "t"
+    assert events["marker"]["ts"] >= span["ts"]
+
+
+def test_tracks_separate_reused_threads(tmp_path: Path) -> None:
+    """Verify each track block gets its own named track, even on the same thread."""
+    tracer = Tracer()
+    tracer.enable()
+
+    def run_steps() -> None:
+        for name in ("Lint", "Test"):
+            with tracer.track(f"step: {name}"), tracer.span("step", step=name):
+                pass
+
+    worker = threading.Thread(target=run_steps)
+    worker.start()
+    worker.join()
+
+    trace_path = tmp_path / "trace.json"
+    tracer.write(trace_path)
+    events = json.loads(trace_path.read_text())["traceEvents"]
+    track_names = {
+        e["tid"]: e["args"]["name"] for e in events if e["name"] == "thread_name"
+    }
+    spans = [e for e in events if e["name"] == "step"]
+
+    assert track_names[0] == "pipeline"
+    assert [track_names[s["tid"]] for s in spans] == ["step: Lint", "step: Test"]
+
+
+def test_enable_discards_previous_events() -> None:
+    tracer = Tracer()
+    tracer.enable()
+    tracer.instant("old")
+    tracer.enable()
+    assert tracer._events == []
+    tracer.disable()
+    assert tracer.enabled is False
+
+
+def test_latency_counters_aggregate_phases() -> None:
+    """Verify counts, totals and maxima are kept per phase."""
+    counters = LatencyCounters()
+    counters.record("container.start", 0.1)
+    counters.record("container.start", 0.3)
+    counters.record("container.wait", 0.5)
+
+    summary = counters.summary()
+    start = summary["container.start"]
+    assert start.count == 2
+    assert start.total == pytest.approx(0.4)
+    assert start.mean == pytest.approx(0.2)
+    assert start.max == pytest.approx(0.3)
+    assert summary["container.wait"].count == 1
+
+    # The summary is a snapshot.
+    counters.record("container.wait", 1.0)
+    assert summary["container.wait"].count == 1
+
+    counters.reset()
+    assert counters.summary() == {}
+
+
+def test_latency_measure_counts_failures() -> None:
+    counters = LatencyCounters()
+    with pytest.raises(RuntimeError):
+        with counters.measure("container.create"):
+            raise RuntimeError("boom")
+    assert counters.summary()["container.create"].count == 1